@@ -0,0 +1,80 @@
+"""
+archiver: drena los streams de Redis a segmentos zstd locales (ver segments.py).
+
+Un consumer group propio (archiver_group) por stream, creado desde "0" para archivar
+también lo que ya está en Redis. Cada lote se escribe (frame + índice, con fsync) y
+recién entonces se hace XACK, así que una caída nunca pierde entradas.
+"""
+import os
+import asyncio
+import logging
+
+from services.common.config import Settings, config
+from services.common.redis_streams import (
+    redis_client, Streams, create_consumer_group, xreadgroup_batches, xack_batch,
+)
+from services.archiver.segments import SegmentWriter
+
+container_label = os.getenv("CONTAINER_LABEL") or os.getenv("HOSTNAME") or "archiver"
+log_fmt = f"%(asctime)s %(levelname)s [{container_label}] %(name)s: %(message)s"
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format=log_fmt)
+log = logging.getLogger("archiver")
+
+DEFAULT_STREAMS = [Streams.RAW, Streams.SIGNALS, Streams.MGMT, Streams.EVENTS, Streams.TICKS]
+ARCHIVER_GROUP = "archiver_group"
+
+
+def archive_streams() -> list:
+    """
+    ARCHIVE_STREAMS (coma) o los streams por defecto. raw_messages se expande a sus
+    particiones cuando router_parser corre con ROUTER_WORKERS > 1 (el stream base se
+    sigue archivando por si quedan productores antiguos).
+    """
+    raw = config.get("ARCHIVE_STREAMS", "")
+    streams = [s.strip() for s in raw.split(",") if s.strip()] if raw else list(DEFAULT_STREAMS)
+    workers = max(1, int(config.get("ROUTER_WORKERS", 1)))
+    if Streams.RAW in streams and workers > 1:
+        streams += [p for p in Streams.raw_partitions(workers) if p not in streams]
+    return streams
+
+
+async def archive_stream(r, stream: str, writer: SegmentWriter, consumer: str, count: int) -> None:
+    await create_consumer_group(r, stream, ARCHIVER_GROUP, start_id="0")
+    log.info(f"[ARCHIVE] {stream} -> {writer.dir} (último archivado={writer.last_id})")
+    while True:
+        try:
+            async for batch in xreadgroup_batches(r, stream, ARCHIVER_GROUP, consumer, count=count):
+                # Compresión + fsync fuera del event loop
+                written = await asyncio.to_thread(writer.append_batch, batch)
+                await xack_batch(r, stream, ARCHIVER_GROUP, [msg_id for msg_id, _ in batch])
+                log.debug(f"[ARCHIVE] {stream}: {written}/{len(batch)} entradas archivadas")
+        except Exception as e:
+            if "NOGROUP" in str(e):
+                log.warning(f"[REDIS] NOGROUP en {stream}, recreando grupo {ARCHIVER_GROUP}...")
+                await create_consumer_group(r, stream, ARCHIVER_GROUP, start_id="0")
+                continue
+            log.error(f"[ARCHIVE] Error archivando {stream}: {e}")
+            await asyncio.sleep(1)
+
+
+async def main():
+    s = Settings.load()
+    # Conexión binaria: los payloads msgpack se archivan tal cual, sin decodificar
+    r = await redis_client(s["redis_url"], binary=True)
+    root = config.get("ARCHIVE_DIR", "/data/archive")
+    segment_bytes = int(float(config.get("ARCHIVE_SEGMENT_MB", 64)) * 1024 * 1024)
+    segment_age = float(config.get("ARCHIVE_SEGMENT_HOURS", 24)) * 3600
+    level = int(config.get("ARCHIVE_ZSTD_LEVEL", 3))
+    count = int(config.get("ARCHIVE_BATCH", 500))
+    consumer = os.getenv("ARCHIVER_CONSUMER", "archiver-1")
+
+    tasks = []
+    for stream in archive_streams():
+        writer = SegmentWriter(root, stream, max_segment_bytes=segment_bytes,
+                               max_segment_age_sec=segment_age, level=level)
+        tasks.append(asyncio.create_task(archive_stream(r, stream, writer, consumer, count)))
+    await asyncio.gather(*tasks)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,260 @@
+"""
+segments.py
+Archivo local de streams Redis en segmentos append-only comprimidos con zstd.
+
+Problema previo: xadd recorta cada stream a ~10000 entradas (MAXLEN aproximado), así
+que los mensajes crudos de Telegram y los trade_events desaparecen en pocas horas y
+Redis es el único almacenamiento.
+
+Solucion: el archiver drena cada stream por consumer group y escribe aquí.
+  <root>/<stream>/<primer_id>.zst   frames zstd concatenados; cada frame es un lote
+                                    msgpack [[id, {campo: valor}], ...]
+  <root>/<stream>/<primer_id>.idx   una línea JSON por frame: primer/último ID,
+                                    rango de tiempo (ms del ID), offset y longitud
+
+ArchiveReader usa el índice para descomprimir sólo los frames que se solapan con el
+rango pedido (scan por ID o por tiempo), sin recorrer el resto del archivo.
+
+Garantías:
+  - Se escribe el frame, luego su línea de índice (ambos con fsync) y recién entonces
+    el llamador hace XACK. Un frame sin índice (caída a mitad) se trunca al reabrir.
+  - IDs <= al último archivado se ignoran, así que re-entregas tras una caída entre
+    el índice y el XACK no duplican entradas.
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import msgpack
+import zstandard
+
+SEGMENT_SUFFIX = ".zst"
+INDEX_SUFFIX = ".idx"
+
+StreamId = Tuple[int, int]
+Bound = Union[None, str, int, float, datetime]
+
+
+def parse_id(value: Union[str, bytes]) -> StreamId:
+    """'1700000000000-3' -> (1700000000000, 3). Un ID sin secuencia toma seq 0."""
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode()
+    ms, _, seq = str(value).partition("-")
+    return int(ms), int(seq or 0)
+
+
+def format_id(sid: StreamId) -> str:
+    return f"{sid[0]}-{sid[1]}"
+
+
+def _bound(value: Bound, is_end: bool) -> Optional[StreamId]:
+    """Límite de scan desde ID ('ms-seq' o 'ms'), epoch ms (int/float) o datetime."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        value = int(value.timestamp() * 1000)
+    if isinstance(value, (int, float)):
+        ms = int(value)
+        return (ms, 2 ** 64 - 1) if is_end else (ms, 0)
+    text = value.decode() if isinstance(value, (bytes, bytearray)) else str(value)
+    if "-" not in text and is_end:
+        return int(text), 2 ** 64 - 1
+    return parse_id(text)
+
+
+def _to_text(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray)):
+        try:
+            return value.decode("utf-8")
+        except UnicodeDecodeError:
+            return bytes(value)  # payload binario (msgpack): se deja tal cual
+    return value
+
+
+def _fsync(f) -> None:
+    f.flush()
+    os.fsync(f.fileno())
+
+
+class SegmentWriter:
+    """
+    Escritor de un stream. No es thread-safe: un writer por stream.
+    Rota de segmento al superar max_segment_bytes o max_segment_age_sec.
+    """
+
+    def __init__(self, root: str, stream: str, max_segment_bytes: int = 64 * 1024 * 1024,
+                 max_segment_age_sec: float = 86400.0, level: int = 3):
+        self.dir = os.path.join(root, stream.replace(":", "_"))
+        self.stream = stream
+        self.max_segment_bytes = int(max_segment_bytes)
+        self.max_segment_age_sec = float(max_segment_age_sec)
+        self._cctx = zstandard.ZstdCompressor(level=level)
+        self._name: Optional[str] = None
+        self._size = 0
+        self._opened_at = 0.0
+        self.last_id: Optional[StreamId] = None
+        os.makedirs(self.dir, exist_ok=True)
+        self._recover()
+
+    def _recover(self) -> None:
+        """Retoma el último segmento: trunca bytes sin indexar y recupera last_id."""
+        names = _segment_names(self.dir)
+        if not names:
+            return
+        name = names[-1]
+        frames = _read_index(os.path.join(self.dir, name + INDEX_SUFFIX))
+        data_path = os.path.join(self.dir, name + SEGMENT_SUFFIX)
+        end = frames[-1]["off"] + frames[-1]["len"] if frames else 0
+        if os.path.exists(data_path) and os.path.getsize(data_path) > end:
+            with open(data_path, "r+b") as f:
+                f.truncate(end)
+        if frames:
+            self.last_id = parse_id(frames[-1]["last"])
+            _rewrite_index(os.path.join(self.dir, name + INDEX_SUFFIX), frames)
+        else:
+            # Segmento vacío: el último ID archivado está en el anterior
+            for prev in reversed(names[:-1]):
+                prev_frames = _read_index(os.path.join(self.dir, prev + INDEX_SUFFIX))
+                if prev_frames:
+                    self.last_id = parse_id(prev_frames[-1]["last"])
+                    break
+        if frames:
+            self._name = name
+            self._size = end
+            self._opened_at = time.time()
+
+    def _should_rotate(self) -> bool:
+        if self._name is None:
+            return True
+        if self._size >= self.max_segment_bytes:
+            return True
+        return self._size > 0 and time.time() - self._opened_at >= self.max_segment_age_sec
+
+    def append_batch(self, entries: List[Tuple[Any, Dict[Any, Any]]]) -> int:
+        """
+        Agrega un lote [(id, fields), ...] en orden de stream como un frame.
+        Devuelve cuántas entradas se escribieron (las ya archivadas se omiten).
+        """
+        records = []
+        last = self.last_id
+        for msg_id, fields in entries:
+            sid = parse_id(msg_id)
+            if last is not None and sid <= last:
+                continue
+            records.append((sid, [format_id(sid), fields or {}]))
+            last = sid
+        if not records:
+            return 0
+        if self._should_rotate():
+            self._name = format_id(records[0][0])
+            self._size = 0
+            self._opened_at = time.time()
+        frame = self._cctx.compress(msgpack.packb([rec for _, rec in records], use_bin_type=True))
+        first = records[0][0]
+        # Segmento nuevo: "w" descarta restos de un intento sin indexar con el mismo nombre
+        fresh = self._size == 0
+        with open(os.path.join(self.dir, self._name + SEGMENT_SUFFIX), "wb" if fresh else "ab") as f:
+            f.write(frame)
+            _fsync(f)
+        line = json.dumps({
+            "first": format_id(first), "last": format_id(last),
+            "t0": first[0], "t1": last[0],
+            "off": self._size, "len": len(frame), "n": len(records),
+        }, separators=(",", ":"))
+        with open(os.path.join(self.dir, self._name + INDEX_SUFFIX), "w" if fresh else "a") as f:
+            f.write(line + "\n")
+            _fsync(f)
+        self._size += len(frame)
+        self.last_id = last
+        return len(records)
+
+
+def _segment_names(directory: str) -> List[str]:
+    if not os.path.isdir(directory):
+        return []
+    names = [n[:-len(INDEX_SUFFIX)] for n in os.listdir(directory) if n.endswith(INDEX_SUFFIX)]
+    return sorted(names, key=parse_id)
+
+
+def _rewrite_index(path: str, frames: List[Dict[str, Any]]) -> None:
+    """Reescribe el índice sólo con frames válidos (descarta una línea cortada por una caída)."""
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        for fr in frames:
+            f.write(json.dumps(fr, separators=(",", ":")) + "\n")
+        _fsync(f)
+    os.replace(tmp, path)
+
+
+def _read_index(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    frames = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                frames.append(json.loads(line))
+            except ValueError:
+                # Línea a medio escribir (caída): el frame correspondiente no cuenta
+                break
+    return frames
+
+
+class ArchiveReader:
+    """
+    Lectura de segmentos para replay y auditoría:
+        reader = ArchiveReader("/data/archive")
+        for msg_id, fields in reader.scan("trade_events", start=datetime(2026, 1, 1)):
+            ...
+    Los valores se devuelven tal como se leyeron de Redis (bytes con la conexión
+    binaria del archiver); para payloads codificados usar redis_streams.decode_message.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._dctx = zstandard.ZstdDecompressor()
+
+    def streams(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def scan(self, stream: str, start: Bound = None, end: Bound = None) -> Iterator[Tuple[str, Dict[Any, Any]]]:
+        """Entradas con start <= id <= end, en orden. Límites por ID, epoch ms o datetime."""
+        lo, hi = _bound(start, False), _bound(end, True)
+        directory = os.path.join(self.root, stream.replace(":", "_"))
+        names = _segment_names(directory)
+        for i, name in enumerate(names):
+            seg_first = parse_id(name)
+            if hi is not None and seg_first > hi:
+                break
+            if lo is not None and i + 1 < len(names) and parse_id(names[i + 1]) <= lo:
+                continue  # el segmento siguiente ya empieza después de lo: éste queda antes
+            frames = _read_index(os.path.join(directory, name + INDEX_SUFFIX))
+            with open(os.path.join(directory, name + SEGMENT_SUFFIX), "rb") as f:
+                for fr in frames:
+                    if lo is not None and parse_id(fr["last"]) < lo:
+                        continue
+                    if hi is not None and parse_id(fr["first"]) > hi:
+                        return
+                    f.seek(fr["off"])
+                    records = msgpack.unpackb(self._dctx.decompress(f.read(fr["len"])), raw=False, strict_map_key=False)
+                    for msg_id, fields in records:
+                        sid = parse_id(msg_id)
+                        if lo is not None and sid < lo:
+                            continue
+                        if hi is not None and sid > hi:
+                            return
+                        yield msg_id, fields
+
+    def scan_text(self, stream: str, start: Bound = None, end: Bound = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Como scan() pero con claves/valores bytes decodificados a str (streams de texto)."""
+        for msg_id, fields in self.scan(stream, start, end):
+            yield msg_id, {_to_text(k): _to_text(v) for k, v in fields.items()}
@@ -6,6 +6,8 @@ import logging
 import secrets
 from typing import List, Optional
 from models import Setting, Account, Channel, Provider, AccountChannel, ChannelProvider
+# La imagen copia services/common como ./common (ver Dockerfile)
+from common.settings_cache import SETTINGS_CHANNEL
 
 logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
 log = logging.getLogger("backend_admin")
@@ -30,6 +32,12 @@ def get_db():
     finally:
         conn.close()
 
+# SETTINGS_CHANNEL es el canal que escuchan los ConfigProvider de los servicios: cualquier
+# escritura de configuración (settings, cuentas, canales, proveedores) lo notifica.
+# El NOTIFY se entrega al hacer commit: los snapshots se recargan sólo con datos confirmados.
+def notify_config_changed(cur, key: str) -> None:
+    cur.execute("SELECT pg_notify(%s, %s)", (SETTINGS_CHANNEL, key))
+
 def check_auth(credentials: HTTPBasicCredentials = Depends(security)) -> None:
     user_ok = secrets.compare_digest(credentials.username.encode(), ADMIN_USER.encode()) if ADMIN_USER else False
     pass_ok = secrets.compare_digest(credentials.password.encode(), ADMIN_PASS.encode()) if ADMIN_PASS else False
@@ -45,6 +53,7 @@ def check_auth(credentials: HTTPBasicCredentials = Depends(security)) -> None:
 def update_setting(key: str, setting: Setting, db=Depends(get_db)):
     with db.cursor() as cur:
         cur.execute("UPDATE settings SET value=%s WHERE key=%s", (setting.value, key))
+        notify_config_changed(cur, key)
         db.commit()
     return {"ok": True}
 
@@ -52,6 +61,7 @@ def update_setting(key: str, setting: Setting, db=Depends(get_db)):
 def delete_setting(key: str, db=Depends(get_db)):
     with db.cursor() as cur:
         cur.execute("DELETE FROM settings WHERE key=%s", (key,))
+        notify_config_changed(cur, key)
         db.commit()
     return {"ok": True}
 
@@ -61,6 +71,7 @@ def update_account(account_id: int, account: Account, db=Depends(get_db)):
     with db.cursor() as cur:
         cur.execute("UPDATE accounts SET name=%s, host=%s, port=%s, active=%s, fixed_lot=%s, chat_id=%s, trading_mode=%s WHERE id=%s",
             (account.name, account.host, account.port, account.active, account.fixed_lot, account.chat_id, account.trading_mode, account_id))
+        notify_config_changed(cur, "accounts")
         db.commit()
     return {"ok": True}
 
@@ -68,6 +79,7 @@ def update_account(account_id: int, account: Account, db=Depends(get_db)):
 def delete_account(account_id: int, db=Depends(get_db)):
     with db.cursor() as cur:
         cur.execute("DELETE FROM accounts WHERE id=%s", (account_id,))
+        notify_config_changed(cur, "accounts")
         db.commit()
     return {"ok": True}
 
@@ -76,6 +88,7 @@ def delete_account(account_id: int, db=Depends(get_db)):
 def update_channel(channel_id: int, channel: Channel, db=Depends(get_db)):
     with db.cursor() as cur:
         cur.execute("UPDATE channels SET name=%s, description=%s WHERE id=%s", (channel.name, channel.description, channel_id))
+        notify_config_changed(cur, "channels")
         db.commit()
     return {"ok": True}
 
@@ -83,6 +96,7 @@ def update_channel(channel_id: int, channel: Channel, db=Depends(get_db)):
 def delete_channel(channel_id: int, db=Depends(get_db)):
     with db.cursor() as cur:
         cur.execute("DELETE FROM channels WHERE id=%s", (channel_id,))
+        notify_config_changed(cur, "channels")
         db.commit()
     return {"ok": True}
 
@@ -91,6 +105,7 @@ def delete_channel(channel_id: int, db=Depends(get_db)):
 def update_provider(provider_id: int, provider: Provider, db=Depends(get_db)):
     with db.cursor() as cur:
         cur.execute("UPDATE signal_providers SET name=%s, parser=%s WHERE id=%s", (provider.name, provider.parser, provider_id))
+        notify_config_changed(cur, "signal_providers")
         db.commit()
     return {"ok": True}
 
@@ -98,6 +113,7 @@ def update_provider(provider_id: int, provider: Provider, db=Depends(get_db)):
 def delete_provider(provider_id: int, db=Depends(get_db)):
     with db.cursor() as cur:
         cur.execute("DELETE FROM signal_providers WHERE id=%s", (provider_id,))
+        notify_config_changed(cur, "signal_providers")
         db.commit()
     return {"ok": True}
 
@@ -106,6 +122,7 @@ def delete_provider(provider_id: int, db=Depends(get_db)):
 def delete_account_channel(ac: AccountChannel, db=Depends(get_db)):
     with db.cursor() as cur:
         cur.execute("DELETE FROM account_channels WHERE account_id=%s AND channel_id=%s", (ac.account_id, ac.channel_id))
+        notify_config_changed(cur, "account_channels")
         db.commit()
     return {"ok": True}
 
@@ -114,6 +131,7 @@ def delete_account_channel(ac: AccountChannel, db=Depends(get_db)):
 def delete_channel_provider(cp: ChannelProvider, db=Depends(get_db)):
     with db.cursor() as cur:
         cur.execute("DELETE FROM channel_providers WHERE channel_id=%s AND provider_id=%s", (cp.channel_id, cp.provider_id))
+        notify_config_changed(cur, "channel_providers")
         db.commit()
     return {"ok": True}
 
@@ -138,6 +156,7 @@ def list_settings(db=Depends(get_db)):
 def set_setting(setting: Setting, db=Depends(get_db)):
     with db.cursor() as cur:
         cur.execute("INSERT INTO settings (key, value) VALUES (%s, %s) ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value", (setting.key, setting.value))
+        notify_config_changed(cur, setting.key)
         db.commit()
     return {"ok": True}
 
@@ -151,6 +170,7 @@ def list_accounts(db=Depends(get_db)):
 def add_account(account: Account, db=Depends(get_db)):
     with db.cursor() as cur:
         cur.execute("INSERT INTO accounts (name, host, port, active, fixed_lot, chat_id, trading_mode) VALUES (%s, %s, %s, %s, %s, %s, %s)", (account.name, account.host, account.port, account.active, account.fixed_lot, account.chat_id, account.trading_mode))
+        notify_config_changed(cur, "accounts")
         db.commit()
     return {"ok": True}
 
@@ -166,6 +186,7 @@ def list_channels(db=Depends(get_db)):
 def add_channel(channel: Channel, db=Depends(get_db)):
     with db.cursor() as cur:
         cur.execute("INSERT INTO channels (name, description) VALUES (%s, %s)", (channel.name, channel.description))
+        notify_config_changed(cur, "channels")
         db.commit()
     return {"ok": True}
 
@@ -180,6 +201,7 @@ def list_providers(db=Depends(get_db)):
 def add_provider(provider: Provider, db=Depends(get_db)):
     with db.cursor() as cur:
         cur.execute("INSERT INTO signal_providers (name, parser) VALUES (%s, %s)", (provider.name, provider.parser))
+        notify_config_changed(cur, "signal_providers")
         db.commit()
     return {"ok": True}
 
@@ -194,6 +216,7 @@ def list_account_channels(db=Depends(get_db)):
 def add_account_channel(ac: AccountChannel, db=Depends(get_db)):
     with db.cursor() as cur:
         cur.execute("INSERT INTO account_channels (account_id, channel_id) VALUES (%s, %s)", (ac.account_id, ac.channel_id))
+        notify_config_changed(cur, "account_channels")
         db.commit()
     return {"ok": True}
 
@@ -208,5 +231,6 @@ def list_channel_providers(db=Depends(get_db)):
 def add_channel_provider(cp: ChannelProvider, db=Depends(get_db)):
     with db.cursor() as cur:
         cur.execute("INSERT INTO channel_providers (channel_id, provider_id) VALUES (%s, %s)", (cp.channel_id, cp.provider_id))
+        notify_config_changed(cur, "channel_providers")
         db.commit()
     return {"ok": True}
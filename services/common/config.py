@@ -1,7 +1,6 @@
 # ConfigProvider abstraction
 from services.common.config_db import ConfigProvider
 from typing import Any
-import json
 
 config = ConfigProvider()
 FAST_UPDATE_WINDOW_SECONDS: float = float(config.get("FAST_UPDATE_WINDOW_SECONDS", 30))
@@ -11,7 +10,7 @@ CHANNELS_CONFIG_JSON: str = config.get("CHANNELS_CONFIG_JSON", "{}")
 class Settings:
     @staticmethod
     def sl_max_pips() -> float:
-        return float(config.get("SL_MAX_PIPS", 120.0))
+        return config.setting("SL_MAX_PIPS")
 
     @staticmethod
     def load() -> dict[str, Any]:
@@ -43,41 +42,19 @@ class Settings:
             "TG_PHONE": config.get("TG_PHONE"),
         }
 
+    # Consultas por el pool de ConfigProvider (db_pool): sin conexión nueva por llamada
     @staticmethod
     def accounts() -> list[dict]:
-        db_url = config.db_url
-        try:
-            import psycopg2
-            if db_url:
-                conn = psycopg2.connect(db_url)
-                from services.common.config_db_loader import load_accounts
-                return load_accounts(conn)
-        except ImportError:
-            pass
-        return json.loads(config.get("ACCOUNTS_JSON", "[]"))
+        return config.get_accounts()
+
+    @staticmethod
+    async def accounts_async() -> list[dict]:
+        return await config.get_accounts_async()
 
     @staticmethod
     def signal_providers() -> list[dict]:
-        db_url = config.db_url
-        try:
-            import psycopg2
-            if db_url:
-                conn = psycopg2.connect(db_url)
-                from services.common.config_db_loader import load_signal_providers
-                return load_signal_providers(conn)
-        except ImportError:
-            pass
-        return []
+        return config.get_signal_providers() if config.pool else []
 
     @staticmethod
     def channel_providers() -> dict:
-        db_url = config.db_url
-        try:
-            import psycopg2
-            if db_url:
-                conn = psycopg2.connect(db_url)
-                from services.common.config_db_loader import load_channel_providers
-                return load_channel_providers(conn)
-        except ImportError:
-            pass
-        return {}
+        return config.get_channel_providers() if config.pool else {}
@@ -1,75 +1,207 @@
 import os
+import select
 import logging
-from typing import Optional, Any
+import threading
+from typing import Optional, Any, Callable, List
 import psycopg2
 
+from services.common.settings_cache import SettingsSnapshot, SETTINGS_CHANNEL, _MISSING
+from services.common.db_pool import ConnectionPool, AsyncConnectionPool
+from services.common import config_db_loader as loader
+from services.common import config_snapshot
+
 log = logging.getLogger("config_db")
 
 
 class ConfigProvider:
-    def __init__(self, db_url: Optional[str] = None):
+    """
+    Configuración desde la tabla settings (o el entorno si no hay CONFIG_DB_URL).
+
+    get()/setting() leen un SettingsSnapshot en memoria (settings_cache.py), cargado
+    al arrancar y recargado por un hilo que hace LISTEN en SETTINGS_CHANNEL; cada
+    SETTINGS_REFRESH_SEC recarga igual por si se perdió una notificación (reconexión).
+
+    Las consultas usan `pool` (db_pool.ConnectionPool, acotado) y los servicios asyncio
+    `async_pool`; sólo el listener tiene una conexión propia (LISTEN es por sesión).
+
+    Cada recarga compila también cuentas, proveedores y canal -> proveedores, y lo guarda
+    en el snapshot local (config_snapshot.py). Si ese archivo existe al arrancar, el
+    servicio arranca con él sin esperar a la base; el listener conecta en segundo plano.
+    `source` indica de dónde vino la configuración vigente: "db", "file" o "env".
+    """
+
+    def __init__(self, db_url: Optional[str] = None, listen: bool = True, snapshot_path: Optional[str] = None):
         self.db_url = db_url or os.environ.get("CONFIG_DB_URL")
-        self._conn = None
-        if self.db_url:
+        self.snapshot_path = snapshot_path or config_snapshot.snapshot_path()
+        self.pool: Optional[ConnectionPool] = None
+        self.async_pool: Optional[AsyncConnectionPool] = None
+        self.source = "env"
+        self._snapshot = SettingsSnapshot.from_env()
+        self._compiled: Optional[dict] = None
+        self._listeners: List[Callable[[SettingsSnapshot], None]] = []
+        self._stop = threading.Event()
+        self._listen_thread: Optional[threading.Thread] = None
+        self.refresh_sec = float(os.environ.get("SETTINGS_REFRESH_SEC", 300))
+        if not self.db_url:
+            return
+        cached = config_snapshot.read_snapshot(self.snapshot_path)
+        pool = ConnectionPool(self.db_url)
+        if cached is not None:
+            # Arranque sin tocar la base: el pool conecta recién en la primera consulta
+            self._apply(cached, source="file")
+            log.info("[ConfigDB] Configuración local cargada de %s (%d cuentas, %d claves); la base se conecta en segundo plano",
+                     self.snapshot_path, len(cached.get("accounts") or ()), len(self._snapshot.raw))
+        else:
             try:
-                self._conn = psycopg2.connect(self.db_url)
+                pool.warmup()
             except Exception as e:
                 log.error("[ConfigDB] No se pudo conectar a la base de datos: %s", e)
+                return
+        self.pool = pool
+        self.async_pool = AsyncConnectionPool(self.db_url, sync_pool=pool)
+        if cached is None:
+            self.reload()
+        if listen:
+            self.start_listener()
 
-    def get(self, key: str, default: Any = None) -> Any:
-        if self._conn:
+    # --- snapshot ---
+
+    @property
+    def snapshot(self) -> SettingsSnapshot:
+        return self._snapshot
+
+    def _apply(self, compiled: dict, source: str) -> SettingsSnapshot:
+        snapshot = SettingsSnapshot(compiled.get("settings") or {}, version=self._snapshot.version + 1)
+        self._compiled = compiled
+        self._snapshot = snapshot
+        self.source = source
+        return snapshot
+
+    def _load_from(self, conn) -> SettingsSnapshot:
+        compiled = config_snapshot.compile_config(
+            loader.load_settings(conn),
+            loader.load_accounts(conn),
+            loader.load_signal_providers(conn),
+            loader.load_channel_providers(conn),
+        )
+        if not config_snapshot.same_config(self._compiled, compiled):
+            config_snapshot.write_snapshot(compiled, self.snapshot_path)
+        snapshot = self._apply(compiled, source="db")
+        for fn in list(self._listeners):
+            try:
+                fn(snapshot)
+            except Exception as e:
+                log.warning("[ConfigDB] listener de settings falló: %s", e)
+        return snapshot
+
+    def reload(self) -> bool:
+        """Relee la configuración completa. Si falla se conserva el snapshot anterior."""
+        if not self.pool:
+            return False
+        try:
+            with self.pool.connection() as conn:
+                snapshot = self._load_from(conn)
+        except Exception as e:
+            log.warning("[ConfigDB] Error recargando settings: %s. Se conserva la versión %d.", e, self._snapshot.version)
+            return False
+        log.info("[ConfigDB] settings v%d cargados (%d claves)", snapshot.version, len(snapshot.raw))
+        return True
+
+    def on_change(self, fn: Callable[[SettingsSnapshot], None]) -> None:
+        """fn(snapshot) tras cada recarga (desde el hilo listener)."""
+        self._listeners.append(fn)
+
+    def start_listener(self) -> None:
+        if self._listen_thread is None and self.db_url:
+            self._listen_thread = threading.Thread(target=self._listen_loop, name="settings-listener", daemon=True)
+            self._listen_thread.start()
+
+    def _listen_loop(self) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            conn = None
             try:
-                with self._conn.cursor() as cur:
-                    cur.execute("SELECT value FROM settings WHERE key = %s", (key,))
-                    row = cur.fetchone()
-                    return row[0] if row else default
+                conn = psycopg2.connect(self.db_url)
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {SETTINGS_CHANNEL}")
+                # Cubre lo que haya cambiado mientras no se escuchaba
+                self._load_from(conn)
+                backoff = 1.0
+                while not self._stop.is_set():
+                    ready, _, _ = select.select([conn], [], [], self.refresh_sec)
+                    conn.poll()
+                    if conn.notifies or not ready:
+                        conn.notifies.clear()
+                        snapshot = self._load_from(conn)
+                        log.info("[ConfigDB] settings recargados v%d", snapshot.version)
             except Exception as e:
-                log.warning("[ConfigDB] Error leyendo clave '%s': %s. Usando default.", key, e)
+                log.warning("[ConfigDB] listener de settings desconectado: %s. Reintento en %.0fs", e, backoff)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    # --- lectura / escritura ---
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if self.source != "env":
+            return self._snapshot.raw.get(key, default)
         return os.environ.get(key, default)
 
+    def setting(self, key: str, default: Any = _MISSING) -> Any:
+        """Valor tipado de SETTINGS_SCHEMA (float/bool/dict ya convertido): un lookup de dict."""
+        return self._snapshot.setting(key, default)
+
     def set(self, key: str, value: str) -> None:
-        if self._conn:
+        if self.pool:
             try:
-                with self._conn.cursor() as cur:
+                with self.pool.connection() as conn, conn.cursor() as cur:
                     cur.execute(
                         "INSERT INTO settings (key, value) VALUES (%s, %s) ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value",
                         (key, value),
                     )
-                    self._conn.commit()
+                    cur.execute("SELECT pg_notify(%s, %s)", (SETTINGS_CHANNEL, key))
+                    conn.commit()
             except Exception as e:
                 log.error("[ConfigDB] Error escribiendo clave '%s': %s", key, e)
+                return
+            self.reload()
         else:
             os.environ[key] = value
+            self._snapshot = SettingsSnapshot.from_env()
+
+    def _cached(self, key: str):
+        return None if self._compiled is None else self._compiled.get(key)
 
     def get_accounts(self) -> list[dict]:
-        if self._conn:
-            with self._conn.cursor() as cur:
-                # Un solo JOIN elimina el N+1 query anterior
-                cur.execute("""
-                    SELECT a.id, a.name, a.host, a.port, a.active,
-                           a.fixed_lot, a.chat_id, a.trading_mode,
-                           COALESCE(array_agg(ac.channel_id) FILTER (WHERE ac.channel_id IS NOT NULL), ARRAY[]::bigint[]) AS allowed_channels
-                    FROM accounts a
-                    LEFT JOIN account_channels ac ON ac.account_id = a.id
-                    GROUP BY a.id, a.name, a.host, a.port, a.active, a.fixed_lot, a.chat_id, a.trading_mode
-                    ORDER BY a.id
-                """)
-                accounts = []
-                for row in cur.fetchall():
-                    accounts.append({
-                        "id": row[0], "name": row[1], "host": row[2], "port": row[3],
-                        "active": row[4], "fixed_lot": row[5], "chat_id": row[6],
-                        "trading_mode": row[7], "allowed_channels": list(row[8]),
-                    })
-                return accounts
+        cached = self._cached("accounts")
+        if cached is not None:
+            return [dict(a) for a in cached]
+        if self.pool:
+            with self.pool.connection() as conn:
+                return loader.load_accounts(conn)
         import json
         return json.loads(os.environ.get("ACCOUNTS_JSON", "[]"))
 
+    async def get_accounts_async(self) -> list[dict]:
+        """get_accounts() para el event loop: no bloquea en la base."""
+        cached = self._cached("accounts")
+        if cached is None and self.async_pool:
+            return await loader.aload_accounts(self.async_pool)
+        return self.get_accounts()
+
     def get_signal_providers(self) -> list[dict]:
-        if self._conn:
-            with self._conn.cursor() as cur:
-                cur.execute("SELECT id, name, parser FROM signal_providers")
-                return [{"id": row[0], "name": row[1], "parser": row[2]} for row in cur.fetchall()]
+        cached = self._cached("signal_providers")
+        if cached is not None:
+            return [dict(p) for p in cached]
+        if self.pool:
+            with self.pool.connection() as conn:
+                return loader.load_signal_providers(conn)
         import json
         channels = json.loads(os.environ.get("CHANNELS_CONFIG_JSON", "{}"))
         all_providers: set[str] = set()
@@ -78,28 +210,27 @@ class ConfigProvider:
         return [{"name": p, "parser": p} for p in all_providers]
 
     def get_account_channels(self, account_id: int) -> list[int]:
-        if self._conn:
-            with self._conn.cursor() as cur:
-                cur.execute("SELECT channel_id FROM account_channels WHERE account_id = %s", (account_id,))
-                return [row[0] for row in cur.fetchall()]
+        if self.pool and self._compiled is None:
+            with self.pool.connection() as conn:
+                return [row[0] for row in loader.fetch(conn, loader.SQL_ACCOUNT_CHANNELS, (account_id,))]
         for acc in self.get_accounts():
             if acc.get("id") == account_id:
                 return acc.get("allowed_channels", [])
         return []
 
     def get_channel_providers(self) -> dict[int, list]:
-        if self._conn:
-            with self._conn.cursor() as cur:
-                cur.execute("SELECT channel_id, provider_id FROM channel_providers")
-                mapping: dict[int, list] = {}
-                for row in cur.fetchall():
-                    mapping.setdefault(row[0], []).append(row[1])
-                return mapping
+        cached = self._cached("channel_providers")
+        if cached is not None:
+            return {ch: list(provs) for ch, provs in cached.items()}
+        if self.pool:
+            with self.pool.connection() as conn:
+                return loader.load_channel_providers(conn)
         import json
         channels = json.loads(os.environ.get("CHANNELS_CONFIG_JSON", "{}"))
         return {int(ch): provs for ch, provs in channels.items()}
 
     def close(self) -> None:
-        if self._conn:
-            self._conn.close()
-            self._conn = None
+        self._stop.set()
+        if self.pool:
+            self.pool.close()
+            self.pool = None
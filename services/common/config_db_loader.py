@@ -1,37 +1,77 @@
-import json
-import psycopg2
+from services.common.db_pool import PooledConnection
 
-def load_settings(conn):
+# Consultas de configuración: (nombre de la sentencia preparada, SQL). Las usan estos
+# loaders, ConfigProvider y Settings; con una conexión del pool (db_pool.PooledConnection)
+# se preparan una vez por conexión.
+SQL_SETTINGS = ("cfg_settings", "SELECT key, value FROM settings")
+# Un solo JOIN (antes: un SELECT de account_channels por cuenta)
+SQL_ACCOUNTS = ("cfg_accounts", """
+    SELECT a.id, a.name, a.host, a.port, a.active,
+           a.fixed_lot, a.chat_id, a.trading_mode,
+           COALESCE(array_agg(ac.channel_id) FILTER (WHERE ac.channel_id IS NOT NULL), ARRAY[]::bigint[]) AS allowed_channels
+    FROM accounts a
+    LEFT JOIN account_channels ac ON ac.account_id = a.id
+    GROUP BY a.id, a.name, a.host, a.port, a.active, a.fixed_lot, a.chat_id, a.trading_mode
+    ORDER BY a.id
+""")
+SQL_SIGNAL_PROVIDERS = ("cfg_signal_providers", "SELECT id, name, parser FROM signal_providers")
+SQL_CHANNEL_PROVIDERS = ("cfg_channel_providers", "SELECT channel_id, provider_id FROM channel_providers")
+SQL_ACCOUNT_CHANNELS = ("cfg_account_channels", "SELECT channel_id FROM account_channels WHERE account_id = %s")
+
+
+def fetch(conn, query, params=()):
+    """Filas de `query`; sentencia preparada si la conexión viene del pool."""
+    name, sql = query
+    if isinstance(conn, PooledConnection):
+        return conn.fetchall(name, sql, params)
     with conn.cursor() as cur:
-        cur.execute("SELECT key, value FROM settings")
-        return {row[0]: row[1] for row in cur.fetchall()}
+        cur.execute(sql, params or None)
+        return cur.fetchall()
+
+
+def settings_from_rows(rows):
+    return {row[0]: row[1] for row in rows}
+
+def accounts_from_rows(rows):
+    return [
+        {
+            "id": row[0], "name": row[1], "host": row[2], "port": row[3], "active": row[4],
+            "fixed_lot": row[5], "chat_id": row[6], "trading_mode": row[7],
+            "allowed_channels": list(row[8] or []),
+        }
+        for row in rows
+    ]
+
+def signal_providers_from_rows(rows):
+    return [{"id": row[0], "name": row[1], "parser": row[2]} for row in rows]
+
+def channel_providers_from_rows(rows):
+    mapping = {}
+    for row in rows:
+        mapping.setdefault(row[0], []).append(row[1])
+    return mapping
+
+
+def load_settings(conn):
+    return settings_from_rows(fetch(conn, SQL_SETTINGS))
 
 def load_accounts(conn):
-    with conn.cursor() as cur:
-        cur.execute("SELECT id, name, host, port, active, fixed_lot, chat_id, trading_mode FROM accounts")
-        accounts = []
-        for row in cur.fetchall():
-            account = {
-                "id": row[0], "name": row[1], "host": row[2], "port": row[3], "active": row[4],
-                "fixed_lot": row[5], "chat_id": row[6], "trading_mode": row[7], "allowed_channels": []
-            }
-            cur.execute("SELECT channel_id FROM account_channels WHERE account_id = %s", (row[0],))
-            account["allowed_channels"] = [r[0] for r in cur.fetchall()]
-            accounts.append(account)
-        return accounts
+    return accounts_from_rows(fetch(conn, SQL_ACCOUNTS))
 
 def load_signal_providers(conn):
-    with conn.cursor() as cur:
-        cur.execute("SELECT id, name, parser FROM signal_providers")
-        providers = []
-        for row in cur.fetchall():
-            providers.append({"id": row[0], "name": row[1], "parser": row[2]})
-        return providers
+    return signal_providers_from_rows(fetch(conn, SQL_SIGNAL_PROVIDERS))
 
 def load_channel_providers(conn):
-    with conn.cursor() as cur:
-        cur.execute("SELECT channel_id, provider_id FROM channel_providers")
-        mapping = {}
-        for row in cur.fetchall():
-            mapping.setdefault(row[0], []).append(row[1])
-        return mapping
+    return channel_providers_from_rows(fetch(conn, SQL_CHANNEL_PROVIDERS))
+
+
+# --- Versiones asyncio (db_pool.AsyncConnectionPool) ---
+
+async def aload_accounts(pool):
+    return accounts_from_rows(await pool.fetchall(*SQL_ACCOUNTS))
+
+async def aload_signal_providers(pool):
+    return signal_providers_from_rows(await pool.fetchall(*SQL_SIGNAL_PROVIDERS))
+
+async def aload_channel_providers(pool):
+    return channel_providers_from_rows(await pool.fetchall(*SQL_CHANNEL_PROVIDERS))
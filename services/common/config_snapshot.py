@@ -0,0 +1,105 @@
+"""
+config_snapshot.py
+Copia local de la configuración compilada (settings, cuentas, canal -> proveedores)
+para arrancar sin esperar a Postgres.
+
+Problema previo: services/common/config.py crea ConfigProvider al importarse y éste
+conectaba a Postgres antes de devolver el control. Con la base lenta o reiniciándose,
+ningún servicio de trading podía arrancar (ni siquiera para seguir gestionando trades
+ya abiertos).
+
+Solucion: cada vez que ConfigProvider recarga desde la base, escribe el resultado en
+CONFIG_SNAPSHOT_PATH (JSON; archivo temporal + fsync + os.replace, así un lector nunca
+ve un archivo a medio escribir). Al arrancar, si el archivo existe se carga en
+milisegundos y la base se conecta en segundo plano; la primera recarga reemplaza el
+snapshot y reescribe el archivo.
+"""
+import json
+import logging
+import os
+import tempfile
+import time
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+log = logging.getLogger("config_db")
+
+SNAPSHOT_FORMAT = 1
+DEFAULT_PATH = "/data/config/config_snapshot.json"
+
+
+def snapshot_path() -> str:
+    return os.environ.get("CONFIG_SNAPSHOT_PATH", DEFAULT_PATH)
+
+
+_SECTIONS = ("settings", "accounts", "signal_providers", "channel_providers")
+
+
+def compile_config(settings: Dict[str, Any], accounts, signal_providers, channel_providers) -> Dict[str, Any]:
+    """Configuración compilada (lo que se guarda en el archivo y sirve ConfigProvider)."""
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "settings": dict(settings),
+        "accounts": list(accounts),
+        "signal_providers": list(signal_providers),
+        "channel_providers": {int(k): list(v) for k, v in channel_providers.items()},
+    }
+
+
+def same_config(a: Optional[Dict[str, Any]], b: Optional[Dict[str, Any]]) -> bool:
+    """True si no hace falta reescribir el archivo (se ignoran format / written_at)."""
+    if a is None or b is None:
+        return False
+    return all(a.get(k) == b.get(k) for k in _SECTIONS)
+
+
+def _json_default(value: Any) -> Any:
+    # fixed_lot llega como Decimal desde psycopg2
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def write_snapshot(data: Dict[str, Any], path: Optional[str] = None) -> bool:
+    """Escribe el snapshot de forma atómica. Devuelve False (y lo informa) si no se pudo."""
+    path = path or snapshot_path()
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        payload = dict(data, written_at=time.time())
+        fd, tmp = tempfile.mkstemp(prefix=".config_snapshot.", dir=directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        tmp = None
+        return True
+    except OSError as e:
+        log.warning("[ConfigDB] No se pudo escribir el snapshot local %s: %s", path, e)
+        return False
+    finally:
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+
+def read_snapshot(path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Snapshot local, o None si no existe, está corrupto o es de otro formato."""
+    path = path or snapshot_path()
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        log.warning("[ConfigDB] Snapshot local %s ilegible: %s", path, e)
+        return None
+    if not isinstance(data, dict) or data.get("format") != SNAPSHOT_FORMAT:
+        log.warning("[ConfigDB] Snapshot local %s con formato desconocido, se ignora", path)
+        return None
+    data["channel_providers"] = {int(k): v for k, v in (data.get("channel_providers") or {}).items()}
+    return data
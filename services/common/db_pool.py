@@ -0,0 +1,218 @@
+"""
+db_pool.py
+Conexiones a la base de configuración compartidas: pool síncrono (psycopg2) y
+asíncrono (asyncpg) con sentencias preparadas reutilizadas.
+
+Problema previo: Settings.accounts() / signal_providers() / channel_providers() hacían
+psycopg2.connect en cada llamada y nunca cerraban la conexión. TelegramNotifierAdapter
+llama a Settings.accounts() por cada notificación: cada mensaje de Telegram abría una
+conexión nueva a Postgres (handshake + auth, bloqueando el event loop) y la dejaba
+abierta hasta agotar max_connections.
+
+Solucion:
+- ConnectionPool: como mucho `maxconn` conexiones por proceso (un semáforo hace esperar
+  a quien llegue de más, hasta `timeout`). Al devolver una conexión se hace rollback
+  (nada queda "idle in transaction"); una conexión cerrada o que falló se descarta. Antes
+  de reusar una conexión que estuvo ociosa más de `ping_after` s se prueba con SELECT 1.
+- PooledConnection.fetchall(name, sql, params): PREPARE una vez por conexión y EXECUTE
+  después; las consultas de configuración son siempre las mismas.
+- AsyncConnectionPool: asyncpg (cachea los statements por conexión) para los servicios
+  asyncio. Sin asyncpg instalado corre el pool síncrono en un hilo (asyncio.to_thread).
+"""
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Iterator, List, Optional, Sequence, Set
+
+import psycopg2
+
+try:
+    import asyncpg
+except ImportError:  # el pool asíncrono cae al síncrono en un hilo
+    asyncpg = None
+
+log = logging.getLogger("config_db")
+
+_PARAM_RE = re.compile(r"%s")
+
+
+class PoolTimeout(RuntimeError):
+    """No se liberó ninguna conexión del pool dentro del timeout."""
+
+
+def numbered_params(sql: str) -> str:
+    """'... WHERE a = %s AND b = %s' -> '... WHERE a = $1 AND b = $2' (PREPARE / asyncpg)."""
+    counter = iter(range(1, 1000))
+    return _PARAM_RE.sub(lambda _: f"${next(counter)}", sql)
+
+
+class PooledConnection:
+    """Conexión psycopg2 del pool; delega todo y agrega fetchall() con sentencias preparadas."""
+
+    __slots__ = ("raw", "prepared", "last_used")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.prepared: Set[str] = set()
+        self.last_used = time.monotonic()
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def fetchall(self, name: str, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        """Ejecuta `sql` (estilo %s) como sentencia preparada `name` de esta conexión."""
+        with self.raw.cursor() as cur:
+            if name not in self.prepared:
+                cur.execute(f"PREPARE {name} AS {numbered_params(sql)}")
+                self.prepared.add(name)
+            if params:
+                cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", tuple(params))
+            else:
+                cur.execute(f"EXECUTE {name}")
+            return cur.fetchall()
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        dsn: str,
+        maxconn: Optional[int] = None,
+        timeout: Optional[float] = None,
+        ping_after: float = 30.0,
+    ):
+        """
+        Args:
+            dsn: CONFIG_DB_URL
+            maxconn: conexiones simultáneas máximas (CONFIG_DB_POOL_MAX, 4 por defecto)
+            timeout: espera máxima por una conexión libre (CONFIG_DB_POOL_TIMEOUT, 10 s)
+            ping_after: segundos de inactividad a partir de los cuales se verifica la conexión
+        """
+        self.dsn = dsn
+        self.maxconn = max(1, int(maxconn or os.environ.get("CONFIG_DB_POOL_MAX", 4)))
+        self.timeout = float(timeout or os.environ.get("CONFIG_DB_POOL_TIMEOUT", 10.0))
+        self.ping_after = float(ping_after)
+        self._slots = threading.BoundedSemaphore(self.maxconn)
+        self._idle: Deque[PooledConnection] = deque()
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.discarded = 0
+
+    def _healthy(self, conn: PooledConnection) -> bool:
+        if conn.raw.closed:
+            return False
+        if time.monotonic() - conn.last_used < self.ping_after:
+            return True
+        try:
+            with conn.raw.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.raw.rollback()
+            return True
+        except Exception as e:
+            log.info("[ConfigDB] conexión del pool descartada (ping): %s", e)
+            return False
+
+    def _discard(self, conn: PooledConnection) -> None:
+        self.discarded += 1
+        try:
+            conn.raw.close()
+        except Exception:
+            pass
+
+    def _checkout(self) -> PooledConnection:
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                self.opened += 1
+                return PooledConnection(psycopg2.connect(self.dsn))
+            if self._healthy(conn):
+                return conn
+            self._discard(conn)
+
+    def _checkin(self, conn: PooledConnection) -> None:
+        broken = False
+        if not conn.raw.closed:
+            try:
+                if not conn.raw.autocommit:
+                    conn.raw.rollback()
+            except Exception:
+                broken = True
+        if broken or conn.raw.closed:
+            self._discard(conn)
+            return
+        conn.last_used = time.monotonic()
+        with self._lock:
+            self._idle.append(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+        """Presta una conexión; al salir se hace rollback de lo no confirmado y vuelve al pool."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"sin conexiones libres en {self.timeout:.0f}s (máx {self.maxconn})")
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        finally:
+            if conn is not None:
+                self._checkin(conn)
+            self._slots.release()
+
+    def warmup(self) -> None:
+        """Abre (y devuelve) una conexión: falla enseguida si la base no responde."""
+        with self.connection():
+            pass
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn in idle:
+            self._discard(conn)
+
+
+class AsyncConnectionPool:
+    """Pool asyncio sobre asyncpg; sin asyncpg delega en un ConnectionPool en hilos."""
+
+    def __init__(self, dsn: str, maxconn: Optional[int] = None, sync_pool: Optional[ConnectionPool] = None):
+        self.dsn = dsn
+        self.maxconn = max(1, int(maxconn or os.environ.get("CONFIG_DB_POOL_MAX", 4)))
+        self._sync = sync_pool
+        self._pool = None
+        self._init_lock: Optional[asyncio.Lock] = None
+
+    async def _get(self):
+        if self._pool is None:
+            if self._init_lock is None:
+                self._init_lock = asyncio.Lock()
+            async with self._init_lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(
+                        self.dsn, min_size=1, max_size=self.maxconn,
+                        # Conexiones ociosas se cierran y se reabren sanas; asyncpg
+                        # prepara y cachea cada consulta por conexión.
+                        max_inactive_connection_lifetime=300.0,
+                    )
+        return self._pool
+
+    async def fetchall(self, name: str, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        if asyncpg is None:
+            if self._sync is None:
+                self._sync = ConnectionPool(self.dsn, self.maxconn)
+
+            def run():
+                with self._sync.connection() as conn:
+                    return conn.fetchall(name, sql, params)
+            return await asyncio.to_thread(run)
+        pool = await self._get()
+        rows = await pool.fetch(numbered_params(sql), *params)
+        return [tuple(r) for r in rows]
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
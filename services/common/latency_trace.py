@@ -0,0 +1,170 @@
+"""
+Trazas de latencia extremo a extremo para señales de trading.
+
+Problema:
+  router_parser y handle_signal generaban cada uno su propio trace id sin
+  relación entre sí y sin timestamps por etapa. Era imposible saber dónde se
+  iban los milisegundos entre el mensaje del proveedor y el fill en MT5.
+
+Solución:
+  telegram_ingestor crea un único TraceContext por mensaje (fecha del mensaje
+  en Telegram, hora de recepción y hora del XADD). El contexto viaja como un
+  campo compacto (`tctx`) por raw_messages → parsed_signals → handle_signal →
+  send_order → resultado de order_send, y cada salto añade (etapa, ts_ms).
+  Al terminar, el orchestrator publica la traza completa en el stream
+  `signal_traces` y alimenta histogramas Prometheus por salto y extremo a extremo.
+
+Nota: los timestamps son time.time() de cada contenedor; las latencias entre
+servicios asumen relojes sincronizados por NTP.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.common.redis_streams import Streams, xadd
+
+try:
+    from prometheus_client import Histogram
+except ImportError:  # router_parser / telegram_ingestor no exponen métricas
+    Histogram = None
+
+log = logging.getLogger("latency_trace")
+
+TRACE_FIELD = "tctx"
+
+_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+if Histogram is not None:
+    SIGNAL_HOP_LATENCY = Histogram(
+        'signal_hop_latency_seconds', 'Latencia entre etapas consecutivas de una señal', ['hop'], buckets=_BUCKETS,
+    )
+    SIGNAL_E2E_LATENCY = Histogram(
+        'signal_e2e_latency_seconds', 'Latencia desde el mensaje de Telegram hasta el resultado final', ['outcome'], buckets=_BUCKETS,
+    )
+else:
+    SIGNAL_HOP_LATENCY = None
+    SIGNAL_E2E_LATENCY = None
+
+
+class Hops:
+    TG_MESSAGE = "tg_message"            # event.date del mensaje (resolución de 1s en Telegram)
+    INGEST_RECEIVED = "ingest_received"  # handler de Telethon invocado
+    RAW_XADD = "raw_xadd"                # justo antes del XADD a raw_messages
+    PARSER_RECEIVED = "parser_received"  # router_parser leyó el mensaje
+    PARSED = "parsed"                    # parse + dedup terminados
+    SIGNAL_XADD = "signal_xadd"          # justo antes del XADD a parsed_signals / mgmt_messages
+    ORCH_RECEIVED = "orch_received"      # handle_signal invocado
+    DISPATCH = "dispatch"                # llamada a open_for_accounts
+    ENTRY_READY = "entry_ready"          # send_order: precio en rango, orden lista
+    ORDER_SEND = "order_send"            # antes de _best_filling_order_send
+    ORDER_RESULT = "order_result"        # respuesta de order_send recibida
+    TRADES_UPDATED = "trades_updated"    # sin orden: SL/TP de trades abiertos actualizados (near-dup / FAST)
+
+
+def _now_ms() -> float:
+    return round(time.time() * 1000.0, 3)
+
+
+@dataclass
+class TraceContext:
+    """
+    Contexto de traza que acompaña a una señal a través de todos los servicios.
+    hops es una lista ordenada de (etapa, epoch_ms).
+    """
+    trace_id: str
+    hops: List[Tuple[str, float]] = field(default_factory=list)
+    account: Optional[str] = None
+
+    @classmethod
+    def new(cls) -> "TraceContext":
+        return cls(trace_id=uuid.uuid4().hex[:8])
+
+    @classmethod
+    def from_fields(cls, fields: Dict[str, Any]) -> Optional["TraceContext"]:
+        """
+        Reconstruye el contexto desde los campos de un mensaje de stream.
+        Devuelve None si el mensaje no trae contexto o es inválido (productores antiguos).
+        """
+        raw = fields.get(TRACE_FIELD) if fields else None
+        if not raw:
+            return None
+        try:
+            data = json.loads(raw)
+            hops = [(str(stage), float(ts)) for stage, ts in data.get("h", [])]
+            return cls(trace_id=str(data["id"]), hops=hops, account=data.get("a"))
+        except Exception as e:
+            log.warning("[TRACE] Contexto de traza inválido (%s): %r", e, raw)
+            return None
+
+    @classmethod
+    def from_fields_or_new(cls, fields: Dict[str, Any]) -> "TraceContext":
+        ctx = cls.from_fields(fields)
+        if ctx is None:
+            ctx = cls.new()
+        return ctx
+
+    def mark(self, stage: str, ts: Optional[float] = None) -> "TraceContext":
+        """Registra una etapa. ts en segundos epoch (como time.time()); por defecto ahora."""
+        ts_ms = _now_ms() if ts is None else round(ts * 1000.0, 3)
+        self.hops.append((stage, ts_ms))
+        return self
+
+    def fork(self, account: str) -> "TraceContext":
+        """Copia independiente para una cuenta (cada send_order tiene sus propios saltos)."""
+        return TraceContext(trace_id=self.trace_id, hops=list(self.hops), account=account)
+
+    def to_field(self) -> str:
+        data: Dict[str, Any] = {"id": self.trace_id, "h": [list(h) for h in self.hops]}
+        if self.account:
+            data["a"] = self.account
+        return json.dumps(data, separators=(",", ":"))
+
+    def hop_durations(self) -> List[Tuple[str, float]]:
+        """Lista de ('etapa_a->etapa_b', ms) entre saltos consecutivos."""
+        return [
+            (f"{prev[0]}->{cur[0]}", round(cur[1] - prev[1], 3))
+            for prev, cur in zip(self.hops, self.hops[1:])
+        ]
+
+    def total_ms(self) -> float:
+        if len(self.hops) < 2:
+            return 0.0
+        return round(self.hops[-1][1] - self.hops[0][1], 3)
+
+
+def observe_trace(ctx: TraceContext, outcome: str) -> None:
+    """Alimenta los histogramas Prometheus (si prometheus_client está disponible)."""
+    if SIGNAL_HOP_LATENCY is None:
+        return
+    for hop, ms in ctx.hop_durations():
+        SIGNAL_HOP_LATENCY.labels(hop=hop).observe(max(ms, 0.0) / 1000.0)
+    if len(ctx.hops) >= 2:
+        SIGNAL_E2E_LATENCY.labels(outcome=outcome).observe(max(ctx.total_ms(), 0.0) / 1000.0)
+
+
+async def publish_trace(r, ctx: TraceContext, outcome: str, **extra: Any) -> None:
+    """
+    Publica la traza terminada en el stream signal_traces y en Prometheus.
+    Nunca lanza: un fallo de observabilidad no debe afectar al trading.
+    """
+    try:
+        observe_trace(ctx, outcome)
+        payload = {
+            "trace": ctx.trace_id,
+            "outcome": outcome,
+            "account": ctx.account or "",
+            "total_ms": str(ctx.total_ms()),
+            "hops": json.dumps(ctx.hops, separators=(",", ":")),
+            "durations": json.dumps(ctx.hop_durations(), separators=(",", ":")),
+        }
+        for k, v in extra.items():
+            if v is not None:
+                payload[k] = str(v)
+        await xadd(r, Streams.TRACES, payload)
+    except Exception as e:
+        log.warning("[TRACE] No se pudo publicar traza %s: %s", ctx.trace_id, e)
@@ -0,0 +1,160 @@
+"""
+notify_digest.py
+Agrupa las notificaciones de un mismo chat en un mensaje resumen (digest).
+
+Problema previo: una señal genera, por cada cuenta, TRADE OPENED, TP, parcial, BE,
+trailing y addon (notify_trade_event, _notify_bg, notify_trade_opened). Casi todas van
+al mismo chat_id: Telegram aplica flood limits (FloodWait) y los mensajes importantes
+(un SL, un error) quedan detrás de una ráfaga de "Trailing actualizado".
+
+Solucion: DigestCoalescer recibe (chat_id, mensaje) y por chat abre una ventana de
+`window_sec`; al cerrarla envía un solo mensaje con todos los eventos (partido en
+trozos de hasta `max_len` caracteres, el límite de Telegram es 4096).
+- urgentes (SL, errores): se envían enseguida, sin esperar la ventana ni entrar al digest.
+- collapse_key (p.ej. ("trailing", ticket)): un evento con la misma clave reemplaza al
+  pendiente, en su lugar; de una ráfaga de trailing sólo llega el último SL.
+submit() no espera el envío: el llamador sólo agrega a una lista.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+log = logging.getLogger("telegram_notifier")
+
+# Sin clasificación explícita, un mensaje que empieza así se trata como urgente
+URGENT_PREFIXES = ("❌", "🚨", "⚠️", "[ERROR]")
+TELEGRAM_MAX_LEN = 4096
+
+
+def is_urgent(message: str) -> bool:
+    return message.lstrip().startswith(URGENT_PREFIXES)
+
+
+def collapse(entries: List[Tuple[Optional[Hashable], str]]) -> List[Tuple[Optional[Hashable], str]]:
+    """[(collapse_key, mensaje)] -> el último de cada clave queda en el lugar del primero."""
+    out: List[Tuple[Optional[Hashable], str]] = []
+    index: Dict[Hashable, int] = {}
+    for key, message in entries:
+        if key is not None and key in index:
+            out[index[key]] = (key, message)
+            continue
+        if key is not None:
+            index[key] = len(out)
+        out.append((key, message))
+    return out
+
+
+def render_digest(messages: List[str], max_len: int = 4000, separator: str = "\n\n") -> List[str]:
+    """Textos a enviar: un mensaje tal cual, o el digest partido en trozos de max_len."""
+    return [text for text, _ in digest_parts(messages, max_len, separator)]
+
+
+def digest_parts(messages: List[str], max_len: int = 4000, separator: str = "\n\n") -> List[Tuple[str, List[int]]]:
+    """Como render_digest, pero cada trozo con los índices de los mensajes que contiene."""
+    max_len = min(int(max_len), TELEGRAM_MAX_LEN)
+    if len(messages) == 1:
+        return [(messages[0][:max_len], [0])]
+    header = f"🧾 {len(messages)} eventos"
+    cont = header + " (cont.)"
+    parts: List[Tuple[str, List[int]]] = []
+    current, indices = header, []
+    for i, message in enumerate(messages):
+        message = message[:max_len - len(cont) - len(separator)]
+        if len(current) + len(separator) + len(message) > max_len:
+            parts.append((current, indices))
+            current, indices = cont, []
+        current += separator + message
+        indices.append(i)
+    parts.append((current, indices))
+    return parts
+
+
+class DigestCoalescer:
+    def __init__(
+        self,
+        send: Callable[[int, str], Awaitable[Any]],
+        window_sec: Optional[float] = None,
+        max_len: int = 4000,
+        separator: str = "\n\n",
+    ):
+        """
+        Args:
+            send: corutina send(chat_id, texto) que entrega un mensaje
+            window_sec: ventana de agrupación por chat (NOTIFY_DIGEST_WINDOW_MS, 1500 ms)
+            max_len: largo máximo de cada mensaje enviado
+            separator: separador entre eventos dentro del digest
+        """
+        self._send = send
+        self.window_sec = float(
+            window_sec if window_sec is not None else float(os.getenv("NOTIFY_DIGEST_WINDOW_MS", 1500)) / 1000.0
+        )
+        self.max_len = min(int(max_len), TELEGRAM_MAX_LEN)
+        self.separator = separator
+        # chat_id -> [(collapse_key, mensaje)] en orden de llegada
+        self._pending: Dict[int, List[Tuple[Optional[Hashable], str]]] = {}
+        self._timers: Dict[int, asyncio.Task] = {}
+        self._inflight: set = set()
+        self.collapsed = 0
+        self.digests = 0
+
+    def submit(
+        self,
+        chat_id: int,
+        message: str,
+        *,
+        urgent: Optional[bool] = None,
+        collapse_key: Optional[Hashable] = None,
+    ) -> None:
+        if urgent is None:
+            urgent = is_urgent(message)
+        if urgent or self.window_sec <= 0:
+            self._spawn(self._deliver(chat_id, [message]))
+            return
+        entries = self._pending.setdefault(chat_id, [])
+        if collapse_key is not None:
+            for i, (key, _) in enumerate(entries):
+                if key == collapse_key:
+                    entries[i] = (collapse_key, message)
+                    self.collapsed += 1
+                    return
+        entries.append((collapse_key, message))
+        if chat_id not in self._timers:
+            self._timers[chat_id] = asyncio.create_task(self._flush_later(chat_id))
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _flush_later(self, chat_id: int) -> None:
+        await asyncio.sleep(self.window_sec)
+        self._timers.pop(chat_id, None)
+        self._spawn(self._flush_chat(chat_id))
+
+    async def _flush_chat(self, chat_id: int) -> None:
+        entries = self._pending.pop(chat_id, [])
+        if entries:
+            await self._deliver(chat_id, [m for _, m in entries])
+
+    def render(self, messages: List[str]) -> List[str]:
+        return render_digest(messages, self.max_len, self.separator)
+
+    async def _deliver(self, chat_id: int, messages: List[str]) -> None:
+        if len(messages) > 1:
+            self.digests += 1
+        for text in self.render(messages):
+            try:
+                await self._send(chat_id, text)
+            except Exception as e:
+                log.error("[NOTIFY][ERROR] digest chat_id=%s error=%s", chat_id, e)
+
+    async def flush(self) -> None:
+        """Envía todo lo pendiente ya (apagado ordenado / tests)."""
+        for task in self._timers.values():
+            task.cancel()
+        self._timers.clear()
+        for chat_id in list(self._pending):
+            self._spawn(self._flush_chat(chat_id))
+        if self._inflight:
+            await asyncio.gather(*list(self._inflight), return_exceptions=True)
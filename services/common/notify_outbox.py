@@ -0,0 +1,410 @@
+"""
+notify_outbox.py
+Outbox durable de notificaciones Telegram sobre un stream de Redis.
+
+Problema previo: _do_be, _do_partial_close, _maybe_take_profits y _maybe_trailing
+esperaban notify_trade_event en línea: un POST HTTP a telegram_ingestor con timeout de
+10 s en medio de la gestión de la posición. Los envíos en segundo plano (create_task,
+DigestCoalescer) no bloquean, pero viven sólo en memoria: si el orchestrator se cae o
+se reinicia, lo que estaba en la ventana del digest o en vuelo se pierde; si el
+ingestor está caído, el mensaje se registra como error y no se reintenta.
+
+Solucion:
+- NotifyOutbox.enqueue() (lado trading) es síncrono: arma el evento con un id único y lo
+  agrega a un buffer en memoria. Un flusher en segundo plano lo publica en
+  Streams.NOTIFY (un pipeline de XADD por tanda). Si Redis no responde se reintenta con
+  backoff sin perder el buffer (acotado: al llenarse se descartan los más viejos).
+  Ventana de pérdida: sólo lo encolado en los milisegundos previos a una caída.
+- NotifyWorker (proceso aparte, notifier_worker.py) lee el stream con un consumer group,
+  agrupa por chat (digest, collapse_key, urgentes primero y solos), entrega por
+  /notify/batch y recién entonces hace XACK. Un chat que falla se reintenta con backoff
+  exponencial + jitter sin frenar a los demás; sus eventos nuevos esperan detrás para no
+  desordenarse. Tras `max_attempts` el evento va a Streams.NOTIFY_DEAD.
+- Idempotencia: cada evento entregado deja notify:sent:<id> (con TTL); un evento
+  re-entregado (reinicio entre el envío y el XACK, XADD repetido) se confirma sin
+  reenviar. La entrega es at-least-once: sólo una caída entre el POST y ese SET duplica.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, List, Optional, Tuple
+
+from services.common.notify_digest import digest_parts, is_urgent
+from services.common.redis_streams import (
+    Streams, StreamSchemaError, decode_message, encode_message, xack_batch, xreadgroup_batches,
+)
+from services.common.settings_cache import parse_bool
+
+log = logging.getLogger("telegram_notifier")
+
+OUTBOX_GROUP = "notifier_group"
+SENT_KEY = "notify:sent:{}"
+
+
+def collapse_token(collapse_key: Optional[Hashable]) -> Optional[str]:
+    """("trailing", 123) -> "trailing:123" (la clave viaja como string en el stream)."""
+    if collapse_key is None:
+        return None
+    if isinstance(collapse_key, (tuple, list)):
+        return ":".join(str(part) for part in collapse_key)
+    return str(collapse_key)
+
+
+class NotifyOutbox:
+    def __init__(
+        self,
+        r,
+        stream: str = Streams.NOTIFY,
+        max_buffer: Optional[int] = None,
+        batch_max: int = 200,
+        maxlen: Optional[int] = None,
+        retry_min_sec: float = 0.5,
+        retry_max_sec: float = 10.0,
+    ):
+        """
+        Args:
+            r: cliente redis.asyncio
+            max_buffer: eventos retenidos en memoria mientras Redis no responde (NOTIFY_OUTBOX_BUFFER)
+            batch_max: XADD por pipeline
+            maxlen: MAXLEN aproximado del stream (NOTIFY_OUTBOX_MAXLEN); holgado para que un
+                worker detenido no pierda eventos por recorte
+        """
+        self.r = r
+        self.stream = stream
+        self.max_buffer = max(1, int(max_buffer or os.getenv("NOTIFY_OUTBOX_BUFFER", 10000)))
+        self.batch_max = max(1, int(batch_max))
+        self.maxlen = int(maxlen or os.getenv("NOTIFY_OUTBOX_MAXLEN", 100000))
+        self.retry_min_sec = float(retry_min_sec)
+        self.retry_max_sec = float(retry_max_sec)
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.dropped = 0
+
+    def enqueue(
+        self,
+        chat_id: int,
+        message: str,
+        *,
+        urgent: Optional[bool] = None,
+        collapse_key: Optional[Hashable] = None,
+        event_id: Optional[str] = None,
+    ) -> str:
+        """Agrega la notificación al outbox y devuelve su id. No espera a Redis."""
+        event = {
+            "id": event_id or uuid.uuid4().hex,
+            "chat_id": int(chat_id),
+            "text": message,
+            "urgent": bool(is_urgent(message) if urgent is None else urgent),
+            "collapse": collapse_token(collapse_key) or "",
+            "ts": time.time(),
+        }
+        self._buffer.append(event)
+        self._trim()
+        self._start()
+        return event["id"]
+
+    def _trim(self) -> None:
+        while len(self._buffer) > self.max_buffer:
+            dropped = self._buffer.popleft()
+            self.dropped += 1
+            log.error("[NOTIFY][OUTBOX] buffer lleno (%d): se descarta chat_id=%s id=%s",
+                      self.max_buffer, dropped["chat_id"], dropped["id"])
+
+    def _start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        except RuntimeError:  # sin loop (script / arranque): lo publica el próximo enqueue o flush()
+            self._task = None
+
+    async def _publish_once(self) -> int:
+        batch = [self._buffer.popleft() for _ in range(min(len(self._buffer), self.batch_max))]
+        if not batch:
+            return 0
+        try:
+            pipe = self.r.pipeline(transaction=False)
+            for event in batch:
+                pipe.xadd(self.stream, encode_message(self.stream, event), maxlen=self.maxlen, approximate=True)
+            await pipe.execute()
+        except BaseException:
+            # Vuelven al frente, en orden. Si el pipeline llegó a ejecutarse en parte, el
+            # reintento repite ids ya publicados: el worker los descarta (notify:sent).
+            self._buffer.extendleft(reversed(batch))
+            self._trim()
+            raise
+        self.published += len(batch)
+        return len(batch)
+
+    async def _run(self) -> None:
+        delay = self.retry_min_sec
+        while self._buffer:
+            try:
+                await self._publish_once()
+                delay = self.retry_min_sec
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("[NOTIFY][OUTBOX] Redis no disponible (%d pendientes), reintento en %.1fs: %s",
+                            len(self._buffer), delay, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.retry_max_sec)
+
+    async def flush(self) -> bool:
+        """Publica todo lo pendiente ya (apagado ordenado / tests). False si Redis falló."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        try:
+            while self._buffer:
+                await self._publish_once()
+        except Exception as e:
+            log.error("[NOTIFY][OUTBOX] flush incompleto (%d pendientes): %s", len(self._buffer), e)
+            return False
+        return True
+
+
+class NotifyWorker:
+    def __init__(
+        self,
+        r,
+        sender,
+        group: str = OUTBOX_GROUP,
+        consumer: str = "notifier-1",
+        stream: str = Streams.NOTIFY,
+        max_attempts: Optional[int] = None,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        sent_ttl: int = 86400,
+        max_len: int = 4000,
+    ):
+        """
+        Args:
+            r: cliente redis.asyncio binario (payloads msgpack)
+            sender: objeto con post_batch([(chat_id, texto)]) -> [error | None]
+                (RemoteTelegramNotifier)
+            max_attempts: envíos fallidos antes del dead-letter (NOTIFY_MAX_ATTEMPTS, 6)
+            base_backoff / max_backoff: espera entre reintentos de un chat (exponencial, s)
+            sent_ttl: vida de las marcas notify:sent:<id> (s)
+        """
+        self.r = r
+        self.sender = sender
+        self.group = group
+        self.consumer = consumer
+        self.stream = stream
+        self.max_attempts = max(1, int(max_attempts or os.getenv("NOTIFY_MAX_ATTEMPTS", 6)))
+        self.base_backoff = float(base_backoff)
+        self.max_backoff = float(max_backoff)
+        self.sent_ttl = int(sent_ttl)
+        self.max_len = int(max_len)
+        # chat_id -> [(msg_id, evento)] en espera de reintento, y cuándo reintentar
+        self._held: Dict[int, List[Tuple[Any, Dict[str, Any]]]] = {}
+        self._due: Dict[int, float] = {}
+        self._lock = asyncio.Lock()
+        self.sent = 0
+        self.duplicates = 0
+        self.retried = 0
+        self.dead = 0
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.max_backoff, self.base_backoff * (2 ** max(0, attempts - 1)))
+        return delay * (0.5 + random.random() / 2)
+
+    @staticmethod
+    def _event(msg_id: Any, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Normaliza el evento (sin msgpack llega en formato plano, todo string)."""
+        if not isinstance(body, dict) or "chat_id" not in body or "text" not in body:
+            raise StreamSchemaError("evento de notificación sin chat_id/text")
+        event_id = body.get("id") or (msg_id.decode() if isinstance(msg_id, bytes) else str(msg_id))
+        return {
+            "id": str(event_id),
+            "chat_id": int(body["chat_id"]),
+            "text": str(body["text"]),
+            "urgent": parse_bool(body.get("urgent", False)),
+            "collapse": str(body.get("collapse") or "") or None,
+            "ts": body.get("ts"),
+            "attempts": 0,
+        }
+
+    async def _dead_letter(self, msg_id: Any, payload: Dict[str, Any], error: str) -> None:
+        self.dead += 1
+        log.error("[NOTIFY][DEAD] %s -> %s: %s", msg_id, Streams.NOTIFY_DEAD, error)
+        try:
+            await self.r.xadd(
+                Streams.NOTIFY_DEAD,
+                encode_message(Streams.NOTIFY_DEAD, dict(payload, error=error, failed_at=time.time())),
+                maxlen=10000, approximate=True,
+            )
+        except Exception as e:
+            log.error("[NOTIFY][DEAD] no se pudo registrar %s: %s", msg_id, e)
+
+    async def process(self, batch: List[Tuple[Any, Dict[Any, Any]]]) -> None:
+        """Entrega un lote leído del stream y confirma lo que quedó resuelto."""
+        ack_ids: List[Any] = []
+        events: List[Tuple[Any, Dict[str, Any]]] = []
+        for msg_id, fields in batch:
+            if not fields:  # recortado por MAXLEN antes de recuperarlo
+                ack_ids.append(msg_id)
+                continue
+            try:
+                events.append((msg_id, self._event(msg_id, decode_message(self.stream, fields))))
+            except (StreamSchemaError, TypeError, ValueError) as e:
+                raw = {(k.decode() if isinstance(k, bytes) else str(k)): v for k, v in fields.items()}
+                await self._dead_letter(msg_id, {"raw": raw}, f"evento inválido: {e}")
+                ack_ids.append(msg_id)
+        async with self._lock:
+            if events:
+                pipe = self.r.pipeline(transaction=False)
+                for _, event in events:
+                    pipe.exists(SENT_KEY.format(event["id"]))
+                sent_flags = await pipe.execute()
+            else:
+                sent_flags = []
+            groups: Dict[int, List[Tuple[Any, Dict[str, Any]]]] = {}
+            # al releer pendientes vuelven los que ya esperan su reintento en _held
+            held_ids = {held_id for entries in self._held.values() for held_id, _ in entries}
+            for (msg_id, event), already_sent in zip(events, sent_flags):
+                if msg_id in held_ids:
+                    continue
+                if already_sent:
+                    self.duplicates += 1
+                    ack_ids.append(msg_id)
+                elif event["chat_id"] in self._held:
+                    # el chat está en backoff: detrás de lo pendiente, para no desordenar
+                    self._held[event["chat_id"]].append((msg_id, event))
+                else:
+                    groups.setdefault(event["chat_id"], []).append((msg_id, event))
+            ack_ids.extend(await self._deliver(groups))
+        await xack_batch(self.r, self.stream, self.group, ack_ids)
+
+    async def retry_due(self) -> None:
+        """Reintenta los chats cuyo backoff venció."""
+        async with self._lock:
+            now = time.monotonic()
+            due = [chat_id for chat_id, at in self._due.items() if at <= now]
+            groups = {}
+            for chat_id in due:
+                self._due.pop(chat_id, None)
+                groups[chat_id] = self._held.pop(chat_id, [])
+            ack_ids = await self._deliver(groups) if groups else []
+        await xack_batch(self.r, self.stream, self.group, ack_ids)
+
+    def _units(self, events: List[Tuple[Any, Dict[str, Any]]]) -> List[Tuple[List[str], List[Tuple[Any, Dict[str, Any]]]]]:
+        """
+        Envíos de un chat: cada urgente solo y primero, el resto en un digest. Cada trozo
+        del digest es su propia unidad con los eventos que contiene: si falla uno, sólo
+        esos eventos se reintentan y los trozos ya entregados no se reenvían.
+        """
+        units = [([event["text"][:self.max_len]], [(msg_id, event)]) for msg_id, event in events if event["urgent"]]
+        # [texto, eventos] por entrada del digest: el último texto de cada collapse_key
+        # queda en el lugar del primero (como notify_digest.collapse)
+        slots: List[list] = []
+        index: Dict[str, int] = {}
+        for msg_id, event in events:
+            if event["urgent"]:
+                continue
+            key = event["collapse"]
+            if key is not None and key in index:
+                slot = slots[index[key]]
+                slot[0] = event["text"]
+                slot[1].append((msg_id, event))
+                continue
+            if key is not None:
+                index[key] = len(slots)
+            slots.append([event["text"], [(msg_id, event)]])
+        if slots:
+            for text, indices in digest_parts([text for text, _ in slots], self.max_len):
+                units.append(([text], [entry for i in indices for entry in slots[i][1]]))
+        return units
+
+    async def _deliver(self, groups: Dict[int, List[Tuple[Any, Dict[str, Any]]]]) -> List[Any]:
+        """Envía los grupos por chat; devuelve los msg_id resueltos (entregados o dead-letter)."""
+        plan = []
+        items: List[Tuple[int, str]] = []
+        for chat_id, events in groups.items():
+            for texts, covered in self._units(events):
+                plan.append((chat_id, len(items), len(texts), covered))
+                items.extend((chat_id, text) for text in texts)
+        if not items:
+            return []
+        errors = await self.sender.post_batch(items)
+        done: List[Any] = []
+        delivered: List[Dict[str, Any]] = []
+        failed: Dict[int, List[Tuple[Any, Dict[str, Any], str]]] = {}
+        for chat_id, start, n, covered in plan:
+            error = next((e for e in errors[start:start + n] if e), None)
+            if error is None:
+                delivered.extend(event for _, event in covered)
+                done.extend(msg_id for msg_id, _ in covered)
+            else:
+                failed.setdefault(chat_id, []).extend((msg_id, event, error) for msg_id, event in covered)
+        if delivered:
+            self.sent += len(delivered)
+            pipe = self.r.pipeline(transaction=False)
+            for event in delivered:
+                pipe.set(SENT_KEY.format(event["id"]), 1, ex=self.sent_ttl)
+            await pipe.execute()
+        for chat_id, entries in failed.items():
+            retry = []
+            for msg_id, event, error in entries:
+                event["attempts"] += 1
+                if event["attempts"] >= self.max_attempts:
+                    payload = {k: v for k, v in event.items() if k != "attempts"}
+                    await self._dead_letter(msg_id, dict(payload, attempts=event["attempts"]), error)
+                    done.append(msg_id)
+                else:
+                    retry.append((msg_id, event))
+            if retry:
+                attempts = max(event["attempts"] for _, event in retry)
+                delay = self.backoff(attempts)
+                self.retried += len(retry)
+                # los que llegaron mientras tanto siguen detrás
+                self._held[chat_id] = retry + self._held.get(chat_id, [])
+                self._due[chat_id] = time.monotonic() + delay
+                log.warning("[NOTIFY][RETRY] chat_id=%s %d eventos, intento %d/%d en %.1fs: %s",
+                            chat_id, len(retry), attempts, self.max_attempts, delay, entries[0][2])
+        return done
+
+    async def _retry_loop(self, interval_sec: float = 0.25) -> None:
+        while True:
+            await asyncio.sleep(interval_sec)
+            if not self._due:
+                continue
+            try:
+                await self.retry_due()
+            except Exception as e:
+                log.error("[NOTIFY][RETRY] error reintentando: %s", e)
+
+    async def run(self, block_ms: int = 2000, count: int = 100, claim_idle_ms: int = 300000) -> None:
+        """
+        Bucle del worker. Los eventos en backoff quedan pendientes (sin ACK) en este
+        consumer: tras un reinicio se recuperan. claim_idle_ms debe superar max_backoff
+        para que otra réplica no reclame eventos que este worker sigue reintentando.
+        Si un lote falla (p.ej. Redis en medio del pipeline de notify:sent) se vuelve a
+        leer desde los pendientes de este consumer, sin esperar a un reinicio.
+        """
+        retry_task = asyncio.create_task(self._retry_loop())
+        delay = self.base_backoff or 1.0
+        try:
+            while True:
+                try:
+                    async for batch in xreadgroup_batches(
+                        self.r, self.stream, self.group, self.consumer,
+                        block_ms=block_ms, count=count, recover_pending=True, claim_idle_ms=claim_idle_ms,
+                    ):
+                        await self.process(batch)
+                        delay = self.base_backoff or 1.0
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    log.error("[NOTIFY][WORKER] error procesando lote, se releen los pendientes en %.1fs: %s", delay, e)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_backoff)
+        finally:
+            retry_task.cancel()
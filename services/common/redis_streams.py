@@ -1,7 +1,16 @@
 import asyncio
+import json
 import logging
+import time
+import zlib
 import redis.asyncio as redis
-from typing import Any, Dict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+try:
+    import msgpack
+except ImportError:  # servicios que no publican/consumen payloads binarios
+    msgpack = None
 
 log = logging.getLogger("redis_streams")
 
@@ -11,19 +20,341 @@ class Streams:
     SIGNALS = "parsed_signals"
     MGMT = "mgmt_messages"
     EVENTS = "trade_events"
+    TRACES = "signal_traces"
+    TICKS = "market_ticks"
+    QUOTES = "market_quotes"   # hash symbol -> último tick (arranque en frío de QuoteCache)
+    NOTIFY = "notify_outbox"   # notificaciones Telegram pendientes (ver notify_outbox.py)
+    NOTIFY_DEAD = "notify_outbox:dead"
+
+    @staticmethod
+    def raw_partition(chat_id: Any, partitions: int) -> str:
+        """
+        Stream de raw_messages para un chat cuando router_parser corre con N workers.
+        Hash estable (crc32, no hash() que cambia por proceso): todos los mensajes de un
+        chat caen siempre en la misma partición y los procesa un único worker, en orden.
+        Con partitions <= 1 es el stream clásico raw_messages.
+        """
+        partitions = int(partitions or 1)
+        if partitions <= 1:
+            return Streams.RAW
+        idx = zlib.crc32(str(chat_id).encode("utf-8")) % partitions
+        return f"{Streams.RAW}:{idx}"
+
+    @staticmethod
+    def raw_partitions(partitions: int) -> List[str]:
+        partitions = int(partitions or 1)
+        if partitions <= 1:
+            return [Streams.RAW]
+        return [f"{Streams.RAW}:{i}" for i in range(partitions)]
 
 
-async def redis_client(redis_url: str) -> "redis.Redis":
-    r = redis.from_url(redis_url, decode_responses=True)
+async def redis_client(redis_url: str, binary: bool = False) -> "redis.Redis":
+    """
+    binary=True devuelve una conexión sin decode_responses: necesaria para LEER streams
+    con payloads msgpack (bytes que no son UTF-8). Para escribir sirve cualquiera.
+    """
+    r = redis.from_url(redis_url, decode_responses=not binary)
     await r.ping()
     return r
 
 
-async def create_consumer_group(r: "redis.Redis", stream: str, group: str) -> None:
+# ---------------------------------------------------------------------------
+# Codec de payloads entre servicios (parsed_signals, mgmt_messages, trade_events)
+#
+# Problema previo: cada mensaje era un mapa plano de strings con entry_range y tps
+# como JSON dentro de un string; cada consumidor volvía a hacer json.loads y cada
+# productor serializaba a su manera (el camino TOROFX mandaba "is_fast" en vez de
+# "fast", p.ej.).
+#
+# Solucion: un único encoder/decoder con esquema versionado por stream. El mensaje
+# es {"v": <versión>, "m": <msgpack>}; para señales y gestión "m" es una lista
+# posicional (sin nombres de campo repetidos en cada entrada) que se decodifica a
+# Signal / MgmtCommand. Para evolucionar el esquema se AGREGAN campos al final y se
+# sube la versión: los campos ausentes toman su valor por defecto.
+# Los mensajes sin "m" (productores antiguos o sin msgpack instalado) se siguen
+# aceptando en el formato plano.
+# ---------------------------------------------------------------------------
+
+class StreamSchemaError(ValueError):
+    """Payload de stream con versión desconocida o contenido inválido."""
+
+
+def _floats(value: Any) -> Optional[List[float]]:
+    """Lista de floats desde lista/tupla, JSON o '(a, b)'. None si no hay valores."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8")
+    if isinstance(value, str):
+        v = value.strip()
+        if v.startswith("(") and v.endswith(")"):
+            v = "[" + v[1:-1] + "]"
+        try:
+            value = json.loads(v)
+        except ValueError:
+            return None
+    if isinstance(value, (int, float)):
+        value = [value]
+    try:
+        out = [float(x) for x in value]
+    except (TypeError, ValueError):
+        return None
+    return out or None
+
+
+def _float_or_none(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class Signal:
+    """Señal de trading parseada (stream parsed_signals)."""
+    symbol: str
+    direction: str
+    entry_range: Optional[List[float]] = None
+    sl: Optional[float] = None
+    tps: List[float] = field(default_factory=list)
+    provider_tag: str = "GEN"
+    format_tag: str = ""
+    fast: bool = False
+    hint_price: Optional[float] = None
+    chat_id: str = ""
+    raw_text: str = ""
+    trace: str = ""
+    tctx: str = ""
+    # Referencia de la señal original cuando ésta es una re-publicación casi idéntica
+    # (router_parser/near_dup.py): el orchestrator actualiza los trades, no abre.
+    update_of: str = ""
+
+    @classmethod
+    def from_parse_result(cls, pr: Any, **extra: Any) -> "Signal":
+        return cls(
+            symbol=pr.symbol,
+            direction=pr.direction,
+            entry_range=_floats(getattr(pr, "entry_range", None)),
+            sl=_float_or_none(getattr(pr, "sl", None)),
+            tps=_floats(getattr(pr, "tps", None)) or [],
+            provider_tag=getattr(pr, "provider_tag", "") or "GEN",
+            format_tag=getattr(pr, "format_tag", "") or "",
+            fast=bool(getattr(pr, "is_fast", False)),
+            hint_price=_float_or_none(getattr(pr, "hint_price", None)) or None,
+            **extra,
+        )
+
+    @classmethod
+    def from_fields(cls, fields: Dict[str, Any]) -> "Signal":
+        """Formato plano legacy (todo strings, listas como JSON)."""
+        return cls(
+            symbol=fields.get("symbol", ""),
+            direction=fields.get("direction", ""),
+            entry_range=_floats(fields.get("entry_range")),
+            sl=_float_or_none(fields.get("sl")),
+            tps=_floats(fields.get("tps")) or [],
+            provider_tag=fields.get("provider_tag", "GEN") or "GEN",
+            format_tag=fields.get("format_tag", ""),
+            fast=str(fields.get("fast", "false")).lower() == "true",
+            hint_price=_float_or_none(fields.get("hint_price")),
+            chat_id=str(fields.get("source_chat_id") or fields.get("chat_id") or ""),
+            raw_text=fields.get("raw_text", ""),
+            trace=fields.get("trace", ""),
+            tctx=fields.get("tctx", ""),
+            update_of=fields.get("update_of", ""),
+        )
+
+    def to_fields(self) -> Dict[str, str]:
+        out = {
+            "symbol": self.symbol,
+            "direction": self.direction,
+            "entry_range": json.dumps(self.entry_range or []),
+            "sl": "" if self.sl is None else str(self.sl),
+            "tps": json.dumps(self.tps or []),
+            "provider_tag": self.provider_tag,
+            "format_tag": self.format_tag,
+            "fast": "true" if self.fast else "false",
+            "hint_price": "" if self.hint_price is None else str(self.hint_price),
+            "chat_id": self.chat_id,
+            "raw_text": self.raw_text,
+            "trace": self.trace,
+        }
+        if self.tctx:
+            out["tctx"] = self.tctx
+        if self.update_of:
+            out["update_of"] = self.update_of
+        return out
+
+
+class MgmtAction:
+    """
+    Acción de un MgmtCommand tipado (la resuelve router_parser/mgmt_parser.py).
+    "" = mensaje sin tipar (productor anterior): el orchestrator re-parsea el texto.
+    NONE = router_parser lo clasificó como gestión pero no pide ninguna acción.
+    """
+    BE = "BE"                    # SL a break-even
+    PARTIAL = "PARTIAL"          # cierre parcial `percent` % (con umbral opcional `pips`)
+    PARTIAL_BE = "PARTIAL_BE"    # parcial `percent` % + BE (cierra si BE no es posible)
+    CLOSE_ENTRY = "CLOSE_ENTRY"  # cierra la entrada ≈`price` (conserva ≈`keep`)
+    CLOSE_ALL = "CLOSE_ALL"      # cierra todo el proveedor
+    NONE = "NONE"
+
+
+@dataclass
+class MgmtCommand:
+    """
+    Mensaje de gestión (stream mgmt_messages). Desde v2 viaja tipado: `action` y sus
+    parámetros, y `scope` (provider_tag de los trades afectados).
+    """
+    chat_id: str
+    text: str
+    provider_hint: str = ""
+    tctx: str = ""
+    action: str = ""
+    scope: str = ""
+    percent: Optional[int] = None
+    pips: Optional[float] = None
+    price: Optional[float] = None
+    keep: Optional[float] = None
+
+    @classmethod
+    def from_fields(cls, fields: Dict[str, Any]) -> "MgmtCommand":
+        percent = _float_or_none(fields.get("percent"))
+        return cls(
+            chat_id=str(fields.get("chat_id", "")),
+            text=fields.get("text", ""),
+            provider_hint=fields.get("provider_hint", ""),
+            tctx=fields.get("tctx", ""),
+            action=fields.get("action", ""),
+            scope=fields.get("scope", ""),
+            percent=None if percent is None else int(percent),
+            pips=_float_or_none(fields.get("pips")),
+            price=_float_or_none(fields.get("price")),
+            keep=_float_or_none(fields.get("keep")),
+        )
+
+    def to_fields(self) -> Dict[str, str]:
+        out = {"chat_id": self.chat_id, "text": self.text, "provider_hint": self.provider_hint}
+        if self.tctx:
+            out["tctx"] = self.tctx
+        if self.action:
+            out["action"] = self.action
+            out["scope"] = self.scope
+            for name in ("percent", "pips", "price", "keep"):
+                value = getattr(self, name)
+                if value is not None:
+                    out[name] = str(value)
+        return out
+
+
+# Orden posicional de cada versión. Nuevas versiones sólo agregan campos al final.
+SIGNAL_SCHEMA = {
+    1: ("symbol", "direction", "entry_range", "sl", "tps", "provider_tag", "format_tag",
+        "fast", "hint_price", "chat_id", "raw_text", "trace", "tctx"),
+    2: ("symbol", "direction", "entry_range", "sl", "tps", "provider_tag", "format_tag",
+        "fast", "hint_price", "chat_id", "raw_text", "trace", "tctx", "update_of"),
+}
+MGMT_SCHEMA = {
+    1: ("chat_id", "text", "provider_hint", "tctx"),
+    2: ("chat_id", "text", "provider_hint", "tctx", "action", "scope", "percent", "pips", "price", "keep"),
+}
+SIGNAL_VERSION = max(SIGNAL_SCHEMA)
+MGMT_VERSION = max(MGMT_SCHEMA)
+EVENT_VERSION = 1
+
+_TYPED = {
+    Streams.SIGNALS: (Signal, SIGNAL_SCHEMA, SIGNAL_VERSION),
+    Streams.MGMT: (MgmtCommand, MGMT_SCHEMA, MGMT_VERSION),
+}
+
+_warned_no_msgpack = False
+
+
+def _get(fields: Dict[Any, Any], key: str) -> Any:
+    if key in fields:
+        return fields[key]
+    return fields.get(key.encode())
+
+
+def _text_fields(fields: Dict[Any, Any]) -> Dict[str, Any]:
+    """Campos leídos con una conexión binaria -> str (formato plano legacy)."""
+    out = {}
+    for k, v in fields.items():
+        if isinstance(k, (bytes, bytearray)):
+            k = k.decode("utf-8")
+        if isinstance(v, (bytes, bytearray)):
+            v = v.decode("utf-8", errors="replace")
+        out[k] = v
+    return out
+
+
+def encode_message(stream: str, obj: Union[Signal, MgmtCommand, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Serializa un Signal / MgmtCommand / evento (dict) para XADD en `stream`.
+    Sin msgpack instalado cae al formato plano legacy.
+    """
+    global _warned_no_msgpack
+    if msgpack is None:
+        if not _warned_no_msgpack:
+            log.warning("[REDIS] msgpack no instalado: se publica en formato plano legacy")
+            _warned_no_msgpack = True
+        if isinstance(obj, dict):
+            return {k: v if isinstance(v, (str, int, float)) else json.dumps(v) for k, v in obj.items()}
+        return obj.to_fields()
+    typed = _TYPED.get(stream)
+    if typed is not None:
+        _cls, schema, version = typed
+        body = [getattr(obj, name) for name in schema[version]]
+    else:
+        version = EVENT_VERSION
+        body = obj if isinstance(obj, dict) else obj.to_fields()
+    return {"v": version, "m": msgpack.packb(body, use_bin_type=True)}
+
+
+def decode_message(stream: str, fields: Dict[Any, Any]) -> Union[Signal, MgmtCommand, Dict[str, Any]]:
+    """
+    Inverso de encode_message. Acepta campos con claves str o bytes y el formato plano
+    legacy. Lanza StreamSchemaError ante una versión desconocida.
+    """
+    packed = _get(fields, "m")
+    typed = _TYPED.get(stream)
+    if packed is None:
+        flat = _text_fields(fields)
+        return typed[0].from_fields(flat) if typed is not None else flat
+    if msgpack is None:
+        raise StreamSchemaError("payload msgpack recibido pero msgpack no está instalado")
+    raw_version = _get(fields, "v")
+    try:
+        version = int(raw_version.decode() if isinstance(raw_version, (bytes, bytearray)) else raw_version)
+        body = msgpack.unpackb(packed, raw=False)
+    except Exception as e:
+        raise StreamSchemaError(f"payload inválido en '{stream}': {e}") from e
+    if typed is None:
+        if version > EVENT_VERSION:
+            raise StreamSchemaError(f"versión {version} desconocida en '{stream}'")
+        return body
+    cls, schema, _ = typed
+    names = schema.get(version)
+    if names is None:
+        raise StreamSchemaError(f"versión {version} desconocida en '{stream}' (soportadas: {sorted(schema)})")
+    return cls(**dict(zip(names, body)))
+
+
+async def xadd_message(r: "redis.Redis", stream: str, obj: Union[Signal, MgmtCommand, Dict[str, Any]]) -> str:
+    return await xadd(r, stream, encode_message(stream, obj))
+
+
+async def create_consumer_group(r: "redis.Redis", stream: str, group: str, start_id: str = "0") -> None:
+    """
+    Crea el grupo si no existe. start_id sólo aplica a la creación:
+    "0" entrega todo el historial del stream, "$" sólo mensajes nuevos.
+    """
     retries = 5
     for attempt in range(1, retries + 1):
         try:
-            await r.xgroup_create(stream, group, id="0", mkstream=True)
+            await r.xgroup_create(stream, group, id=start_id, mkstream=True)
             log.info("[REDIS] Grupo '%s' creado en stream '%s'", group, stream)
             return
         except Exception as e:
@@ -45,10 +376,83 @@ async def xadd(r: "redis.Redis", stream: str, data: Dict[str, Any]) -> str:
     return await r.xadd(stream, data, maxlen=10000, approximate=True)
 
 
+async def publish_tick(r: "redis.Redis", tick: Dict[str, Any]) -> list:
+    """
+    XADD a market_ticks y último valor en el hash market_quotes, en un solo pipeline.
+    """
+    latest = json.dumps({"bid": tick.get("bid"), "ask": tick.get("ask"), "ts": time.time(), "source": tick.get("source")})
+    pipe = r.pipeline(transaction=False)
+    pipe.xadd(Streams.TICKS, tick, maxlen=10000, approximate=True)
+    pipe.hset(Streams.QUOTES, tick["symbol"], latest)
+    return await pipe.execute()
+
+
 async def xack(r: "redis.Redis", stream: str, group: str, msg_id: str) -> None:
     await r.xack(stream, group, msg_id)
 
 
+async def xack_batch(r: "redis.Redis", stream: str, group: str, msg_ids: List[str]) -> None:
+    """ACK de un lote completo en un solo comando XACK (un round-trip)."""
+    if msg_ids:
+        await r.xack(stream, group, *msg_ids)
+
+
+async def publish_batch_and_ack(
+    r: "redis.Redis",
+    outputs: List[Tuple[str, Dict[str, Any]]],
+    ack_stream: str,
+    group: str,
+    msg_ids: List[str],
+) -> list:
+    """
+    Publica todas las salidas de un lote [(stream, data), ...] (en orden) y hace ACK de
+    todos los mensajes de entrada en un único pipeline: un round-trip por lote.
+    Sin MULTI/EXEC: si el proceso muere antes de execute() nada se publica ni se
+    confirma, y el lote se re-entrega como pendiente.
+    """
+    if not outputs and not msg_ids:
+        return []
+    pipe = r.pipeline(transaction=False)
+    for stream, data in outputs:
+        pipe.xadd(stream, data, maxlen=10000, approximate=True)
+    if msg_ids:
+        pipe.xack(ack_stream, group, *msg_ids)
+    return await pipe.execute()
+
+
+async def reclaim_idle(
+    r: "redis.Redis",
+    stream: str,
+    group: str,
+    consumer: str,
+    min_idle_ms: int,
+    count: int = 50,
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    XAUTOCLAIM: transfiere a `consumer` las entradas pendientes de OTROS consumers del
+    grupo que llevan más de min_idle_ms sin ACK (p.ej. un worker que murió a mitad de
+    lote, o el antiguo consumer_{pid}). Recorre el PEL completo con el cursor.
+    Entradas ya recortadas por MAXLEN se devuelven con fields={} para que el llamador
+    las confirme igualmente.
+    """
+    claimed: List[Tuple[str, Dict[str, Any]]] = []
+    cursor = "0-0"
+    while True:
+        resp = await r.xautoclaim(stream, group, consumer, min_idle_time=int(min_idle_ms), start_id=cursor, count=count)
+        if not resp:
+            break
+        cursor = resp[0]
+        claimed.extend((msg_id, fields or {}) for msg_id, fields in (resp[1] or []))
+        # Redis >= 7 devuelve aparte los IDs pendientes cuyo contenido ya no existe
+        if len(resp) > 2:
+            claimed.extend((msg_id, {}) for msg_id in (resp[2] or []))
+        if cursor in ("0-0", b"0-0"):
+            break
+    if claimed:
+        log.warning("[REDIS] XAUTOCLAIM: %d mensajes pendientes reclamados en '%s' (%s/%s)", len(claimed), stream, group, consumer)
+    return claimed
+
+
 async def xreadgroup_loop(
     r: "redis.Redis",
     stream: str,
@@ -81,3 +485,56 @@ async def xread_loop(
             for msg_id, fields in msgs:
                 last_id = msg_id
                 yield msg_id, fields
+
+
+async def xreadgroup_batches(
+    r: "redis.Redis",
+    stream: str,
+    group: str,
+    consumer: str,
+    block_ms: int = 2000,
+    count: int = 50,
+    recover_pending: bool = True,
+    claim_idle_ms: Optional[int] = None,
+    claim_interval_sec: float = 30.0,
+):
+    """
+    Igual que xreadgroup_loop pero entrega lotes [(msg_id, fields), ...] para que el
+    consumidor pueda hacer un único XACK por lote.
+
+    Con recover_pending=True primero re-entrega los mensajes pendientes (leídos pero
+    sin ACK) de este mismo consumer — p.ej. tras un reinicio a mitad de lote — y
+    después pasa a mensajes nuevos (">"). Requiere un nombre de consumer estable.
+    Entradas pendientes cuyo contenido ya fue recortado por MAXLEN llegan con fields={}.
+
+    Con claim_idle_ms, cada claim_interval_sec se reclaman (XAUTOCLAIM) las entradas
+    que otros consumers dejaron pendientes más de claim_idle_ms y se entregan antes
+    de seguir con mensajes nuevos.
+    """
+    pending_id = "0" if recover_pending else None
+    next_claim = 0.0
+    while True:
+        if claim_idle_ms and pending_id is None and time.monotonic() >= next_claim:
+            next_claim = time.monotonic() + claim_interval_sec
+            claimed = await reclaim_idle(r, stream, group, consumer, claim_idle_ms, count=count)
+            if claimed:
+                yield claimed
+                continue
+        if pending_id is not None:
+            resp = await r.xreadgroup(group, consumer, {stream: pending_id}, count=count)
+            msgs: List[Tuple[str, Dict[str, Any]]] = []
+            for _, entries in resp or []:
+                msgs.extend((msg_id, fields or {}) for msg_id, fields in entries)
+            if not msgs:
+                pending_id = None
+                continue
+            log.info("[REDIS] Recuperando %d mensajes pendientes de '%s' (%s/%s)", len(msgs), stream, group, consumer)
+            pending_id = msgs[-1][0]
+            yield msgs
+            continue
+        resp = await r.xreadgroup(group, consumer, {stream: ">"}, block=block_ms, count=count)
+        if not resp:
+            continue
+        for _, entries in resp:
+            if entries:
+                yield [(msg_id, fields or {}) for msg_id, fields in entries]
@@ -0,0 +1,98 @@
+"""
+settings_cache.py
+Snapshot en memoria de la tabla settings, con esquema tipado.
+
+Problema previo: ConfigProvider.get hacía un SELECT por llamada y los caminos calientes
+lo llaman sin parar: TOLERANCE_PIPS en cada send_order, SCALING_TRAMO_PIPS /
+SCALING_PERCENT_PER_TRAMO en cada tick de _maybe_scaling_out_no_tp, 'trailing' por
+ticket y tick en _maybe_trailing, Settings.sl_max_pips() en cada modify_sl. Además cada
+lector volvía a convertir el string (float(), json.loads...).
+
+Solucion: SettingsSnapshot se arma una vez por recarga con todos los pares key/value.
+Las claves de SETTINGS_SCHEMA se convierten en ese momento a su tipo (float, int, bool,
+dict); un valor inválido se informa y queda el default del esquema. Leer es un lookup
+de dict. ConfigProvider (config_db.py) reemplaza el snapshot completo (asignación
+atómica) cuando backend_admin avisa por NOTIFY en SETTINGS_CHANNEL.
+"""
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, Mapping, Tuple
+
+log = logging.getLogger("config_db")
+
+# Canal de LISTEN/NOTIFY: backend_admin y ConfigProvider.set lo notifican al escribir settings
+SETTINGS_CHANNEL = "settings_changed"
+
+_MISSING = object()
+
+
+def parse_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("true", "1", "yes", "on")
+
+
+def parse_json(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return value
+    return json.loads(value) if str(value).strip() else {}
+
+
+# clave -> (conversión, default). Sólo las que se leen en caminos calientes o que
+# necesitan conversión no trivial; el resto sigue disponible como string vía get().
+SETTINGS_SCHEMA: Dict[str, Tuple[Callable[[Any], Any], Any]] = {
+    "TOLERANCE_PIPS": (float, 30.0),
+    "SCALING_TRAMO_PIPS": (float, 40.0),
+    "SCALING_PERCENT_PER_TRAMO": (float, 25.0),
+    "trailing": (parse_json, {}),
+    "SL_MAX_PIPS": (float, 120.0),
+    "DEDUP_TTL_SECONDS": (float, 120.0),
+    "DEFAULT_SL_XAUUSD_PIPS": (float, 300.0),
+    "DEFAULT_SL_PIPS": (float, 100.0),
+    "SL_MODIFY_MIN_INTERVAL_MS": (float, 200.0),
+    "QUOTE_MAX_AGE_MS": (float, 3000.0),
+    "QUOTE_ENTRY_MAX_AGE_MS": (float, 2000.0),
+    "FAST_UPDATE_WINDOW_SECONDS": (float, 30.0),
+    "ENABLE_NOTIFICATIONS": (parse_bool, True),
+    "ENABLE_TRAILING": (parse_bool, True),
+    "ENABLE_BREAKEVEN": (parse_bool, True),
+}
+
+
+class SettingsSnapshot:
+    """Vista inmutable de settings: `raw` (strings, como en la tabla) y `typed` (según SETTINGS_SCHEMA)."""
+
+    __slots__ = ("raw", "typed", "version", "loaded")
+
+    def __init__(self, raw: Mapping[str, Any], version: int = 0, loaded: bool = True):
+        self.raw: Dict[str, Any] = dict(raw)
+        self.version = version
+        self.loaded = loaded
+        typed: Dict[str, Any] = {}
+        for key, (parse, default) in SETTINGS_SCHEMA.items():
+            if key not in self.raw:
+                continue
+            try:
+                typed[key] = parse(self.raw[key])
+            except (TypeError, ValueError) as e:
+                log.warning("[ConfigDB] valor inválido para '%s' (%r): %s. Usando default %r.", key, self.raw[key], e, default)
+                typed[key] = default
+        self.typed = typed
+
+    @classmethod
+    def from_env(cls) -> "SettingsSnapshot":
+        """Sin base de datos: las claves del esquema presentes en el entorno."""
+        return cls({k: os.environ[k] for k in SETTINGS_SCHEMA if k in os.environ})
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.raw.get(key, default)
+
+    def setting(self, key: str, default: Any = _MISSING) -> Any:
+        """Valor tipado; si la clave no está configurada, `default` o el del esquema."""
+        value = self.typed.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if default is not _MISSING:
+            return default
+        return SETTINGS_SCHEMA[key][1]
@@ -1,14 +1,58 @@
 """
 Signal deduplication using Redis.
 Prevents processing the same signal twice within a time window.
+
+Problema previo: por cada señal parseada router_parser hacía GET fast_sig:*, a veces
+DELETE, SETEX y después el SET NX de is_duplicate: hasta cuatro round trips
+secuenciales a Redis. cleanup() usaba KEYS (bloquea Redis mientras recorre todo el
+keyspace) y ni siquiera era compatible con el cliente async.
+
+Solucion:
+  - check() resuelve la marca FAST y el duplicado en un único script Lua (EVALSHA):
+    un round trip por señal.
+  - Un cache local con TTL delante del script: una señal completa repetida en el
+    mismo worker se descarta sin tocar Redis. Es seguro porque la firma incluye el
+    chat_id y todos los mensajes de un chat los procesa el mismo worker
+    (raw_partition); por lo mismo el worker sabe qué marcas FAST dejó, y con una
+    pendiente para ese símbolo/dirección la señal va igual al script. Las FAST
+    siempre pasan por el script (renuevan su marca).
+  - Cada clave de dedup se indexa en un ZSET (score = expiración). El script poda
+    las entradas vencidas en cada llamada, así que el índice queda acotado; cleanup()
+    y reset() trabajan sobre el índice y SCAN, nunca con KEYS.
 """
 
 import hashlib
+import time
+from collections import OrderedDict
 from redis import Redis
 import logging
 
 log = logging.getLogger("router_parser.dedup")
 
+# Resultados de check()
+NEW = 0
+DUPLICATE = 1
+FAST_UPDATE = 2   # señal completa que actualiza una FAST previa (se publica igual)
+
+# KEYS: fast_sig, clave de dedup, índice ZSET. ARGV: is_fast, ttl, ventana FAST, ahora.
+_CHECK_LUA = """
+local ttl = tonumber(ARGV[2])
+local now = tonumber(ARGV[4])
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now)
+if ARGV[1] == '1' then
+  redis.call('SET', KEYS[1], '1', 'EX', tonumber(ARGV[3]))
+elseif redis.call('DEL', KEYS[1]) == 1 then
+  redis.call('SET', KEYS[2], '1', 'EX', ttl)
+  redis.call('ZADD', KEYS[3], now + ttl, KEYS[2])
+  return 2
+end
+if redis.call('SET', KEYS[2], '1', 'EX', ttl, 'NX') then
+  redis.call('ZADD', KEYS[3], now + ttl, KEYS[2])
+  return 0
+end
+return 1
+"""
+
 
 class SignalDeduplicator:
     """
@@ -16,16 +60,23 @@ class SignalDeduplicator:
     Uses Redis to store seen signatures with TTL.
     """
     
-    def __init__(self, redis_client: Redis, ttl_seconds: float = 120.0, key_prefix: str = "signal_dedup:"):
+    def __init__(self, redis_client: Redis, ttl_seconds: float = 120.0, key_prefix: str = "signal_dedup:",
+                 local_max_entries: int = 4096):
         """
         Args:
             redis_client: Redis connection
             ttl_seconds: Time-to-live for dedup entries (default 120s)
             key_prefix: Redis key prefix for dedup entries
+            local_max_entries: tamaño del cache local delante de Redis (0 lo desactiva)
         """
         self.redis = redis_client
         self.ttl_seconds = ttl_seconds
         self.key_prefix = key_prefix
+        self.index_key = f"{key_prefix}index"
+        self.local_max_entries = max(0, int(local_max_entries))
+        self._recent: "OrderedDict[str, float]" = OrderedDict()
+        self._fast_marks: "OrderedDict[str, float]" = OrderedDict()
+        self._script = None
     
     def _signature_from_parse_result(self, chat_id: str, parse_result) -> str:
         """
@@ -45,6 +96,10 @@ class SignalDeduplicator:
         raw = "|".join(parts)
         return hashlib.md5(raw.encode("utf-8")).hexdigest()
     
+    def signature(self, chat_id: str, parse_result) -> str:
+        """Firma exacta de la señal (md5 hex)."""
+        return self._signature_from_parse_result(chat_id, parse_result)
+
     async def is_duplicate(self, chat_id: str, parse_result) -> bool:
         """
         Verifica si la señal ya fue procesada recientemente.
@@ -70,16 +125,86 @@ class SignalDeduplicator:
         log.debug("[DEDUP] duplicada chat=%s sig=%s", chat_id, sig)
         return True  # Clave ya existía: duplicado
     
-    def cleanup(self) -> int:
+    @staticmethod
+    def _live(entries: "OrderedDict[str, float]", key: str, now: float) -> bool:
+        expires = entries.get(key)
+        if expires is None:
+            return False
+        if now >= expires:
+            del entries[key]
+            return False
+        return True
+
+    def _remember(self, entries: "OrderedDict[str, float]", key: str, expires: float) -> None:
+        if not self.local_max_entries:
+            return
+        entries[key] = expires
+        entries.move_to_end(key)
+        while len(entries) > self.local_max_entries:
+            entries.popitem(last=False)
+
+    async def check(self, chat_id: str, parse_result, fast_window: float) -> int:
         """
-        Clean up expired entries (optional manual cleanup).
+        Dedup + marca FAST en un round trip. Devuelve NEW, DUPLICATE o FAST_UPDATE.
+        - Señal FAST: deja fast_sig:{chat}:{symbol}:{direction} por fast_window segundos
+          y se deduplica como cualquier otra.
+        - Señal completa con una FAST previa: consume la marca y se publica como
+          actualización (registrando su firma, así sus repeticiones sí se descartan).
+        Ante un error de Redis deja pasar la señal (no bloquear trading).
+        """
+        sig = self._signature_from_parse_result(chat_id, parse_result)
+        now = time.monotonic()
+        is_fast = bool(getattr(parse_result, "is_fast", False))
+        fast_key = f"fast_sig:{chat_id}:{parse_result.symbol}:{parse_result.direction}"
+        if not is_fast and not self._live(self._fast_marks, fast_key, now) and self._live(self._recent, sig, now):
+            return DUPLICATE
+
+        try:
+            if self._script is None:
+                self._script = self.redis.register_script(_CHECK_LUA)
+            result = int(await self._script(
+                keys=[fast_key, f"{self.key_prefix}{sig}", self.index_key],
+                args=["1" if is_fast else "0", int(self.ttl_seconds), int(fast_window), int(time.time())],
+            ))
+        except Exception as e:
+            log.warning("[DEDUP] script falló sig=%s err=%s — asumiendo nueva señal", sig, e)
+            return NEW
+        self._remember(self._recent, sig, now + self.ttl_seconds)
+        if is_fast:
+            self._remember(self._fast_marks, fast_key, now + fast_window)
+        elif result == FAST_UPDATE:
+            self._fast_marks.pop(fast_key, None)
+        if result == DUPLICATE:
+            log.debug("[DEDUP] duplicada chat=%s sig=%s", chat_id, sig)
+        return result
+
+    async def cleanup(self) -> int:
+        """
+        Poda del índice ZSET y del cache local: quita las entradas vencidas (las claves
+        de Redis ya expiraron por TTL).
+        Returns number of index entries removed.
+        """
+        now = time.monotonic()
+        for entries in (self._recent, self._fast_marks):
+            for key in [k for k, expires in entries.items() if now >= expires]:
+                del entries[key]
+        return int(await self.redis.zremrangebyscore(self.index_key, "-inf", int(time.time())))
+
+    async def reset(self, batch: int = 500) -> int:
+        """
+        Clear all dedup entries: SCAN por prefijo (incluye el índice) y DEL en lotes
+        de `batch`, sin KEYS.
         Returns number of keys deleted.
         """
-        keys = self.redis.keys(f"{self.key_prefix}*")
-        if not keys:
-            return 0
-        return self.redis.delete(*keys)
-    
-    def reset(self):
-        """Clear all dedup entries"""
-        self.cleanup()
+        self._recent.clear()
+        self._fast_marks.clear()
+        deleted = 0
+        chunk = []
+        async for key in self.redis.scan_iter(match=f"{self.key_prefix}*", count=batch):
+            chunk.append(key)
+            if len(chunk) >= batch:
+                deleted += int(await self.redis.delete(*chunk))
+                chunk = []
+        if chunk:
+            deleted += int(await self.redis.delete(*chunk))
+        return deleted
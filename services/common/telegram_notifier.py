@@ -5,15 +5,18 @@ RemoteTelegramNotifier envia notificaciones via HTTP al servicio telegram_ingest
 TelegramNotifier envia directamente usando un TelegramClient (Telethon).
 Ambas clases implementan la misma interfaz de metodos para ser intercambiables.
 """
+import asyncio
 import logging
 import os
 import json
 from dataclasses import dataclass
-from typing import Optional
+from typing import Hashable, Iterable, List, Optional, Tuple
 
 import httpx
 from telethon import TelegramClient
 
+from services.common.notify_digest import DigestCoalescer
+
 log = logging.getLogger("telegram_notifier")
 
 
@@ -29,12 +32,88 @@ class RemoteTelegramNotifier:
     """
     Envia notificaciones via HTTP al endpoint /notify del telegram_ingestor.
     Resuelve el chat_id de cada cuenta desde ACCOUNTS_JSON o config_provider.
+
+    Un solo httpx.AsyncClient por notificador (keep-alive, pool acotado a
+    `max_connections`) en lugar de un cliente nuevo por mensaje. Los notify() que llegan
+    dentro de `batch_window_ms` (p.ej. una cascada de TPs en varias cuentas) se envían
+    juntos a /notify/batch; como mucho `max_concurrency` requests en vuelo.
+
+    Con `digest_window_ms` > 0 (NOTIFY_DIGEST_WINDOW_MS) notify() no espera el envío:
+    los mensajes de un chat se agrupan en un digest (notify_digest.DigestCoalescer),
+    los urgentes salen enseguida y los que comparten collapse_key se reemplazan.
+
+    Con `outbox` (notify_outbox.NotifyOutbox) notify() sólo encola el evento en Redis y
+    lo entrega el proceso notifier_worker (reintentos, digest, idempotencia); el envío
+    HTTP (post_one / post_batch) lo usa ese worker.
     """
 
-    def __init__(self, api_url: str, api_key: str = "", config_provider=None):
+    def __init__(
+        self,
+        api_url: str,
+        api_key: str = "",
+        config_provider=None,
+        max_connections: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        batch_window_ms: Optional[float] = None,
+        batch_max: int = 50,
+        timeout: float = 10.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        digest_window_ms: Optional[float] = None,
+        outbox=None,
+    ):
         self.api_url = api_url.rstrip("/")
         self.api_key = api_key or os.getenv("NOTIFY_API_KEY", "")
         self._config_provider = config_provider
+        self.max_connections = int(max_connections or os.getenv("NOTIFY_HTTP_MAX_CONNECTIONS", 8))
+        self.max_concurrency = int(max_concurrency or os.getenv("NOTIFY_MAX_CONCURRENCY", 4))
+        self.batch_window = float(
+            batch_window_ms if batch_window_ms is not None else os.getenv("NOTIFY_BATCH_WINDOW_MS", 10)
+        ) / 1000.0
+        self.batch_max = max(1, int(batch_max))
+        self.timeout = timeout
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._pending: List[Tuple[int, str, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        # False si el ingestor no tiene /notify/batch (versión anterior): se envía de a uno
+        self._batch_supported = True
+        digest_window = float(
+            digest_window_ms if digest_window_ms is not None else os.getenv("NOTIFY_DIGEST_WINDOW_MS", 1500)
+        ) / 1000.0
+        self.outbox = outbox
+        self.digest: Optional[DigestCoalescer] = (
+            DigestCoalescer(self._deliver, window_sec=digest_window) if digest_window > 0 and outbox is None else None
+        )
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            headers = {"X-API-Key": self.api_key} if self.api_key else {}
+            self._client = httpx.AsyncClient(
+                base_url=self.api_url,
+                headers=headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60.0,
+                ),
+                transport=self._transport,
+            )
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def aclose(self) -> None:
+        if self.outbox is not None:
+            await self.outbox.flush()
+        if self.digest is not None:
+            await self.digest.flush()
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     def _resolve_chat_id(self, account_name: str) -> Optional[int]:
         """Busca el chat_id de una cuenta por nombre."""
@@ -57,23 +136,108 @@ class RemoteTelegramNotifier:
             pass
         return None
 
-    async def notify(self, chat_id: str | int, message: str) -> None:
+    async def notify(
+        self,
+        chat_id: str | int,
+        message: str,
+        *,
+        urgent: Optional[bool] = None,
+        collapse_key: Optional[Hashable] = None,
+    ) -> None:
+        """
+        urgent: salta el digest (None = según el prefijo del mensaje, ver notify_digest)
+        collapse_key: reemplaza al mensaje pendiente del mismo chat con la misma clave
+        """
         try:
             chat_id_int = int(str(chat_id))
         except (ValueError, TypeError):
             log.error("[NOTIFY][SKIP] chat_id '%s' no es un entero valido.", chat_id)
             return
-        headers = {"X-API-Key": self.api_key} if self.api_key else {}
+        if self.outbox is not None:
+            self.outbox.enqueue(chat_id_int, message, urgent=urgent, collapse_key=collapse_key)
+            return
+        if self.digest is not None:
+            self.digest.submit(chat_id_int, message, urgent=urgent, collapse_key=collapse_key)
+            return
+        await self._deliver(chat_id_int, message)
+
+    async def _deliver(self, chat_id: int, message: str) -> None:
+        if self.batch_window <= 0:
+            await self._send_one(chat_id, message)
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((chat_id, message, fut))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+        await fut
+
+    async def notify_many(self, items: Iterable[Tuple[str | int, str]]) -> None:
+        """Envía varios (chat_id, mensaje) en requests a /notify/batch (en orden)."""
+        await asyncio.gather(*(self.notify(chat_id, message) for chat_id, message in items))
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.batch_window)
+        while self._pending:
+            batch, self._pending = self._pending[:self.batch_max], self._pending[self.batch_max:]
+            try:
+                await self._send_batch(batch)
+            finally:
+                for _, _, fut in batch:
+                    if not fut.done():
+                        fut.set_result(None)
+
+    async def _send_one(self, chat_id: int, message: str) -> None:
+        error = await self.post_one(chat_id, message)
+        if error:
+            log.error("[NOTIFY][ERROR] chat_id=%s error=%s", chat_id, error)
+
+    async def _send_batch(self, batch: List[Tuple[int, str, asyncio.Future]]) -> None:
+        errors = await self.post_batch([(chat_id, message) for chat_id, message, _ in batch])
+        for (chat_id, _, _), error in zip(batch, errors):
+            if error:
+                log.error("[NOTIFY][ERROR] chat_id=%s error=%s", chat_id, error)
+
+    async def post_one(self, chat_id: int, message: str) -> Optional[str]:
+        """POST /notify. Devuelve None si se entregó, o el error (no lanza)."""
+        client = self._http()
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.post(
-                    f"{self.api_url}/notify",
-                    json={"chat_id": str(chat_id_int), "message": message},
-                    headers=headers,
-                )
-                resp.raise_for_status()
+            async with self._sem:
+                resp = await client.post("/notify", json={"chat_id": str(chat_id), "message": message})
+            resp.raise_for_status()
+            return None
         except Exception as e:
-            log.error("[NOTIFY][ERROR] chat_id=%s error=%s", chat_id_int, e)
+            return str(e) or type(e).__name__
+
+    async def post_batch(self, items: List[Tuple[int, str]]) -> List[Optional[str]]:
+        """
+        Entrega [(chat_id, mensaje), ...] por /notify/batch en lotes de batch_max.
+        Devuelve un error (o None) por mensaje, en el mismo orden; no lanza.
+        """
+        errors: List[Optional[str]] = []
+        for start in range(0, len(items), self.batch_max):
+            chunk = items[start:start + self.batch_max]
+            if len(chunk) == 1 or not self._batch_supported:
+                for chat_id, message in chunk:  # en orden: Telegram muestra el orden de llegada
+                    errors.append(await self.post_one(chat_id, message))
+                continue
+            client = self._http()
+            payload = {"messages": [{"chat_id": str(chat_id), "message": message} for chat_id, message in chunk]}
+            try:
+                async with self._sem:
+                    resp = await client.post("/notify/batch", json=payload)
+                if resp.status_code == 404:
+                    log.warning("[NOTIFY] telegram_ingestor sin /notify/batch: envío individual")
+                    self._batch_supported = False
+                    errors.extend(await self.post_batch(chunk))
+                    continue
+                resp.raise_for_status()
+                results = resp.json().get("results") or []
+            except Exception as e:
+                errors.extend([f"batch: {e}"] * len(chunk))
+                continue
+            results = list(results) + [{"status": "error", "detail": "sin resultado"}] * (len(chunk) - len(results))
+            errors.extend(None if r.get("status") == "ok" else (r.get("detail") or "error") for r in results[:len(chunk)])
+        return errors
 
     async def notify_trade_opened(
         self,
@@ -144,14 +308,14 @@ class RemoteTelegramNotifier:
         if not chat_id:
             return
         msg = f"❌ STOP LOSS HIT\n━━━━━━━━━━━━━━━━\n📊 Account: `{account_name}`\n📈 Symbol: `{symbol}`\n🛑 SL: `{sl_price}`\n💔 Loss: `-{loss:.2f}` USD\n🏷️ Ticket: `{ticket}`\n"
-        await self.notify(chat_id, msg)
+        await self.notify(chat_id, msg, urgent=True)
 
     async def notify_error(self, account_name: str, error_type: str, error_message: str) -> None:
         chat_id = self._resolve_chat_id(account_name)
         if not chat_id:
             return
         msg = f"🚨 ERROR\n━━━━━━━━━━━━━━━━\n📊 Account: `{account_name}`\n⚠️ Tipo: `{error_type}`\n📝 Mensaje: `{error_message}`\n"
-        await self.notify(chat_id, msg)
+        await self.notify(chat_id, msg, urgent=True)
 
 
 class TelegramNotifier:
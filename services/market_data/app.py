@@ -1,6 +1,6 @@
 import os, asyncio, logging
 from common.config import Settings
-from common.redis_streams import redis_client, xadd
+from common.redis_streams import redis_client, publish_tick
 
 from mt5linux import MetaTrader5
 
@@ -184,7 +184,10 @@ async def main():
     requested_symbols = symbols
     
     # Retry logic for mt5_acct1 connection (may need significant startup time)
-    mt5 = await connect_mt5(host="mt5_acct1", port=8001, max_attempts=30)
+    host, port = "mt5_acct1", 8001
+    # Los consumidores (QuoteCache) sólo usan estos ticks para clientes de este mismo bridge
+    source = f"{host}:{port}"
+    mt5 = await connect_mt5(host=host, port=port, max_attempts=30)
     
     # Try to get basic info about MT5 connection
     try:
@@ -222,7 +225,8 @@ async def main():
             for sym in symbols:
                 tick_data = await fetch_tick_data(mt5, sym)
                 if tick_data:
-                    await xadd(r, "market_ticks", tick_data)
+                    tick_data["source"] = source
+                    await publish_tick(r, tick_data)
                     log.info(f"Published tick for {sym}: bid={tick_data['bid']}, ask={tick_data['ask']}")
                     # Reset reconnection counter on successful data fetch
                     reconnect_attempts = 0
@@ -245,7 +249,7 @@ async def main():
             if reconnect_attempts >= max_reconnect_attempts:
                 log.error(f"Max reconnection attempts ({max_reconnect_attempts}) reached, attempting full reconnect...")
                 try:
-                    mt5 = await connect_mt5(host="mt5_acct1", port=8001, max_attempts=10)
+                    mt5 = await connect_mt5(host=host, port=port, max_attempts=10)
                     reconnect_attempts = 0
                     failed_symbols.clear()
                 except Exception as reconnect_e:
@@ -0,0 +1,190 @@
+"""
+mt5_composite.py
+Operaciones compuestas que corren al lado del terminal MT5 (dentro del bridge rpyc).
+
+Problema previo: MT5Client.partial_close hacía positions_get, symbol_info,
+symbol_info_tick, order_send y otra vez positions_get por cada filling mode, cada
+una un round-trip de red contra el bridge. _do_be y modify_sl tenían bucles de
+verificación similares: 5-15 saltos de red por operación.
+
+Solucion: el bridge (MT5Service) expone close_partial y move_sl_verified.
+Todo el ida y vuelta contra el terminal ocurre localmente y el cliente recibe un
+único resultado compacto.
+
+Los resultados son tuplas de tipos primitivos para que rpyc las pase por valor
+(un dict llegaría como netref y cada acceso sería otro round-trip):
+  close_partial    -> (ok, retcode, closed_volume, remaining_volume, message)
+  move_sl_verified -> (ok, retcode, sl_applied, message)
+
+Las funciones reciben el módulo MetaTrader5 como parámetro para poder probarlas
+sin terminal.
+"""
+from __future__ import annotations
+
+import time
+
+RETCODE_DONE = 10009
+RETCODE_PLACED = 10008
+RETCODE_INVALID_FILL = 10030
+RETCODE_OK = (RETCODE_DONE, RETCODE_PLACED)
+
+ACTION_DEAL = 1
+ACTION_SLTP = 6
+
+FILLING_IOC = 1
+FILLING_FOK = 3
+FILLING_RETURN = 2
+
+DEFAULT_DEVIATION = 50
+DEFAULT_MAGIC = 987654
+
+
+def _filling_candidates(info):
+    """Filling recomendado por el símbolo primero, luego el resto (IOC, FOK, RETURN)."""
+    candidates = []
+    fillmode = getattr(info, "trade_fill_mode", None) if info is not None else None
+    if fillmode is None and info is not None:
+        fillmode = getattr(info, "fill_mode", None)
+    if fillmode in (FILLING_IOC, FILLING_FOK, FILLING_RETURN):
+        candidates.append(int(fillmode))
+    for f in (FILLING_IOC, FILLING_FOK, FILLING_RETURN):
+        if f not in candidates:
+            candidates.append(f)
+    return candidates
+
+
+def _position(mt5, ticket):
+    pos_list = mt5.positions_get(ticket=int(ticket))
+    return pos_list[0] if pos_list else None
+
+
+def _close_volume(volume, pct, info):
+    step = float(getattr(info, "volume_step", 0.01) or 0.01) if info is not None else 0.01
+    min_vol = float(getattr(info, "volume_min", 0.01) or 0.01) if info is not None else 0.01
+    raw_close = volume * (float(pct) / 100.0)
+    close_vol = step * int(round(raw_close / step, 8))
+    if close_vol < min_vol:
+        close_vol = min_vol if volume > min_vol else volume
+    return round(min(close_vol, volume), 8)
+
+
+def _send_close(mt5, pos, volume, info, deviation, magic, comment):
+    """Envía un DEAL de cierre probando filling modes. Devuelve el último resultado."""
+    symbol = pos.symbol
+    order_type = 1 if int(getattr(pos, "type", 0)) == 0 else 0
+    last_res = None
+    for type_filling in _filling_candidates(info):
+        tick = mt5.symbol_info_tick(symbol)
+        if not tick:
+            return None
+        price = float(tick.bid if order_type == 1 else tick.ask)
+        req = {
+            "action": ACTION_DEAL,
+            "symbol": symbol,
+            "volume": float(volume),
+            "type": order_type,
+            "position": int(pos.ticket),
+            "price": price,
+            "deviation": int(deviation),
+            "magic": int(magic),
+            "comment": comment,
+            "type_time": 0,
+            "type_filling": type_filling,
+        }
+        res = mt5.order_send(req)
+        last_res = res
+        retcode = getattr(res, "retcode", None) if res else None
+        if retcode in RETCODE_OK:
+            return res
+        if retcode is not None and retcode != RETCODE_INVALID_FILL:
+            # Error distinto de filling inválido: no tiene sentido probar otro modo
+            return res
+    return last_res
+
+
+def close_partial(mt5, ticket, pct, deviation=DEFAULT_DEVIATION, magic=DEFAULT_MAGIC, comment="PartialClose"):
+    """
+    Cierra pct% (0-100] de la posición respetando volume_step/volume_min.
+    -> (ok, retcode, closed_volume, remaining_volume, message)
+    """
+    pos = _position(mt5, ticket)
+    if pos is None:
+        return (False, None, 0.0, 0.0, "position not found")
+    volume = float(getattr(pos, "volume", 0.0))
+    if volume <= 0:
+        return (False, None, 0.0, 0.0, "invalid volume")
+    info = mt5.symbol_info(pos.symbol)
+    close_vol = _close_volume(volume, pct, info)
+    res = _send_close(mt5, pos, close_vol, info, deviation, magic, comment)
+    retcode = getattr(res, "retcode", None) if res else None
+    if retcode not in RETCODE_OK:
+        return (False, retcode, 0.0, volume, str(getattr(res, "comment", "") if res else "no response"))
+    after = _position(mt5, ticket)
+    remaining = float(getattr(after, "volume", 0.0)) if after is not None else 0.0
+    return (True, retcode, float(close_vol), remaining, str(getattr(res, "comment", "")))
+
+
+def _pip_size(symbol, point):
+    """1 pip en precio, igual que trade_utils.pips_to_price (este módulo corre solo en el bridge)."""
+    if str(symbol).upper().startswith("XAU"):
+        return 0.1
+    return point
+
+
+def _clamp_to_stop_level(pos, info, sl):
+    """Aleja el SL lo mínimo necesario para respetar stops_level del símbolo."""
+    point = float(getattr(info, "point", 0.0) or 0.0)
+    stop_level = float(getattr(info, "stops_level", 0.0) or 0.0) * point
+    if stop_level <= 0:
+        return sl
+    price_current = float(getattr(pos, "price_current", 0.0))
+    digits = 2 if str(pos.symbol).upper().startswith("XAU") else 5
+    if int(getattr(pos, "type", 0)) == 0:
+        return round(min(sl, price_current - stop_level), digits)
+    return round(max(sl, price_current + stop_level), digits)
+
+
+def move_sl_verified(mt5, ticket, sl, tp=None, comment="SLUPD", attempts=3, verify_polls=5, verify_interval=0.05):
+    """
+    Mueve el SL (tp=None conserva el TP actual) y verifica contra positions_get en el
+    propio bridge. Si el broker rechaza, aleja 1 pip por intento (como modify_sl).
+    -> (ok, retcode, sl_applied, message)
+    """
+    pos = _position(mt5, ticket)
+    if pos is None:
+        return (False, None, 0.0, "position not found")
+    info = mt5.symbol_info(pos.symbol)
+    if info is None:
+        return (False, None, 0.0, "symbol info not found")
+    point = float(getattr(info, "point", 0.0) or 0.0)
+    pip = _pip_size(pos.symbol, point)
+    is_buy = int(getattr(pos, "type", 0)) == 0
+    tp_value = float(getattr(pos, "tp", 0.0)) if tp is None else float(tp)
+    target = _clamp_to_stop_level(pos, info, float(sl))
+    retcode = None
+    message = ""
+    for _ in range(max(1, int(attempts))):
+        req = {
+            "action": ACTION_SLTP,
+            "position": int(ticket),
+            "symbol": pos.symbol,
+            "sl": float(target),
+            "tp": tp_value,
+            "comment": comment,
+        }
+        res = mt5.order_send(req)
+        retcode = getattr(res, "retcode", None) if res else None
+        message = str(getattr(res, "comment", "") if res else "no response")
+        if retcode in RETCODE_OK:
+            for _poll in range(max(1, int(verify_polls))):
+                after = _position(mt5, ticket)
+                if after is None:
+                    return (False, retcode, 0.0, "position closed")
+                applied = float(getattr(after, "sl", 0.0))
+                if abs(applied - float(target)) <= max(point, 1e-9):
+                    return (True, retcode, applied, message)
+                time.sleep(verify_interval)
+            return (False, retcode, applied, "sl not reflected after order_send")
+        target = round(target - pip if is_buy else target + pip, 8)
+    return (False, retcode, 0.0, message)
+
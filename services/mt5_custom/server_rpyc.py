@@ -1,5 +1,6 @@
 import rpyc
 import MetaTrader5 as mt5
+import mt5_composite
 import sys
 import time
 import logging
@@ -31,6 +32,14 @@ class MT5Service(rpyc.Service):
     def exposed_symbol_info_tick(self, symbol):
         return mt5.symbol_info_tick(symbol)
 
+    # ---- Operaciones compuestas: un solo round-trip desde el orchestrator ----
+
+    def exposed_close_partial(self, ticket, pct):
+        return mt5_composite.close_partial(mt5, ticket, pct)
+
+    def exposed_move_sl_verified(self, ticket, sl, tp=None):
+        return mt5_composite.move_sl_verified(mt5, ticket, sl, tp)
+
 
 if __name__ == "__main__":
     import traceback
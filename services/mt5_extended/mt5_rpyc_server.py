@@ -1,6 +1,7 @@
 import rpyc
 from rpyc.utils.server import ThreadedServer
 import MetaTrader5 as mt5
+import mt5_composite
 import time
 import logging
 import sys
@@ -38,6 +39,14 @@ class MT5Service(rpyc.Service):
     def exposed_last_error(self):
         return mt5.last_error()
 
+    # ---- Operaciones compuestas: un solo round-trip desde el orchestrator ----
+
+    def exposed_close_partial(self, ticket, pct):
+        return mt5_composite.close_partial(mt5, ticket, pct)
+
+    def exposed_move_sl_verified(self, ticket, sl, tp=None):
+        return mt5_composite.move_sl_verified(mt5, ticket, sl, tp)
+
 
 if __name__ == "__main__":
     log.info("Inicializando MT5...")
@@ -1,9 +1,16 @@
-import os, re, json, logging, uuid
+import os, re, json, logging
 from services.common.config import Settings
-from services.common.redis_streams import redis_client, xadd, Streams, create_consumer_group, xreadgroup_loop, xack
-from services.common.signal_dedup import SignalDeduplicator
-from gb_filters import looks_like_followup
-from torofx_filters import looks_like_torofx_management
+from services.common.redis_streams import (
+    redis_client, Streams, create_consumer_group, xreadgroup_batches, publish_batch_and_ack,
+    reclaim_idle, Signal, MgmtCommand, encode_message,
+)
+from services.common.signal_dedup import SignalDeduplicator, DUPLICATE, NEW
+from services.common.latency_trace import TraceContext, Hops
+from prefilter import MessageView, candidate_parsers, register_anchor
+from templates import load_templates
+from parse_cache import ParseCache
+from mgmt_parser import parse_management
+from near_dup import NearDuplicateIndex
 from parsers_base import SignalParser, ParseResult
 
 from parsers_goldbro_fast import GoldBroFastParser
@@ -11,8 +18,6 @@ from parsers_goldbro_long import GoldBroLongParser
 from parsers_goldbro_scalp import GoldBroScalpParser
 from parsers_torofx import ToroFxParser
 from parsers_daily_signal import DailySignalParser
-from parsers_hannah import HannahParser
-from parsers_tradepulse import TradePulseParser
 
 
 # Add container label to log format for Grafana filtering
@@ -26,154 +31,228 @@ log = logging.getLogger("router_parser")
 from services.common.config import FAST_UPDATE_WINDOW_SECONDS
 
 class SignalRouter:
-    def __init__(self, redis_client, dedup_ttl=120.0, channels_config=None):
-        from parsers_limitless import LimitlessParser
+    def __init__(self, redis_client, dedup_ttl=120.0, channels_config=None, parse_cache=None,
+                 dedup_local_size=4096, near_dup=None):
         self.parser_map = {
-            'hannah': HannahParser(),
             'goldbro_long': GoldBroLongParser(),
             'goldbro_fast': GoldBroFastParser(),
             'goldbro_scalp': GoldBroScalpParser(),
             'torofx': ToroFxParser(),
             'daily_signal': DailySignalParser(),
-            'limitless': LimitlessParser(),
-            'tradepulse': TradePulseParser(),
         }
+        # Proveedores declarativos (provider_templates/*.json + PARSER_TEMPLATES_DIR):
+        # Hannah, Limitless y TradePulse sólo existen como plantilla. Una plantilla con
+        # el nombre de un parser escrito a mano lo reemplaza (conserva su posición).
+        for name, parser in load_templates().items():
+            self.parser_map[name] = parser
+            if parser.anchor is not None:
+                register_anchor(name, parser.anchor)
         self.channels_config = channels_config or {}
-        self.deduplicator = SignalDeduplicator(redis_client, ttl_seconds=dedup_ttl)
+        self.deduplicator = SignalDeduplicator(redis_client, ttl_seconds=dedup_ttl, local_max_entries=dedup_local_size)
         self.fast_update_window = FAST_UPDATE_WINDOW_SECONDS
         self.redis = redis_client
+        self.parse_cache = parse_cache if parse_cache is not None else ParseCache()
+        self.near_dup = near_dup if near_dup is not None else NearDuplicateIndex(window_sec=dedup_ttl)
 
-    def parse_signal(self, text, chat_id=None):
-        norm = text.strip()
-        # --- 1. LIMITLESS si tiene 'Risk Price' ---
-        norm_lower = norm.lower()
-        if 'risk price' in norm_lower:
-            parser = self.parser_map['limitless']
-            try:
-                result = parser.parse(norm)
-                if result:
-                    if hasattr(result, 'entry_range') and result.entry_range is not None:
-                        try:
-                            entry_range = list(map(float, result.entry_range))
-                            result = result.__class__(**{**result.__dict__, 'entry_range': entry_range})
-                        except Exception as e:
-                            log.warning(f"[PARSE_ERROR] entry_range conversion: {e}")
-                            result = result.__class__(**{**result.__dict__, 'entry_range': None})
-                    # log.debug(f"[PARSE] {parser.format_tag} matched (LIMITLESS priority)")  # Reduce log noise
-                    return result
-            except Exception as e:
-                log.warning(f"[PARSE_ERROR] LimitlessParser: {e}")
+    def parse_signal(self, text, chat_id=None, view=None):
+        # Vista normalizada (casefold, palabras y frases clave) calculada una sola vez;
+        # route_raw ya la trae hecha. Sólo se prueban los parsers cuyo ancla aparece.
+        key = ParseCache.key(chat_id, view.text if view is not None else (text or "").strip())
+        hit, result = self.parse_cache.lookup(key)
+        if not hit:
+            result = self._parse_view(view or MessageView(text), chat_id)
+            self.parse_cache.store(key, result)
+        return result
+
+    def _try_parse(self, name, norm):
+        parser = self.parser_map[name]
+        try:
+            # Los parsers ya devuelven precios como float (entry_range = (min, max))
+            return parser.parse(norm)
+        except Exception as e:
+            log.warning(f"[PARSE_ERROR] {parser.__class__.__name__}: {e}")
             return None
+
+    def _parse_view(self, view, chat_id=None):
+        norm = view.text
+        # --- 1. LIMITLESS si tiene 'Risk Price' ---
+        if view.has('risk price'):
+            return self._try_parse('limitless', norm)
         # --- 2. TOROFX si tiene 'Target: open' ---
-        if 'target: open' in norm_lower:
-            parser = self.parser_map['torofx']
-            try:
-                result = parser.parse(norm)
-                if result:
-                    if hasattr(result, 'entry_range') and result.entry_range is not None:
-                        try:
-                            entry_range = list(map(float, result.entry_range))
-                            result = result.__class__(**{**result.__dict__, 'entry_range': entry_range})
-                        except Exception as e:
-                            log.warning(f"[PARSE_ERROR] entry_range conversion: {e}")
-                            result = result.__class__(**{**result.__dict__, 'entry_range': None})
-                    # log.debug(f"[PARSE] {parser.format_tag} matched (TOROFX priority)")  # Reduce log noise
-                    return result
-            except Exception as e:
-                log.warning(f"[PARSE_ERROR] ToroFxParser: {e}")
-            return None
+        if view.has('target: open'):
+            return self._try_parse('torofx', norm)
         # --- 3. HANNAH si hace match (prioridad absoluta sobre cualquier otro parser) ---
-        hannah_parser = self.parser_map['hannah']
-        try:
-            result = hannah_parser.parse(norm)
+        if candidate_parsers(view, ['hannah']):
+            result = self._try_parse('hannah', norm)
             if result:
-                # log.debug(f"[PARSE] {hannah_parser.format_tag} matched (HANNAH priority)")  # Reduce log noise
                 return result
-        except Exception as e:
-            log.warning(f"[PARSE_ERROR] HannahParser: {e}")
-        # --- 4. Normal routing ---
-        parsers = []
+        # --- 4. Normal routing (sólo candidatos del prefiltro) ---
+        parser_names = []
         if chat_id and str(chat_id) in self.channels_config:
-            parser_names = self.channels_config[str(chat_id)]
-            parsers = [self.parser_map[name] for name in parser_names if name in self.parser_map]
-        if not parsers:
-            parsers = list(self.parser_map.values())
-        for parser in parsers:
-            try:
-                result = parser.parse(norm)
-                if result:
-                    if hasattr(result, 'entry_range') and result.entry_range is not None:
-                        try:
-                            entry_range = list(map(float, result.entry_range))
-                            result = result.__class__(**{**result.__dict__, 'entry_range': entry_range})
-                        except Exception as e:
-                            log.warning(f"[PARSE_ERROR] entry_range conversion: {e}")
-                            result = result.__class__(**{**result.__dict__, 'entry_range': None})
-                    # log.debug(f"[PARSE] {parser.format_tag} matched")  # Reduce log noise
-                    return result
-            except Exception as e:
-                log.warning(f"[PARSE_ERROR] {parser.__class__.__name__}: {e}")
-                continue
-        # log.debug("[PARSE] no parser matched")  # Reduce log noise
+            parser_names = [name for name in self.channels_config[str(chat_id)] if name in self.parser_map]
+        if not parser_names:
+            parser_names = list(self.parser_map)
+        for name in candidate_parsers(view, parser_names):
+            result = self._try_parse(name, norm)
+            if result:
+                return result
         return None
 
-    async def process_raw_signal(self, chat_id, text):
-        parse_result = self.parse_signal(text, chat_id=chat_id)
+    async def process_raw_signal(self, chat_id, text, view=None, ref=None):
+        parse_result = self.parse_signal(text, chat_id=chat_id, view=view)
         if not parse_result:
             return None
 
-        # Si es señal completa, busca una FAST previa para actualizar
+        # Un round trip: marca FAST (o actualización de una FAST previa) + dedup.
+        # Las repeticiones inmediatas se descartan en el cache local sin tocar Redis.
+        outcome = await self.deduplicator.check(chat_id, parse_result, self.fast_update_window)
+        if outcome == DUPLICATE:
+            return None
+
+        # Señal tipada: entry_range/tps como listas de float, sl/hint_price como float
+        sig = Signal.from_parse_result(parse_result)
         if not parse_result.is_fast:
-            # Buscar señales FAST recientes para el mismo chat, símbolo y dirección
-            key_prefix = f"fast_sig:{chat_id}:{parse_result.symbol}:{parse_result.direction}"
-            fast_key = f"{key_prefix}"
-            fast_data = await self.redis.get(fast_key)
-            if fast_data:
-                # Hay una señal FAST previa, actualizarla
-                # log.info(f"[FAST-UPDATE] Actualizando señal FAST previa para {parse_result.symbol} {parse_result.direction}")  # Reduce log noise
-                await self.redis.delete(fast_key)
-                # No deduplicar, forzar update
-            elif await self.deduplicator.is_duplicate(chat_id, parse_result):
-                # log.info("[DEDUP] %s", parse_result.provider_tag)  # Reduce log noise
-                return None
-        else:
-            # Es señal FAST, guarda referencia para posible actualización
-            key_prefix = f"fast_sig:{chat_id}:{parse_result.symbol}:{parse_result.direction}"
-            await self.redis.setex(key_prefix, int(self.fast_update_window), "1")
-            if await self.deduplicator.is_duplicate(chat_id, parse_result):
-                # log.info("[DEDUP] %s", parse_result.provider_tag)  # Reduce log noise
-                return None
-
-        entry_range = json.dumps(parse_result.entry_range) if parse_result.entry_range else ""
-        tps = parse_result.tps or []
-
-        # Always ensure entry_range is a valid JSON array (never a string tuple)
-        if parse_result.entry_range is not None:
-            try:
-                entry_range = json.dumps(list(map(float, parse_result.entry_range)))
-            except Exception:
-                entry_range = json.dumps([])
-        else:
-            entry_range = json.dumps([])
-
-        return {
-            "symbol": parse_result.symbol,
-            "direction": parse_result.direction,
-            "entry_range": entry_range,
-            "sl": str(parse_result.sl) if parse_result.sl is not None else "",
-            "tps": json.dumps(tps),
-            "provider_tag": parse_result.provider_tag,
-            "format_tag": parse_result.format_tag,
-            "fast": "true" if parse_result.is_fast else "false",
-            "hint_price": str(parse_result.hint_price) if parse_result.hint_price else "",
-        }
+            # Re-publicación con precios casi iguales: se enlaza como actualización de la
+            # original (ref = su trace id). La que actualiza una FAST ya es una actualización.
+            original = self.near_dup.link(chat_id, parse_result, ref or self.deduplicator.signature(chat_id, parse_result))
+            if original and outcome == NEW:
+                log.info(f"[NEAR-DUP] chat={chat_id} {parse_result.symbol} {parse_result.direction} -> update_of={original}")
+                sig.update_of = original
+        return sig
+
+    def mgmt_command(self, chat_id, text, view, provider_hint, tctx):
+        """Gestión ya tipada (acción + parámetros): el orchestrator sólo despacha."""
+        typed = parse_management(view, provider_hint)
+        log.info(f"[MGMT] {provider_hint} {typed['action']}")
+        return MgmtCommand(
+            chat_id=chat_id, text=text, provider_hint=provider_hint,
+            tctx=tctx.mark(Hops.SIGNAL_XADD).to_field(), **typed,
+        )
+
+    async def route_raw(self, fields):
+        """
+        Clasifica un mensaje de raw_messages y devuelve (stream_destino, Signal | MgmtCommand)
+        o None si se descarta. No publica ni hace ACK: el worker acumula las salidas del lote,
+        las codifica (encode_message) y las envía en un solo pipeline.
+        """
+        text = fields.get("text", "")
+        chat_id = fields.get("chat_id", "")
+        # Continúa la traza creada por telegram_ingestor (o inicia una si el productor es antiguo)
+        tctx = TraceContext.from_fields_or_new(fields).mark(Hops.PARSER_RECEIVED)
+        # log.debug("[RAW] chat=%s text=%s", chat_id, (text or "").strip()[:200])  # Reduce log noise
+
+        # Una sola pasada de prefiltro; la reutilizan los filtros de gestión y parse_signal
+        view = MessageView(text)
+
+        # Si el texto parece gestión TOROFX (o contiene 'Target: open'), priorizar ese parser
+        if view.is_torofx_management():
+            sig = self.parser_map['torofx'].parse(text)
+            tctx.mark(Hops.PARSED)
+            if sig:
+                trace_id = tctx.trace_id
+                out = Signal.from_parse_result(
+                    sig, chat_id=chat_id, raw_text=text, trace=trace_id,
+                    tctx=tctx.mark(Hops.SIGNAL_XADD).to_field(),
+                )
+                log.info(f"[SIGNAL] trace={trace_id} TOROFX {out.direction} {out.symbol}")
+                return Streams.SIGNALS, out
+            # Si no parsea, lo manda como gestión
+            return Streams.MGMT, self.mgmt_command(chat_id, text, view, "TOROFX", tctx)
+
+        if view.is_followup():
+            return Streams.MGMT, self.mgmt_command(chat_id, text, view, "GOLD_BROTHERS", tctx)
+
+        sig = await self.process_raw_signal(chat_id, text, view=view, ref=tctx.trace_id)
+        tctx.mark(Hops.PARSED)
+        if sig:
+            trace_id = tctx.trace_id
+            sig.chat_id = chat_id
+            sig.raw_text = text
+            sig.trace = trace_id
+            sig.tctx = tctx.mark(Hops.SIGNAL_XADD).to_field()
+            log.info(f"[SIGNAL] trace={trace_id} {sig.provider_tag} {sig.direction} {sig.symbol}")
+            return Streams.SIGNALS, sig
+        # log.debug("[DROP] chat=%s parsed=None", chat_id)  # Reduce log noise
+        return None
 
-async def main():
+def worker_settings():
+    """
+    Parámetros de escalado horizontal (env / config DB):
+      ROUTER_WORKERS         número de procesos parser; también el número de particiones
+                             de raw_messages (telegram_ingestor debe usar el mismo valor).
+      ROUTER_CONSUMER_PREFIX prefijo de los nombres de consumer; deben ser estables entre
+                             reinicios para que cada worker recupere sus propios pendientes.
+      ROUTER_CLAIM_IDLE_MS   antigüedad mínima de un pendiente ajeno para reclamarlo (XAUTOCLAIM).
+      ROUTER_CLAIM_INTERVAL_SEC cada cuánto se revisan las particiones de los demás workers.
+    """
+    from services.common.config import config
+    return {
+        "workers": max(1, int(config.get("ROUTER_WORKERS", 1))),
+        "consumer_prefix": config.get("ROUTER_CONSUMER_PREFIX", "router"),
+        "claim_idle_ms": int(config.get("ROUTER_CLAIM_IDLE_MS", 60000)),
+        "claim_interval_sec": float(config.get("ROUTER_CLAIM_INTERVAL_SEC", 30)),
+    }
+
+
+async def route_and_ack(r, router, stream, group, batch):
+    """
+    Clasifica el lote completo (en orden de stream, así se preserva el orden por chat) y
+    luego un único pipeline publica todas las salidas y hace ACK de todas las entradas:
+    1 RTT por lote en vez de 2 por mensaje.
+    """
+    outputs = []
+    for msg_id, fields in batch:
+        try:
+            out = await router.route_raw(fields)
+        except Exception as e:
+            log.error(f"[ROUTE][EXCEPTION] id={msg_id} chat={fields.get('chat_id')} error={e}")
+            out = None
+        if out:
+            out_stream, msg = out
+            outputs.append((out_stream, encode_message(out_stream, msg)))
+    await publish_batch_and_ack(r, outputs, stream, group, [msg_id for msg_id, _ in batch])
+
+
+async def claim_foreign_partitions(r, router, streams, group, consumer, min_idle_ms):
+    """
+    Reclama (XAUTOCLAIM) y procesa los pendientes de las particiones de OTROS workers que
+    llevan más de min_idle_ms sin ACK. Cubre el caso en que el dueño de la partición no
+    vuelve (proceso relanzado en bucle, contenedor con menos workers): sin esto esas
+    entradas sólo las recuperaría el propio dueño. Con min_idle_ms mayor que el tiempo de
+    relanzado del supervisor, un worker que vuelve recupera sus pendientes antes que nadie.
+    Devuelve cuántas entradas se procesaron.
+    """
+    handled = 0
+    for other in streams:
+        try:
+            claimed = await reclaim_idle(r, other, group, consumer, min_idle_ms)
+        except Exception as e:
+            log.warning(f"[WORKER] {consumer}: XAUTOCLAIM en '{other}' falló: {e}")
+            continue
+        if claimed:
+            log.warning(f"[WORKER] {consumer}: {len(claimed)} pendientes de '{other}' sin dueño activo, procesando")
+            await route_and_ack(r, router, other, group, claimed)
+            handled += len(claimed)
+    return handled
+
+
+async def run_worker(index: int, workers: int):
+    """
+    Worker parser `index` de `workers`. Consume su partición de raw_messages con un
+    consumer estable ({prefix}-{index}): al reiniciar recupera sus pendientes y cada
+    ROUTER_CLAIM_IDLE_MS reclama los que dejó un worker caído (o el antiguo consumer_{pid}).
+    Todos los mensajes de un chat caen en la misma partición, así que el orden por chat
+    se mantiene aunque haya N workers. Cada ROUTER_CLAIM_INTERVAL_SEC revisa además las
+    particiones de los demás workers (claim_foreign_partitions): si un worker no vuelve,
+    sus pendientes quedan detenidos como mucho ROUTER_CLAIM_IDLE_MS + ese intervalo.
+    """
     import json
+    import asyncio
     from services.common.env_validator import validate_router_parser
     validate_router_parser()
 
-    from services.common.config import CHANNELS_CONFIG_JSON
+    from services.common.config import CHANNELS_CONFIG_JSON, config
+    ws = worker_settings()
     s = Settings.load()
     r = await redis_client(s["redis_url"])
     try:
@@ -181,99 +260,102 @@ async def main():
     except Exception as e:
         log.warning(f"CHANNELS_CONFIG_JSON parse error: {e}")
         channels_config = {}
-    router = SignalRouter(r, dedup_ttl=s["dedup_ttl_seconds"], channels_config=channels_config)
+    parse_cache = ParseCache(
+        max_entries=int(config.get("PARSE_CACHE_SIZE", 2048)),
+        ttl_sec=float(config.get("PARSE_CACHE_TTL_SEC", 300)),
+    )
+    router = SignalRouter(r, dedup_ttl=s["dedup_ttl_seconds"], channels_config=channels_config,
+                          parse_cache=parse_cache,
+                          dedup_local_size=int(config.get("DEDUP_LOCAL_CACHE_SIZE", 4096)),
+                          near_dup=NearDuplicateIndex(
+                              window_sec=float(config.get("NEAR_DUP_WINDOW_SEC", s["dedup_ttl_seconds"])),
+                              tol_bps=float(config.get("NEAR_DUP_TOLERANCE_BPS", 2.0)),
+                          ))
     group = "router_group"
-    consumer = f"consumer_{os.getpid()}"
+    stream = Streams.raw_partitions(workers)[index]
+    consumer = f"{ws['consumer_prefix']}-{index}"
+    await create_consumer_group(r, stream, group)
+    log.info(f"[WORKER] {consumer} consumiendo '{stream}' ({index + 1}/{workers})")
+
+    foreign = [other for other in Streams.raw_partitions(workers) if other != stream]
+
+    async def _claim_foreign_loop():
+        while True:
+            await asyncio.sleep(ws["claim_interval_sec"])
+            try:
+                await claim_foreign_partitions(r, router, foreign, group, consumer, ws["claim_idle_ms"])
+            except Exception as e:
+                log.error(f"[WORKER] {consumer}: error procesando pendientes ajenos: {e}")
+
+    claim_task = asyncio.create_task(_claim_foreign_loop()) if foreign else None
 
     # Bucle robusto: reintenta creación de grupo si ocurre NOGROUP
-    import asyncio
     while True:
         try:
-            async for msg_id, fields in xreadgroup_loop(r, Streams.RAW, group, consumer):
-                text = fields.get("text", "")
-                chat_id = fields.get("chat_id", "")
-                # log.debug("[RAW] chat=%s text=%s", chat_id, (text or "").strip()[:200])  # Reduce log noise
-
-                # Si el texto parece gestión TOROFX o contiene 'Stop Loss' y 'Target: open', priorizar ese parser
-                if looks_like_torofx_management(text) or ("stop loss" in text.lower() and "target: open" in text.lower()):
-                    sig = router.parser_map['torofx'].parse(text)
-                    if sig:
-                        trace_id = uuid.uuid4().hex[:8]
-                        sig_dict = {}
-                        # --- SERIALIZACIÓN ROBUSTA DE entry_range ---
-                        entry_range_val = sig.entry_range
-                        import json
-                        if entry_range_val is None:
-                            entry_range_json = json.dumps([])
-                        elif isinstance(entry_range_val, str):
-                            v_clean = entry_range_val.strip()
-                            if v_clean.startswith('(') and v_clean.endswith(')'):
-                                v_clean = v_clean[1:-1]
-                                parts = [float(x.strip()) for x in v_clean.split(',') if x.strip()]
-                                entry_range_json = json.dumps(parts)
-                            else:
-                                try:
-                                    val = json.loads(v_clean)
-                                    entry_range_json = json.dumps(val)
-                                except Exception:
-                                    entry_range_json = json.dumps([])
-                        elif isinstance(entry_range_val, (tuple, list)):
-                            entry_range_json = json.dumps(list(entry_range_val))
-                        else:
-                            entry_range_json = json.dumps([])
-                        for k, v in (sig.__dict__ if hasattr(sig, "__dict__") else sig).items():
-                            if k == "entry_range":
-                                sig_dict[k] = entry_range_json
-                            elif isinstance(v, bool):
-                                sig_dict[k] = str(v).lower()
-                            elif isinstance(v, (list, tuple)):
-                                sig_dict[k] = json.dumps(v)
-                            elif v is None:
-                                continue
-                            else:
-                                sig_dict[k] = v
-                        sig_dict["chat_id"] = chat_id
-                        sig_dict["raw_text"] = text
-                        sig_dict["trace"] = trace_id
-                        await xadd(r, Streams.SIGNALS, sig_dict)
-                        log.info(f"[SIGNAL] trace={trace_id} TOROFX {sig_dict.get('direction','')} {sig_dict.get('symbol','')}")
-                        await xack(r, Streams.RAW, group, msg_id)
-                        continue
-                    # Si no parsea, lo manda como gestión
-                    await xadd(r, Streams.MGMT, {"chat_id": chat_id, "text": text, "provider_hint": "TOROFX"})
-                    log.info("[MGMT] TOROFX")
-                    await xack(r, Streams.RAW, group, msg_id)
-                    continue
-
-                if looks_like_followup(text):
-                    await xadd(r, Streams.MGMT, {"chat_id": chat_id, "text": text, "provider_hint": "GOLD_BROTHERS"})
-                    log.info("[MGMT] GB follow-up")
-                    await xack(r, Streams.RAW, group, msg_id)
-                    continue
-
-                try:
-                    sig = await router.process_raw_signal(chat_id, text)
-                    if sig:
-                        trace_id = uuid.uuid4().hex[:8]
-                        sig["chat_id"] = chat_id
-                        sig["raw_text"] = text
-                        sig["trace"] = trace_id
-                        await xadd(r, Streams.SIGNALS, sig)
-                        log.info(f"[SIGNAL] trace={trace_id} {sig['provider_tag']} {sig['direction']} {sig['symbol']}")
-                    else:
-                        pass  # log.debug("[DROP] chat=%s parsed=None", chat_id)  # Reduce log noise
-                finally:
-                    await xack(r, Streams.RAW, group, msg_id)
+            async for batch in xreadgroup_batches(r, stream, group, consumer, claim_idle_ms=ws["claim_idle_ms"]):
+                await route_and_ack(r, router, stream, group, batch)
         except Exception as e:
             if "NOGROUP" in str(e):
                 log.warning("[REDIS] NOGROUP detectado, reintentando creación de grupo...")
-                await create_consumer_group(r, Streams.RAW, group)
+                await create_consumer_group(r, stream, group)
                 await asyncio.sleep(1)
                 continue
             else:
                 log.error(f"[FATAL] Error inesperado en bucle de consumo: {e}")
+                if claim_task:
+                    claim_task.cancel()
                 raise
 
-if __name__ == "__main__":
+
+def _worker_entry(index: int, workers: int):
     import asyncio
-    asyncio.run(main())
+    asyncio.run(run_worker(index, workers))
+
+
+def main():
+    """
+    Con ROUTER_WORKERS=1 corre un único worker en este proceso (stream raw_messages).
+    Con N > 1 lanza N procesos (uno por partición) y los relanza si mueren; los
+    pendientes que deja un worker caído los recupera su reemplazo al arrancar.
+    """
+    import signal
+    import time
+    import multiprocessing as mp
+
+    workers = worker_settings()["workers"]
+    if workers == 1:
+        _worker_entry(0, 1)
+        return
+
+    ctx = mp.get_context("spawn")
+    procs = {}
+
+    def _start(i):
+        p = ctx.Process(target=_worker_entry, args=(i, workers), name=f"router-worker-{i}", daemon=True)
+        p.start()
+        procs[i] = p
+        log.info(f"[SUPERVISOR] worker {i} iniciado pid={p.pid}")
+
+    stopping = False
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    for i in range(workers):
+        _start(i)
+    while not stopping:
+        time.sleep(1)
+        for i, p in list(procs.items()):
+            if not p.is_alive() and not stopping:
+                log.error(f"[SUPERVISOR] worker {i} terminó (exitcode={p.exitcode}), relanzando")
+                _start(i)
+    for p in procs.values():
+        p.terminate()
+    for p in procs.values():
+        p.join(timeout=5)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+bench_parsers.py
+Benchmark de throughput de los parsers y del ruteo completo (SignalRouter.parse_signal).
+
+Uso (desde la raíz del repo):
+    python -m services.router_parser.benchmarks.bench_parsers
+    python -m services.router_parser.benchmarks.bench_parsers --update-baseline
+    python -m services.router_parser.benchmarks.bench_parsers --max-regression 0.15 --json
+
+Carga corpus: corpus_v<N>.json (versionado) trae mensajes con formato real por proveedor,
+el canal de cada proveedor y semillas de ruido. El ruido se expande de forma
+determinista (noise_set) a --noise-size mensajes: es la mayor parte del tráfico real.
+
+Por cada parser se mide su proveedor + todo el ruido; "router" mide parse_signal
+sobre todos los proveedores (con su chat_id y CHANNELS_CONFIG del corpus) + ruido, con
+el cache de parseo apagado; "router_cached" lo mide con el cache encendido.
+
+Los msgs/s dependen de la máquina: se normalizan contra una carga de calibración fija
+corrida justo antes de cada ronda (score = msgs/s / calibración, mediana de las
+rondas) y eso es lo que se compara con baseline.json. El proceso
+sale con código 1 si el corpus deja de parsear como se espera o si algún score cae más
+de --max-regression respecto del baseline.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_ROUTER_DIR = os.path.dirname(_HERE)
+_ROOT = os.path.dirname(os.path.dirname(_ROUTER_DIR))
+for _p in (_ROOT, _ROUTER_DIR):
+    if _p not in sys.path:
+        sys.path.insert(0, _p)
+
+DEFAULT_CORPUS = os.path.join(_HERE, "corpus_v1.json")
+DEFAULT_BASELINE = os.path.join(_HERE, "baseline.json")
+DEFAULT_MAX_REGRESSION = 0.25
+
+_NOISE_PREFIXES = ["", "", "", "📢 ", "🔥 ", "👉 ", "Equipo: ", "UPDATE: ", ">> "]
+_NOISE_SUFFIXES = ["", "", "", " 🚀", " ✅", " !!", " 💰💰", " #gold", " (ver canal)"]
+
+_CALIB_RE = re.compile(r"\b(alpha|beta|gamma)\s*[:=]\s*(\d+(?:\.\d+)?)", re.IGNORECASE)
+_CALIB_TEXT = "Calibration ALPHA: 1234.5 beta=42 and some filler words to scan " * 4
+
+
+def load_corpus(path: str = DEFAULT_CORPUS) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def channels_config(corpus: dict) -> Dict[str, List[str]]:
+    return {p["chat_id"]: list(p["parsers"]) for p in corpus["providers"].values()}
+
+
+def noise_set(seeds: Sequence[str], size: int = 2000, seed: int = 1234) -> List[str]:
+    """Expande las semillas de ruido a `size` mensajes distintos (determinista)."""
+    rnd = random.Random(seed)
+    out = []
+    for i in range(size):
+        base = seeds[i % len(seeds)]
+        variant = rnd.randrange(3)
+        if variant == 1:
+            base = base.upper()
+        elif variant == 2:
+            base = base.lower()
+        out.append(f"{rnd.choice(_NOISE_PREFIXES)}{base}{rnd.choice(_NOISE_SUFFIXES)} #{i}")
+    return out
+
+
+def build_router(corpus: dict, cache_size: int = 0):
+    """SignalRouter con el CHANNELS_CONFIG del corpus. No toca Redis (sólo parse_signal)."""
+    logging.getLogger("router_parser").setLevel(logging.ERROR)
+    # Por ruta de paquete: un `app` suelto puede ser el de otro servicio ya importado
+    from services.router_parser.app import SignalRouter
+    from parse_cache import ParseCache
+    return SignalRouter(None, channels_config=channels_config(corpus),
+                        parse_cache=ParseCache(max_entries=cache_size))
+
+
+def verify_corpus(router, corpus: dict, noise: Sequence[str]) -> List[str]:
+    """Errores de corpus: proveedor que no da su format_tag o ruido que parsea como señal."""
+    errors = []
+    for name, provider in corpus["providers"].items():
+        for msg in provider["messages"]:
+            result = router.parse_signal(msg["text"], chat_id=provider["chat_id"])
+            got = result.format_tag if result else None
+            if got != msg["format_tag"]:
+                errors.append(f"{name}: esperado {msg['format_tag']}, obtenido {got} -> {msg['text'][:60]!r}")
+    chats = [None] + [p["chat_id"] for p in corpus["providers"].values()]
+    for text in noise:
+        for chat_id in chats:
+            result = router.parse_signal(text, chat_id=chat_id)
+            if result:
+                errors.append(f"ruido parseado como {result.format_tag} (chat={chat_id}): {text[:60]!r}")
+                break
+    return errors
+
+
+def _percentile(sorted_values: List[int], pct: float) -> int:
+    if not sorted_values:
+        return 0
+    idx = min(len(sorted_values) - 1, int(round(pct * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def calibrate(iterations: int = 2000) -> float:
+    """Operaciones/s de una carga fija regex + strings (referencia de velocidad de la máquina)."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        _CALIB_RE.findall(_CALIB_TEXT.lower())
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed if elapsed > 0 else 0.0
+
+
+def measure(fn: Callable[[str, Optional[str]], object], workload: Sequence[tuple], rounds: int = 5) -> dict:
+    """
+    Corre fn(text, chat_id) sobre el workload `rounds` veces. Cada ronda va precedida de
+    una calibración corta y su score es msgs/s / calibración de ese momento: así una
+    máquina compartida (CPU steal, frecuencia variable) afecta a ambos por igual. Se
+    reporta la mediana por ronda; la latencia por mensaje usa todas las muestras.
+    """
+    samples: List[int] = []
+    clock = time.perf_counter_ns
+    rates, scores = [], []
+    for _ in range(max(1, rounds)):
+        calib = calibrate()
+        round_start = clock()
+        for text, chat_id in workload:
+            t0 = clock()
+            fn(text, chat_id)
+            samples.append(clock() - t0)
+        elapsed = (clock() - round_start) / 1e9
+        rate = len(workload) / elapsed if elapsed > 0 else 0.0
+        rates.append(rate)
+        scores.append(rate / calib if calib else 0.0)
+    samples.sort()
+    return {
+        "messages": len(samples),
+        "msgs_per_sec": statistics.median(rates),
+        "p50_us": _percentile(samples, 0.50) / 1000.0,
+        "p99_us": _percentile(samples, 0.99) / 1000.0,
+        "score": statistics.median(scores),
+    }
+
+
+def run_benchmark(corpus: dict, noise_size: int = 2000, rounds: int = 5) -> dict:
+    noise = noise_set(corpus["noise"], size=noise_size)
+    router = build_router(corpus)
+    errors = verify_corpus(router, corpus, noise)
+
+    noise_load = [(text, None) for text in noise]
+    results: Dict[str, dict] = {}
+    for name, provider in corpus["providers"].items():
+        for parser_name in provider["parsers"]:
+            parser = router.parser_map[parser_name]
+            load = [(m["text"], None) for m in provider["messages"]] + noise_load
+            results[parser_name] = measure(lambda text, _chat, p=parser: p.parse(text), load, rounds)
+
+    routed = [
+        (m["text"], p["chat_id"]) for p in corpus["providers"].values() for m in p["messages"]
+    ] + noise_load
+    results["router"] = measure(lambda text, chat_id: router.parse_signal(text, chat_id=chat_id), routed, rounds)
+    cached = build_router(corpus, cache_size=4 * len(routed))
+    results["router_cached"] = measure(lambda text, chat_id: cached.parse_signal(text, chat_id=chat_id), routed, rounds)
+
+    return {
+        "corpus_version": corpus.get("version"),
+        "noise_size": noise_size,
+        "calibration_ops_per_sec": calibrate(),
+        "results": results,
+        "errors": errors,
+    }
+
+
+def compare(report: dict, baseline: dict, max_regression: float = DEFAULT_MAX_REGRESSION) -> List[str]:
+    """Entradas cuyo score cayó más de max_regression (fracción) respecto del baseline."""
+    regressions = []
+    if baseline.get("corpus_version") != report.get("corpus_version"):
+        return [f"baseline de corpus v{baseline.get('corpus_version')}, corpus actual v{report.get('corpus_version')}: regenerar con --update-baseline"]
+    for name, base in baseline.get("scores", {}).items():
+        current = report["results"].get(name)
+        if current is None:
+            continue
+        floor = base * (1.0 - max_regression)
+        if current["score"] < floor:
+            drop = 1.0 - current["score"] / base if base else 0.0
+            regressions.append(f"{name}: score {current['score']:.4f} < {floor:.4f} (-{drop:.0%} vs baseline {base:.4f})")
+    return regressions
+
+
+def baseline_from(report: dict) -> dict:
+    return {
+        "corpus_version": report["corpus_version"],
+        "noise_size": report["noise_size"],
+        "scores": {name: round(r["score"], 6) for name, r in report["results"].items()},
+    }
+
+
+def _print_table(report: dict) -> None:
+    print(f"corpus v{report['corpus_version']}  ruido={report['noise_size']}  "
+          f"calibración={report['calibration_ops_per_sec']:.0f} ops/s")
+    print(f"{'target':<16}{'msgs/s':>12}{'p50 us':>10}{'p99 us':>10}{'score':>10}")
+    for name, r in report["results"].items():
+        print(f"{name:<16}{r['msgs_per_sec']:>12.0f}{r['p50_us']:>10.1f}{r['p99_us']:>10.1f}{r['score']:>10.4f}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark de parsers de router_parser")
+    ap.add_argument("--corpus", default=DEFAULT_CORPUS)
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE)
+    ap.add_argument("--max-regression", type=float, default=DEFAULT_MAX_REGRESSION,
+                    help="caída máxima de score tolerada (fracción, default 0.25)")
+    ap.add_argument("--noise-size", type=int, default=2000)
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--update-baseline", action="store_true")
+    ap.add_argument("--json", action="store_true", help="imprime el reporte completo en JSON")
+    args = ap.parse_args(argv)
+
+    report = run_benchmark(load_corpus(args.corpus), noise_size=args.noise_size, rounds=args.rounds)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        _print_table(report)
+
+    if report["errors"]:
+        print("\nCORPUS FALLIDO:")
+        for e in report["errors"]:
+            print(f"  {e}")
+        return 1
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline_from(report), f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline actualizado: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nSin baseline en {args.baseline}; generarlo con --update-baseline")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(report, json.load(f), args.max_regression)
+    if regressions:
+        print("\nREGRESIÓN DE THROUGHPUT:")
+        for r in regressions:
+            print(f"  {r}")
+        return 1
+    print("\nOK: sin regresiones respecto del baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
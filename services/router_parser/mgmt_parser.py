@@ -0,0 +1,118 @@
+"""
+mgmt_parser.py
+Mensajes de gestión -> comando tipado (MgmtAction + parámetros + scope).
+
+Problema previo: route_raw publicaba el texto crudo en mgmt_messages y el orchestrator
+(TradeManager.handle_torofx_management_message / handle_hannah_management_message)
+volvía a hacer upper(), búsquedas de palabras clave y re.findall de porcentajes, pips y
+precios dentro del loop sensible a latencia.
+
+Solucion: el texto se clasifica una sola vez aquí, sobre la MessageView que route_raw
+ya construyó, con las mismas reglas que esos handlers. El orchestrator recibe
+action/percent/pips/price/keep/scope y despacha en O(1) (TradeManager.apply_mgmt_command).
+Los valores por defecto que dependen de la configuración del orchestrator (porcentaje y
+pips mínimos de TOROFX) quedan en None y los completa el orchestrator.
+"""
+import re
+from typing import Any, Dict, Optional
+
+from services.common.redis_streams import MgmtAction
+from prefilter import MessageView
+
+_PCT_RE = re.compile(r"(\d{1,3})\s*%")
+_PIPS_RE = re.compile(r"\+(\d{1,4})(?:\s*/\s*(\d{1,4}))?")
+# Precios de entrada TOROFX (oro: 4xxx)
+_PRICE_RE = re.compile(r"\b(4\d{3}(?:\.\d+)?)\b")
+
+# Palabras clave en casefold (mismas listas que los handlers de TradeManager)
+_TOROFX_CLOSE = ("cerrando", "cerrar", "cierro", "cerrad", "cerraré")
+_TOROFX_PARTIAL = ("parcial", "partial", "recoger", "coger")
+_TOROFX_BE = ("breakeven", "break even", "break-even", "quitando el riesgo", "sin riesgo", "risk off", "asegurando")
+
+_HANNAH_CLOSE_ALL = ("close all", "price spiked")
+_HANNAH_CLOSE_HALF = ("close half", "half guys", "half now", "half only")
+_HANNAH_PARTIAL = ("secure", "half", "profits", "colect", "collect", "cierra", "cierre", "parcial")
+_HANNAH_BE = ("breakeven", "break even", "break-even", "be", "risk free", "riskless", "sin riesgo")
+
+
+def _contains(folded: str, keywords) -> bool:
+    for k in keywords:
+        if k in folded:
+            return True
+    return False
+
+
+def _percent(text: str) -> Optional[int]:
+    m = _PCT_RE.search(text)
+    return max(1, min(100, int(m.group(1)))) if m else None
+
+
+def parse_torofx(view: MessageView) -> Dict[str, Any]:
+    """
+    Reglas TOROFX (una acción por mensaje, en este orden):
+    - "cerrando mi entrada de 4330 y dejando 4325" -> CLOSE_ENTRY price=4330 keep=4325
+    - "Asegurando profits... quitando riesgo"      -> BE
+    - "Cerrando el 50% ... +30" / "parcial +50/60" -> PARTIAL percent/pips (None = default)
+    """
+    text, folded = view.text, view.folded
+    has_close = _contains(folded, _TOROFX_CLOSE)
+    has_partial = _contains(folded, _TOROFX_PARTIAL)
+    pct = _percent(text)
+
+    if "entrada" in folded and has_close:
+        prices = [float(x) for x in _PRICE_RE.findall(text)]
+        if prices:
+            return {
+                "action": MgmtAction.CLOSE_ENTRY,
+                "price": prices[0],
+                "keep": prices[1] if len(prices) >= 2 else None,
+            }
+    if _contains(folded, _TOROFX_BE) and not has_partial:
+        return {"action": MgmtAction.BE}
+    if has_partial or (has_close and pct is not None):
+        pips = None
+        m = _PIPS_RE.search(text)
+        if m:
+            # "+50/60": el menor es el umbral
+            pips = float(m.group(1))
+            if m.group(2):
+                pips = min(pips, float(m.group(2)))
+        return {"action": MgmtAction.PARTIAL, "percent": pct, "pips": pips}
+    return {"action": MgmtAction.NONE}
+
+
+def parse_hannah(view: MessageView) -> Dict[str, Any]:
+    """
+    Reglas Hannah (también para el seguimiento de Gold Brothers):
+    - "CLOSE ALL" / "price spiked"                       -> CLOSE_ALL
+    - "close half" / "half now" ...                      -> PARTIAL 50%
+    - "Secure half your profits & set breakeven" (+ N%)  -> PARTIAL_BE (50% por defecto)
+    """
+    folded = view.folded
+    if _contains(folded, _HANNAH_CLOSE_ALL):
+        return {"action": MgmtAction.CLOSE_ALL}
+    if _contains(folded, _HANNAH_CLOSE_HALF):
+        return {"action": MgmtAction.PARTIAL, "percent": 50}
+    if _contains(folded, _HANNAH_PARTIAL) and _contains(folded, _HANNAH_BE):
+        return {"action": MgmtAction.PARTIAL_BE, "percent": _percent(view.text) or 50}
+    return {"action": MgmtAction.NONE}
+
+
+# provider_hint -> (reglas, scope: provider_tag de los trades afectados)
+PROVIDER_RULES = {
+    "TOROFX": (parse_torofx, "TOROFX"),
+    "HANNAH": (parse_hannah, "HANNAH"),
+    # El seguimiento de Gold Brothers siempre se aplicó con las reglas y el scope de Hannah
+    "GOLD_BROTHERS": (parse_hannah, "HANNAH"),
+}
+
+
+def parse_management(view: MessageView, provider_hint: str) -> Dict[str, Any]:
+    """Campos tipados de MgmtCommand (action, scope, percent, pips, price, keep) para el mensaje."""
+    rules = PROVIDER_RULES.get(provider_hint)
+    if rules is None:
+        return {"action": MgmtAction.NONE, "scope": provider_hint}
+    parse, scope = rules
+    out = parse(view)
+    out["scope"] = scope
+    return out
@@ -0,0 +1,114 @@
+"""
+near_dup.py
+Índice de señales casi duplicadas por (chat, símbolo, dirección) con tolerancia de precio.
+
+Problema previo: SignalDeduplicator firma con md5 los valores exactos de SL, TPs,
+entrada y hint. Un proveedor que re-publica la señal con SL 4454.0 en vez de 4454, o
+con un TP corrido 0.1, genera una firma nueva y el orchestrator vuelve a abrir en
+todas las cuentas: órdenes duplicadas, llamadas al bridge y margen.
+
+Solucion: cada señal completa que pasa el dedup exacto se registra en un índice por
+(chat, símbolo, dirección) dividido en buckets de `window_sec`. Una señal nueva se
+compara sólo contra los buckets actual y anterior de su clave; si entrada, SL y los TPs
+en común están dentro de la tolerancia, es la misma señal y se publica como
+actualización (Signal.update_of = referencia de la original): el orchestrator ajusta
+SL/TPs de los trades abiertos y no abre nada.
+
+La tolerancia es relativa al precio (tol_bps, puntos básicos) para servir igual a oro
+y a FX. El índice vive en el worker: todos los mensajes de un chat caen en la misma
+partición (raw_partition), así que ningún otro worker ve ese chat.
+"""
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# (ts, entry_range, sl, tps, ref)
+_Entry = Tuple[float, Optional[Tuple[float, ...]], Optional[float], Tuple[float, ...], str]
+
+
+def _close(a: Optional[float], b: Optional[float], tol_bps: float) -> bool:
+    if a is None or b is None:
+        return a is None and b is None
+    return abs(a - b) <= max(abs(a), abs(b)) * tol_bps / 10000.0
+
+
+def _close_all(a: Optional[Sequence[float]], b: Optional[Sequence[float]], tol_bps: float) -> bool:
+    if not a or not b:
+        return not a and not b
+    return len(a) == len(b) and all(_close(x, y, tol_bps) for x, y in zip(a, b))
+
+
+class NearDuplicateIndex:
+    def __init__(self, window_sec: float = 120.0, tol_bps: float = 2.0, max_per_key: int = 16):
+        """
+        Args:
+            window_sec: ancho del bucket; una señal se compara con las de los últimos
+                        1-2 buckets de su clave (0 desactiva el índice)
+            tol_bps: tolerancia de precio en puntos básicos (2 = 0.02%: ~0.9 en oro a 4450)
+            max_per_key: señales recordadas por bucket y clave
+        """
+        self.window_sec = float(window_sec)
+        self.tol_bps = float(tol_bps)
+        self.max_per_key = max(1, int(max_per_key))
+        self._buckets: Dict[Tuple[str, str, str], Dict[int, List[_Entry]]] = {}
+        self.linked = 0
+        self._pruned_bucket = 0
+
+    def _matches(self, entry: _Entry, entry_range, sl, tps) -> bool:
+        _, e_range, e_sl, e_tps, _ = entry
+        if not _close_all(e_range, entry_range, self.tol_bps) or not _close(e_sl, sl, self.tol_bps):
+            return False
+        # TPs: se comparan los que tienen en común (una re-publicación suele agregar o quitar el último)
+        common = min(len(e_tps), len(tps))
+        return _close_all(e_tps[:common], tps[:common], self.tol_bps)
+
+    def link(self, chat_id, parse_result, ref: str, now: Optional[float] = None) -> Optional[str]:
+        """
+        Registra la señal y devuelve la referencia de la señal original si es una casi
+        duplicada (dentro de la ventana y la tolerancia), o None si es nueva.
+        """
+        if self.window_sec <= 0:
+            return None
+        now = time.time() if now is None else now
+        key = (str(chat_id or ""), str(parse_result.symbol), str(parse_result.direction))
+        entry_range = tuple(float(x) for x in parse_result.entry_range) if parse_result.entry_range else None
+        sl = float(parse_result.sl) if parse_result.sl is not None else None
+        tps = tuple(float(x) for x in parse_result.tps or ())
+
+        bucket = int(now // self.window_sec)
+        if bucket != self._pruned_bucket:
+            self.prune(now)
+        buckets = self._buckets.setdefault(key, {})
+
+        original = None
+        for b in (bucket, bucket - 1):
+            for i, entry in enumerate(buckets.get(b, ())):
+                if now - entry[0] <= self.window_sec and self._matches(entry, entry_range, sl, tps):
+                    original = entry[4]
+                    # Se recuerda la última versión (la próxima re-publicación se compara con ésta)
+                    del buckets[b][i]
+                    break
+            if original is not None:
+                break
+
+        current = buckets.setdefault(bucket, [])
+        current.append((now, entry_range, sl, tps, original or ref))
+        del current[:-self.max_per_key]
+        if original is not None:
+            self.linked += 1
+        return original
+
+    def prune(self, now: Optional[float] = None) -> None:
+        """Descarta buckets vencidos y claves vacías (corre al cambiar de bucket: memoria acotada a chats activos)."""
+        if self.window_sec <= 0:
+            return
+        bucket = int((time.time() if now is None else now) // self.window_sec)
+        self._pruned_bucket = bucket
+        for key in list(self._buckets):
+            buckets = self._buckets[key]
+            for old in [b for b in buckets if b < bucket - 1]:
+                del buckets[old]
+            if not buckets:
+                del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
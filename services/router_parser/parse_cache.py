@@ -0,0 +1,59 @@
+"""
+parse_cache.py
+Memoización de parse_signal por (chat_id, hash del texto).
+
+Problema previo: los proveedores reenvían o re-publican textos idénticos (y los
+mismos mensajes de charla) y cada copia volvía a recorrer la cadena de parsers.
+
+Solucion: cache LRU acotado (PARSE_CACHE_SIZE) con TTL (PARSE_CACHE_TTL_SEC). Guarda
+también los resultados negativos (None), que son la mayoría del tráfico. Es seguro
+compartir el resultado: ParseResult es inmutable y parse_signal es determinista para
+un mismo texto, canal y configuración. La deduplicación sigue corriendo después, así
+que una señal repetida se descarta igual que antes.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class ParseCache:
+    def __init__(self, max_entries: int = 2048, ttl_sec: float = 300.0):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_sec = float(ttl_sec)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(chat_id, text: str) -> Tuple[str, bytes]:
+        digest = hashlib.blake2b((text or "").encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        return (str(chat_id or ""), digest)
+
+    def lookup(self, key, now: Optional[float] = None) -> Tuple[bool, Any]:
+        """(True, resultado) si hay entrada vigente (el resultado puede ser None); si no (False, None)."""
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return False, None
+        expires, value = entry
+        if (time.monotonic() if now is None else now) >= expires:
+            del self._entries[key]
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, value
+
+    def store(self, key, value, now: Optional[float] = None) -> None:
+        if not self.max_entries:
+            return
+        self._entries[key] = ((time.monotonic() if now is None else now) + self.ttl_sec, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
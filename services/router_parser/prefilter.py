@@ -0,0 +1,209 @@
+"""
+prefilter.py
+Prefiltro de palabras clave para SignalRouter.
+
+Problema previo: parse_signal probaba HannahParser y después recorría hasta 8 parsers,
+cada uno con varias regex sobre el texto completo; antes, route_raw ya había pasado
+el texto por looks_like_torofx_management y looks_like_followup (upper() + búsquedas
+de subcadenas). Un mensaje de ruido (charla del canal) recorría todos los parsers.
+
+Solucion:
+  - MessageView se construye una vez por mensaje: texto en casefold, conjunto de
+    palabras (misma noción de palabra que \\b en las regex de los parsers) y las frases
+    clave encontradas por un único regex combinado (alternancia con lookahead, así
+    detecta frases solapadas como "cerrando" dentro de "cerrando el riesgo").
+  - Cada parser declara en PARSER_ANCHORS una condición NECESARIA para devolver algo
+    (p.ej. TradePulse necesita "signal alert" o símbolo + BUY/SELL + NOW). Sólo se
+    prueban los parsers cuyo ancla se cumple; un parser sin ancla se prueba siempre.
+  - is_torofx_management() / is_followup() reproducen los filtros de gestión
+    (torofx_filters / gb_filters) sobre la misma vista.
+
+Las anclas son deliberadamente más laxas que el parser: si se cumple, el parser puede
+igual devolver None; si no se cumple, el parser nunca habría reconocido el mensaje.
+Al cambiar las regex de un parser hay que revisar su ancla (tests/test_prefilter.py).
+"""
+import re
+from typing import Callable, Dict, FrozenSet, Iterable, List
+
+# Palabras: \w+ sobre el texto en casefold (equivale a \bPALABRA\b con IGNORECASE)
+_WORD_RE = re.compile(r"\w+")
+
+# Frases con semántica de subcadena (como los filtros de gestión y las prioridades
+# de parse_signal). Nombre -> patrón (sobre casefold).
+PHRASES: Dict[str, str] = {
+    # Prioridades de parse_signal / gestión TOROFX
+    "risk price": re.escape("risk price"),
+    "target: open": re.escape("target: open"),
+    "stop loss": re.escape("stop loss"),
+    "asegurando": "asegurando",
+    "quitando el riesgo": re.escape("quitando el riesgo"),
+    "tomar parcial": re.escape("tomar parcial"),
+    "tomando parcial": re.escape("tomando parcial"),
+    "cierro mi entrada": re.escape("cierro mi entrada"),
+    "cerrando el riesgo": re.escape("cerrando el riesgo"),
+    # Seguimiento Gold Brothers (gb_filters.FOLLOWUP_KEYWORDS)
+    "ganancias": "ganancias",
+    "profits": "profits",
+    "breakeven": "breakeven",
+    "break even": re.escape("break even"),
+    "punto de equilibrio": re.escape("punto de equilibrio"),
+    "cierra": "cierra",
+    "cerrar": "cerrar",
+    "cerrando": "cerrando",
+    "risk off": re.escape("risk off"),
+    "corriendo": "corriendo",
+    "pips desde": re.escape("pips desde"),
+    "recoger": "recoger",
+    "scalpers": "scalpers",
+    "mantener": "mantener",
+    "capas": "capas",
+    "sl": "sl",
+    "stop": "stop",
+    "@": "@",
+    # Anclas de parsers
+    "gold buy now": re.escape("gold buy now"),
+    "gold sell now": re.escape("gold sell now"),
+    "signal alert": r"signal\s+alert",
+    "zone": "zone",
+}
+
+TOROFX_MGMT = frozenset({
+    "asegurando", "quitando el riesgo", "tomar parcial", "tomando parcial",
+    "cierro mi entrada", "cerrando el riesgo",
+})
+FOLLOWUP = frozenset({
+    "ganancias", "profits", "breakeven", "break even", "punto de equilibrio",
+    "cierra", "cerrar", "cerrando", "asegurando", "risk off", "quitando el riesgo",
+    "corriendo", "pips desde", "recoger", "scalpers", "mantener", "capas",
+})
+
+
+def _build_phrase_regex(phrases: Dict[str, str]):
+    # Más largas primero: en una misma posición gana la primera alternativa, y las
+    # frases literales que son prefijo de la ganadora se agregan vía _IMPLIED.
+    # Un solo grupo de captura (uno por frase es ~20x más lento) y un lookahead de
+    # primer carácter para descartar rápido las posiciones que no inician ninguna frase.
+    names = sorted(phrases, key=len, reverse=True)
+    first = "".join(sorted({re.escape(name[0]) for name in names}))
+    alternation = "|".join(phrases[name] for name in names)
+    return re.compile(f"(?=[{first}])(?=({alternation}))")
+
+
+_PHRASE_RE = _build_phrase_regex(PHRASES)
+_IMPLIED: Dict[str, FrozenSet[str]] = {
+    name: frozenset(other for other in PHRASES if other != name and name.startswith(other))
+    for name in PHRASES
+}
+
+
+def _phrase_name(matched: str) -> str:
+    # Las frases con \s+ ("signal alert") se nombran con espacios simples
+    return matched if matched in PHRASES else " ".join(matched.split())
+
+
+class MessageView:
+    """Vista normalizada de un mensaje: se calcula una vez y la consultan todos los filtros."""
+
+    __slots__ = ("text", "folded", "words", "phrases")
+
+    def __init__(self, text: str):
+        self.text = (text or "").strip()
+        self.folded = self.text.casefold()
+        self.words: FrozenSet[str] = frozenset(_WORD_RE.findall(self.folded))
+        found = set()
+        for m in _PHRASE_RE.finditer(self.folded):
+            name = _phrase_name(m.group(1))
+            found.add(name)
+            found.update(_IMPLIED[name])
+        self.phrases: FrozenSet[str] = frozenset(found)
+
+    def any_word(self, words: Iterable[str]) -> bool:
+        return not self.words.isdisjoint(words)
+
+    def has(self, phrase: str) -> bool:
+        return phrase in self.phrases
+
+    def is_torofx_management(self) -> bool:
+        """Equivalente a torofx_filters.looks_like_torofx_management (+ 'stop loss' y 'target: open')."""
+        return "target: open" in self.phrases or not self.phrases.isdisjoint(TOROFX_MGMT)
+
+    def is_followup(self) -> bool:
+        """Equivalente a gb_filters.looks_like_followup: palabra de seguimiento sin @ + SL."""
+        if self.phrases.isdisjoint(FOLLOWUP):
+            return False
+        has_entry = "@" in self.phrases
+        has_sl = "sl" in self.phrases or "stop" in self.phrases
+        return not (has_entry and has_sl)
+
+
+# --- Anclas por parser (condiciones necesarias) ---
+
+_DIR_EN = frozenset({"buy", "sell"})
+_GOLD = frozenset({"gold", "xau", "xauusd"})
+
+
+def _hannah(v: MessageView) -> bool:
+    # La primera línea debe empezar con GOLD BUY NOW / GOLD SELL NOW
+    return v.has("gold buy now") or v.has("gold sell now")
+
+
+def _goldbro_long(v: MessageView) -> bool:
+    return v.any_word(_GOLD | {"oro"}) and v.any_word({"buy", "compra", "comprar", "sell", "venta", "vender", "vende"})
+
+
+def _goldbro_fast(v: MessageView) -> bool:
+    directions = {
+        "compra", "comprar", "compren", "buy", "long", "entrada",
+        "vende", "vender", "vendan", "venta", "sell", "short", "salida",
+    }
+    # Urgencia o formato "at/@ precio"
+    urgency = v.any_word({"ahora", "now", "ya", "inmediato", "asap", "nuevo", "nuevamente", "at"}) or v.has("@")
+    return v.any_word(directions) and urgency
+
+
+def _goldbro_scalp(v: MessageView) -> bool:
+    return v.any_word({"buy", "comprar", "compra", "sell", "vender", "vende"})
+
+
+def _torofx(v: MessageView) -> bool:
+    return v.any_word(_DIR_EN)
+
+
+def _daily_signal(v: MessageView) -> bool:
+    return v.any_word({"market", "ahora"}) and v.any_word({"buy", "compra", "sell", "venta"})
+
+
+def _limitless(v: MessageView) -> bool:
+    return v.has("zone") and v.any_word(_DIR_EN)
+
+
+def _tradepulse(v: MessageView) -> bool:
+    fast = v.any_word(_GOLD) and v.any_word(_DIR_EN) and "now" in v.words
+    return fast or v.has("signal alert")
+
+
+PARSER_ANCHORS: Dict[str, Callable[[MessageView], bool]] = {
+    "hannah": _hannah,
+    "goldbro_long": _goldbro_long,
+    "goldbro_fast": _goldbro_fast,
+    "goldbro_scalp": _goldbro_scalp,
+    "torofx": _torofx,
+    "daily_signal": _daily_signal,
+    "limitless": _limitless,
+    "tradepulse": _tradepulse,
+}
+
+
+def register_anchor(name: str, anchor: Callable[[MessageView], bool]) -> None:
+    """Ancla de un parser externo (p.ej. una plantilla de templates.py)."""
+    PARSER_ANCHORS[name] = anchor
+
+
+def candidate_parsers(view: MessageView, names: Iterable[str]) -> List[str]:
+    """Filtra `names` (en su orden) a los parsers cuyo ancla se cumple."""
+    out = []
+    for name in names:
+        anchor = PARSER_ANCHORS.get(name)
+        if anchor is None or anchor(view):
+            out.append(name)
+    return out
@@ -0,0 +1,284 @@
+"""
+templates.py
+Parsers de proveedor declarativos (plantillas JSON) compilados a una sola regex.
+
+Problema previo: cada proveedor es un parser escrito a mano que corre varios
+re.search independientes sobre el texto completo (símbolo, dirección, entrada, SL,
+TPs...). Sumar un canal nuevo implicaba escribir Python.
+
+Solucion: una plantilla por proveedor (provider_templates/<nombre>.json, o PARSER_TEMPLATES_DIR
+para canales propios) con:
+  format_tag / provider_tag
+  fields     campo -> regex con grupos nombrados. Los grupos nombran el dato que
+             extraen: symbol, direction, entry_a, entry_b, sl, tp, hint. Un sufijo
+             "__x" (p.ej. symbol__fast) permite repetir un dato en dos campos.
+  multi      campos que se acumulan (tp); los demás se quedan con el primer match.
+  required   campos que tienen que aparecer (p.ej. anchor, entry). El primero hace
+             de compuerta (un search suelto antes del scan): conviene que sea el
+             más selectivo.
+  symbol     {"aliases": {...}, "default": ...}
+  direction  {"aliases": {...}, "priority": ["BUY", "SELL"]}
+  entry      {"order": "sorted" | "as_written"}
+  tps        {"unique": bool}
+  fast       variantes FAST: [{"pattern": ..., "unless": [campos]}]; se prueban
+             antes de la señal completa y se descartan si aparece algún campo de unless.
+  prefilter  condición necesaria para el prefiltro de SignalRouter: lista de
+             alternativas; cada una es una lista de grupos "alguno de" con palabras o,
+             con prefijo "~", subcadenas.
+
+TemplateParser arma `(?P<f_anchor>...)|(?P<f_symbol>...)|...` y una sola pasada
+de finditer extrae todos los campos: el orden de `fields` es la prioridad cuando dos
+campos podrían empezar en la misma posición.
+"""
+import json
+import logging
+import os
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from parsers_base import SignalParser, ParseResult
+
+log = logging.getLogger("router_parser.templates")
+
+BUILTIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "provider_templates")
+SLOTS = ("symbol", "direction", "entry_a", "entry_b", "sl", "tp", "hint")
+
+
+class TemplateError(ValueError):
+    """Plantilla inválida (se informa con el nombre del proveedor)."""
+
+
+def _flags(spec: str) -> int:
+    flags = 0
+    for ch in spec or "":
+        flags |= {"i": re.IGNORECASE, "m": re.MULTILINE, "s": re.DOTALL}[ch]
+    return flags
+
+
+def _slot(group_name: str) -> str:
+    return group_name.split("__", 1)[0]
+
+
+def _to_float(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _prefilter_fn(alternatives: List[List[List[str]]]) -> Optional[Callable]:
+    """Condición del prefiltro: alguna alternativa con todos sus grupos presentes."""
+    if not alternatives:
+        return None
+    compiled = []
+    for alt in alternatives:
+        groups = []
+        for group in alt:
+            words = frozenset(w.casefold() for w in group if not w.startswith("~"))
+            subs = tuple(w[1:].casefold() for w in group if w.startswith("~"))
+            groups.append((words, subs))
+        compiled.append(groups)
+
+    def anchor(view) -> bool:
+        # Bucles explícitos: corre para cada mensaje, all()/any() con generadores cuestan el doble
+        words, folded = view.words, view.folded
+        for groups in compiled:
+            for group_words, subs in groups:
+                if not words.isdisjoint(group_words):
+                    continue
+                for sub in subs:
+                    if sub in folded:
+                        break
+                else:
+                    break
+            else:
+                return True
+        return False
+    return anchor
+
+
+class TemplateParser(SignalParser):
+    """Parser generado a partir de una plantilla (ver el docstring del módulo)."""
+
+    def __init__(self, template: Dict[str, Any]):
+        self.template = template
+        self.name = template.get("name") or ""
+        if not self.name:
+            raise TemplateError("plantilla sin 'name'")
+        self.format_tag = template.get("format_tag") or self.name.upper()
+        self.provider_tag = template.get("provider_tag") or self.format_tag
+        flags = _flags(template.get("flags", "i"))
+
+        fields = template.get("fields") or {}
+        if not fields:
+            raise TemplateError(f"{self.name}: 'fields' vacío")
+        self._field_slots: Dict[str, List[Tuple[str, str]]] = {}
+        self._field_rx: Dict[str, Any] = {}
+        parts = []
+        for field, pattern in fields.items():
+            try:
+                inner = re.compile(pattern, flags)
+            except re.error as e:
+                raise TemplateError(f"{self.name}.{field}: regex inválida: {e}") from e
+            slots = [(g, _slot(g)) for g in inner.groupindex]
+            unknown = [g for g, s in slots if s not in SLOTS]
+            if unknown:
+                raise TemplateError(f"{self.name}.{field}: grupos desconocidos {unknown} (válidos: {SLOTS})")
+            self._field_slots[f"f_{field}"] = slots
+            self._field_rx[field] = inner
+            parts.append(f"(?P<f_{field}>{pattern})")
+        try:
+            self._scan = re.compile("|".join(parts), flags)
+        except re.error as e:
+            raise TemplateError(f"{self.name}: grupos repetidos entre campos ({e}); usar sufijo __x") from e
+
+        self._multi = frozenset(template.get("multi") or ())
+        self._required = tuple(template.get("required") or ())
+        missing = [f for f in self._required if f"f_{f}" not in self._field_slots]
+        if missing:
+            raise TemplateError(f"{self.name}: required sin campo {missing}")
+        # El primer campo requerido hace de compuerta: un search suelto (que conserva la
+        # optimización de prefijo literal de re) descarta el ruido antes del scan combinado.
+        self._gate = self._field_rx[self._required[0]] if self._required else None
+
+        sym = template.get("symbol") or {}
+        self._symbol_aliases = {k.upper(): v for k, v in (sym.get("aliases") or {}).items()}
+        self._symbol_default = sym.get("default")
+        direction = template.get("direction") or {}
+        self._direction_aliases = {k.upper(): v.upper() for k, v in (direction.get("aliases") or {}).items()}
+        self._direction_priority = [d.upper() for d in direction.get("priority") or ("BUY", "SELL")]
+        self._entry_sorted = (template.get("entry") or {}).get("order", "sorted") == "sorted"
+        self._unique_tps = bool((template.get("tps") or {}).get("unique", False))
+
+        self._fast = []
+        for variant in template.get("fast") or ():
+            try:
+                rx = re.compile(variant["pattern"], flags)
+            except (KeyError, re.error) as e:
+                raise TemplateError(f"{self.name}.fast: {e}") from e
+            self._fast.append((rx, tuple(variant.get("unless") or ())))
+
+        self.anchor = _prefilter_fn(template.get("prefilter") or [])
+
+    # --- extracción ---
+
+    def scan(self, norm: str) -> Tuple[set, Dict[str, List[str]]]:
+        """Una pasada: campos presentes y valores por dato (en orden de aparición)."""
+        seen = set()
+        values: Dict[str, List[str]] = {}
+        for m in self._scan.finditer(norm):
+            outer = m.lastgroup
+            field = outer[2:]
+            if field in seen and field not in self._multi:
+                continue
+            seen.add(field)
+            for group, slot in self._field_slots[outer]:
+                v = m.group(group)
+                if v is not None:
+                    values.setdefault(slot, []).append(v)
+        return seen, values
+
+    def _symbol(self, raw: Optional[str]) -> Optional[str]:
+        if raw is None:
+            return self._symbol_default
+        up = raw.upper()
+        return self._symbol_aliases.get(up, up)
+
+    def _direction(self, raws: Iterable[str]) -> Optional[str]:
+        found = {self._direction_aliases.get(r.upper(), r.upper()) for r in raws}
+        for d in self._direction_priority:
+            if d in found:
+                return d
+        return None
+
+    def _parse_fast(self, norm: str) -> Optional[ParseResult]:
+        for rx, unless in self._fast:
+            m = rx.search(norm)
+            if not m or any(self._field_rx[f].search(norm) for f in unless if f in self._field_rx):
+                continue
+            groups = {_slot(g): v for g, v in m.groupdict().items() if v is not None}
+            symbol = self._symbol(groups.get("symbol"))
+            direction = self._direction([groups["direction"]]) if "direction" in groups else None
+            if symbol and direction:
+                return ParseResult(
+                    format_tag=self.format_tag, provider_tag=self.provider_tag,
+                    symbol=symbol, direction=direction, is_fast=True,
+                    hint_price=_to_float(groups.get("hint")),
+                )
+        return None
+
+    def parse(self, text: str) -> Optional[ParseResult]:
+        norm = self.normalize(text)
+        if not norm:
+            return None
+        if self._fast:
+            fast = self._parse_fast(norm)
+            if fast:
+                return fast
+        if self._gate is not None and not self._gate.search(norm):
+            return None
+
+        seen, values = self.scan(norm)
+        if any(f not in seen for f in self._required):
+            return None
+        symbol = self._symbol((values.get("symbol") or [None])[0])
+        direction = self._direction(values.get("direction") or ())
+        if not symbol or not direction:
+            return None
+
+        entry_range = None
+        if values.get("entry_a"):
+            a = _to_float(values["entry_a"][0])
+            b = _to_float(values["entry_b"][0]) if values.get("entry_b") else a
+            if a is None or b is None:
+                return None
+            entry_range = (min(a, b), max(a, b)) if self._entry_sorted else (a, b)
+
+        sl = next((f for f in map(_to_float, values.get("sl") or ()) if f is not None), None)
+        tps = []
+        for tp in map(_to_float, values.get("tp") or ()):
+            if tp is None or (self._unique_tps and tp in tps):
+                continue
+            tps.append(tp)
+
+        return ParseResult(
+            format_tag=self.format_tag,
+            provider_tag=self.provider_tag,
+            symbol=symbol,
+            direction=direction,
+            hint_price=_to_float((values.get("hint") or [None])[0]),
+            entry_range=entry_range,
+            sl=sl,
+            tps=tps or None,
+        )
+
+
+def load_templates(dirs: Optional[Iterable[str]] = None) -> Dict[str, TemplateParser]:
+    """
+    Compila las plantillas *.json de `dirs` (por defecto la carpeta incluida y
+    PARSER_TEMPLATES_DIR). Una plantilla posterior con el mismo name reemplaza a la
+    anterior. Una plantilla inválida se informa y se omite.
+    """
+    if dirs is None:
+        dirs = [BUILTIN_DIR]
+        extra = os.getenv("PARSER_TEMPLATES_DIR")
+        if extra:
+            dirs.append(extra)
+    parsers: Dict[str, TemplateParser] = {}
+    for d in dirs:
+        if not d or not os.path.isdir(d):
+            continue
+        for fname in sorted(os.listdir(d)):
+            if not fname.endswith(".json"):
+                continue
+            path = os.path.join(d, fname)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    parser = TemplateParser(json.load(f))
+            except (OSError, ValueError) as e:
+                log.error(f"[TEMPLATE] {path} ignorada: {e}")
+                continue
+            parsers[parser.name] = parser
+    return parsers
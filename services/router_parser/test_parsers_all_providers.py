@@ -1,18 +1,19 @@
 import sys, os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from router_parser.parsers_hannah import HannahParser
 from router_parser.parsers_goldbro_long import GoldBroLongParser
 from router_parser.parsers_goldbro_fast import GoldBroFastParser
 from router_parser.parsers_goldbro_scalp import GoldBroScalpParser
 from router_parser.parsers_torofx import ToroFxParser
 from router_parser.parsers_daily_signal import DailySignalParser
-from parsers_limitless import LimitlessParser
+from router_parser.templates import load_templates
+
+TEMPLATES = load_templates()
 
 samples = {
     'hannah': {
         'signal': '''GOLD BUY NOW\n\n@4460-4457\n\nSL 4454\n\nTP1 4463\nTP2 4466''',
-        'parser': HannahParser(),
+        'parser': TEMPLATES['hannah'],
         'expected': {
             'format_tag': 'HANNAH',
             'provider_tag': 'hannah',
@@ -72,7 +73,7 @@ samples = {
                 },
                 'limitless': {
                     'signal': '''GOLD SELL NOW\n\nZone:4427.5 - 4431.5\n\nTP 1: 4423.5\nTP 2: 4419.5\n\nRisk Price: 4435.5''',
-                    'parser': LimitlessParser(),
+                    'parser': TEMPLATES['limitless'],
                     'expected': {
                         'format_tag': 'LIMITLESS',
                         'symbol': 'XAUUSD',
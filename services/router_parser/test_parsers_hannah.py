@@ -2,12 +2,12 @@
 import sys, os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from router_parser.parsers_hannah import HannahParser
 from router_parser.parsers_goldbro_fast import GoldBroFastParser
 from router_parser.parsers_goldbro_long import GoldBroLongParser
 from router_parser.parsers_goldbro_scalp import GoldBroScalpParser
 from router_parser.parsers_torofx import ToroFxParser
 from router_parser.parsers_daily_signal import DailySignalParser
+from router_parser.templates import load_templates
 
 samples = {
     'gb_fast': 'Compra ORO ahora @2500',
@@ -24,7 +24,7 @@ parsers = [
     GoldBroScalpParser(),
     ToroFxParser(),
     DailySignalParser(),
-    HannahParser(),
+    load_templates()["hannah"],
 ]
 
 for name, text in samples.items():
@@ -1,7 +1,7 @@
 import sys, os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from router_parser.parsers_hannah import HannahParser
+from router_parser.templates import load_templates
 
 # Ejemplo de señal Hannah
 hannah_signal = '''GOLD BUY NOW
@@ -13,12 +13,12 @@ SL 4454
 TP1 4463
 TP2 4466'''
 
-parser = HannahParser()
+parser = load_templates()["hannah"]
 result = parser.parse(hannah_signal)
 
 print("--- Prueba señal Hannah ---")
 if result:
-    print(f"Parser HannahParser matched: {result}")
+    print(f"Plantilla hannah matched: {result}")
     assert result.format_tag == "HANNAH"
     assert result.provider_tag == "hannah"
     assert result.symbol == "XAUUSD"
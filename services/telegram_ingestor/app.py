@@ -1,7 +1,8 @@
-import os, asyncio, json, logging
+import os, asyncio, json, logging, time
 from telethon import TelegramClient, events
 from services.common.config import Settings
 from services.common.redis_streams import redis_client, xadd, Streams
+from services.common.latency_trace import TraceContext, Hops, TRACE_FIELD
 
 
 # Add container label to log format for Grafana filtering
@@ -25,9 +26,11 @@ async def main():
             await asyncio.sleep(600)  # Solo cada 10 minutos
 
     import json
-    from services.common.config import CHANNELS_CONFIG_JSON
+    from services.common.config import CHANNELS_CONFIG_JSON, config
     s = Settings.load()
     r = await redis_client(s["redis_url"])
+    # Mismo valor que router_parser: un stream raw_messages:{i} por worker, particionado por chat_id
+    raw_partitions = max(1, int(config.get("ROUTER_WORKERS", 1)))
 
     api_id = int(s["TG_API_ID"])
     api_hash = s["TG_API_HASH"]
@@ -43,6 +46,7 @@ async def main():
 
     @client.on(events.NewMessage)
     async def handler(event):
+        recv_ts = time.time()
         try:
             last_msg["ts"] = asyncio.get_event_loop().time()
             chat_id = str(event.chat_id)
@@ -54,15 +58,22 @@ async def main():
             if not text:
                 log.warning(f"[HANDLER] Mensaje vacío ignorado: chat_id={chat_id} id={event.id}")
                 return
+            # Contexto de traza único para todo el recorrido mensaje -> fill
+            tctx = TraceContext.new()
+            if event.date:
+                tctx.mark(Hops.TG_MESSAGE, ts=event.date.timestamp())
+            tctx.mark(Hops.INGEST_RECEIVED, ts=recv_ts)
             payload = {
                 "chat_id": chat_id,
                 "message_id": str(event.id),
                 "date": event.date.isoformat() if event.date else "",
                 "text": text
             }
-            log.info(f"[RECEIVED] Mensaje recibido: chat_id={chat_id} id={event.id} texto='{text[:80]}...'")
+            log.info(f"[RECEIVED] Mensaje recibido: chat_id={chat_id} id={event.id} trace={tctx.trace_id} texto='{text[:80]}...'")
             try:
-                await xadd(r, Streams.RAW, payload)
+                tctx.mark(Hops.RAW_XADD)
+                payload[TRACE_FIELD] = tctx.to_field()
+                await xadd(r, Streams.raw_partition(chat_id, raw_partitions), payload)
             except Exception as re:
                 log.error(f"[REDIS][EXCEPTION] Error al escribir en Redis: {re}")
                 log.exception(re)
@@ -1,8 +1,8 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException, status, Depends
 from fastapi.security import APIKeyHeader
-from pydantic import BaseModel, field_validator
-import os, logging, time
+from pydantic import BaseModel, Field, field_validator
+import asyncio, os, logging, time
 from collections import defaultdict
 from telethon import TelegramClient
 
@@ -65,16 +65,30 @@ class NotifyRequest(BaseModel):
         return v
 
 
-def _check_rate_limit(client_ip: str) -> None:
+# Mensajes por request en /notify/batch (cada mensaje cuenta como un request para el rate limit)
+NOTIFY_BATCH_MAX = int(os.getenv("NOTIFY_BATCH_MAX", "50"))
+
+
+class NotifyBatchRequest(BaseModel):
+    messages: list[NotifyRequest] = Field(min_length=1, max_length=NOTIFY_BATCH_MAX)
+
+
+_RATE_LIMIT_DETAIL = f"Rate limit excedido: max {RATE_LIMIT_REQUESTS} requests por {RATE_LIMIT_WINDOW}s"
+
+
+def _take_rate_limit(client_ip: str, count: int = 1) -> int:
+    """Consume hasta `count` envíos del cupo de la IP; devuelve cuántos se concedieron."""
     now = time.time()
     window_start = now - RATE_LIMIT_WINDOW
     _rate_limit_store[client_ip] = [t for t in _rate_limit_store[client_ip] if t > window_start]
-    if len(_rate_limit_store[client_ip]) >= RATE_LIMIT_REQUESTS:
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail=f"Rate limit excedido: max {RATE_LIMIT_REQUESTS} requests por {RATE_LIMIT_WINDOW}s",
-        )
-    _rate_limit_store[client_ip].append(now)
+    granted = max(0, min(count, RATE_LIMIT_REQUESTS - len(_rate_limit_store[client_ip])))
+    _rate_limit_store[client_ip].extend([now] * granted)
+    return granted
+
+
+def _check_rate_limit(client_ip: str) -> None:
+    if not _take_rate_limit(client_ip):
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=_RATE_LIMIT_DETAIL)
 
 
 def _check_api_key(api_key: str | None = Depends(api_key_header)) -> None:
@@ -101,6 +115,40 @@ async def notify(req: NotifyRequest, request: Request) -> dict:
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(e))
 
 
+async def _send_chat(chat_id: int, items: list[tuple[int, str]], results: list) -> None:
+    """Mensajes de un mismo chat en orden; un fallo no corta el resto."""
+    for index, message in items:
+        try:
+            await client.send_message(chat_id, message)
+            results[index] = {"status": "ok"}
+        except Exception as e:
+            log.error("[NOTIFY][ERROR] chat_id=%s error=%s", chat_id, e)
+            results[index] = {"status": "error", "detail": str(e)}
+
+
+@app.post("/notify/batch", dependencies=[Depends(_check_api_key)])
+async def notify_batch(req: NotifyBatchRequest, request: Request) -> dict:
+    """
+    Varios mensajes en un request. Chats distintos se envían en paralelo, los de un
+    mismo chat en el orden recibido. `results` tiene un estado por mensaje (mismo orden).
+    Cada mensaje consume un envío del rate limit: los que no caben en el cupo (siempre
+    los últimos del request, así cada chat conserva su orden) vuelven con error.
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    granted = _take_rate_limit(client_ip, len(req.messages))
+    if not granted:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=_RATE_LIMIT_DETAIL)
+
+    by_chat: dict[int, list[tuple[int, str]]] = {}
+    for i, item in enumerate(req.messages[:granted]):
+        by_chat.setdefault(int(item.chat_id), []).append((i, item.message))
+    results: list = [None] * granted + [{"status": "error", "detail": _RATE_LIMIT_DETAIL}] * (len(req.messages) - granted)
+    await asyncio.gather(*(_send_chat(chat_id, items, results) for chat_id, items in by_chat.items()))
+    sent = sum(1 for r in results if r["status"] == "ok")
+    log.info("[NOTIFY] batch %d/%d enviados (%d chats) ip=%s", sent, len(results), len(by_chat), client_ip)
+    return {"status": "ok" if sent == len(results) else "partial", "results": results}
+
+
 @app.get("/health")
 async def health() -> dict:
     return {"status": "ok", "connected": client.is_connected()}
@@ -0,0 +1,116 @@
+"""
+admission.py
+Etapa de admisión de señales por antigüedad (load shedding).
+
+Problema previo: si el orchestrator se atrasa (p.ej. handle_signal bloqueado en una
+espera de entrada) las señales se acumulan en parsed_signals y se ejecutan tarde,
+a precios malos.
+
+Solucion: antes de llegar a open_for_accounts cada señal pasa por decide():
+  - edad <= SIGNAL_OPEN_MAX_AGE_SEC   -> ADMIT: flujo normal.
+  - edad <= SIGNAL_MAX_AGE_SEC        -> DOWNGRADE: sólo se aplica lo que protege
+                                         posiciones existentes (upgrade FAST->COMPLETE,
+                                         cierre por precio pasado TP1); no se abren trades.
+  - más vieja                         -> DROP: se descarta completa.
+Cada DOWNGRADE/DROP se registra en trade_events.
+
+La edad se mide desde el origen: el primer hop del contexto de traza (hora del
+mensaje en Telegram). Sin traza, se usa el ID del stream (hora del XADD del parser).
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from prometheus_client import Counter, Histogram
+
+from services.common.latency_trace import TRACE_FIELD, TraceContext
+
+ADMIT = "admit"
+DOWNGRADE = "downgrade"
+DROP = "drop"
+
+SIGNAL_ADMISSION = Counter('signal_admission_total', 'Decisiones de admisión de señales por antigüedad', ['decision'])
+SIGNAL_AGE = Histogram(
+    'signal_admission_age_seconds', 'Antigüedad de la señal al llegar a la etapa de admisión',
+    buckets=(0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 900),
+)
+
+
+@dataclass
+class AdmissionDecision:
+    action: str
+    age_sec: Optional[float]
+    reason: str = ""
+
+    @property
+    def admitted(self) -> bool:
+        return self.action == ADMIT
+
+    def event(self, sig, trace_id: str = "", msg_id: Optional[str] = None) -> dict:
+        """Registro para trade_events."""
+        return {
+            "type": "signal_dropped" if self.action == DROP else "signal_downgraded",
+            "reason": self.reason,
+            "age_sec": round(self.age_sec, 3) if self.age_sec is not None else None,
+            "symbol": sig.symbol,
+            "direction": sig.direction,
+            "provider_tag": sig.provider_tag,
+            "chat_id": sig.chat_id,
+            "trace": trace_id,
+            "msg_id": msg_id,
+        }
+
+
+def _id_ms(msg_id) -> Optional[float]:
+    if msg_id is None:
+        return None
+    if isinstance(msg_id, (bytes, bytearray)):
+        msg_id = msg_id.decode()
+    try:
+        return float(str(msg_id).split("-", 1)[0])
+    except ValueError:
+        return None
+
+
+class SignalAdmission:
+    def __init__(self, open_max_age_sec: float = 20.0, max_age_sec: float = 120.0):
+        self.open_max_age_sec = float(open_max_age_sec)
+        self.max_age_sec = max(float(max_age_sec), self.open_max_age_sec)
+
+    @classmethod
+    def from_config(cls, config) -> "SignalAdmission":
+        return cls(
+            open_max_age_sec=float(config.get("SIGNAL_OPEN_MAX_AGE_SEC", 20)),
+            max_age_sec=float(config.get("SIGNAL_MAX_AGE_SEC", 120)),
+        )
+
+    @staticmethod
+    def signal_age(sig, msg_id=None, now: Optional[float] = None) -> Optional[float]:
+        """Segundos desde el origen de la señal (traza) o desde su XADD (ID del stream)."""
+        now_ms = (time.time() if now is None else now) * 1000.0
+        origin_ms = None
+        ctx = TraceContext.from_fields({TRACE_FIELD: getattr(sig, "tctx", "")})
+        if ctx is not None and ctx.hops:
+            origin_ms = ctx.hops[0][1]
+        if origin_ms is None:
+            origin_ms = _id_ms(msg_id)
+        if origin_ms is None:
+            return None
+        return max(0.0, (now_ms - origin_ms) / 1000.0)
+
+    def decide(self, sig, msg_id=None, now: Optional[float] = None) -> AdmissionDecision:
+        age = self.signal_age(sig, msg_id, now)
+        if age is None:
+            decision = AdmissionDecision(ADMIT, None, "unknown_age")
+        else:
+            SIGNAL_AGE.observe(age)
+            if age > self.max_age_sec:
+                decision = AdmissionDecision(DROP, age, f"stale>{self.max_age_sec:g}s")
+            elif age > self.open_max_age_sec:
+                decision = AdmissionDecision(DOWNGRADE, age, f"stale>{self.open_max_age_sec:g}s (update-only)")
+            else:
+                decision = AdmissionDecision(ADMIT, age)
+        SIGNAL_ADMISSION.labels(decision=decision.action).inc()
+        return decision
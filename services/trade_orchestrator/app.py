@@ -1,11 +1,16 @@
 import os, json, asyncio, logging, sys, uuid
-import redis.asyncio as aioredis
-from services.common.config_db import ConfigProvider
-from services.common.redis_streams import redis_client, xread_loop, xadd, Streams
+from services.common.redis_streams import (
+    redis_client, xadd_message, Streams, create_consumer_group, xreadgroup_batches, xack_batch,
+    Signal, MgmtCommand, MgmtAction, decode_message, StreamSchemaError,
+)
 from services.common.timewindow import parse_windows, in_windows
+from services.common.latency_trace import TraceContext, Hops, publish_trace, TRACE_FIELD
 
 from .mt5_executor import MT5Executor
 from .trade_manager import TradeManager
+from .admission import SignalAdmission, DROP, DOWNGRADE
+from .stream_lag import monitor_stream_lag
+from .signal_scheduler import SignalScheduler, lane_key
 # Ensure services folder is on sys.path so sibling packages (telegram_ingestor) can be imported
 _svc_a = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 _svc_b = os.path.abspath(os.path.join(os.path.dirname(__file__), 'services'))
@@ -19,6 +24,7 @@ else:
     if os.path.isdir(_svc_c):
         sys.path.insert(0, _svc_c)
 from services.common.telegram_notifier import RemoteTelegramNotifier
+from services.common.notify_outbox import NotifyOutbox
 from .notifications.telegram import TelegramNotifierAdapter
 from prometheus_client import start_http_server
 
@@ -70,6 +76,70 @@ class NotifierAdapter:
         """
         await self._tg.notify(account_name, message)
 
+async def consume_group(rb, stream: str, group: str, consumer: str, handler, start_id: str,
+                        scheduler: SignalScheduler, scheduled: bool = False, retry_sec: float = 1.0):
+    """
+    Consume un stream por consumer group sobre la conexión Redis binaria.
+    - Lotes de hasta 50 mensajes; un solo XACK por lote.
+    - Al arrancar re-entrega los pendientes de este consumer antes de los nuevos.
+    - Cada mensaje se decodifica (decode_message) a su objeto tipado antes del handler.
+    - Un mensaje que lanza excepción o no decodifica se loguea y se ACKea igual (no bloquea el stream).
+    - scheduled=True (señales): el handler se encola en el scheduler y el XACK de ese
+      mensaje se hace al terminar; si no, el handler corre con prioridad sobre las señales.
+    - Si el bucle se reinicia tras un error, la relectura de pendientes vuelve a traer las
+      señales aún en el scheduler (sin XACK todavía): esas se saltean, no se encolan dos veces.
+    """
+    await create_consumer_group(rb, stream, group, start_id=start_id)
+    # msg_ids entregados al scheduler cuyo XACK (ack_when_done) todavía no corrió
+    in_flight = set()
+
+    def ack_when_done(msg_id):
+        async def _ack(ok: bool):
+            try:
+                await xack_batch(rb, stream, group, [msg_id])
+            finally:
+                in_flight.discard(msg_id)
+        return _ack
+
+    while True:
+        try:
+            async for batch in xreadgroup_batches(rb, stream, group, consumer):
+                done = []
+                for msg_id, fields in batch:
+                    if msg_id in in_flight:
+                        continue
+                    if fields:
+                        try:
+                            msg = decode_message(stream, fields)
+                            log.info(f"[STREAM] Mensaje recibido en stream {stream}: id={msg_id} msg={msg}")
+                            if scheduled:
+                                in_flight.add(msg_id)
+                                try:
+                                    await scheduler.submit(
+                                        lane_key(msg),
+                                        lambda msg=msg, msg_id=msg_id: handler(msg, msg_id),
+                                        on_done=ack_when_done(msg_id),
+                                    )
+                                except BaseException:
+                                    in_flight.discard(msg_id)
+                                    raise
+                                continue
+                            async with scheduler.priority():
+                                await handler(msg, msg_id)
+                        except StreamSchemaError as e:
+                            log.error(f"[STREAM] Payload descartado en {stream} id={msg_id}: {e}")
+                        except Exception as e:
+                            log.exception(f"[STREAM] Error procesando {stream} id={msg_id}: {e}")
+                    done.append(msg_id)
+                await xack_batch(rb, stream, group, done)
+        except Exception as e:
+            if "NOGROUP" in str(e):
+                log.warning(f"[REDIS] NOGROUP en {stream}, recreando grupo {group}...")
+                await create_consumer_group(rb, stream, group, start_id="$")
+                continue
+            log.error(f"[STREAM] Error en bucle de consumo de {stream}: {e}")
+            await asyncio.sleep(retry_sec)
+
 async def main():
     """
     Función principal de arranque del servicio trade_orchestrator.
@@ -79,8 +149,9 @@ async def main():
     from services.common.env_validator import validate_trade_orchestrator
     validate_trade_orchestrator()
 
-    from services.common.config import Settings
-    config = ConfigProvider()
+    # Un solo ConfigProvider por proceso (el de services.common.config): una sola carga
+    # del snapshot local / la base, un pool y un listener
+    from services.common.config import Settings, config
     s = Settings.load()
     # start Prometheus metrics server
     try:
@@ -90,13 +161,24 @@ async def main():
     except Exception as e:
         log.error(f"Failed to start Prometheus metrics server: {e}")
     r = await redis_client(s["redis_url"])
+    # Conexión sin decode_responses para leer payloads msgpack de parsed_signals / mgmt_messages
+    rb = await redis_client(s["redis_url"], binary=True)
     accounts = config.get_accounts()
 
     # Inicialización centralizada del notificador Telegram
     # Forzar habilitación de notificaciones
     notifier_adapter = None
     try:
-        tg_notifier = RemoteTelegramNotifier(config.get("TELEGRAM_INGESTOR_URL", "http://telegram_ingestor:8000"))
+        # Con outbox las notificaciones se encolan en Redis y las entrega notifier_worker:
+        # la gestión de posiciones nunca espera un POST a telegram_ingestor. Apagado por
+        # defecto: sin el servicio notifier_worker corriendo nada se entregaría.
+        outbox = NotifyOutbox(r) if str(config.get("NOTIFY_OUTBOX", "false")).lower() in ("true", "1", "yes", "on") else None
+        if outbox is not None:
+            log.info("[NOTIFY] NOTIFY_OUTBOX activo: las notificaciones las entrega el servicio notifier_worker")
+        tg_notifier = RemoteTelegramNotifier(
+            config.get("TELEGRAM_INGESTOR_URL", "http://telegram_ingestor:8000"),
+            outbox=outbox,
+        )
         notifier_adapter = TelegramNotifierAdapter(tg_notifier)
         log.info("TelegramNotifierAdapter initialized (forced enable)")
     except Exception as e:
@@ -126,29 +208,87 @@ async def main():
 
     tradeManager = TradeManager(tradeExecutor, notifier=(notifier_adapter if notifier_adapter is not None else None), config_provider=config)  # attach notifier and config_provider
 
-    async def handle_signal(fields: dict):
+    # Load shedding: señales demasiado viejas no abren trades (ver admission.py)
+    admission = SignalAdmission.from_config(config)
+
+    async def reject_stale(sig: Signal, decision, tctx, msg_id):
+        log.warning(f"[ADMISSION] Señal {decision.action} trace={tctx.trace_id} {sig.provider_tag} {sig.direction} {sig.symbol} edad={decision.age_sec:.1f}s ({decision.reason})")
+        await xadd_message(r, Streams.EVENTS, decision.event(sig, trace_id=tctx.trace_id, msg_id=msg_id))
+        asyncio.create_task(publish_trace(r, tctx, f"stale_{decision.action}"))
+
+    async def update_open_trades(symbol, direction, provider_tag, tps, sl, match_tag, reason):
+        """
+        Actualiza SL/TPs/provider_tag de los trades abiertos (symbol, direction, provider_tag == match_tag)
+        y mueve el SL en MT5 de todas las cuentas en paralelo. Retorna True si actualizó alguno.
+        """
+        updated_any = False
+        sl_batch = []
+        for acct_name, trade in list(tradeManager.trades.items()):
+            t = trade
+            if (
+                t.symbol == symbol
+                and t.direction == direction
+                and t.provider_tag == match_tag
+            ):
+                # Update the trade with new SL, TPs, and provider_tag
+                log.info(f"[TRACE][FAST-UPDATE] SL recibido para update_trade_signal: {sl}")
+                prev_sl = t.planned_sl
+                tradeManager.update_trade_signal(
+                    ticket=t.ticket,
+                    tps=tps,
+                    planned_sl=float(sl) if sl else None,
+                    provider_tag=provider_tag,
+                )
+                account = next((a for a in accounts if a.get("name") == t.account_name), None)
+                # Sin cambio de SL (re-publicación idéntica) no hay llamada al bridge
+                if account and t.ticket and sl and (prev_sl is None or float(prev_sl) != float(sl)):
+                    sl_batch.append({"account": account, "ticket": t.ticket, "sl": float(sl), "tp": None})
+                log.info(f"[FAST-UPDATE] Updated {match_tag} trade ticket={t.ticket} acct={t.account_name} with new SL/TP/provider_tag ({reason}).")
+                updated_any = True
+        # --- Update SL in MT5: todas las cuentas en paralelo, un snapshot por cuenta ---
+        if sl_batch:
+            try:
+                batch_res = await tradeExecutor.modify_sltp_batch(sl_batch, reason=reason)
+                for acct_name, done in batch_res.updated_by_account.items():
+                    for ticket, new_sl in done.items():
+                        log.info(f"[FAST-UPDATE] SL updated in MT5 for ticket={ticket} acct={acct_name} to SL={new_sl}")
+                for acct_name, failed in batch_res.errors_by_account.items():
+                    for ticket, err in failed.items():
+                        log.warning(f"[FAST-UPDATE] SL update in MT5 failed for ticket={ticket} acct={acct_name} to SL={sl}: {err}")
+            except Exception as e:
+                log.error(f"[FAST-UPDATE] Failed to update SL in MT5 for {len(sl_batch)} ticket(s): {e}")
+        return updated_any
+
+    async def handle_signal(sig: Signal, msg_id=None):
         """
         Procesa una señal de trading recibida, calcula SL/TP, filtra cuentas y ejecuta la apertura o actualización de trades.
         """
-        trace_id = uuid.uuid4().hex[:8]
-        orig_trace = fields.get("trace", "NO_TRACE")
-        log.info(f"[SIGNAL][TRACE] handle_signal llamado: trace_id={trace_id} orig_trace={orig_trace} fields={fields}")
+        # Mismo trace id desde telegram_ingestor; si el mensaje no trae contexto se inicia aquí
+        tctx = TraceContext.from_fields_or_new({TRACE_FIELD: sig.tctx}).mark(Hops.ORCH_RECEIVED)
+        trace_id = tctx.trace_id
+        orig_trace = sig.trace or "NO_TRACE"
+        log.info(f"[SIGNAL][TRACE] handle_signal llamado: trace_id={trace_id} orig_trace={orig_trace} signal={sig}")
+        msg_id = msg_id.decode() if isinstance(msg_id, bytes) else msg_id
+        decision = admission.decide(sig, msg_id)
+        if decision.action == DROP:
+            await reject_stale(sig, decision, tctx, msg_id)
+            return
         
         if not in_windows(parse_windows(s["trading_windows"])):
             log.info("[SKIP] signal outside windows (no connect). trace=%s", trace_id)
-            await xadd(r, Streams.EVENTS, {"type": "skip", "reason": "outside_windows", "trace": trace_id})
+            await xadd_message(r, Streams.EVENTS, {"type": "skip", "reason": "outside_windows", "trace": trace_id})
+            asyncio.create_task(publish_trace(r, tctx, "outside_windows"))
             return
 
-        symbol = fields.get("symbol")
-        direction = fields.get("direction")
-        provider_tag = fields.get("provider_tag", "GEN")
-        entry_range = fields.get("entry_range", "")
-        sl = fields.get("sl", "")
-        tps = json.loads(fields.get("tps", "[]") or "[]")
-        is_fast = fields.get("fast", "false").lower() == "true"
+        symbol = sig.symbol
+        direction = sig.direction
+        provider_tag = sig.provider_tag
+        sl = sig.sl
+        tps = sig.tps
+        is_fast = sig.fast
         # Nuevo: obtener el canal de origen de la señal
         try:
-            source_channel = int(fields.get("source_chat_id") or fields.get("chat_id") or 0)
+            source_channel = int(sig.chat_id or 0)
         except Exception:
             source_channel = 0
         # Si es FAST y no trae SL, calcularlo aquí usando la lógica de pips correcta (oro y otros)
@@ -156,59 +296,39 @@ async def main():
             account = next((a for a in accounts if a.get("active")), None)
             if account:
                 client = tradeExecutor._client_for(account)
-                price = client.tick_price(symbol, direction)
+                price = tradeExecutor.tick_price(client, symbol, direction)
                 # Obtener default_sl_pips desde config
                 default_sl_pips = float(config.get("DEFAULT_SL_XAUUSD_PIPS", 300)) if symbol.upper().startswith("XAU") else float(config.get("DEFAULT_SL_PIPS", 100))
                 point = 0.1 if symbol.upper().startswith("XAU") else 0.00001
                 from .trade_utils import calcular_sl_default
                 forced_sl = calcular_sl_default(symbol, direction, price, point, default_sl_pips)
-                sl = str(forced_sl)
+                sl = float(forced_sl)
                 log.info(f"[TRACE][SIGNAL][FAST] SL forzado en handle_signal (calcular_sl_default): {sl} (price={price}, default_sl_pips={default_sl_pips}, point={point})")
             else:
                 log.error(f"[TRACE][SIGNAL][FAST] No se pudo calcular SL forzado: no hay cuenta activa. Abortando señal.")
                 return
-        log.info(f"[TRACE][SIGNAL] SL recibido en handle_signal: {sl} (type={type(sl)}) fields={fields}")
+        log.info(f"[TRACE][SIGNAL] SL recibido en handle_signal: {sl} (type={type(sl)}) signal={sig}")
         if not sl or float(sl) == 0.0:
-            log.error(f"[TRACE][SIGNAL] SL inválido detectado en handle_signal. SL={sl} is_fast={is_fast} fields={fields}. Abortando señal.")
+            log.error(f"[TRACE][SIGNAL] SL inválido detectado en handle_signal. SL={sl} is_fast={is_fast} signal={sig}. Abortando señal.")
             return
 
-        entry_tuple = json.loads(entry_range) if entry_range else None
+        entry_tuple = sig.entry_range or None
+
+        # --- Re-publicación casi idéntica (router_parser near_dup): actualiza, no abre ---
+        if sig.update_of:
+            updated_any = await update_open_trades(symbol, direction, provider_tag, tps, sl, match_tag=provider_tag, reason="near-dup")
+            log.info(f"[NEAR-DUP] trace={trace_id} {provider_tag} {direction} {symbol} update_of={sig.update_of} trades_actualizados={updated_any}")
+            asyncio.create_task(publish_trace(r, tctx.mark(Hops.TRADES_UPDATED), "near_dup_update"))
+            return
 
         # --- FAST update logic ---
         log.info(f"[TRACE][SIGNAL] SL propagado a lógica FAST/COMPLETE: {sl}")
         if not is_fast:
             # For each account, check for an existing trade with provider_tag 'GB_FAST' for this symbol/direction
-            updated_any = False
-            for acct_name, trade in list(tradeManager.trades.items()):
-                t = trade
-                if (
-                    t.symbol == symbol
-                    and t.direction == direction
-                    and t.provider_tag == "GB_FAST"
-                ):
-                    # Update the trade with new SL, TPs, and provider_tag
-                    log.info(f"[TRACE][FAST-UPDATE] SL recibido para update_trade_signal: {sl}")
-                    tradeManager.update_trade_signal(
-                        ticket=t.ticket,
-                        tps=tps,
-                        planned_sl=float(sl) if sl else None,
-                        provider_tag=provider_tag,
-                    )
-                    # --- NEW: Update SL in MT5 as well ---
-                    try:
-                        account = next((a for a in accounts if a.get("name") == t.account_name), None)
-                        if account and t.ticket and sl:
-                            result = await tradeExecutor.modify_sl(account, t.ticket, float(sl), reason="full-signal")
-                            if result:
-                                log.info(f"[FAST-UPDATE] SL updated in MT5 for ticket={t.ticket} acct={t.account_name} to SL={sl}")
-                            else:
-                                log.warning(f"[FAST-UPDATE] SL update in MT5 failed for ticket={t.ticket} acct={t.account_name} to SL={sl}")
-                    except Exception as e:
-                        log.error(f"[FAST-UPDATE] Failed to update SL in MT5 for ticket={t.ticket}: {e}")
-                    log.info(f"[FAST-UPDATE] Updated FAST trade ticket={t.ticket} acct={t.account_name} with new SL/TP/provider_tag from full signal.")
-                    updated_any = True
+            updated_any = await update_open_trades(symbol, direction, provider_tag, tps, sl, match_tag="GB_FAST", reason="full-signal")
             # If any trade was updated, skip opening a new trade
             if updated_any:
+                asyncio.create_task(publish_trace(r, tctx.mark(Hops.TRADES_UPDATED), "fast_update"))
                 return
 
             # --- TP1/fast close logic for complete signals ---
@@ -221,7 +341,7 @@ async def main():
                     # Use tick_price to get current price in the right direction
                     # For BUY, price must be >= TP1; for SELL, price <= TP1
                     tp1 = float(tps[0])
-                    current_price = client.tick_price(symbol, direction)
+                    current_price = tradeExecutor.tick_price(client, symbol, direction)
                     price_past_tp1 = False
                     if direction.upper() == "BUY" and current_price >= tp1:
                         price_past_tp1 = True
@@ -245,8 +365,14 @@ async def main():
                                     log.info(f"[COMPLETE-SIGNAL] Closed FAST trade ticket={t.ticket} acct={t.account_name} due to price past TP1.")
                                 except Exception as e:
                                     log.error(f"[COMPLETE-SIGNAL] Failed to close FAST trade ticket={t.ticket}: {e}")
+                        asyncio.create_task(publish_trace(r, tctx, "past_tp1"))
                         return
 
+        # Señal vieja: ya se aplicó lo que protege posiciones existentes, no se abre nada nuevo
+        if decision.action == DOWNGRADE:
+            await reject_stale(sig, decision, tctx, msg_id)
+            return
+
         log.info("[SIGNAL] calling open_complete_trade trace=%s provider=%s symbol=%s dir=%s", trace_id, provider_tag, symbol, direction)
         log.info(f"[TRACE][SIGNAL] SL propagado a open_complete_trade: {sl}")
         # Filtrar cuentas según allowed_channels
@@ -260,8 +386,10 @@ async def main():
                     filtered_accounts.append(acct)
         if not filtered_accounts:
             log.info(f"[SKIP] Ninguna cuenta permite el canal {source_channel}. Signal ignorada.")
+            asyncio.create_task(publish_trace(r, tctx, "no_accounts"))
             return
         # Ejecutar solo para las cuentas filtradas (reutiliza el singleton tradeExecutor)
+        tctx.mark(Hops.DISPATCH)
         res = await tradeExecutor.open_for_accounts(
             filtered_accounts,
             provider_tag=provider_tag,
@@ -270,11 +398,24 @@ async def main():
             entry_range=entry_tuple,
             sl=float(sl) if sl else 0.0,
             tps=tps,
+            trace=tctx,
         )
 
 
         log.info("[SIGNAL] open_complete_trade done trace=%s result=%s", trace_id, res)
 
+        # Trazas por cuenta: una entrada en signal_traces por cada send_order
+        for acct_name, acct_trace in res.traces_by_account.items():
+            ticket = res.tickets_by_account.get(acct_name)
+            outcome = "filled" if ticket else ("error" if acct_name in res.errors_by_account else "not_sent")
+            asyncio.create_task(publish_trace(
+                r, acct_trace, outcome,
+                ticket=ticket,
+                error=res.errors_by_account.get(acct_name),
+                symbol=symbol,
+                provider_tag=provider_tag,
+            ))
+
         if not res.tickets_by_account:
             log.error(f"[SIGNAL][ERROR] No se abrió ningún trade. Errores: {res.errors_by_account}")
         else:
@@ -297,7 +438,7 @@ async def main():
                 entry_price = None
                 if entry_tuple:
                     entry_price = (float(entry_tuple[0]) + float(entry_tuple[1])) / 2.0
-                hint_price = float(fields.get("hint_price")) if fields.get("hint_price") else None
+                hint_price = sig.hint_price
                 use_price = entry_price if entry_price is not None else hint_price
                 if use_price is None or use_price == 0.0:
                     log.error(f"[APP][ERROR] No se pudo obtener el precio de entrada para notificar trade abierto en {symbol}. Abortando notificación.")
@@ -320,77 +461,71 @@ async def main():
                 log.exception("failed to send trade_opened notifications: %s", e)
 
         if res.errors_by_account:
-            await xadd(r, Streams.EVENTS, {"type": "open_errors", "errors": json.dumps(res.errors_by_account)})
+            await xadd_message(r, Streams.EVENTS, {"type": "open_errors", "errors": res.errors_by_account})
 
-    async def handle_mgmt(fields: dict):
+    async def handle_mgmt(cmd: MgmtCommand, msg_id=None):
         """
         Procesa mensajes de gestión recibidos (ej: comandos Hannah, Torofx, etc).
+        Desde MgmtCommand v2 llegan tipados (router_parser ya resolvió acción y parámetros)
+        y sólo se despachan; los mensajes sin tipar (productor anterior) se re-parsean.
         """
-        text = fields.get("text","")
-        hint = fields.get("provider_hint","")
-        chat_id = int(fields.get("chat_id","0"))
-        #log.info(f"[MGMT] Mensaje de gestión recibido: provider_hint={hint} chat_id={chat_id} text={text}")
+        hint = cmd.provider_hint
+        if cmd.action == MgmtAction.NONE:
+            return
+        if cmd.action:
+            result = await tradeManager.apply_mgmt_command(cmd)
+            log.info(f"[MGMT] {cmd.scope} {cmd.action} aplicado={result}")
+            return
+
+        text = cmd.text
+        chat_id = int(cmd.chat_id or 0)
         if hint == "TOROFX":
             result = tradeManager.handle_torofx_management_message(chat_id, text)
             log.info(f"[MGMT] Resultado handle_torofx_management_message: {result}")
-        elif hint == "HANNAH":
+        elif hint in ("HANNAH", "GOLD_BROTHERS"):
             result = tradeManager.handle_hannah_management_message(chat_id, text)
-            log.info(f"[MGMT] Resultado handle_hannah_management_message: {result}")
-        elif hint == "GOLD_BROTHERS":
-            result = tradeManager.handle_hannah_management_message(chat_id, text)
-            log.info(f"[MGMT] Mensaje GOLD_BROTHERS recibido pero no manejado explícitamente.")
+            log.info(f"[MGMT] Resultado handle_hannah_management_message ({hint}): {result}")
         else:
             log.warning(f"[MGMT] Mensaje de gestión con provider_hint desconocido: {hint}")
 
+    # Offset del consumo legacy por XREAD: sólo se usa como punto de partida al crear el grupo
+    # por primera vez, para no re-procesar el historial de parsed_signals.
     REDIS_OFFSET_KEY = "signals:last_id"
-
-    async def get_last_id():
-        """
-        Obtiene el último ID procesado de señales desde Redis.
-        """
-        try:
-            redis_url = config.get("REDIS_URL", 'redis://redis:6379/0')
-            redis = aioredis.from_url(redis_url, decode_responses=True)
-            last_id = await redis.get(REDIS_OFFSET_KEY)
-            await redis.aclose()
-            return last_id or "$"
-        except Exception as e:
-            log.warning(f"[OFFSET] Could not get last_id from Redis: {e}")
-            return "$"
-
-    async def set_last_id(last_id):
-        """
-        Guarda el último ID procesado de señales en Redis.
-        """
-        try:
-            redis_url = config.get("REDIS_URL", 'redis://redis:6379/0')
-            redis = aioredis.from_url(redis_url, decode_responses=True)
-            await redis.set(REDIS_OFFSET_KEY, last_id)
-            await redis.aclose()
-        except Exception as e:
-            log.warning(f"[OFFSET] Could not set last_id in Redis: {e}")
+    ORCH_GROUP = "orchestrator_group"
+    # Nombre estable entre reinicios: permite recuperar los pendientes (leídos sin ACK) de este consumer
+    orch_consumer = os.getenv("ORCHESTRATOR_CONSUMER", "orchestrator-1")
+
+    # Señales independientes en paralelo, en orden dentro de cada carril (symbol, direction, canal)
+    scheduler = SignalScheduler(
+        max_concurrency=int(config.get("SIGNAL_MAX_CONCURRENCY", 4)),
+        max_queued=int(config.get("SIGNAL_MAX_QUEUED", 200)),
+    )
 
     async def loop_signals():
         """
         Loop principal que consume señales de trading y las procesa.
         """
-        last_id = await get_last_id()
-        log.info(f"[DEBUG] Suscrito a stream {Streams.SIGNALS} desde offset {last_id}")
-        async for msg_id, fields in xread_loop(r, Streams.SIGNALS, last_id=last_id):
-            log.info(f"[SIGNAL] Mensaje recibido en stream {Streams.SIGNALS}: id={msg_id} fields={fields}")
-            await handle_signal(fields)
-            await set_last_id(msg_id)
+        legacy_last_id = await r.get(REDIS_OFFSET_KEY)
+        log.info(f"[DEBUG] Suscrito a stream {Streams.SIGNALS} grupo={ORCH_GROUP} consumer={orch_consumer}")
+        await consume_group(
+            rb, Streams.SIGNALS, ORCH_GROUP, orch_consumer, handle_signal,
+            start_id=legacy_last_id or "$", scheduler=scheduler, scheduled=True,
+        )
 
     async def loop_mgmt():
         """
         Loop principal que consume mensajes de gestión y los procesa.
         """
-        async for msg_id, fields in xread_loop(r, Streams.MGMT, last_id="$"):
-            log.info(f"[MGMT] Mensaje recibido en stream MGMT: id={msg_id} fields={fields}")
-            await handle_mgmt(fields)
+        await consume_group(rb, Streams.MGMT, ORCH_GROUP, orch_consumer, handle_mgmt, start_id="$", scheduler=scheduler)
 
     # Lanzar el loop de gestión de trades en background
     asyncio.create_task(tradeManager.run_forever())
+    # Cotizaciones desde market_ticks (evita tick_price al bridge en el camino de la señal)
+    asyncio.create_task(tradeExecutor.quotes.run(r))
+    # Métricas de atraso por stream/grupo (parser y orchestrator)
+    lag_targets = [(stream, "router_group") for stream in Streams.raw_partitions(int(config.get("ROUTER_WORKERS", 1)))]
+    lag_targets += [(Streams.SIGNALS, ORCH_GROUP), (Streams.MGMT, ORCH_GROUP)]
+    asyncio.create_task(monitor_stream_lag(rb, lag_targets, interval_sec=float(config.get("STREAM_LAG_INTERVAL_SEC", 5))))
     await asyncio.gather(loop_signals(), loop_mgmt())
 
 if __name__ == "__main__":
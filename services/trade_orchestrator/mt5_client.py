@@ -5,9 +5,36 @@ log = logging.getLogger("trade_orchestrator.mt5_client")
 
 
 class MT5Client:
-    def __init__(self, host: str, port: int):
+    def __init__(self, host: str, port: int, bridge_port: int | None = None):
         self.mt5 = MetaTrader5(host=host, port=port)
         self.mt5.initialize()
+        # Bridge MT5Service (services/mt5_custom/server_rpyc.py) con operaciones compuestas.
+        # Opcional: si la cuenta no define bridge_port se usa el camino clásico de varios round-trips.
+        self.host = host
+        self.port = port
+        self.bridge_port = int(bridge_port) if bridge_port else None
+        self._bridge = None
+
+    # ---- Operaciones compuestas (un solo round-trip al bridge) ----
+
+    def _bridge_root(self):
+        if self.bridge_port is None:
+            return None
+        if self._bridge is None or self._bridge.closed:
+            import rpyc
+            self._bridge = rpyc.connect(self.host, self.bridge_port, config={"sync_request_timeout": 30})
+        return self._bridge.root
+
+    def supports_composite(self) -> bool:
+        return self.bridge_port is not None
+
+    def close_partial(self, ticket: int, percent: float) -> tuple:
+        """-> (ok, retcode, closed_volume, remaining_volume, message)"""
+        return tuple(self._bridge_root().close_partial(int(ticket), float(percent)))
+
+    def move_sl_verified(self, ticket: int, sl: float, tp: float | None = None) -> tuple:
+        """-> (ok, retcode, sl_applied, message)"""
+        return tuple(self._bridge_root().move_sl_verified(int(ticket), float(sl), tp))
 
     def get_pip_size(self, symbol: str) -> float:
         info = self.symbol_info(symbol)
@@ -28,6 +55,15 @@ class MT5Client:
         return self.mt5.symbol_info_tick(symbol)
 
     def partial_close(self, account: dict, ticket: int, percent: int) -> bool:
+        if self.supports_composite():
+            try:
+                ok, retcode, closed, remaining, msg = self.close_partial(ticket, percent)
+                log.debug("[MT5Client][PartialClose][bridge] ticket=%s ok=%s retcode=%s closed=%s remaining=%s msg=%s",
+                          ticket, ok, retcode, closed, remaining, msg)
+                return bool(ok)
+            except Exception as e:
+                log.warning("[MT5Client] close_partial en bridge falló (%s). Usando camino clásico.", e)
+                self._bridge = None
         if hasattr(self.mt5, "connect_to_account"):
             try:
                 self.mt5.connect_to_account(account)
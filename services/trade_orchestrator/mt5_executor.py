@@ -1,23 +1,43 @@
 
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional, Tuple
 import asyncio
 import time
 import re
 
 from services.common.timewindow import parse_windows, in_windows
+from services.common.latency_trace import TraceContext, Hops
 import logging
 
 log = logging.getLogger("trade_orchestrator.mt5_executor")
 
 from .trade_utils import safe_comment, pips_to_price, calcular_lotaje
 from .notifications.telegram import TelegramNotifierAdapter
+from .sl_coalescer import SLCoalescer, APPLIED, FAILED, SUPERSEDED
+from .quote_cache import QuoteCache
 
 @dataclass
 class MT5OpenResult:
     tickets_by_account: dict[str, int]
     errors_by_account: dict[str, str]
+    # Traza de latencia por cuenta (solo si la señal traía TraceContext)
+    traces_by_account: dict[str, TraceContext] = field(default_factory=dict)
+
+
+@dataclass
+class MT5ModifyResult:
+    """Resultado agregado de modify_sltp_batch: SL final por ticket y errores, por cuenta."""
+    updated_by_account: dict[str, dict[int, float]]
+    errors_by_account: dict[str, dict[int, str]]
+
+    @property
+    def updated_count(self) -> int:
+        return sum(len(v) for v in self.updated_by_account.values())
+
+    @property
+    def error_count(self) -> int:
+        return sum(len(v) for v in self.errors_by_account.values())
 
 class MT5Executor:
     async def open_runner_trade(self, account: dict, symbol: str, direction: str, volume: float, sl: float, tp: float, provider_tag: str = None):
@@ -133,10 +153,14 @@ class MT5Executor:
             self._notify_bg(account["name"], f"❌ early_partial_close: cierre parcial falló | Ticket: {int(ticket)} | retcode={getattr(res_close,'retcode',None)} {getattr(res_close,'comment',None)}")
             return False
         # 2. Mover SL a BE
-        ok_be = await self._apply_be(account, ticket, reason=f"PARTBE-{reason}")
-        if ok_be:
+        be_outcome = await self._apply_be(account, ticket, reason=f"PARTBE-{reason}")
+        if be_outcome == APPLIED:
             self._notify_bg(account["name"], f"✅ early_partial_close: {percent*100:.0f}% cerrado y SL movido a BE | Ticket: {int(ticket)}")
             return True
+        elif be_outcome == SUPERSEDED:
+            # El BE no se envió: lo reemplazó un SL más reciente del mismo ticket (trailing, etc.)
+            self._notify_bg(account["name"], f"✅ early_partial_close: {percent*100:.0f}% cerrado; SL actualizado por un ajuste más reciente (no BE) | Ticket: {int(ticket)}")
+            return True
         else:
             self._notify_bg(account["name"], f"⚠️ early_partial_close: {percent*100:.0f}% cerrado pero SL no pudo moverse a BE | Ticket: {int(ticket)}")
             return False
@@ -166,26 +190,11 @@ class MT5Executor:
             return False
         point = float(getattr(info, "point", 0.0))
         is_buy = (int(getattr(pos, "type", 0)) == 0)
-        sl_actual = float(getattr(pos, "sl", 0.0))
-        stop_level = float(getattr(info, "stops_level", 0.0)) * point
         price_current = float(getattr(pos, "price_current", 0.0))
         from services.common.config import Settings
         from .trade_utils import calcular_sl_respetando_maximo
         sl_max_pips = Settings.sl_max_pips()
-        # Centralizar el cálculo del SL respetando el máximo
-        sl_pips = abs((price_current - new_sl) / (0.1 if symbol.upper().startswith("XAU") else point))
-        new_sl = calcular_sl_respetando_maximo(symbol, price_current, "BUY" if is_buy else "SELL", sl_pips, point, sl_max_pips)
-        # Validar que el nuevo SL cumple con el mínimo stop level
-        if is_buy:
-            min_sl = price_current - stop_level
-            if new_sl > min_sl:
-                log.warning(f"[SL-UPDATE] SL ({new_sl}) está demasiado cerca del precio actual ({price_current}), mínimo permitido: {min_sl}. Ajustando SL a {min_sl}")
-                new_sl = round(min_sl, 2 if symbol.upper().startswith("XAU") else 5)
-        else:
-            max_sl = price_current + stop_level
-            if new_sl < max_sl:
-                log.warning(f"[SL-UPDATE] SL ({new_sl}) está demasiado cerca del precio actual ({price_current}), máximo permitido: {max_sl}. Ajustando SL a {max_sl}")
-                new_sl = round(max_sl, 2 if symbol.upper().startswith("XAU") else 5)
+        new_sl = self._clamp_sl(symbol, info, pos, new_sl, sl_max_pips)
         # Usar provider_tag actualizado en el comentario si se proporciona
         comment_tag = f"{provider_tag}-SLUPD-{reason}" if provider_tag else f"SLUPD-{reason}"
         req = {
@@ -195,6 +204,19 @@ class MT5Executor:
             "tp": float(getattr(pos, "tp", 0.0)),
             "comment": self._safe_comment(comment_tag),
         }
+        # Bridge con operaciones compuestas: envío + reintentos + verificación en un solo round-trip
+        if getattr(client, "supports_composite", lambda: False)():
+            try:
+                ok, retcode, sl_applied, msg = await asyncio.get_running_loop().run_in_executor(
+                    None, client.move_sl_verified, int(ticket), float(new_sl), float(getattr(pos, "tp", 0.0))
+                )
+                if ok:
+                    self._notify_bg(account["name"], f"✅ SL actualizado | Ticket: {int(ticket)} | SL: {sl_applied:.5f}")
+                    return True
+                self._notify_bg(account["name"], f"❌ SL update falló | Ticket: {int(ticket)} | retcode={retcode} {msg}")
+                return False
+            except Exception as e:
+                log.warning(f"[SL-UPDATE] move_sl_verified en bridge falló ({e}). Usando camino clásico.")
         for intento in range(reintentos):
             res = await self._best_filling_order_send(client, symbol, req, account.get('name'))
             log.debug(f"[ORDER_SEND][SL-UPDATE][{intento+1}/{reintentos}] Respuesta completa de order_send: {repr(res)}")
@@ -216,6 +238,171 @@ class MT5Executor:
                 new_sl = calcular_sl_respetando_maximo(symbol, price_current, "SELL", sl_pips, point, sl_max_pips)
         self._notify_bg(account["name"], f"❌ SL update falló tras {reintentos} intentos | Ticket: {int(ticket)} | retcode={getattr(res,'retcode',None)} {getattr(res,'comment',None)}")
         return False
+
+    def _clamp_sl(self, symbol: str, info, pos, new_sl: float, sl_max_pips: float) -> float:
+        """
+        Ajusta new_sl al máximo de pips permitido (SL_MAX_PIPS) y al stop level mínimo del símbolo,
+        usando el precio actual de la posición.
+        """
+        from .trade_utils import calcular_sl_respetando_maximo
+        point = float(getattr(info, "point", 0.0))
+        is_buy = (int(getattr(pos, "type", 0)) == 0)
+        stop_level = float(getattr(info, "stops_level", 0.0)) * point
+        price_current = float(getattr(pos, "price_current", 0.0))
+        # Centralizar el cálculo del SL respetando el máximo
+        sl_pips = abs((price_current - new_sl) / (0.1 if symbol.upper().startswith("XAU") else point))
+        new_sl = calcular_sl_respetando_maximo(symbol, price_current, "BUY" if is_buy else "SELL", sl_pips, point, sl_max_pips)
+        # Validar que el nuevo SL cumple con el mínimo stop level
+        if is_buy:
+            min_sl = price_current - stop_level
+            if new_sl > min_sl:
+                log.warning(f"[SL-UPDATE] SL ({new_sl}) está demasiado cerca del precio actual ({price_current}), mínimo permitido: {min_sl}. Ajustando SL a {min_sl}")
+                new_sl = round(min_sl, 2 if symbol.upper().startswith("XAU") else 5)
+        else:
+            max_sl = price_current + stop_level
+            if new_sl < max_sl:
+                log.warning(f"[SL-UPDATE] SL ({new_sl}) está demasiado cerca del precio actual ({price_current}), máximo permitido: {max_sl}. Ajustando SL a {max_sl}")
+                new_sl = round(max_sl, 2 if symbol.upper().startswith("XAU") else 5)
+        return new_sl
+
+    async def modify_sltp_batch(self, items: list[dict], *, reason: str = "", provider_tag: str = None, reintentos: int = 3) -> "MT5ModifyResult":
+        """
+        Modifica SL (y opcionalmente TP) de varios tickets en paralelo entre cuentas.
+
+        items: [{"account": dict, "ticket": int, "sl": float, "tp": float | None}, ...]
+        Si "tp" es None se conserva el TP actual de la posición.
+
+        A diferencia de llamar modify_sl ticket por ticket:
+        - Un único positions_get por cuenta como snapshot (con un symbol_info por símbolo,
+          no por ticket) y otro para verificar al final, en lugar de 2 round-trips por
+          ticket y por intento.
+        - Las cuentas se procesan concurrentemente; dentro de una cuenta los envíos son
+          secuenciales (el bridge rpyc serializa las llamadas de todos modos).
+        - TRADE_ACTION_SLTP no usa type_filling, así que se envía directo sin el barrido de
+          filling modes de _best_filling_order_send.
+        - Una sola notificación resumen por cuenta.
+        """
+        from services.common.config import Settings
+        sl_max_pips = Settings.sl_max_pips()
+        loop = asyncio.get_running_loop()
+
+        by_account: dict[str, tuple[dict, list[dict]]] = {}
+        for item in items:
+            account = item["account"]
+            by_account.setdefault(account["name"], (account, []))[1].append(item)
+
+        updated: dict[str, dict[int, float]] = {}
+        errors: dict[str, dict[int, str]] = {}
+
+        async def _modify_account(name: str, account: dict, acct_items: list[dict]):
+            ok_map = updated.setdefault(name, {})
+            err_map = errors.setdefault(name, {})
+            client = self._client_for(account)
+            wanted = {int(item["ticket"]) for item in acct_items}
+
+            def _snapshot():
+                # positions_get y un symbol_info por símbolo en una sola llamada al executor
+                positions = client.positions_get()
+                snapshot = {int(getattr(p, "ticket", 0)): p for p in (positions or [])}
+                symbols = {snapshot[t].symbol for t in wanted if t in snapshot}
+                return snapshot, {symbol: client.symbol_info(symbol) for symbol in symbols}
+
+            try:
+                snapshot, infos = await loop.run_in_executor(None, _snapshot)
+            except Exception as e:
+                for item in acct_items:
+                    err_map[int(item["ticket"])] = f"positions_get falló: {e}"
+                return
+
+            sent: dict[int, float] = {}
+            for item in acct_items:
+                ticket = int(item["ticket"])
+                pos = snapshot.get(ticket)
+                if pos is None:
+                    err_map[ticket] = "No se encontró la posición"
+                    continue
+                symbol = pos.symbol
+                info = infos.get(symbol)
+                if not info:
+                    err_map[ticket] = "No se encontró info de símbolo"
+                    continue
+                point = float(getattr(info, "point", 0.0))
+                is_buy = (int(getattr(pos, "type", 0)) == 0)
+                new_sl = self._clamp_sl(symbol, info, pos, float(item["sl"]), sl_max_pips)
+                tp = item.get("tp")
+                tp = float(getattr(pos, "tp", 0.0)) if tp is None else float(tp)
+                comment_tag = f"{provider_tag}-SLUPD-{reason}" if provider_tag else f"SLUPD-{reason}"
+                last_res = {}
+
+                async def _send(sl_value: float, ticket=ticket, pos=pos, symbol=symbol, info=info,
+                                point=point, is_buy=is_buy, tp=tp, comment_tag=comment_tag, last_res=last_res) -> bool:
+                    new_sl = sl_value
+                    for intento in range(reintentos):
+                        req = {
+                            "action": 6,  # TRADE_ACTION_SLTP
+                            "position": ticket,
+                            "symbol": symbol,
+                            "sl": float(new_sl),
+                            "tp": tp,
+                            "comment": self._safe_comment(comment_tag),
+                        }
+                        try:
+                            res = await loop.run_in_executor(None, client.order_send, req)
+                        except Exception as e:
+                            log.warning(f"[SL-BATCH][{name}] order_send excepción ticket={ticket}: {e}")
+                            res = None
+                        last_res["res"] = res
+                        log.debug(f"[SL-BATCH][{name}][{intento+1}/{reintentos}] ticket={ticket} req={req} res={repr(res)}")
+                        if res and getattr(res, "retcode", None) in (10009, 10008):
+                            last_res["sl"] = float(new_sl)
+                            return True
+                        # Si falla, alejar 1 pip sin superar sl_max_pips (igual que modify_sl)
+                        new_sl = new_sl - pips_to_price(symbol, 1, point) if is_buy else new_sl + pips_to_price(symbol, 1, point)
+                        new_sl = self._clamp_sl(symbol, info, pos, new_sl, sl_max_pips)
+                    return False
+
+                outcome = await self.sl_coalescer.submit(account, ticket, new_sl, _send, reason=reason)
+                if outcome == APPLIED:
+                    sent[ticket] = last_res.get("sl", float(new_sl))
+                elif outcome == SUPERSEDED:
+                    err_map[ticket] = "superseded: SL más reciente pendiente para el ticket"
+                else:
+                    res = last_res.get("res")
+                    err_map[ticket] = f"retcode={getattr(res, 'retcode', None)} {getattr(res, 'comment', None)}"
+
+            # Verificación única por cuenta con el SL que reporta el broker
+            if sent:
+                try:
+                    after = await loop.run_in_executor(None, client.positions_get)
+                    after_map = {int(getattr(p, "ticket", 0)): p for p in (after or [])}
+                except Exception as e:
+                    log.warning(f"[SL-BATCH][{name}] Verificación positions_get falló: {e}")
+                    after_map = {}
+                for ticket, sl_sent in sent.items():
+                    p = after_map.get(ticket)
+                    ok_map[ticket] = float(getattr(p, "sl", sl_sent)) if p is not None else sl_sent
+
+            if ok_map:
+                tickets_txt = ", ".join(f"{t}→{sl:.5f}" for t, sl in ok_map.items())
+                self._notify_bg(name, f"✅ SL actualizado ({reason}) | {len(ok_map)} ticket(s): {tickets_txt}")
+            if err_map:
+                errors_txt = ", ".join(f"{t}: {e}" for t, e in err_map.items())
+                self._notify_bg(name, f"❌ SL update falló ({reason}) | {errors_txt}")
+
+        outcomes = await asyncio.gather(
+            *(_modify_account(name, account, acct_items) for name, (account, acct_items) in by_account.items()),
+            return_exceptions=True,
+        )
+        for (name, (_, acct_items)), outcome in zip(by_account.items(), outcomes):
+            if isinstance(outcome, Exception):
+                log.error(f"[SL-BATCH][{name}] Excepción: {outcome}")
+                for item in acct_items:
+                    ticket = int(item["ticket"])
+                    if ticket not in updated.get(name, {}):
+                        errors.setdefault(name, {}).setdefault(ticket, f"Exception: {outcome}")
+        result = MT5ModifyResult(updated_by_account=updated, errors_by_account=errors)
+        log.info(f"[SL-BATCH] reason={reason} actualizados={result.updated_count} errores={result.error_count}")
+        return result
     def _safe_comment(self, tag: str) -> str:
         """
         Wrapper para safe_comment centralizado.
@@ -231,23 +418,25 @@ class MT5Executor:
         from .mt5_pool import MT5ClientPool
         return MT5ClientPool.get_for_account(account)
 
-    async def _apply_be(self, account: dict, ticket: int, be_offset_pips: Optional[float] = None, reason: str = "") -> bool:
+    async def _apply_be(self, account: dict, ticket: int, be_offset_pips: Optional[float] = None, reason: str = "") -> str:
         """
         Aplica break-even (BE) modificando el SL de la posición indicada.
         Loguea el SL actual antes y después, el SL propuesto y el stop_level del símbolo.
+        Devuelve el resultado del coalescedor: APPLIED, FAILED o SUPERSEDED (un SL más
+        reciente reemplazó al BE antes de enviarse; el BE no se aplicó).
         """
         import logging
         client = self._client_for(account)
         pos_list = client.positions_get(ticket=int(ticket))
         if not pos_list:
             self._notify_bg(account["name"], f"❌ BE falló | Ticket: {int(ticket)} | No se encontró la posición")
-            return False
+            return FAILED
         pos = pos_list[0]
         symbol = pos.symbol
         info = client.symbol_info(symbol)
         if not info:
             self._notify_bg(account["name"], f"❌ BE falló | Ticket: {int(ticket)} | No se encontró info de símbolo")
-            return False
+            return FAILED
         point = float(getattr(info, "point", 0.0))
         entry = float(getattr(pos, "price_open", 0.0))
         is_buy = (int(getattr(pos, "type", 0)) == 0)
@@ -271,11 +460,26 @@ class MT5Executor:
                 logging.info(f"[BE] SL BE ({be_sl}) está demasiado cerca del precio actual ({price_current}), máximo permitido: {max_sl}. Ajustando SL a {max_sl}")
                 be_sl = round(max_sl, 2 if symbol.upper().startswith("XAU") else 5)
 
-        req = {
-            "action": 6,  # TRADE_ACTION_SLTP
-            "position": int(ticket),
-            "sl": float(be_sl),
-        }
+        async def _send(sl_value: float) -> bool:
+            req = {
+                "action": 6,  # TRADE_ACTION_SLTP
+                "position": int(ticket),
+                "symbol": symbol,
+                "sl": float(sl_value),
+                "tp": float(getattr(pos, "tp", 0.0)),
+                "comment": self._safe_comment(f"BE-{reason}" if reason else "BE"),
+            }
+            res = await asyncio.get_running_loop().run_in_executor(None, client.order_send, req)
+            logging.debug(f"[BE] order_send req={req} res={repr(res)}")
+            return bool(res and getattr(res, "retcode", None) in (10009, 10008))
+
+        outcome = await self.sl_coalescer.submit(account, ticket, be_sl, _send, reason=f"BE-{reason}")
+        if outcome == SUPERSEDED:
+            # Una intención más nueva (trailing, etc.) reemplazó al BE antes de enviarse
+            logging.info(f"[BE] ticket={ticket} BE {be_sl} reemplazado por un SL más reciente")
+        elif outcome != APPLIED:
+            self._notify_bg(account["name"], f"❌ BE falló | Ticket: {int(ticket)} | SL: {be_sl:.5f}")
+        return outcome
 
     def find_recent_fast_trade(trades, symbol, account_name, direction, max_age_seconds=60):
             """
@@ -399,27 +603,47 @@ class MT5Executor:
         self.entry_wait_seconds = entry_wait_seconds
         self.entry_poll_ms = entry_poll_ms
         self.config_provider = config_provider
+        # Registro latest-wins de SL por ticket, compartido con TradeManager
+        try:
+            sl_min_interval_ms = float(config_provider.get("SL_MODIFY_MIN_INTERVAL_MS", 200)) if config_provider else 200.0
+        except Exception:
+            sl_min_interval_ms = 200.0
+        self.sl_coalescer = SLCoalescer(min_interval_sec=sl_min_interval_ms / 1000.0)
+        # Cotizaciones de market_ticks; tick_price contra el bridge sólo si no están frescas.
+        # market_data publica cada símbolo cada ~1 s (0.1 s por símbolo + 0.5 s de pausa):
+        # las cotas tienen que quedar holgadamente por encima o el cache casi nunca acierta.
+        try:
+            quote_max_age_ms = float(config_provider.get("QUOTE_MAX_AGE_MS", 3000)) if config_provider else 3000.0
+            self.entry_quote_max_age = float(config_provider.get("QUOTE_ENTRY_MAX_AGE_MS", 2000)) / 1000.0 if config_provider else 2.0
+        except Exception:
+            quote_max_age_ms, self.entry_quote_max_age = 3000.0, 2.0
+        self.quotes = QuoteCache(max_age_sec=quote_max_age_ms / 1000.0)
+
+    def tick_price(self, client, symbol: str, direction: str, max_age: Optional[float] = None) -> float:
+        """Precio desde QuoteCache (cota de frescura max_age) o, si no está fresco, desde el bridge."""
+        return self.quotes.tick_price(client, symbol, direction, max_age)
 
-    async def open_for_accounts(self, filtered_accounts: list[dict], *, provider_tag, symbol, direction, entry_range, sl, tps) -> "MT5OpenResult":
+    async def open_for_accounts(self, filtered_accounts: list[dict], *, provider_tag, symbol, direction, entry_range, sl, tps, trace: Optional[TraceContext] = None) -> "MT5OpenResult":
         """
         Ejecuta open_complete_trade usando un subconjunto de cuentas (filtered_accounts)
         en lugar de self.accounts. Evita crear una nueva instancia de MT5Executor por señal.
         """
         return await self.open_complete_trade(
             provider_tag, symbol, direction, entry_range, sl, tps,
-            _accounts=filtered_accounts,
+            _accounts=filtered_accounts, trace=trace,
         )
 
-    async def open_complete_trade(self, provider_tag, symbol, direction, entry_range, sl, tps, *, _accounts=None):
+    async def open_complete_trade(self, provider_tag, symbol, direction, entry_range, sl, tps, *, _accounts=None, trace: Optional[TraceContext] = None):
         tickets = {}
         errors = {}
+        traces = {}
 
         # _accounts permite que open_for_accounts pase un subset sin crear nueva instancia
         source_accounts = _accounts if _accounts is not None else self.accounts
 
         # Tomar snapshot de precio al inicio para referencia
         ref_client = self._client_for(source_accounts[0])
-        ref_price = ref_client.tick_price(symbol, direction)
+        ref_price = self.tick_price(ref_client, symbol, direction)
         ref_time = time.time()
 
         # Construir accounts con direction correcto para cada cuenta activa
@@ -467,6 +691,9 @@ class MT5Executor:
                 default_sl = getattr(self, 'default_sl_xauusd', 300) if symbol.upper().startswith('XAU') else getattr(self, 'default_sl', 100)
                 return calcular_sl_default(symbol, direction, price, point, default_sl)
             name = account["name"]
+            acct_trace = trace.fork(name) if trace is not None else None
+            if acct_trace is not None:
+                traces[name] = acct_trace
             try:
                 client = self._client_for(account)
                 client.symbol_select(symbol, True)
@@ -498,7 +725,7 @@ class MT5Executor:
                     point = float(getattr(symbol_info, "point", point))
 
                 if self.config_provider is not None:
-                    tolerance_pips = float(self.config_provider.get("TOLERANCE_PIPS", "30"))
+                    tolerance_pips = float(self.config_provider.setting("TOLERANCE_PIPS", 30.0))
                 else:
                     tolerance_pips = 30.0
                 # Para oro: tolerancia en precio (0.1 point/pip × 30 pips = 3.0)
@@ -510,7 +737,7 @@ class MT5Executor:
                     price = ref_price
                     log.info("[ENTRY] Usando precio de referencia fresco: %s age=%.3fs (%s)", price, age_ref, name)
                 else:
-                    price = client.tick_price(symbol, direction)
+                    price = self.tick_price(client, symbol, direction, self.entry_quote_max_age)
 
                 if price is None or price == 0.0:
                     log.error("[ENTRY][ERROR] No se pudo obtener precio para %s (%s). Abortando.", symbol, name)
@@ -544,7 +771,7 @@ class MT5Executor:
                         entered = False
                         while time.time() <= deadline:
                             await asyncio.sleep(entry_poll)
-                            price = client.tick_price(symbol, direction)
+                            price = self.tick_price(client, symbol, direction, self.entry_quote_max_age)
                             if price is None or price == 0.0:
                                 continue
                             if _price_in_range(price):
@@ -559,13 +786,15 @@ class MT5Executor:
                             return
                 else:
                     # Sin entry_range: ejecutar a mercado inmediatamente
-                    price = client.tick_price(symbol, direction)
+                    price = self.tick_price(client, symbol, direction, self.entry_quote_max_age)
                     if price is None or price == 0.0:
                         log.error("[ENTRY][ERROR] No se pudo obtener precio de mercado para %s (%s).", symbol, name)
                         return
 
                 entry_end = time.time()
                 log.info("[ENTRY] Latencia entrada %s: %.3fs", name, entry_end - entry_start)
+                if acct_trace is not None:
+                    acct_trace.mark(Hops.ENTRY_READY, ts=entry_end)
                 order_type = 0 if direction == "BUY" else 1
 
 
@@ -654,7 +883,11 @@ class MT5Executor:
                     "comment": self._safe_comment(provider_tag),
                     "type_time": 0,
                 }
+                if acct_trace is not None:
+                    acct_trace.mark(Hops.ORDER_SEND)
                 res = await self._best_filling_order_send(client, symbol, req, account.get('name'))
+                if acct_trace is not None:
+                    acct_trace.mark(Hops.ORDER_RESULT)
                 log.info(f"[ORDER_SEND][DEBUG][OPEN] Respuesta completa de order_send: {repr(res)}")
                 if res and getattr(res, "retcode", None) == 10009:
                     tickets[name] = int(getattr(res, "order", 0))
@@ -680,7 +913,7 @@ class MT5Executor:
                             import os
                             now = time.time()
                             try:
-                                window_seconds = int(self.config_provider.get('DEDUP_TTL_SECONDS', '120')) if self.config_provider else int(os.getenv('DEDUP_TTL_SECONDS', '120'))
+                                window_seconds = int(self.config_provider.setting('DEDUP_TTL_SECONDS', 120)) if self.config_provider else int(os.getenv('DEDUP_TTL_SECONDS', '120'))
                             except Exception:
                                 window_seconds = 120
                             # Logging: mostrar todos los trades candidatos
@@ -753,4 +986,4 @@ class MT5Executor:
                 log.error(f"[EXCEPTION] open_complete_trade failed acct={name}: {e}")
 
         await asyncio.gather(*(send_order_with_timeout(account) for account in accounts), return_exceptions=True)
-        return MT5OpenResult(tickets_by_account=tickets, errors_by_account=errors)
+        return MT5OpenResult(tickets_by_account=tickets, errors_by_account=errors, traces_by_account=traces)
@@ -33,16 +33,17 @@ class MT5ClientPool:
     _symbol_cache: dict[tuple[str, int, str], tuple] = {}  # (host, port, symbol) -> (info, ts)
 
     @classmethod
-    def get(cls, host: str, port: int) -> "PooledMT5Client":
+    def get(cls, host: str, port: int, bridge_port: Optional[int] = None) -> "PooledMT5Client":
         """
         Devuelve el cliente para (host, port), creandolo si no existe.
         El cliente se inicializa una sola vez y se reutiliza en llamadas posteriores.
+        bridge_port habilita las operaciones compuestas del bridge MT5Service.
         """
         key = (host, port)
         with cls._lock:
             if key not in cls._clients:
                 log.info("[MT5Pool] Creando cliente nuevo para %s:%s", host, port)
-                cls._clients[key] = PooledMT5Client(host, port)
+                cls._clients[key] = PooledMT5Client(host, port, bridge_port=bridge_port)
             return cls._clients[key]
 
     @classmethod
@@ -52,7 +53,7 @@ class MT5ClientPool:
             return account["client"]
         host = account.get("host", "localhost")
         port = int(account.get("port", 18812))
-        return cls.get(host, port)
+        return cls.get(host, port, bridge_port=account.get("bridge_port"))
 
     @classmethod
     def get_symbol_info(cls, host: str, port: int, symbol: str, client: "PooledMT5Client"):
@@ -104,11 +105,12 @@ class PooledMT5Client:
     MAX_RECONNECT_ATTEMPTS = 3
     RECONNECT_DELAY = 0.5  # segundos
 
-    def __init__(self, host: str, port: int):
+    def __init__(self, host: str, port: int, bridge_port: Optional[int] = None):
         from .mt5_client import MT5Client
         self.host = host
         self.port = port
-        self._client = MT5Client(host, port)
+        self.bridge_port = bridge_port
+        self._client = MT5Client(host, port, bridge_port=bridge_port)
         self._lock = threading.Lock()
         log.info("[PooledMT5Client] Inicializado %s:%s", host, port)
 
@@ -123,7 +125,7 @@ class PooledMT5Client:
             try:
                 log.warning("[PooledMT5Client] Reconectando %s:%s (intento %d/%d)",
                             self.host, self.port, attempt, self.MAX_RECONNECT_ATTEMPTS)
-                self._client = MT5Client(self.host, self.port)
+                self._client = MT5Client(self.host, self.port, bridge_port=self.bridge_port)
                 log.info("[PooledMT5Client] Reconectado %s:%s", self.host, self.port)
                 return True
             except Exception as e:
@@ -173,3 +175,14 @@ class PooledMT5Client:
 
     def get_pip_size(self, symbol: str) -> float:
         return self._call("get_pip_size", symbol)
+
+    # ---- Operaciones compuestas del bridge ----
+
+    def supports_composite(self) -> bool:
+        return self._client.supports_composite()
+
+    def close_partial(self, ticket: int, percent: float) -> tuple:
+        return self._call("close_partial", ticket, percent)
+
+    def move_sl_verified(self, ticket: int, sl: float, tp: Optional[float] = None) -> tuple:
+        return self._call("move_sl_verified", ticket, sl, tp)
@@ -4,9 +4,32 @@ Centraliza toda la lógica de notificaciones por Telegram para el trade orchestr
 Incluye adaptadores y helpers para desacoplar la gestión de notificaciones del resto de la lógica de trading.
 """
 
+import inspect
 import logging
 from typing import Any
 
+# Eventos que no esperan la ventana del digest / que se reemplazan por el último (por ticket)
+URGENT_EVENTS = frozenset({'sl', 'error'})
+COLLAPSE_EVENTS = frozenset({'trailing'})
+
+
+def _accepted_opts(fn, opts: dict) -> dict:
+    """
+    Filtra opts a lo que acepta la firma de fn: los notificadores con firma
+    (chat_id, message) reciben el mensaje sin opts en vez de fallar con TypeError.
+    """
+    if not opts:
+        return opts
+    try:
+        params = inspect.signature(fn).parameters.values()
+    except (TypeError, ValueError):
+        return {}
+    if any(p.kind is inspect.Parameter.VAR_KEYWORD for p in params):
+        return opts
+    names = {p.name for p in params}
+    return {k: v for k, v in opts.items() if k in names}
+
+
 class TelegramNotifierAdapter:
     """
     Adaptador para notificaciones Telegram desacoplado de la lógica de gestión.
@@ -16,10 +39,11 @@ class TelegramNotifierAdapter:
         self.notifier = notifier
         self.log = logging.getLogger("trade_orchestrator.notifications.telegram")
 
-    async def notify(self, target: str | int, message: str):
+    async def notify(self, target: str | int, message: str, **opts: Any):
         """
         target: puede ser el nombre de la cuenta (str) o el chat_id (int o str numérico)
-        Si es un nombre de cuenta, busca el chat_id usando Settings.accounts().
+        opts: urgent / collapse_key para el digest del notificador (ver notify_digest)
+        Si es un nombre de cuenta, busca el chat_id usando Settings.accounts_async() (pool, sin bloquear el loop).
         Si es un chat_id numérico, lo usa directamente.
         """
         from services.common.config import Settings
@@ -30,7 +54,7 @@ class TelegramNotifierAdapter:
         else:
             account_name = target
             try:
-                accounts_list = Settings.accounts()
+                accounts_list = await Settings.accounts_async()
             except Exception:
                 accounts_list = []
             for acct in accounts_list:
@@ -44,20 +68,34 @@ class TelegramNotifierAdapter:
             self.log.info(f"[NOTIFY][{account_name or chat_id}] {message}")
             return
         try:
-            if hasattr(self.notifier, 'notify') and callable(getattr(self.notifier, 'notify')):
-                await self.notifier.notify(str(chat_id), message)
-            else:
-                await self.notifier(str(chat_id), message)
+            await self._send(str(chat_id), message, opts)
         except Exception as e:
             self.log.error(f"[NOTIFY][ERROR] {account_name or chat_id}: {e}")
 
+    async def _send(self, chat_id: str, message: str, opts: dict) -> None:
+        # opts sólo a quien los acepta: otros notificadores reciben únicamente (chat_id, message)
+        if hasattr(self.notifier, 'notify') and callable(getattr(self.notifier, 'notify')):
+            send = self.notifier.notify
+        else:
+            send = self.notifier
+        await send(chat_id, message, **_accepted_opts(send, opts))
+
+    @staticmethod
+    def event_opts(event: str, **kwargs: Any) -> dict:
+        """Clasificación para el digest: SL urgente; trailing se colapsa por ticket."""
+        if event in URGENT_EVENTS:
+            return {"urgent": True}
+        if event in COLLAPSE_EVENTS and kwargs.get('ticket') is not None:
+            return {"collapse_key": (event, int(kwargs['ticket']))}
+        return {}
+
     async def notify_trade_event(self, event: str, **kwargs: Any):
         from services.common.config import Settings
         account_name = kwargs.get('account_name')
         msg = self.format_event_message(event, **kwargs)
         chat_id = None
         try:
-            accounts_list = Settings.accounts()
+            accounts_list = await Settings.accounts_async()
         except Exception:
             accounts_list = []
         for acct in accounts_list:
@@ -71,10 +109,7 @@ class TelegramNotifierAdapter:
             self.log.info(f"[NOTIFY][{account_name}] {msg}")
             return
         try:
-            if hasattr(self.notifier, 'notify') and callable(getattr(self.notifier, 'notify')):
-                await self.notifier.notify(str(chat_id), msg)
-            else:
-                await self.notifier(str(chat_id), msg)
+            await self._send(str(chat_id), msg, self.event_opts(event, **kwargs))
         except Exception as e:
             self.log.error(f"[NOTIFY][ERROR] {account_name}: {e}")
 
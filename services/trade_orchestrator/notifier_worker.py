@@ -0,0 +1,51 @@
+"""
+notifier_worker: entrega las notificaciones del outbox (Streams.NOTIFY) a
+telegram_ingestor, fuera del proceso de trading (ver services/common/notify_outbox.py).
+
+Consumer group propio (notifier_group) creado desde "0": lo que el orchestrator encoló
+mientras el worker estaba detenido se entrega al arrancar. NOTIFIER_CONSUMER debe ser
+estable entre reinicios para recuperar los pendientes.
+"""
+import os
+import asyncio
+import logging
+
+from services.common.config import Settings, config
+from services.common.notify_outbox import OUTBOX_GROUP, NotifyWorker
+from services.common.redis_streams import Streams, create_consumer_group, redis_client
+from services.common.telegram_notifier import RemoteTelegramNotifier
+
+container_label = os.getenv("CONTAINER_LABEL") or os.getenv("HOSTNAME") or "notifier_worker"
+log_fmt = f"%(asctime)s %(levelname)s [{container_label}] %(name)s: %(message)s"
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format=log_fmt)
+log = logging.getLogger("notifier_worker")
+
+
+async def main():
+    s = Settings.load()
+    # Conexión binaria: los eventos del outbox son msgpack
+    r = await redis_client(s["redis_url"], binary=True)
+    await create_consumer_group(r, Streams.NOTIFY, OUTBOX_GROUP)
+    # El worker agrupa por lote él mismo: sin ventana de batch ni digest en el cliente HTTP
+    sender = RemoteTelegramNotifier(
+        config.get("TELEGRAM_INGESTOR_URL", "http://telegram_ingestor:8000"),
+        batch_window_ms=0,
+        digest_window_ms=0,
+        batch_max=int(config.get("NOTIFY_BATCH_MAX", 50)),
+    )
+    worker = NotifyWorker(
+        r,
+        sender,
+        consumer=os.getenv("NOTIFIER_CONSUMER", "notifier-1"),
+        max_attempts=int(config.get("NOTIFY_MAX_ATTEMPTS", 6)),
+        max_backoff=float(config.get("NOTIFY_MAX_BACKOFF_SEC", 60)),
+    )
+    log.info("[NOTIFY][WORKER] consumiendo %s (%s/%s)", Streams.NOTIFY, OUTBOX_GROUP, worker.consumer)
+    try:
+        await worker.run()
+    finally:
+        await sender.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
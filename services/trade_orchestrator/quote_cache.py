@@ -0,0 +1,147 @@
+"""
+quote_cache.py
+Cache en proceso de cotizaciones alimentada por market_ticks.
+
+Problema previo: market_data publica market_ticks cada ~0.5 s pero nadie lo leía.
+handle_signal (SL de FAST, chequeo de TP1) y la espera de entrada de
+open_complete_trade hacían tick_price contra el bridge: un RPC por consulta, varios
+por segundo durante cada espera de entrada.
+
+Solucion:
+  - QuoteCache.run() lee market_ticks con XREAD (sin consumer group: cada instancia
+    necesita todos los ticks) y guarda el último bid/ask por símbolo.
+  - Arranque en frío: market_data también deja el último valor en el hash
+    market_quotes, que warm_start() carga antes de empezar a leer el stream.
+  - Cada consulta trae su cota de frescura (max_age). Si la cotización cacheada es
+    más vieja, tick_price() cae al bridge como antes.
+
+La edad de un tick es la del ID del stream (hora del XADD en Redis), no el campo time
+de MT5, que viene en la zona horaria del servidor del broker.
+
+Cada tick trae source (host:port del bridge que lo leyó; hoy market_data sólo lee
+mt5_acct1). Las cotizaciones se guardan por (source, símbolo) y una consulta sólo usa
+las del mismo bridge que el cliente: otra cuenta / otro broker puede tener otro
+precio, así que sus consultas siguen yendo a su bridge. Ticks sin source se ignoran.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import Counter
+
+from services.common.redis_streams import Streams
+
+log = logging.getLogger("trade_orchestrator.quote_cache")
+
+QUOTE_LOOKUPS = Counter('quote_cache_lookups_total', 'Consultas de precio por resultado', ['result'])
+
+
+@dataclass
+class Quote:
+    bid: float
+    ask: float
+    ts: float  # epoch s
+
+    def price(self, direction: str) -> float:
+        return self.ask if str(direction).upper() == "BUY" else self.bid
+
+
+def quote_source(client) -> Optional[str]:
+    """host:port del bridge del cliente, con el mismo formato que el campo source de los ticks."""
+    host, port = getattr(client, "host", None), getattr(client, "port", None)
+    if not isinstance(host, str) or port is None:
+        return None
+    try:
+        return f"{host}:{int(port)}"
+    except (TypeError, ValueError):
+        return None
+
+
+def _ts_from_id(msg_id) -> float:
+    if isinstance(msg_id, (bytes, bytearray)):
+        msg_id = msg_id.decode()
+    return int(str(msg_id).split("-", 1)[0]) / 1000.0
+
+
+class QuoteCache:
+    def __init__(self, max_age_sec: float = 3.0):
+        self.max_age_sec = float(max_age_sec)
+        self._quotes: Dict[Tuple[str, str], Quote] = {}
+
+    def update(self, source: Optional[str], symbol: str, bid, ask, ts: float) -> None:
+        if not source:
+            return
+        try:
+            bid, ask = float(bid), float(ask)
+        except (TypeError, ValueError):
+            return
+        if bid <= 0 or ask <= 0:
+            return
+        key = (str(source), str(symbol).upper())
+        current = self._quotes.get(key)
+        if current is None or ts >= current.ts:
+            self._quotes[key] = Quote(bid=bid, ask=ask, ts=ts)
+
+    def get(self, source: Optional[str], symbol: str, max_age: Optional[float] = None, now: Optional[float] = None) -> Optional[Quote]:
+        """Cotización del bridge source si existe y tiene a lo sumo max_age segundos (default del cache)."""
+        q = self._quotes.get((str(source), str(symbol).upper()))
+        if q is None:
+            return None
+        limit = self.max_age_sec if max_age is None else float(max_age)
+        if (time.time() if now is None else now) - q.ts > limit:
+            return None
+        return q
+
+    def tick_price(self, client, symbol: str, direction: str, max_age: Optional[float] = None) -> float:
+        """Precio BUY=ask / SELL=bid desde el cache (mismo bridge que client); si no está fresco, desde el bridge."""
+        source = quote_source(client)
+        q = self._quotes.get((str(source), str(symbol).upper()))
+        fresh = self.get(source, symbol, max_age)
+        if fresh is not None:
+            QUOTE_LOOKUPS.labels(result="hit").inc()
+            return fresh.price(direction)
+        QUOTE_LOOKUPS.labels(result="stale" if q is not None else "miss").inc()
+        return client.tick_price(symbol, direction)
+
+    def apply_tick(self, msg_id, fields: dict) -> None:
+        symbol = fields.get("symbol")
+        if symbol:
+            self.update(fields.get("source"), symbol, fields.get("bid"), fields.get("ask"), _ts_from_id(msg_id))
+
+    async def warm_start(self, r) -> int:
+        """Carga el último valor por símbolo desde el hash market_quotes."""
+        try:
+            data = await r.hgetall(Streams.QUOTES)
+        except Exception as e:
+            log.warning("[QUOTES] No se pudo leer %s: %s", Streams.QUOTES, e)
+            return 0
+        for symbol, raw in (data or {}).items():
+            try:
+                q = json.loads(raw)
+                self.update(q.get("source"), symbol, q.get("bid"), q.get("ask"), float(q.get("ts", 0)))
+            except Exception:
+                continue
+        log.info("[QUOTES] Arranque en frío: %d símbolos desde %s", len(self._quotes), Streams.QUOTES)
+        return len(self._quotes)
+
+    async def run(self, r, block_ms: int = 2000, count: int = 200) -> None:
+        """Sigue market_ticks desde el final del stream."""
+        await self.warm_start(r)
+        last_id = "$"
+        while True:
+            try:
+                resp = await r.xread({Streams.TICKS: last_id}, block=block_ms, count=count)
+                for _, entries in resp or []:
+                    for msg_id, fields in entries:
+                        last_id = msg_id
+                        self.apply_tick(msg_id, fields or {})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("[QUOTES] Error leyendo %s: %s", Streams.TICKS, e)
+                await asyncio.sleep(1)
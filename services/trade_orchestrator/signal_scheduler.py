@@ -0,0 +1,142 @@
+"""
+signal_scheduler.py
+Ejecución concurrente de señales con orden por carril.
+
+Problema previo: loop_signals hacía await de handle_signal mensaje a mensaje. Una
+señal esperando entrada (5-60 s dentro de open_complete_trade) bloqueaba todas las
+siguientes, aunque fueran de otro proveedor o símbolo.
+
+Solucion:
+  - Cada señal va a un carril (symbol, direction, proveedor). Dentro del carril se
+    ejecutan en orden de llegada, una a la vez; carriles distintos corren en paralelo.
+    El proveedor es el canal de origen (chat_id): así la señal FAST y la completa que
+    la actualiza (GB_FAST -> GB_LONG, mismo canal) comparten carril y el upgrade ve el
+    trade FAST ya registrado. Sin chat_id se usa provider_tag.
+  - Límite global de handlers simultáneos (SIGNAL_MAX_CONCURRENCY).
+  - Límite de señales en cola (SIGNAL_MAX_QUEUED): submit() espera cuando se llena, lo
+    que frena la lectura del stream (backpressure) en vez de acumular en memoria.
+  - Prioridad de gestión: mientras corre un mensaje de gestión (priority()), ninguna
+    señal nueva empieza; las que ya están en curso siguen.
+  - on_done(ok) se llama al terminar cada señal (el consumidor hace el XACK ahí).
+
+Métricas: profundidad por carril, handlers en curso y espera en cola.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from prometheus_client import Gauge, Histogram
+
+log = logging.getLogger("trade_orchestrator.signal_scheduler")
+
+LANE_DEPTH = Gauge('signal_lane_depth', 'Señales en cola (incluida la que corre) por carril', ['lane'])
+SIGNALS_RUNNING = Gauge('signal_scheduler_running', 'Handlers de señal ejecutándose')
+SIGNALS_QUEUED = Gauge('signal_scheduler_queued', 'Señales aceptadas aún no terminadas')
+QUEUE_WAIT = Histogram(
+    'signal_scheduler_wait_seconds', 'Espera desde submit hasta que el handler empieza',
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 120),
+)
+
+Job = Callable[[], Awaitable[None]]
+DoneFn = Callable[[bool], Awaitable[None]]
+
+
+def lane_key(sig) -> Tuple[str, str, str]:
+    provider = str(getattr(sig, "chat_id", "") or "") or str(getattr(sig, "provider_tag", "") or "")
+    return (str(sig.symbol or "").upper(), str(sig.direction or "").upper(), provider)
+
+
+class SignalScheduler:
+    def __init__(self, max_concurrency: int = 4, max_queued: int = 200):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queued = max(1, int(max_queued))
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._capacity = asyncio.Semaphore(self.max_queued)
+        self._lanes: Dict[Tuple[str, str, str], Deque[Tuple[Job, Optional[DoneFn], float]]] = {}
+        self._workers: Dict[Tuple[str, str, str], asyncio.Task] = {}
+        self._priority_active = 0
+        self._priority_idle = asyncio.Event()
+        self._priority_idle.set()
+        self._queued = 0
+
+    @staticmethod
+    def _label(key) -> str:
+        return ":".join(key)
+
+    async def submit(self, key, job: Job, on_done: Optional[DoneFn] = None) -> None:
+        """
+        Encola job en su carril y vuelve enseguida (sólo espera si la cola global está llena).
+        """
+        await self._capacity.acquire()
+        self._queued += 1
+        SIGNALS_QUEUED.set(self._queued)
+        lane = self._lanes.setdefault(key, deque())
+        lane.append((job, on_done, time.monotonic()))
+        LANE_DEPTH.labels(lane=self._label(key)).set(len(lane))
+        worker = self._workers.get(key)
+        if worker is None or worker.done():
+            self._workers[key] = asyncio.create_task(self._run_lane(key))
+
+    async def _run_lane(self, key) -> None:
+        lane = self._lanes[key]
+        label = self._label(key)
+        try:
+            while lane:
+                job, on_done, enqueued = lane[0]
+                ok = False
+                await self._priority_idle.wait()
+                async with self._slots:
+                    # La gestión pudo empezar mientras se esperaba un slot
+                    await self._priority_idle.wait()
+                    QUEUE_WAIT.observe(time.monotonic() - enqueued)
+                    SIGNALS_RUNNING.inc()
+                    try:
+                        await job()
+                        ok = True
+                    except Exception as e:
+                        log.exception("[SCHED] Error en carril %s: %s", label, e)
+                    finally:
+                        SIGNALS_RUNNING.dec()
+                lane.popleft()
+                self._queued -= 1
+                SIGNALS_QUEUED.set(self._queued)
+                self._capacity.release()
+                LANE_DEPTH.labels(lane=label).set(len(lane))
+                if on_done is not None:
+                    try:
+                        await on_done(ok)
+                    except Exception as e:
+                        log.error("[SCHED] on_done falló en carril %s: %s", label, e)
+        finally:
+            if not lane:
+                self._lanes.pop(key, None)
+                self._workers.pop(key, None)
+                try:
+                    LANE_DEPTH.remove(label)
+                except KeyError:
+                    pass
+
+    @asynccontextmanager
+    async def priority(self):
+        """Bloquea el arranque de señales nuevas mientras dura (mensajes de gestión)."""
+        self._priority_active += 1
+        self._priority_idle.clear()
+        try:
+            yield
+        finally:
+            self._priority_active -= 1
+            if self._priority_active == 0:
+                self._priority_idle.set()
+
+    def depth(self, key) -> int:
+        return len(self._lanes.get(key, ()))
+
+    async def drain(self) -> None:
+        """Espera a que terminen todos los carriles (tests / apagado)."""
+        while self._workers:
+            await asyncio.gather(*list(self._workers.values()), return_exceptions=True)
@@ -0,0 +1,168 @@
+"""
+sl_coalescer.py
+Registro de "SL deseado" por ticket — siempre gana la intención más reciente.
+
+Problema previo: trailing (_maybe_trailing), BE (_do_be, _apply_be, _move_sl_to_be),
+BE-PNL (_move_sl) y los upgrades FAST->COMPLETE podían mandar modificaciones de SL
+para el mismo ticket en el mismo instante. Varias eran create_task fire-and-forget,
+así que competían entre sí: llamadas al bridge desperdiciadas y, en el peor caso,
+un SL viejo pisando a uno más nuevo.
+
+Solucion:
+  - Un único worker por ticket serializa los envíos; nunca hay dos order_send de SL
+    simultáneos para la misma posición.
+  - Mientras hay un envío en vuelo, las nuevas intenciones sólo reemplazan a la
+    pendiente (latest-wins). La intención reemplazada se resuelve como SUPERSEDED
+    sin tocar el bridge.
+  - Una intención igual al SL en vuelo o al último SL aplicado no genera otro envío.
+  - Rate limit por bridge (host:port): intervalo mínimo entre modificaciones de SL.
+    La intención a enviar se toma DESPUÉS de esperar el turno, así que la espera
+    también sirve para absorber intenciones intermedias.
+
+Cada intención trae su propia función de envío (send(sl) -> bool), de modo que cada
+llamador conserva su lógica (filling modes, verificación, notificaciones).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from prometheus_client import Counter
+
+log = logging.getLogger("trade_orchestrator.sl_coalescer")
+
+SL_INTENTS = Counter('sl_intents_total', 'Intenciones de modificación de SL por resultado', ['outcome'])
+
+APPLIED = "applied"
+FAILED = "failed"
+SUPERSEDED = "superseded"
+
+_SL_EPSILON = 1e-9
+
+SendFn = Callable[[float], Awaitable[bool]]
+
+
+@dataclass
+class _SLIntent:
+    sl: float
+    send: SendFn
+    reason: str
+    waiters: list = field(default_factory=list)
+
+
+@dataclass
+class _TicketState:
+    pending: Optional[_SLIntent] = None
+    inflight: Optional[_SLIntent] = None
+    applied_sl: Optional[float] = None
+    worker: Optional[asyncio.Task] = None
+    forgotten: bool = False
+
+
+class SLCoalescer:
+    """
+    Coalescedor de modificaciones de SL por ticket con rate limit por bridge.
+    Uso:
+        outcome = await coalescer.submit(account, ticket, new_sl, send, reason="TRAIL")
+        if outcome == APPLIED: ...
+    """
+
+    def __init__(self, min_interval_sec: float = 0.2):
+        self.min_interval_sec = float(min_interval_sec)
+        self._tickets: dict[tuple, _TicketState] = {}
+        # Próximo turno libre por bridge (time.monotonic)
+        self._bridge_next_slot: dict[tuple, float] = {}
+
+    @staticmethod
+    def _bridge_key(account: dict) -> tuple:
+        if account.get("host") is not None:
+            return (account.get("host"), int(account.get("port", 18812)))
+        # Cuentas con cliente inyectado (tests / clientes custom): un bridge por nombre
+        return ("account", account.get("name"))
+
+    async def submit(self, account: dict, ticket: int, sl: float, send: SendFn, reason: str = "") -> str:
+        """
+        Registra el SL deseado para el ticket y espera el resultado de SU intención:
+        APPLIED, FAILED o SUPERSEDED (reemplazada por una más nueva antes de enviarse).
+        """
+        bridge = self._bridge_key(account)
+        key = (bridge, int(ticket))
+        state = self._tickets.setdefault(key, _TicketState())
+        state.forgotten = False
+        sl = float(sl)
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+
+        if state.pending is None and state.inflight is not None and abs(state.inflight.sl - sl) < _SL_EPSILON:
+            # Mismo SL que el envío en curso: compartir su resultado
+            state.inflight.waiters.append(fut)
+            return await fut
+        if state.pending is None and state.inflight is None and state.applied_sl is not None and abs(state.applied_sl - sl) < _SL_EPSILON:
+            SL_INTENTS.labels(outcome="noop").inc()
+            return APPLIED
+
+        if state.pending is not None:
+            if abs(state.pending.sl - sl) < _SL_EPSILON:
+                state.pending.waiters.append(fut)
+                return await fut
+            log.debug("[SL-COALESCE] ticket=%s %s SL=%s reemplazado por %s SL=%s",
+                      ticket, state.pending.reason, state.pending.sl, reason, sl)
+            self._resolve(state.pending, SUPERSEDED)
+        state.pending = _SLIntent(sl=sl, send=send, reason=reason, waiters=[fut])
+
+        if state.worker is None or state.worker.done():
+            state.worker = asyncio.create_task(self._drain(key, bridge, state))
+        return await fut
+
+    def forget(self, account: dict, ticket: int) -> None:
+        """
+        Libera el estado de un ticket cerrado. Si todavía tiene un envío en curso o
+        pendiente, el worker lo libera al terminar.
+        """
+        key = (self._bridge_key(account), int(ticket))
+        state = self._tickets.get(key)
+        if state is None:
+            return
+        if state.pending is None and state.inflight is None:
+            self._tickets.pop(key, None)
+        else:
+            state.forgotten = True
+
+    async def _wait_bridge_slot(self, bridge: tuple) -> None:
+        # El turno se reserva sin await de por medio (no hace falta lock) y la espera
+        # ocurre después: un ticket esperando no frena el cálculo de los demás.
+        now = time.monotonic()
+        slot = max(now, self._bridge_next_slot.get(bridge, now))
+        self._bridge_next_slot[bridge] = slot + self.min_interval_sec
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _drain(self, key: tuple, bridge: tuple, state: _TicketState) -> None:
+        while state.pending is not None:
+            await self._wait_bridge_slot(bridge)
+            intent, state.pending = state.pending, None
+            if intent is None:
+                break
+            state.inflight = intent
+            try:
+                ok = bool(await intent.send(intent.sl))
+            except Exception as e:
+                log.error("[SL-COALESCE] ticket=%s reason=%s SL=%s excepción: %s", key[1], intent.reason, intent.sl, e)
+                ok = False
+            finally:
+                state.inflight = None
+            if ok:
+                state.applied_sl = intent.sl
+            self._resolve(intent, APPLIED if ok else FAILED)
+        if state.forgotten and self._tickets.get(key) is state:
+            self._tickets.pop(key, None)
+
+    @staticmethod
+    def _resolve(intent: _SLIntent, outcome: str) -> None:
+        SL_INTENTS.labels(outcome=outcome).inc()
+        for fut in intent.waiters:
+            if not fut.done():
+                fut.set_result(outcome)
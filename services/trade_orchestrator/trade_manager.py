@@ -1,5 +1,6 @@
 from .trade_utils import pips_to_price, safe_comment, valor_pip, calcular_sl_por_pnl, calcular_volumen_parcial, calcular_trailing_retroceso, calcular_sl_default
 from .mt5_executor import MT5Executor
+from .sl_coalescer import SLCoalescer, APPLIED, SUPERSEDED
 from .notifications.telegram import TelegramNotifierAdapter
 import asyncio
 import time
@@ -10,6 +11,7 @@ import os
 from enum import Enum
 from . import mt5_constants as mt5
 from .mt5_client import MT5Client
+from services.common.redis_streams import MgmtAction
 from prometheus_client import Counter, Gauge
 import logging
 import datetime
@@ -314,8 +316,8 @@ class TradeManager:
             trade.first_tramo_close_price = None
         if trade.tps:
             return
-        tramo_pips = float(self.config_provider.get('SCALING_TRAMO_PIPS', getattr(self, 'scaling_tramo_pips', 40.0)))
-        percent_per_tramo = float(self.config_provider.get('SCALING_PERCENT_PER_TRAMO', getattr(self, 'scaling_percent_per_tramo', 25)))
+        tramo_pips = float(self.config_provider.setting('SCALING_TRAMO_PIPS', getattr(self, 'scaling_tramo_pips', 40.0)))
+        percent_per_tramo = float(self.config_provider.setting('SCALING_PERCENT_PER_TRAMO', getattr(self, 'scaling_percent_per_tramo', 25)))
         entry = trade.entry_price if trade.entry_price is not None else float(pos.price_open)
         symbol = trade.symbol.upper() if hasattr(trade, 'symbol') else ''
         client = self.mt5._client_for(account)
@@ -380,6 +382,7 @@ class TradeManager:
         await self.notify_trade_event(
             'trailing',
             account_name=account["name"],
+            ticket=int(pos.ticket),
             message=f"🔄 Trailing actualizado | Ticket: {int(pos.ticket)} | SL: {new_sl:.5f}"
         )
 
@@ -493,6 +496,12 @@ class TradeManager:
         self.notifier = notifier
         self.trades = {}
         self.group_addon_count = {}
+        # Registro latest-wins de SL por ticket: se comparte con el executor si lo tiene
+        self.sl_coalescer = getattr(self.mt5, "sl_coalescer", None)
+        if not isinstance(self.sl_coalescer, SLCoalescer):
+            self.sl_coalescer = SLCoalescer()
+        # Envíos de SL lanzados en background (referencia fuerte hasta que terminan)
+        self._sl_tasks = set()
 
         # --- Redis connection for PnL tracking ---
         # Already set in __init__
@@ -600,6 +609,23 @@ class TradeManager:
             if remaining > 0:
                 await asyncio.sleep(remaining)
 
+    def _spawn_sl(self, coro):
+        """
+        Lanza un envío de SL sin bloquear al llamador (el loop de gestión no espera
+        el turno del rate limit del bridge).
+        """
+        task = asyncio.create_task(coro)
+        self._sl_tasks.add(task)
+        task.add_done_callback(self._sl_tasks.discard)
+        return task
+
+    def _drop_trade(self, account, ticket):
+        """
+        Deja de seguir un trade cerrado y libera su estado en el coalescedor de SL.
+        """
+        self.trades.pop(ticket, None)
+        self.sl_coalescer.forget(account, ticket)
+
     async def _tick_once_account(self, account):
         """
         Gestiona los trades de una sola cuenta (idéntico a la lógica previa de _tick_once, pero por cuenta).
@@ -615,7 +641,7 @@ class TradeManager:
                 # Si no hay posiciones, limpia los trades registrados para esta cuenta
                 for ticket in list(self.trades.keys()):
                     if self.trades[ticket].account_name == account["name"]:
-                        del self.trades[ticket]
+                        self._drop_trade(account, ticket)
                 return
 
             pos_by_ticket = {p.ticket: p for p in positions}
@@ -626,10 +652,7 @@ class TradeManager:
                 if trade.account_name != account["name"]:
                     continue
                 if ticket not in pos_by_ticket:
-                    try:
-                        del self.trades[ticket]
-                    except KeyError:
-                        pass
+                    self._drop_trade(account, ticket)
             try:
                 ACTIVE_TRADES.set(len(self.trades))
             except Exception:
@@ -702,7 +725,7 @@ class TradeManager:
                     # Si no hay posiciones, limpia los trades registrados para esta cuenta
                     for ticket in list(self.trades.keys()):
                         if self.trades[ticket].account_name == account["name"]:
-                            del self.trades[ticket]
+                            self._drop_trade(account, ticket)
                     continue
 
                 pos_by_ticket = {p.ticket: p for p in positions}
@@ -721,10 +744,7 @@ class TradeManager:
                             await self.notify_manual_close(account, t, t)
                         except Exception:
                             pass
-                        try:
-                            del self.trades[ticket]
-                        except KeyError:
-                            pass
+                        self._drop_trade(account, ticket)
                 try:
                     ACTIVE_TRADES.set(len(self.trades))
                 except Exception:
@@ -926,69 +946,93 @@ class TradeManager:
         log.info(f"[BE-DEBUG] BE calculation ajustado | entry_price={entry_price} spread={spread} offset={offset} is_buy={is_buy} => BE={be_attempt}")
         log.info(f"[BE-DEBUG] BE calculation | entry_price={entry_price} spread={spread} offset={offset} is_buy={is_buy} => BE={be}")
         # --- Probar todos los filling modes para modificar SL (BE) ---
+        # El envío pasa por el coalescedor: si trailing u otro BE piden un SL más nuevo
+        # para el mismo ticket, éste se descarta sin tocar el bridge.
         supported_filling_modes = [1, 3, 2]  # IOC, FOK, RETURN
-        be_applied = False
-        for type_filling in supported_filling_modes:
-            pos_info = client.positions_get(ticket=int(ticket))
-            if not pos_info or len(pos_info) == 0:
-                log.error(f"[BE-DEBUG] No se pudo obtener info de la posición para modificar SL | ticket={ticket}")
-                continue
-            pos0 = pos_info[0]
-            req = {
-                "action": 6,  # TRADE_ACTION_SLTP (MT5)
-                "position": int(ticket),
-                "sl": float(be_attempt),
-                "tp": float(getattr(pos0, 'tp', 0.0)),
-                "comment": self._safe_comment("BE-general"),
-                "type_filling": type_filling
-            }
-            log.info(f"[BE-DEBUG] Enviando order_send | req={req}")
-            res = client.order_send(req)
-            log.info(f"[BE-DEBUG] Resultado order_send | res={res}")
-            if res and getattr(res, "retcode", None) == 10009:
-                await asyncio.sleep(1)
-                pos_check = client.positions_get(ticket=int(ticket))
-                sl_actual = None
-                if pos_check and len(pos_check) > 0:
-                    sl_actual = float(getattr(pos_check[0], 'sl', 0.0))
-                if sl_actual is not None and abs(sl_actual - float(be_attempt)) < 1e-4:
-                    self._notify_bg(account["name"], f"✅ BE aplicado | Ticket: {int(ticket)} | SL: {be_attempt:.5f}")
-                    log.info("[TM] BE applied ticket=%s sl=%.5f", int(ticket), be_attempt)
+        be_failure_notified = False
+
+        async def _send_be(sl_value: float) -> bool:
+            nonlocal be_failure_notified
+            if getattr(client, "supports_composite", lambda: False)():
+                # Bridge con operaciones compuestas: envío + verificación en un solo round-trip
+                try:
+                    ok, retcode, sl_applied, msg = await asyncio.get_running_loop().run_in_executor(
+                        None, client.move_sl_verified, int(ticket), float(sl_value)
+                    )
+                    log.info(f"[BE-DEBUG] move_sl_verified | ok={ok} retcode={retcode} sl={sl_applied} msg={msg}")
+                    return bool(ok)
+                except Exception as e:
+                    log.warning(f"[BE-DEBUG] move_sl_verified en bridge falló ({e}). Usando camino clásico.")
+            for type_filling in supported_filling_modes:
+                pos_info = client.positions_get(ticket=int(ticket))
+                if not pos_info or len(pos_info) == 0:
+                    log.error(f"[BE-DEBUG] No se pudo obtener info de la posición para modificar SL | ticket={ticket}")
+                    continue
+                pos0 = pos_info[0]
+                req = {
+                    "action": 6,  # TRADE_ACTION_SLTP (MT5)
+                    "position": int(ticket),
+                    "sl": float(sl_value),
+                    "tp": float(getattr(pos0, 'tp', 0.0)),
+                    "comment": self._safe_comment("BE-general"),
+                    "type_filling": type_filling
+                }
+                log.info(f"[BE-DEBUG] Enviando order_send | req={req}")
+                res = await asyncio.get_running_loop().run_in_executor(None, client.order_send, req)
+                log.info(f"[BE-DEBUG] Resultado order_send | res={res}")
+                if res and getattr(res, "retcode", None) == 10009:
+                    await asyncio.sleep(1)
+                    pos_check = client.positions_get(ticket=int(ticket))
+                    sl_actual = None
+                    if pos_check and len(pos_check) > 0:
+                        sl_actual = float(getattr(pos_check[0], 'sl', 0.0))
+                    if sl_actual is not None and abs(sl_actual - float(sl_value)) < 1e-4:
+                        return True
+                    log.error(f"[BE-DEBUG] SL no cambió tras BE | esperado={sl_value} actual={sl_actual}")
+                    self._notify_bg(
+                        account["name"],
+                        f"❌ BE falló | Ticket: {int(ticket)}\nSL no cambió tras BE (esperado={sl_value}, actual={sl_actual})"
+                    )
                     await self.notify_trade_event(
                         'be',
                         account_name=account["name"],
-                        message=f"✅ BE aplicado | Ticket: {int(ticket)} | SL: {be_attempt:.5f}"
+                        message=f"❌ BE falló | Ticket: {int(ticket)}\nSL no cambió tras BE (esperado={sl_value}, actual={sl_actual})"
                     )
-                    log.info(f"[BE-DEBUG] FIN _do_be OK | account={account.get('name')} ticket={ticket}")
-                    be_applied = True
-                    break
-                else:
-                    log.error(f"[BE-DEBUG] SL no cambió tras BE | esperado={be_attempt} actual={sl_actual}")
+                    be_failure_notified = True
+                    return False
+                elif res and getattr(res, "retcode", None) not in [10030, 10013]:
+                    retcode = getattr(res, 'retcode', None)
+                    comment = getattr(res, 'comment', None)
+                    log.error(f"[BE-DEBUG] FIN _do_be FAIL | account={account.get('name')} ticket={ticket} - retcode={retcode} comment={comment}")
                     self._notify_bg(
                         account["name"],
-                        f"❌ BE falló | Ticket: {int(ticket)}\nSL no cambió tras BE (esperado={be_attempt}, actual={sl_actual})"
+                        f"❌ BE falló | Ticket: {int(ticket)}\nretcode={retcode} {comment}"
                     )
                     await self.notify_trade_event(
                         'be',
                         account_name=account["name"],
-                        message=f"❌ BE falló | Ticket: {int(ticket)}\nSL no cambió tras BE (esperado={be_attempt}, actual={sl_actual})"
+                        message=f"❌ BE falló | Ticket: {int(ticket)}\nretcode={retcode} {comment}"
                     )
-                    return
-            elif res and getattr(res, "retcode", None) not in [10030, 10013]:
-                retcode = getattr(res, 'retcode', None)
-                comment = getattr(res, 'comment', None)
-                log.error(f"[BE-DEBUG] FIN _do_be FAIL | account={account.get('name')} ticket={ticket} - retcode={retcode} comment={comment}")
-                self._notify_bg(
-                    account["name"],
-                    f"❌ BE falló | Ticket: {int(ticket)}\nretcode={retcode} {comment}"
-                )
-                await self.notify_trade_event(
-                    'be',
-                    account_name=account["name"],
-                    message=f"❌ BE falló | Ticket: {int(ticket)}\nretcode={retcode} {comment}"
-                )
-                return
-        if not be_applied:
+                    be_failure_notified = True
+                    return False
+            return False
+
+        outcome = await self.sl_coalescer.submit(account, ticket, be_attempt, _send_be, reason="BE")
+        if outcome == SUPERSEDED:
+            log.info(f"[BE-DEBUG] BE {be_attempt} reemplazado por un SL más reciente | ticket={ticket}")
+            return
+        if outcome == APPLIED:
+            self._notify_bg(account["name"], f"✅ BE aplicado | Ticket: {int(ticket)} | SL: {be_attempt:.5f}")
+            log.info("[TM] BE applied ticket=%s sl=%.5f", int(ticket), be_attempt)
+            await self.notify_trade_event(
+                'be',
+                account_name=account["name"],
+                message=f"✅ BE aplicado | Ticket: {int(ticket)} | SL: {be_attempt:.5f}"
+            )
+            log.info(f"[BE-DEBUG] FIN _do_be OK | account={account.get('name')} ticket={ticket}")
+        elif be_failure_notified:
+            return
+        else:
             log.error(f"[BE-DEBUG] FIN _do_be FAIL | account={account.get('name')} ticket={ticket} - No filling mode funcionó")
             self._notify_bg(
                 account["name"],
@@ -1341,7 +1385,7 @@ class TradeManager:
         trailing_activation_after_tp2 = self.trailing_activation_after_tp2
         if self.config_provider:
             try:
-                trailing_cfg = self.config_provider.get('trailing', {})
+                trailing_cfg = self.config_provider.setting('trailing', {})
                 if acc_name in trailing_cfg and symbol in trailing_cfg[acc_name]:
                     cfg = trailing_cfg[acc_name][symbol]
                     trailing_activation_pips = cfg.get('activation_pips', trailing_activation_pips)
@@ -1374,22 +1418,32 @@ class TradeManager:
         if not improved:
             return
 
-        req = {"action": mt5.TRADE_ACTION_SLTP, "position": int(pos.ticket), "sl": float(new_sl), "tp": 0.0}
         client = self.mt5._client_for(account)
-        res = client.order_send(req)
-        ok = bool(res and res.retcode in (mt5.TRADE_RETCODE_DONE, mt5.TRADE_RETCODE_DONE_PARTIAL))
 
-        if ok:
+        async def _send_trailing(sl_value: float) -> bool:
+            req = {"action": mt5.TRADE_ACTION_SLTP, "position": int(pos.ticket), "sl": float(sl_value), "tp": 0.0}
+            res = client.order_send(req)
+            return bool(res and res.retcode in (mt5.TRADE_RETCODE_DONE, mt5.TRADE_RETCODE_DONE_PARTIAL))
+
+        async def _apply_trailing():
+            # Latest-wins: si llega un SL más nuevo antes de enviar éste, se descarta
+            outcome = await self.sl_coalescer.submit(account, int(pos.ticket), new_sl, _send_trailing, reason="TRAIL")
+            if outcome != APPLIED:
+                return
             t.last_trailing_sl = float(new_sl)
             t.last_trailing_ts = now
             log.info("[TM] 🔄 trailing update ticket=%s sl=%.5f", int(pos.ticket), new_sl)
-            self._notify_bg(account["name"], f"🔄 Trailing actualizado | Ticket: {int(pos.ticket)} | SL: {new_sl:.5f}")
+            # Un solo aviso (con ticket: el digest deja sólo el último SL de la ráfaga)
             await self.notify_trade_event(
                 'trailing',
                 account_name=account["name"],
+                ticket=int(pos.ticket),
                 message=f"🔄 Trailing actualizado | Ticket: {int(pos.ticket)} | SL: {new_sl:.5f}"
             )
 
+        # El tick no espera al bridge: el resultado se aplica al trade cuando llega
+        self._spawn_sl(_apply_trailing())
+
     # ======================================================================
     # ✅ TOROFX MANAGEMENT (mensajes de seguimiento) — NO abre trades
     # ======================================================================
@@ -1731,6 +1785,185 @@ class TradeManager:
 
         return any_matched_trade
 
+    # ======================================================================
+    # ✅ GESTIÓN TIPADA (MgmtCommand v2, parseado una vez en router_parser)
+    # ======================================================================
+    async def apply_mgmt_command(self, cmd) -> bool:
+        """
+        Ejecuta un MgmtCommand tipado: despacho por cmd.action (sin re-parsear el texto).
+        Las órdenes de todos los tickets afectados corren en paralelo.
+        Retorna True si al menos un trade del scope recibió la acción.
+        """
+        handler = self._MGMT_DISPATCH.get(cmd.action)
+        if handler is None:
+            return False
+        jobs = handler(self, cmd, await self._mgmt_targets(cmd.scope))
+        if not jobs:
+            return False
+        for res in await asyncio.gather(*jobs, return_exceptions=True):
+            if isinstance(res, Exception):
+                log.error("[TM] gestión %s %s falló: %s", cmd.scope, cmd.action, res)
+        return True
+
+    async def _mgmt_targets(self, scope: str) -> list:
+        """
+        [(account, ticket, trade, pos, info)] de los trades abiertos del proveedor `scope`.
+        positions_get y symbol_info son RPC síncronos al bridge: corren en el executor,
+        una tanda por cuenta y las cuentas en paralelo.
+        """
+        scope = (scope or "").upper()
+        match = self.torofx_provider_tag_match if scope == "TOROFX" else scope
+        per_account = []
+        for account in [a for a in self.mt5.accounts if a.get("active")]:
+            trades = [
+                (ticket, t) for ticket, t in list(self.trades.items())
+                if t.account_name == account["name"] and match in (t.provider_tag or "").upper()
+            ]
+            if trades:
+                per_account.append((account, trades))
+        loop = asyncio.get_running_loop()
+        snapshots = await asyncio.gather(
+            *(loop.run_in_executor(None, self._mgmt_snapshot, account, {t.symbol for _, t in trades})
+              for account, trades in per_account),
+            return_exceptions=True,
+        )
+        targets = []
+        for (account, trades), snap in zip(per_account, snapshots):
+            if isinstance(snap, Exception):
+                log.error("[TM] gestión %s: no se pudo leer la cuenta %s: %s", scope, account.get("name"), snap)
+                continue
+            positions, infos = snap
+            pos_by_ticket = {p.ticket: p for p in positions}
+            for ticket, t in trades:
+                pos = pos_by_ticket.get(ticket)
+                if pos is not None and pos.magic == self.mt5.magic:
+                    targets.append((account, ticket, t, pos, infos.get(t.symbol)))
+        return targets
+
+    def _mgmt_snapshot(self, account: dict, symbols: set):
+        """(posiciones, {símbolo: symbol_info}) de la cuenta; corre fuera del event loop."""
+        client = self.mt5._client_for(account)
+        positions = client.positions_get()
+        if not positions:
+            return [], {}
+        return positions, {symbol: client.symbol_info(symbol) for symbol in symbols}
+
+    def _mgmt_be(self, cmd, targets: list) -> list:
+        jobs = []
+        action_key = f"{cmd.scope}_BE"
+        for account, ticket, t, pos, info in targets:
+            if action_key in t.actions_done:
+                continue
+            if not info:
+                continue
+            t.actions_done.add(action_key)
+            # BE = entry ± spread (_do_be) para todos los proveedores, TOROFX incluido: el viejo
+            # "BE directo sin offset" llamaba a un set_be que el executor no tiene
+            jobs.append(self._do_be(account, int(ticket), float(info.point), t.direction == "BUY"))
+        return jobs
+
+    def _mgmt_partial(self, cmd, targets: list) -> list:
+        # Defaults TOROFX de la configuración del orchestrator; el resto de proveedores 50% sin umbral
+        torofx = cmd.scope.upper() == "TOROFX"
+        pct = cmd.percent if cmd.percent is not None else (self.torofx_partial_default_percent if torofx else 50)
+        pct = max(1, min(100, int(pct)))
+        pips_need = cmd.pips if cmd.pips is not None else (self.torofx_partial_min_pips if torofx else None)
+        action_key = f"{cmd.scope}_PARTIAL_{pct}" + (f"_AT_{int(pips_need)}" if pips_need is not None else "")
+
+        jobs = []
+        for account, ticket, t, pos, info in targets:
+            if action_key in t.actions_done:
+                continue
+            profit_pips = None
+            if pips_need is not None:
+                if not info:
+                    continue
+                point = float(info.point)
+                entry, current = float(pos.price_open), float(pos.price_current)
+                profit_pips = ((current - entry) / point) if t.direction == "BUY" else ((entry - current) / point)
+                if profit_pips < pips_need:
+                    continue
+            t.actions_done.add(action_key)
+            jobs.append(self._do_partial_close(account, ticket, pct, reason=f"{cmd.scope} partial {pct}%"))
+            gate = f" | Profit≈{profit_pips:.1f} pips" if profit_pips is not None else ""
+            self._notify_bg(
+                account["name"],
+                f"✂️ {cmd.scope} parcial ejecutado\nTicket: {ticket} | {t.symbol} | {t.direction}{gate} | Cierre: {pct}%"
+            )
+        return jobs
+
+    async def _partial_then_be(self, account: dict, ticket: int, t: ManagedTrade, pos, point: float, pct: int, scope: str):
+        await self._do_partial_close(account, ticket, pct, reason=f"{scope} partial+BE")
+        entry, current = float(pos.price_open), float(pos.price_current)
+        is_buy = t.direction == "BUY"
+        if (is_buy and current < entry) or ((not is_buy) and current > entry):
+            # Por debajo del entry no hay BE posible: se cierra el resto
+            await self._do_partial_close(account, ticket, 100, reason=f"{scope} close loss (BE not possible)")
+            self._notify_bg(
+                account["name"],
+                f"❌ {scope}: BE no posible, trade cerrado por debajo del entry\nTicket: {ticket} | Entry: {entry:.2f} | Current: {current:.2f}"
+            )
+            return
+        await self._do_be(account, int(ticket), point, is_buy)
+
+    def _mgmt_partial_be(self, cmd, targets: list) -> list:
+        pct = max(1, min(100, int(cmd.percent if cmd.percent is not None else 50)))
+        action_key = f"{cmd.scope}_PARTIAL_BE_{pct}"
+        jobs = []
+        for account, ticket, t, pos, info in targets:
+            # Con TP1 alcanzado manda la gestión normal
+            if action_key in t.actions_done or 1 in t.tp_hit:
+                continue
+            if not info:
+                continue
+            t.actions_done.add(action_key)
+            jobs.append(self._partial_then_be(account, ticket, t, pos, float(info.point), pct, cmd.scope))
+        return jobs
+
+    def _mgmt_close_entry(self, cmd, targets: list) -> list:
+        if cmd.price is None:
+            return []
+        action_key = f"{cmd.scope}_CLOSE_ENTRY_{int(cmd.price)}"
+        jobs = []
+        for account, ticket, t, pos, info in targets:
+            if action_key in t.actions_done:
+                continue
+            if not info:
+                continue
+            tol = self.torofx_close_entry_tolerance_pips * float(info.point)
+            entry = float(pos.price_open)
+            # No cerrar la entrada que se conserva
+            if cmd.keep is not None and abs(entry - cmd.keep) <= tol:
+                continue
+            if abs(entry - cmd.price) > tol:
+                continue
+            t.actions_done.add(action_key)
+            jobs.append(self._do_partial_close(account, ticket, 100, reason=f"{cmd.scope} close entry {cmd.price}"))
+            self._notify_bg(
+                account["name"],
+                f"🧹 {cmd.scope}: cerrada entrada ≈{cmd.price}\nTicket: {ticket} | Entry: {entry:.2f}"
+            )
+        return jobs
+
+    def _mgmt_close_all(self, cmd, targets: list) -> list:
+        action_key = f"{cmd.scope}_CLOSE_ALL"
+        jobs = []
+        for account, ticket, t, pos, info in targets:
+            if action_key in t.actions_done:
+                continue
+            t.actions_done.add(action_key)
+            jobs.append(self._do_partial_close(account, ticket, 100, reason=f"{cmd.scope} close all (alert)"))
+            self._notify_bg(account["name"], f"🚨 {cmd.scope}: Cierre inmediato por alerta\nTicket: {ticket}")
+        return jobs
+
+    _MGMT_DISPATCH = {
+        MgmtAction.BE: _mgmt_be,
+        MgmtAction.PARTIAL: _mgmt_partial,
+        MgmtAction.PARTIAL_BE: _mgmt_partial_be,
+        MgmtAction.CLOSE_ENTRY: _mgmt_close_entry,
+        MgmtAction.CLOSE_ALL: _mgmt_close_all,
+    }
+
     async def gestionar_trade(self, trade, cuenta, pos=None, point=None, is_buy=None, current=None):
         """
         Decide y delega la gestión del trade según la modalidad configurada en la cuenta.
@@ -2026,8 +2259,12 @@ class TradeManager:
             return
         pos = pos_list[0]
         entry = float(getattr(pos, "price_open", 0.0))
-        # Mover SL a precio de entrada
-        asyncio.create_task(self.mt5.modify_sl(cuenta, trade.ticket, entry, reason="BE-auto", provider_tag=trade.provider_tag))
+        # Mover SL a precio de entrada (coalescido: no compite con trailing/BE del mismo ticket)
+        self._spawn_sl(self.sl_coalescer.submit(
+            cuenta, trade.ticket, entry,
+            lambda sl: self.mt5.modify_sl(cuenta, trade.ticket, sl, reason="BE-auto", provider_tag=trade.provider_tag),
+            reason="BE-auto",
+        ))
 
     def _calcular_sl_por_pnl(self, trade, cuenta, pnl_ganado):
         """
@@ -2054,6 +2291,9 @@ class TradeManager:
         cuenta = self._ensure_account_dict(cuenta)
         if not cuenta:
             return
-        client = self.mt5._client_for(cuenta)
-        asyncio.create_task(self.mt5.modify_sl(cuenta, trade.ticket, sl_price, reason="BE-PNL", provider_tag=trade.provider_tag))
+        self._spawn_sl(self.sl_coalescer.submit(
+            cuenta, trade.ticket, sl_price,
+            lambda sl: self.mt5.modify_sl(cuenta, trade.ticket, sl, reason="BE-PNL", provider_tag=trade.provider_tag),
+            reason="BE-PNL",
+        ))
 
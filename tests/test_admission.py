@@ -0,0 +1,61 @@
+"""
+Tests de la admisión por antigüedad (admission.py) y de las métricas de atraso (stream_lag.py).
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from unittest.mock import AsyncMock
+
+from services.common.latency_trace import TraceContext, Hops
+from services.common.redis_streams import Signal
+from services.trade_orchestrator.admission import SignalAdmission, ADMIT, DOWNGRADE, DROP
+from services.trade_orchestrator.stream_lag import sample_stream
+
+NOW = 1_800_000_000.0
+
+
+def _signal(origin_age_sec=None):
+    sig = Signal(symbol="XAUUSD", direction="BUY", sl=2490.0, provider_tag="HANNAH")
+    if origin_age_sec is not None:
+        sig.tctx = TraceContext.new().mark(Hops.TG_MESSAGE, ts=NOW - origin_age_sec).to_field()
+    return sig
+
+
+@pytest.mark.parametrize("age,expected", [(1, ADMIT), (45, DOWNGRADE), (600, DROP)])
+def test_decision_by_trace_origin(age, expected):
+    adm = SignalAdmission(open_max_age_sec=20, max_age_sec=120)
+    decision = adm.decide(_signal(age), now=NOW)
+    assert decision.action == expected
+    assert decision.age_sec == pytest.approx(age)
+
+
+def test_falls_back_to_stream_id_without_trace():
+    adm = SignalAdmission(open_max_age_sec=20, max_age_sec=120)
+    msg_id = f"{int((NOW - 30) * 1000)}-0"
+    assert adm.decide(_signal(), msg_id, now=NOW).action == DOWNGRADE
+    assert adm.decide(_signal(), None, now=NOW).action == ADMIT   # edad desconocida: no se descarta
+
+
+def test_drop_event_record():
+    adm = SignalAdmission(open_max_age_sec=20, max_age_sec=120)
+    ev = adm.decide(_signal(300), now=NOW).event(_signal(), trace_id="abc", msg_id="1-0")
+    assert ev["type"] == "signal_dropped"
+    assert ev["symbol"] == "XAUUSD" and ev["trace"] == "abc" and ev["age_sec"] == pytest.approx(300)
+
+
+@pytest.mark.asyncio
+async def test_sample_stream_lag_pending_and_ages():
+    now_ms = int(NOW * 1000)
+    r = AsyncMock()
+    r.xlen.return_value = 120
+    r.xinfo_groups.return_value = [
+        {"name": b"other", "pending": 0, "lag": 0, "last-delivered-id": b"0-0"},
+        {"name": b"orchestrator_group", "pending": 3, "lag": 7, "last-delivered-id": f"{now_ms - 5000}-0".encode()},
+    ]
+    r.xpending.return_value = {"pending": 3, "min": f"{now_ms - 9000}-0".encode(), "max": b"x", "consumers": []}
+    r.xrange.return_value = [(f"{now_ms - 4000}-0".encode(), {b"m": b"\x00"})]
+    out = await sample_stream(r, "parsed_signals", "orchestrator_group", now=NOW)
+    assert out == {"length": 120, "lag": 7, "pending": 3, "pending_age": pytest.approx(9.0), "undelivered_age": pytest.approx(4.0)}
+    assert r.xrange.call_args.kwargs["min"] == f"({now_ms - 5000}-0"
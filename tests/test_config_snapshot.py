@@ -0,0 +1,92 @@
+"""
+Snapshot local de configuración (config_snapshot): arranque sin base de datos.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+from services.common import config_db, config_snapshot
+from services.common.config_db import ConfigProvider
+from services.common.config_snapshot import compile_config, read_snapshot, write_snapshot
+
+ACCOUNT_ROW = (1, "demo", "mt5_acct1", 8001, True, Decimal("0.02"), 555, "general", [10])
+
+
+def _compiled():
+    accounts = [{"id": 1, "name": "demo", "fixed_lot": 0.02, "chat_id": 555, "allowed_channels": [10]}]
+    return compile_config({"TOLERANCE_PIPS": "25"}, accounts, [{"id": 1, "name": "TOROFX", "parser": "TOROFX"}], {10: [1]})
+
+
+def test_roundtrip_is_atomic(tmp_path):
+    path = str(tmp_path / "cfg" / "config.json")
+    assert write_snapshot(_compiled(), path)
+    data = read_snapshot(path)
+    assert data["channel_providers"] == {10: [1]}
+    assert data["accounts"][0]["fixed_lot"] == 0.02
+    assert os.listdir(tmp_path / "cfg") == ["config.json"]
+
+
+def test_unreadable_snapshot_is_ignored(tmp_path):
+    path = tmp_path / "config.json"
+    assert read_snapshot(str(path)) is None
+    path.write_text("{trunc")
+    assert read_snapshot(str(path)) is None
+    path.write_text(json.dumps({"format": 999}))
+    assert read_snapshot(str(path)) is None
+
+
+def test_starts_from_file_without_touching_db(tmp_path):
+    path = str(tmp_path / "config.json")
+    write_snapshot(_compiled(), path)
+    connect = MagicMock(side_effect=AssertionError("no debería conectar"))
+    with patch.object(config_db.psycopg2, "connect", connect), \
+         patch("services.common.db_pool.psycopg2.connect", connect):
+        provider = ConfigProvider(db_url="postgresql://x", listen=False, snapshot_path=path)
+        assert provider.source == "file"
+        assert provider.setting("TOLERANCE_PIPS") == 25.0
+        assert provider.get_accounts()[0]["chat_id"] == 555
+        assert provider.get_account_channels(1) == [10]
+        assert provider.get_channel_providers() == {10: [1]}
+    connect.assert_not_called()
+
+
+def _fake_pool(rows_by_sql):
+    cur = MagicMock()
+    cur.execute.side_effect = lambda sql, params=None: setattr(cur, "rows", rows_by_sql.get(" ".join(sql.split())[:30], []))
+    cur.fetchall.side_effect = lambda: cur.rows
+    conn = MagicMock(autocommit=False)
+    conn.cursor.return_value.__enter__.return_value = cur
+    pool = MagicMock()
+    pool.connection.return_value.__enter__.return_value = conn
+    return pool
+
+
+def test_db_reload_refreshes_file_only_on_change(tmp_path):
+    path = str(tmp_path / "config.json")
+    write_snapshot(_compiled(), path)
+    with patch("services.common.db_pool.psycopg2.connect", MagicMock(side_effect=RuntimeError("db caída"))):
+        provider = ConfigProvider(db_url="postgresql://x", listen=False, snapshot_path=path)
+    provider.pool = _fake_pool({
+        "SELECT key, value FROM setting": [("TOLERANCE_PIPS", "40")],
+        "SELECT a.id, a.name, a.host, a": [ACCOUNT_ROW],
+    })
+    with patch.object(config_snapshot, "write_snapshot", wraps=write_snapshot) as write:
+        assert provider.reload()
+        assert provider.reload()
+    assert write.call_count == 1
+    assert provider.source == "db" and provider.setting("TOLERANCE_PIPS") == 40.0
+    saved = read_snapshot(path)
+    assert saved["settings"] == {"TOLERANCE_PIPS": "40"}
+    assert saved["accounts"][0]["fixed_lot"] == 0.02 and saved["channel_providers"] == {}
+
+
+def test_no_file_and_no_db_falls_back_to_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("ACCOUNTS_JSON", '[{"name": "env"}]')
+    with patch("services.common.db_pool.psycopg2.connect", MagicMock(side_effect=RuntimeError("db caída"))):
+        provider = ConfigProvider(db_url="postgresql://x", listen=False, snapshot_path=str(tmp_path / "none.json"))
+    assert provider.source == "env" and provider.pool is None
+    assert provider.get_accounts() == [{"name": "env"}]
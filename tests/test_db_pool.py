@@ -0,0 +1,119 @@
+"""
+Pool de conexiones de configuración (db_pool) y loaders con sentencias preparadas.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.common import db_pool
+from services.common.db_pool import ConnectionPool, AsyncConnectionPool, PoolTimeout, numbered_params
+from services.common import config_db_loader as loader
+
+
+class FakeConn:
+    def __init__(self, rows=()):
+        self.closed = 0
+        self.autocommit = False
+        self.rollbacks = 0
+        self.cur = MagicMock()
+        self.cur.fetchall.return_value = list(rows)
+
+    def cursor(self):
+        cm = MagicMock()
+        cm.__enter__.return_value = self.cur
+        return cm
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connect(monkeypatch):
+    conns = []
+
+    def _connect(dsn):
+        conns.append(FakeConn(rows=[("K", "V")]))
+        return conns[-1]
+    monkeypatch.setattr(db_pool.psycopg2, "connect", _connect)
+    return conns
+
+
+def test_numbered_params():
+    assert numbered_params("a = %s AND b = %s") == "a = $1 AND b = $2"
+
+
+def test_connections_are_reused_and_rolled_back(connect):
+    pool = ConnectionPool("dsn", maxconn=2)
+    for _ in range(5):
+        with pool.connection() as conn:
+            assert loader.load_settings(conn) == {"K": "V"}
+    assert pool.opened == 1 and len(connect) == 1
+    assert connect[0].rollbacks == 5
+
+
+def test_statements_prepared_once_per_connection(connect):
+    pool = ConnectionPool("dsn", maxconn=1)
+    for _ in range(3):
+        with pool.connection() as conn:
+            loader.fetch(conn, loader.SQL_ACCOUNT_CHANNELS, (7,))
+    sqls = [c.args[0] for c in connect[0].cur.execute.call_args_list]
+    assert sqls.count("PREPARE cfg_account_channels AS SELECT channel_id FROM account_channels WHERE account_id = $1") == 1
+    assert sqls.count("EXECUTE cfg_account_channels (%s)") == 3
+
+
+def test_closed_or_stale_connections_are_replaced(connect):
+    pool = ConnectionPool("dsn", maxconn=1, ping_after=0.0)
+    with pool.connection():
+        pass
+    connect[0].cur.execute.side_effect = RuntimeError("server closed the connection")
+    with pool.connection() as conn:
+        assert conn.raw is connect[1]
+    assert pool.discarded == 1 and connect[0].closed
+
+    connect[1].closed = 1
+    with pool.connection() as conn:
+        assert conn.raw is connect[2]
+
+
+def test_pool_is_bounded(connect):
+    pool = ConnectionPool("dsn", maxconn=1, timeout=0.05)
+    held = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with pool.connection():
+            held.set()
+            release.wait(1)
+    t = threading.Thread(target=hold)
+    t.start()
+    held.wait(1)
+    with pytest.raises(PoolTimeout):
+        with pool.connection():
+            pass
+    release.set()
+    t.join()
+    assert len(connect) == 1
+
+
+@pytest.mark.asyncio
+async def test_async_pool_falls_back_to_threads(monkeypatch):
+    monkeypatch.setattr(db_pool, "asyncpg", None)
+    conns = []
+
+    def _connect(dsn):
+        conns.append(FakeConn(rows=[(1, "demo", "h", 1, True, None, 55, "general", [10])]))
+        return conns[-1]
+    monkeypatch.setattr(db_pool.psycopg2, "connect", _connect)
+    pool = AsyncConnectionPool("dsn", sync_pool=ConnectionPool("dsn", maxconn=1))
+    accounts = await loader.aload_accounts(pool)
+    assert accounts[0]["name"] == "demo" and accounts[0]["allowed_channels"] == [10]
+    await loader.aload_accounts(pool)
+    assert len(conns) == 1
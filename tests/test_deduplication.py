@@ -29,3 +29,84 @@ async def test_deduplication_redis_error_passthrough():
     redis.set.side_effect = Exception("connection refused")
     dedup = SignalDeduplicator(redis, ttl_seconds=120)
     assert await dedup.is_duplicate('chat1', AsyncMock()) is False
+
+
+# --- check(): marca FAST + dedup en un solo script, cache local delante ---
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from services.common.signal_dedup import NEW, DUPLICATE, FAST_UPDATE
+
+
+def _pr(is_fast=False, hint=None):
+    return SimpleNamespace(provider_tag='GB', symbol='XAUUSD', direction='BUY', sl=2490.0,
+                           tps=[2510.0], entry_range=(2500.0, 2505.0), hint_price=hint, is_fast=is_fast)
+
+
+def _dedup_with_script(*results):
+    redis = MagicMock()
+    script = AsyncMock(side_effect=list(results))
+    redis.register_script.return_value = script
+    return SignalDeduplicator(redis, ttl_seconds=120), script
+
+
+@pytest.mark.asyncio
+async def test_check_is_one_script_call_with_fast_key():
+    dedup, script = _dedup_with_script(NEW)
+    assert await dedup.check('chat1', _pr(), fast_window=30) == NEW
+    script.assert_awaited_once()
+    kwargs = script.await_args.kwargs
+    assert kwargs['keys'][0] == 'fast_sig:chat1:XAUUSD:BUY'
+    assert kwargs['keys'][1].startswith('signal_dedup:') and kwargs['keys'][2] == 'signal_dedup:index'
+    assert kwargs['args'][:3] == ['0', 120, 30]
+
+
+@pytest.mark.asyncio
+async def test_check_repeat_is_answered_locally():
+    dedup, script = _dedup_with_script(NEW)
+    assert await dedup.check('chat1', _pr(), fast_window=30) == NEW
+    assert await dedup.check('chat1', _pr(), fast_window=30) == DUPLICATE
+    assert script.await_count == 1
+    # Otro chat: otra firma, va a Redis
+    script.side_effect = [NEW]
+    assert await dedup.check('chat2', _pr(), fast_window=30) == NEW
+    assert script.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_check_pending_fast_mark_bypasses_local_cache():
+    dedup, script = _dedup_with_script(NEW, NEW, FAST_UPDATE, DUPLICATE)
+    assert await dedup.check('chat1', _pr(), fast_window=30) == NEW
+    assert await dedup.check('chat1', _pr(is_fast=True, hint=2501.0), fast_window=30) == NEW
+    # La completa repetida tras una FAST de este worker vuelve a consultar Redis (actualización)
+    assert await dedup.check('chat1', _pr(), fast_window=30) == FAST_UPDATE
+    # Marca consumida: la siguiente repetición se descarta localmente
+    assert await dedup.check('chat1', _pr(), fast_window=30) == DUPLICATE
+    assert script.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_check_redis_error_passthrough_and_local_cache_off():
+    redis = MagicMock()
+    redis.register_script.return_value = AsyncMock(side_effect=Exception("connection refused"))
+    dedup = SignalDeduplicator(redis, ttl_seconds=120, local_max_entries=0)
+    assert await dedup.check('chat1', _pr(), fast_window=30) == NEW
+    assert await dedup.check('chat1', _pr(), fast_window=30) == NEW
+
+
+@pytest.mark.asyncio
+async def test_cleanup_and_reset_never_use_keys():
+    redis = MagicMock()
+    redis.zremrangebyscore = AsyncMock(return_value=3)
+
+    async def scan_iter(match, count):
+        for k in ('signal_dedup:a', 'signal_dedup:b', 'signal_dedup:index'):
+            yield k
+    redis.scan_iter = scan_iter
+    redis.delete = AsyncMock(side_effect=lambda *keys: len(keys))
+    dedup = SignalDeduplicator(redis, ttl_seconds=120)
+
+    assert await dedup.cleanup() == 3
+    assert await dedup.reset(batch=2) == 3
+    assert [c.args for c in redis.delete.await_args_list] == [('signal_dedup:a', 'signal_dedup:b'), ('signal_dedup:index',)]
+    redis.keys.assert_not_called()
@@ -0,0 +1,66 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from services.common.latency_trace import TraceContext, Hops, TRACE_FIELD, publish_trace
+from services.common.redis_streams import Streams
+
+import json
+import pytest
+from unittest.mock import AsyncMock
+
+
+def test_trace_roundtrip_through_stream_fields():
+    """El contexto serializado en un campo de stream conserva id, saltos y orden."""
+    ctx = TraceContext.new()
+    ctx.mark(Hops.TG_MESSAGE, ts=1000.0).mark(Hops.INGEST_RECEIVED, ts=1000.25).mark(Hops.RAW_XADD, ts=1000.26)
+    restored = TraceContext.from_fields({"text": "x", TRACE_FIELD: ctx.to_field()})
+    assert restored.trace_id == ctx.trace_id
+    assert [h[0] for h in restored.hops] == [Hops.TG_MESSAGE, Hops.INGEST_RECEIVED, Hops.RAW_XADD]
+    assert restored.hop_durations() == [
+        ("tg_message->ingest_received", 250.0),
+        ("ingest_received->raw_xadd", 10.0),
+    ]
+    assert restored.total_ms() == 260.0
+
+
+def test_missing_or_invalid_context_starts_new_trace():
+    """Productores antiguos (sin tctx) o basura en el campo no rompen el consumidor."""
+    assert TraceContext.from_fields({"text": "x"}) is None
+    assert TraceContext.from_fields({TRACE_FIELD: "{not json"}) is None
+    ctx = TraceContext.from_fields_or_new({"text": "x"})
+    assert ctx.trace_id and ctx.hops == []
+
+
+def test_fork_per_account_is_independent():
+    """Cada cuenta tiene sus propios saltos de send_order sin contaminar la traza padre."""
+    parent = TraceContext.new().mark(Hops.DISPATCH, ts=1.0)
+    a = parent.fork("acct_a").mark(Hops.ORDER_SEND, ts=1.1)
+    b = parent.fork("acct_b")
+    assert len(parent.hops) == 1
+    assert len(a.hops) == 2 and len(b.hops) == 1
+    assert a.trace_id == b.trace_id == parent.trace_id
+    assert a.account == "acct_a"
+
+
+@pytest.mark.asyncio
+async def test_publish_trace_writes_to_traces_stream():
+    r = AsyncMock()
+    ctx = TraceContext.new().mark(Hops.ORCH_RECEIVED, ts=2.0).mark(Hops.ORDER_RESULT, ts=2.5).fork("acct")
+    await publish_trace(r, ctx, "filled", ticket=123, error=None)
+    stream, payload = r.xadd.call_args[0][:2]
+    assert stream == Streams.TRACES
+    assert payload["trace"] == ctx.trace_id
+    assert payload["outcome"] == "filled"
+    assert payload["account"] == "acct"
+    assert payload["ticket"] == "123"
+    assert "error" not in payload
+    assert float(payload["total_ms"]) == 500.0
+    assert json.loads(payload["durations"]) == [["orch_received->order_result", 500.0]]
+
+
+@pytest.mark.asyncio
+async def test_publish_trace_never_raises():
+    """Un fallo de Redis en observabilidad no debe afectar al flujo de trading."""
+    r = AsyncMock()
+    r.xadd.side_effect = Exception("connection refused")
+    await publish_trace(r, TraceContext.new(), "filled")
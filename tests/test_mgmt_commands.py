@@ -0,0 +1,172 @@
+"""
+Gestión tipada: router_parser clasifica (mgmt_parser) y TradeManager sólo despacha.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'services', 'router_parser')))
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from services.common.redis_streams import (
+    Streams, MgmtCommand, MgmtAction, MGMT_VERSION, encode_message, decode_message, msgpack,
+)
+from services.router_parser.prefilter import MessageView
+from services.router_parser.mgmt_parser import parse_management
+from services.trade_orchestrator.trade_manager import TradeManager
+
+
+def _parse(text, hint):
+    return parse_management(MessageView(text), hint)
+
+
+@pytest.mark.parametrize("text,hint,expected", [
+    ("Cerrando mi entrada de 4330 y dejando 4325", "TOROFX",
+     {"action": MgmtAction.CLOSE_ENTRY, "price": 4330.0, "keep": 4325.0, "scope": "TOROFX"}),
+    ("Asegurando profits, quitando el riesgo", "TOROFX", {"action": MgmtAction.BE, "scope": "TOROFX"}),
+    ("Cerrando el 50% aquí +30", "TOROFX",
+     {"action": MgmtAction.PARTIAL, "percent": 50, "pips": 30.0, "scope": "TOROFX"}),
+    ("Tomando parcial +50/60", "TOROFX",
+     {"action": MgmtAction.PARTIAL, "percent": None, "pips": 50.0, "scope": "TOROFX"}),
+    ("Cerrando el riesgo de la entrada", "TOROFX", {"action": MgmtAction.NONE, "scope": "TOROFX"}),
+    ("CLOSE ALL POSITIONS NOW", "HANNAH", {"action": MgmtAction.CLOSE_ALL, "scope": "HANNAH"}),
+    ("Close half guys", "HANNAH", {"action": MgmtAction.PARTIAL, "percent": 50, "scope": "HANNAH"}),
+    ("Secure 30% of your profits & set breakeven", "GOLD_BROTHERS",
+     {"action": MgmtAction.PARTIAL_BE, "percent": 30, "scope": "HANNAH"}),
+    ("Corriendo +40 pips desde la entrada", "GOLD_BROTHERS", {"action": MgmtAction.NONE, "scope": "HANNAH"}),
+])
+def test_parse_management(text, hint, expected):
+    assert _parse(text, hint) == expected
+
+
+def test_unknown_provider_is_not_actionable():
+    assert _parse("close all", "OTRO") == {"action": MgmtAction.NONE, "scope": "OTRO"}
+
+
+@pytest.mark.skipif(msgpack is None, reason="msgpack no instalado")
+def test_typed_command_roundtrip_and_v1_payload():
+    cmd = MgmtCommand(chat_id="9", text="Cerrando mi entrada de 4330", provider_hint="TOROFX",
+                      action=MgmtAction.CLOSE_ENTRY, scope="TOROFX", price=4330.0)
+    fields = encode_message(Streams.MGMT, cmd)
+    assert fields["v"] == MGMT_VERSION == 2
+    assert decode_message(Streams.MGMT, fields) == cmd
+
+    v1 = {"v": 1, "m": msgpack.packb(["9", "move SL to BE", "TOROFX", ""], use_bin_type=True)}
+    legacy = decode_message(Streams.MGMT, v1)
+    assert legacy.action == "" and legacy.text == "move SL to BE"
+
+
+def test_flat_fields_keep_typed_values():
+    cmd = MgmtCommand(chat_id="9", text="x", provider_hint="TOROFX", action=MgmtAction.PARTIAL,
+                      scope="TOROFX", percent=50, pips=30.0)
+    assert MgmtCommand.from_fields(cmd.to_fields()) == cmd
+    assert "action" not in MgmtCommand(chat_id="9", text="x").to_fields()
+
+
+# --- Despacho en TradeManager ---
+
+def _pos(ticket, price_open, price_current, magic=777):
+    return SimpleNamespace(ticket=ticket, price_open=price_open, price_current=price_current, magic=magic)
+
+
+@pytest.fixture
+def manager():
+    client = MagicMock()
+    client.symbol_info.return_value = SimpleNamespace(point=0.1)
+    mt5 = SimpleNamespace(accounts=[{'name': 'demo', 'active': True}], magic=777,
+                          _client_for=lambda account: client)
+    tm = TradeManager(mt5, notifier=MagicMock())
+    tm._do_partial_close = AsyncMock()
+    tm._do_be = AsyncMock()
+    tm._notify_bg = MagicMock()
+    return tm, client
+
+
+def _cmd(action, scope="TOROFX", **kw):
+    return MgmtCommand(chat_id="1", text="", provider_hint=scope, action=action, scope=scope, **kw)
+
+
+@pytest.mark.asyncio
+async def test_partial_respects_pips_gate_and_dedups(manager):
+    tm, client = manager
+    client.positions_get.return_value = [_pos(1, 4300.0, 4304.0), _pos(2, 4300.0, 4301.0)]
+    tm.register_trade('demo', 1, 'XAUUSD', 'BUY', 'TOROFX', [4310.0], planned_sl=4000.0)
+    tm.register_trade('demo', 2, 'XAUUSD', 'BUY', 'TOROFX', [4310.0], planned_sl=4000.0)
+
+    assert await tm.apply_mgmt_command(_cmd(MgmtAction.PARTIAL, percent=50, pips=30.0)) is True
+    tm._do_partial_close.assert_awaited_once()
+    assert tm._do_partial_close.await_args.args[1:3] == (1, 50)
+
+    # Repetido: ya aplicado en el ticket 1 y el 2 sigue sin llegar a +30
+    assert await tm.apply_mgmt_command(_cmd(MgmtAction.PARTIAL, percent=50, pips=30.0)) is False
+    assert tm._do_partial_close.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_close_entry_skips_keep_and_other_providers(manager):
+    tm, client = manager
+    client.positions_get.return_value = [_pos(1, 4330.2, 4320.0), _pos(2, 4325.0, 4320.0), _pos(3, 4330.0, 4320.0)]
+    tm.register_trade('demo', 1, 'XAUUSD', 'SELL', 'TOROFX', [], planned_sl=4000.0)
+    tm.register_trade('demo', 2, 'XAUUSD', 'SELL', 'TOROFX', [], planned_sl=4000.0)
+    tm.register_trade('demo', 3, 'XAUUSD', 'SELL', 'HANNAH', [], planned_sl=4000.0)
+
+    assert await tm.apply_mgmt_command(_cmd(MgmtAction.CLOSE_ENTRY, price=4330.0, keep=4325.0))
+    closed = [c.args[1] for c in tm._do_partial_close.await_args_list]
+    assert closed == [1]
+
+
+@pytest.mark.asyncio
+async def test_partial_be_closes_when_underwater(manager):
+    tm, client = manager
+    client.positions_get.return_value = [_pos(1, 4300.0, 4290.0), _pos(2, 4300.0, 4310.0)]
+    tm.register_trade('demo', 1, 'XAUUSD', 'BUY', 'HANNAH', [4320.0], planned_sl=4000.0)
+    tm.register_trade('demo', 2, 'XAUUSD', 'BUY', 'HANNAH', [4320.0], planned_sl=4000.0)
+
+    assert await tm.apply_mgmt_command(_cmd(MgmtAction.PARTIAL_BE, scope="HANNAH", percent=50))
+    calls = sorted(tuple(c.args[1:3]) for c in tm._do_partial_close.await_args_list)
+    assert calls == [(1, 50), (1, 100), (2, 50)]
+    tm._do_be.assert_awaited_once()
+    assert tm._do_be.await_args.args[1] == 2
+
+
+@pytest.mark.asyncio
+async def test_targets_read_bridge_off_the_event_loop(manager):
+    import threading
+    tm, client = manager
+    threads = []
+
+    def positions_get():
+        threads.append(threading.current_thread())
+        return [_pos(1, 4300.0, 4310.0)]
+    client.positions_get.side_effect = positions_get
+    client.symbol_info.side_effect = lambda symbol: threads.append(threading.current_thread()) or SimpleNamespace(point=0.1)
+    tm.register_trade('demo', 1, 'XAUUSD', 'BUY', 'TOROFX', [4320.0], planned_sl=4000.0)
+    tm.register_trade('demo', 2, 'XAUUSD', 'BUY', 'TOROFX', [4320.0], planned_sl=4000.0)
+
+    assert await tm.apply_mgmt_command(_cmd(MgmtAction.BE))
+    # un positions_get y un symbol_info por cuenta/símbolo, ninguno en el hilo del loop
+    assert len(threads) == 2 and threading.main_thread() not in threads
+    tm._do_be.assert_awaited_once()
+    assert tm._do_be.await_args.args[1:] == (1, 0.1, True)
+
+
+@pytest.mark.asyncio
+async def test_untyped_or_noop_actions_do_nothing(manager):
+    tm, client = manager
+    client.positions_get.return_value = [_pos(1, 4300.0, 4310.0)]
+    tm.register_trade('demo', 1, 'XAUUSD', 'BUY', 'HANNAH', [4320.0], planned_sl=4000.0)
+    assert await tm.apply_mgmt_command(_cmd(MgmtAction.NONE, scope="HANNAH")) is False
+    assert await tm.apply_mgmt_command(_cmd("", scope="HANNAH")) is False
+    tm._do_partial_close.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_route_raw_publishes_typed_command():
+    from services.router_parser.app import SignalRouter
+    router = SignalRouter(AsyncMock(), channels_config={})
+    stream, cmd = await router.route_raw({"chat_id": "5", "text": "Close half guys, secure profits"})
+    assert stream == Streams.MGMT
+    assert (cmd.provider_hint, cmd.action, cmd.scope, cmd.percent) == ("GOLD_BROTHERS", MgmtAction.PARTIAL, "HANNAH", 50)
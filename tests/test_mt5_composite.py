@@ -0,0 +1,183 @@
+"""
+Tests de las operaciones compuestas del bridge MT5Service (mt5_composite.py).
+Se usa un módulo MetaTrader5 simulado — no requiere terminal ni rpyc.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from types import SimpleNamespace
+
+from services.mt5_custom import mt5_composite
+
+
+class FakeMT5:
+    """Terminal simulado: posiciones en memoria, order_send aplica DEAL/SLTP."""
+
+    def __init__(self, positions, fill_mode=None, reject_sl_first=0, stops_level=0):
+        self.positions = {p.ticket: p for p in positions}
+        self.fill_mode = fill_mode
+        self.reject_sl_first = reject_sl_first
+        self.stops_level = stops_level
+        self.orders = []
+
+    def positions_get(self, ticket=None):
+        if ticket is not None:
+            p = self.positions.get(int(ticket))
+            return (p,) if p else ()
+        return tuple(self.positions.values())
+
+    def symbol_info(self, symbol):
+        return SimpleNamespace(point=0.01, stops_level=self.stops_level, volume_step=0.01,
+                               volume_min=0.01, trade_fill_mode=self.fill_mode)
+
+    def symbol_info_tick(self, symbol):
+        return SimpleNamespace(bid=2500.0, ask=2500.2)
+
+    def order_send(self, req):
+        self.orders.append(dict(req))
+        if req["action"] == mt5_composite.ACTION_DEAL:
+            if self.fill_mode is not None and req["type_filling"] != self.fill_mode:
+                return SimpleNamespace(retcode=10030, comment="Unsupported filling mode")
+            pos = self.positions[req["position"]]
+            pos.volume = round(pos.volume - req["volume"], 8)
+            if pos.volume <= 0:
+                del self.positions[req["position"]]
+            return SimpleNamespace(retcode=10009, comment="done")
+        if self.reject_sl_first > 0:
+            self.reject_sl_first -= 1
+            return SimpleNamespace(retcode=10016, comment="Invalid stops")
+        pos = self.positions[req["position"]]
+        pos.sl = req["sl"]
+        pos.tp = req["tp"]
+        return SimpleNamespace(retcode=10009, comment="done")
+
+
+def _pos(ticket, volume=0.10, type_=0, sl=2490.0, tp=0.0, magic=987654, symbol="XAUUSD"):
+    return SimpleNamespace(ticket=ticket, symbol=symbol, type=type_, volume=volume, sl=sl, tp=tp,
+                           price_current=2500.0, price_open=2495.0, magic=magic)
+
+
+def test_close_partial_single_result():
+    mt5 = FakeMT5([_pos(1, volume=0.10)])
+    ok, retcode, closed, remaining, _ = mt5_composite.close_partial(mt5, 1, 50)
+    assert ok and retcode == 10009
+    assert closed == 0.05
+    assert remaining == 0.05
+
+
+def test_close_partial_uses_symbol_fill_mode_first():
+    mt5 = FakeMT5([_pos(1)], fill_mode=mt5_composite.FILLING_RETURN)
+    ok, *_ = mt5_composite.close_partial(mt5, 1, 50)
+    assert ok
+    assert [o["type_filling"] for o in mt5.orders] == [mt5_composite.FILLING_RETURN]
+
+
+def test_close_partial_missing_position():
+    ok, retcode, closed, remaining, msg = mt5_composite.close_partial(FakeMT5([]), 7, 50)
+    assert not ok and msg == "position not found"
+
+
+def test_move_sl_verified_keeps_tp_and_verifies():
+    mt5 = FakeMT5([_pos(1, tp=2600.0)])
+    ok, retcode, applied, _ = mt5_composite.move_sl_verified(mt5, 1, 2495.0)
+    assert ok and applied == 2495.0
+    assert mt5.orders[0]["tp"] == 2600.0
+
+
+def test_move_sl_verified_backs_off_after_reject():
+    mt5 = FakeMT5([_pos(1)], reject_sl_first=1)
+    ok, retcode, applied, _ = mt5_composite.move_sl_verified(mt5, 1, 2495.0)
+    assert ok
+    assert len(mt5.orders) == 2
+    assert applied == 2494.9   # BUY: se aleja 1 pip (XAU: 0.1) hacia abajo
+
+
+def test_move_sl_verified_backs_off_one_point_pip_outside_gold():
+    mt5 = FakeMT5([_pos(1, type_=1, symbol="EURUSD")], reject_sl_first=1)
+    ok, _, applied, _ = mt5_composite.move_sl_verified(mt5, 1, 2505.0)
+    assert ok and applied == 2505.01   # SELL: se aleja hacia arriba, 1 pip = point
+
+
+def test_move_sl_respects_stop_level():
+    mt5 = FakeMT5([_pos(1)], stops_level=100)  # 100 points * 0.01 = 1.0
+    ok, _, applied, _ = mt5_composite.move_sl_verified(mt5, 1, 2499.8)
+    assert ok and applied == 2499.0
+
+
+# --- TradeManager._do_be usa move_sl_verified cuando el bridge lo soporta ---
+
+import asyncio
+import threading
+
+import pytest
+
+from services.trade_orchestrator.sl_coalescer import SLCoalescer
+from services.trade_orchestrator.trade_manager import TradeManager
+
+
+class BridgeClient:
+    """Cliente con bridge: lecturas contra FakeMT5; cuenta los order_send del camino clásico."""
+
+    def __init__(self, mt5, bridge_ok=True):
+        self.mt5 = mt5
+        self.bridge_ok = bridge_ok
+        self.composite_calls = []
+        self.classic_sends = []
+        self.threads = []
+
+    def supports_composite(self):
+        return True
+
+    def move_sl_verified(self, ticket, sl, tp=None):
+        self.composite_calls.append((ticket, sl))
+        self.threads.append(threading.current_thread())
+        if not self.bridge_ok:
+            raise ConnectionError("bridge caído")
+        return mt5_composite.move_sl_verified(self.mt5, ticket, sl, tp, verify_interval=0)
+
+    def positions_get(self, ticket=None):
+        return self.mt5.positions_get(ticket=ticket)
+
+    def symbol_info(self, symbol):
+        return self.mt5.symbol_info(symbol)
+
+    def order_send(self, req):
+        self.classic_sends.append(req)
+        return self.mt5.order_send(req)
+
+
+def _manager(client, monkeypatch):
+    real_sleep = asyncio.sleep
+
+    async def no_wait(_delay, *a, **kw):
+        await real_sleep(0)
+    monkeypatch.setattr(asyncio, "sleep", no_wait)
+    acct = {"name": "demo", "host": "mt5_acct1", "port": 8001}
+    tm = TradeManager(SimpleNamespace(accounts=[acct], _client_for=lambda account: client), notifier=None)
+    tm.sl_coalescer = SLCoalescer(min_interval_sec=0.0)
+    return tm, acct
+
+
+@pytest.mark.asyncio
+async def test_do_be_uses_composite_move_sl(monkeypatch):
+    mt5 = FakeMT5([_pos(1, tp=2600.0)])
+    client = BridgeClient(mt5)
+    tm, acct = _manager(client, monkeypatch)
+    await tm._do_be(acct, 1, 0.01, True)
+    assert client.composite_calls == [(1, 2495.0)]
+    assert client.classic_sends == []
+    # La llamada rpyc (envío + polls de verificación) corre fuera del event loop
+    assert client.threads and client.threads[0] is not threading.main_thread()
+    assert mt5.positions[1].sl == 2495.0 and mt5.positions[1].tp == 2600.0
+
+
+@pytest.mark.asyncio
+async def test_do_be_falls_back_when_bridge_fails(monkeypatch):
+    mt5 = FakeMT5([_pos(1)])
+    client = BridgeClient(mt5, bridge_ok=False)
+    tm, acct = _manager(client, monkeypatch)
+    await tm._do_be(acct, 1, 0.01, True)
+    assert len(client.composite_calls) == 1
+    assert [r["sl"] for r in client.classic_sends] == [2495.0]
+    assert mt5.positions[1].sl == 2495.0
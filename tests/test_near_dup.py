@@ -0,0 +1,75 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'services', 'router_parser')))
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from services.router_parser.near_dup import NearDuplicateIndex
+from services.common.signal_dedup import NEW, FAST_UPDATE
+
+
+def _pr(sl=4454.0, tps=(4460.0, 4466.0), entry=(4457.0, 4460.0), direction='BUY', symbol='XAUUSD', is_fast=False):
+    return SimpleNamespace(symbol=symbol, direction=direction, sl=sl, tps=list(tps), entry_range=entry,
+                           provider_tag='HANNAH', format_tag='HANNAH', hint_price=None, is_fast=is_fast)
+
+
+def test_repost_within_tolerance_links_to_original():
+    idx = NearDuplicateIndex(window_sec=120, tol_bps=2)
+    assert idx.link('c1', _pr(), 'orig', now=1000) is None
+    # SL 4454 (int), TP corrido 0.1 y un TP3 agregado
+    assert idx.link('c1', _pr(sl=4454, tps=(4460.1, 4466.0, 4470.0)), 'repost', now=1010) == 'orig'
+    # La siguiente re-publicación sigue apuntando a la original
+    assert idx.link('c1', _pr(sl=4454.1), 'repost2', now=1020) == 'orig'
+    assert idx.linked == 2
+
+
+@pytest.mark.parametrize("other", [
+    _pr(sl=4440.0),                       # SL fuera de tolerancia
+    _pr(entry=(4470.0, 4473.0)),          # otra zona de entrada
+    _pr(tps=(4480.0,)),                   # TP1 distinto
+    _pr(direction='SELL'),                # otra dirección
+    _pr(symbol='EURUSD'),                 # otro símbolo
+])
+def test_different_signals_are_not_linked(other):
+    idx = NearDuplicateIndex(window_sec=120, tol_bps=2)
+    idx.link('c1', _pr(), 'orig', now=1000)
+    assert idx.link('c1', other, 'other', now=1010) is None
+
+
+def test_other_chat_and_expired_window_are_new():
+    idx = NearDuplicateIndex(window_sec=120, tol_bps=2)
+    idx.link('c1', _pr(), 'orig', now=1000)
+    assert idx.link('c2', _pr(), 'x', now=1001) is None
+    assert idx.link('c1', _pr(), 'y', now=1000 + 121) is None
+
+
+def test_old_buckets_are_pruned_and_zero_window_disables():
+    idx = NearDuplicateIndex(window_sec=60, tol_bps=2)
+    idx.link('c1', _pr(), 'a', now=0)
+    idx.link('c2', _pr(), 'b', now=1)
+    assert len(idx) == 2
+    idx.link('c3', _pr(), 'c', now=1000)
+    assert len(idx) == 1
+    off = NearDuplicateIndex(window_sec=0)
+    off.link('c1', _pr(), 'a', now=0)
+    assert off.link('c1', _pr(), 'b', now=1) is None
+
+
+@pytest.mark.asyncio
+async def test_router_marks_repost_as_update():
+    from services.router_parser.app import SignalRouter
+    router = SignalRouter(AsyncMock(), channels_config={})
+    router.deduplicator.check = AsyncMock(side_effect=[NEW, NEW, FAST_UPDATE])
+    router.parse_signal = lambda text, chat_id=None, view=None: _pr(sl=4454.0 if text == 'a' else 4454.1)
+
+    first = await router.process_raw_signal('c1', 'a', ref='trace-1')
+    assert first.update_of == ''
+    repost = await router.process_raw_signal('c1', 'b', ref='trace-2')
+    assert repost.update_of == 'trace-1'
+    # Una completa que ya actualiza una FAST no se marca dos veces
+    fast_update = await router.process_raw_signal('c1', 'b', ref='trace-3')
+    assert fast_update.update_of == ''
@@ -0,0 +1,118 @@
+"""
+Digest de notificaciones por chat (notify_digest.DigestCoalescer).
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from services.common.notify_digest import DigestCoalescer, is_urgent
+from services.trade_orchestrator.notifications.telegram import TelegramNotifierAdapter
+
+
+def _coalescer(window=0.02, **kw):
+    sent = []
+
+    async def send(chat_id, text):
+        sent.append((chat_id, text))
+    return DigestCoalescer(send, window_sec=window, **kw), sent
+
+
+@pytest.mark.asyncio
+async def test_events_of_one_chat_become_one_digest():
+    digest, sent = _coalescer()
+    digest.submit(1, "TRADE OPENED cuenta A")
+    digest.submit(1, "TRADE OPENED cuenta B")
+    digest.submit(2, "TRADE OPENED cuenta C")
+    await asyncio.sleep(0.05)
+    assert len(sent) == 2
+    chat1 = dict(sent)[1]
+    assert chat1.startswith("🧾 2 eventos") and "cuenta A" in chat1 and chat1.index("cuenta A") < chat1.index("cuenta B")
+    assert dict(sent)[2] == "TRADE OPENED cuenta C"
+
+
+@pytest.mark.asyncio
+async def test_urgent_jumps_the_queue():
+    digest, sent = _coalescer()
+    digest.submit(1, "TP1 cuenta A")
+    digest.submit(1, "❌ SL HIT cuenta B")
+    digest.submit(1, "cierre forzado", urgent=True)
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert [t for _, t in sent] == ["❌ SL HIT cuenta B", "cierre forzado"]
+    await digest.flush()
+    assert sent[-1] == (1, "TP1 cuenta A")
+
+
+@pytest.mark.asyncio
+async def test_trailing_burst_collapses_to_latest():
+    digest, sent = _coalescer()
+    digest.submit(1, "TP1 ticket 7")
+    for sl in (4301, 4302, 4303):
+        digest.submit(1, f"Trailing ticket 7 SL {sl}", collapse_key=("trailing", 7))
+    digest.submit(1, "Trailing ticket 8 SL 10", collapse_key=("trailing", 8))
+    await digest.flush()
+    text = sent[0][1]
+    assert text.startswith("🧾 3 eventos") and "SL 4303" in text and "SL 4301" not in text
+    assert digest.collapsed == 2
+
+
+def test_render_splits_long_digests():
+    digest, _ = _coalescer(max_len=100)
+    chunks = digest.render(["x" * 60, "y" * 60, "z" * 60])
+    assert len(chunks) == 3 and all(len(c) <= 100 for c in chunks)
+    assert chunks[1].startswith("🧾 3 eventos (cont.)")
+
+
+def test_is_urgent():
+    assert is_urgent("  🚨 ERROR") and not is_urgent("🎯 TP HIT")
+
+
+@pytest.mark.asyncio
+async def test_adapter_classifies_trade_events(monkeypatch):
+    from services.common import config
+    monkeypatch.setattr(config.Settings, "accounts_async", AsyncMock(return_value=[{"name": "demo", "chat_id": 55}]))
+    notifier = AsyncMock()
+    adapter = TelegramNotifierAdapter(notifier)
+    await adapter.notify_trade_event('trailing', account_name='demo', ticket=9, message="🔄 Trailing")
+    await adapter.notify_trade_event('sl', account_name='demo', ticket=9)
+    await adapter.notify_trade_event('tp', account_name='demo', ticket=9)
+    opts = [c.kwargs for c in notifier.notify.await_args_list]
+    assert opts == [{"collapse_key": ("trailing", 9)}, {"urgent": True}, {}]
+
+
+@pytest.mark.asyncio
+async def test_adapter_delivers_to_notifiers_without_opts(monkeypatch):
+    """TelegramNotifier y NotifierAdapter sólo aceptan (chat_id, message): reciben el mensaje sin opts."""
+    from services.common import config
+    from services.common.telegram_notifier import NotificationConfig, TelegramNotifier
+    from services.trade_orchestrator.app import NotifierAdapter
+    monkeypatch.setattr(config.Settings, "accounts_async", AsyncMock(return_value=[{"name": "demo", "chat_id": 55}]))
+    client = AsyncMock()
+    direct = TelegramNotifier(client, [NotificationConfig(account_name="55", chat_id=55)])
+    for notifier in (direct, NotifierAdapter(direct)):
+        adapter = TelegramNotifierAdapter(notifier)
+        await adapter.notify_trade_event('sl', account_name='demo', ticket=9)
+        await adapter.notify_trade_event('trailing', account_name='demo', ticket=9, message="🔄 Trailing")
+    sent = [c.args for c in client.send_message.await_args_list]
+    assert len(sent) == 4 and all(chat_id == 55 for chat_id, _ in sent)
+    assert sent[1][1] == "🔄 Trailing"
+
+
+@pytest.mark.asyncio
+async def test_trade_manager_trailing_collapses_by_ticket(monkeypatch):
+    """TradeManager.notify_trailing (única definición) pasa el ticket para colapsar por posición."""
+    from types import SimpleNamespace
+    from services.common import config
+    from services.trade_orchestrator.trade_manager import TradeManager
+    monkeypatch.setattr(config.Settings, "accounts_async", AsyncMock(return_value=[{"name": "demo", "chat_id": 55}]))
+    notifier = AsyncMock()
+    tm = TradeManager(SimpleNamespace(accounts=[], _client_for=lambda a: None), notifier=notifier)
+    await tm.notify_trailing({"name": "demo"}, SimpleNamespace(ticket=9), 2001.5)
+    [call] = notifier.notify.await_args_list
+    assert call.args[0] == "55" and "2001.50000" in call.args[1]
+    assert call.kwargs == {"collapse_key": ("trailing", 9)}
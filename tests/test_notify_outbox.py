@@ -0,0 +1,275 @@
+"""
+Outbox de notificaciones en Redis (notify_outbox.NotifyOutbox / NotifyWorker).
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from services.common.notify_outbox import NotifyOutbox, NotifyWorker, SENT_KEY
+from services.common.redis_streams import Streams, decode_message, encode_message
+from services.common.telegram_notifier import RemoteTelegramNotifier
+
+
+class FakeRedis:
+    """Lo mínimo de redis.asyncio que usan el outbox y el worker."""
+
+    def __init__(self):
+        self.streams = {}
+        self.keys = {}
+        self.acked = []
+        self.down = False
+
+    def xadd_sync(self, stream, fields, **_):
+        entries = self.streams.setdefault(stream, [])
+        msg_id = f"{len(entries) + 1}-0"
+        entries.append((msg_id, dict(fields)))
+        return msg_id
+
+    async def xadd(self, stream, fields, **kw):
+        return self.xadd_sync(stream, fields, **kw)
+
+    async def xack(self, stream, group, *ids):
+        self.acked.extend(ids)
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, r):
+        self.r = r
+        self.ops = []
+
+    def xadd(self, stream, fields, **kw):
+        self.ops.append(lambda: self.r.xadd_sync(stream, fields, **kw))
+
+    def exists(self, key):
+        self.ops.append(lambda: int(key in self.r.keys))
+
+    def set(self, key, value, ex=None):
+        self.ops.append(lambda: self.r.keys.__setitem__(key, value))
+
+    async def execute(self):
+        if self.r.down:
+            raise ConnectionError("redis caído")
+        return [op() for op in self.ops]
+
+
+def _events(r):
+    return [decode_message(Streams.NOTIFY, fields) for _, fields in r.streams.get(Streams.NOTIFY, [])]
+
+
+def _sender(*error_rounds):
+    """post_batch que devuelve, por llamada, el error indicado para cada item (None = ok)."""
+    sender = AsyncMock()
+    calls = []
+    rounds = list(error_rounds)
+
+    async def post_batch(items):
+        calls.append(list(items))
+        error = rounds.pop(0) if rounds else None
+        return [error] * len(items)
+    sender.post_batch.side_effect = post_batch
+    return sender, calls
+
+
+def _worker(r, sender, **kw):
+    kw.setdefault("base_backoff", 0.0)
+    return NotifyWorker(r, sender, consumer="t", **kw)
+
+
+@pytest.mark.asyncio
+async def test_enqueue_does_not_wait_for_redis_and_publishes_in_one_pipeline():
+    r = FakeRedis()
+    outbox = NotifyOutbox(r)
+    ids = [outbox.enqueue(10, f"TP{i}", collapse_key=("trailing", 5)) for i in range(3)]
+    assert _events(r) == [] and len(set(ids)) == 3
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    events = _events(r)
+    assert [e["text"] for e in events] == ["TP0", "TP1", "TP2"]
+    assert events[0]["id"] == ids[0] and events[0]["collapse"] == "trailing:5" and events[0]["urgent"] is False
+    assert outbox.published == 3
+
+
+@pytest.mark.asyncio
+async def test_outbox_keeps_events_while_redis_is_down():
+    r = FakeRedis()
+    r.down = True
+    outbox = NotifyOutbox(r, max_buffer=2, retry_min_sec=0.01)
+    for i in range(3):
+        outbox.enqueue(10, f"m{i}")
+    await asyncio.sleep(0.02)
+    assert _events(r) == [] and outbox.dropped == 1
+    r.down = False
+    assert await outbox.flush()
+    assert [e["text"] for e in _events(r)] == ["m1", "m2"]
+
+
+@pytest.mark.asyncio
+async def test_remote_notifier_with_outbox_only_enqueues():
+    r = FakeRedis()
+    outbox = NotifyOutbox(r)
+    notifier = RemoteTelegramNotifier("http://ingestor:8000", outbox=outbox)
+    await notifier.notify("42", "❌ SL HIT")
+    await notifier.notify("no-es-chat", "x")
+    assert notifier._client is None and notifier.digest is None
+    await outbox.flush()
+    [event] = _events(r)
+    assert event["chat_id"] == 42 and event["urgent"] is True
+
+
+@pytest.mark.asyncio
+async def test_worker_sends_urgent_first_then_one_digest_and_acks():
+    r = FakeRedis()
+    outbox = NotifyOutbox(r)
+    outbox.enqueue(1, "TRADE OPENED")
+    outbox.enqueue(1, "Trailing SL 1.10", collapse_key=("trailing", 7))
+    outbox.enqueue(1, "❌ SL HIT")
+    outbox.enqueue(1, "Trailing SL 1.20", collapse_key=("trailing", 7))
+    outbox.enqueue(2, "TP1")
+    await outbox.flush()
+    sender, calls = _sender()
+    await _worker(r, sender).process(r.streams[Streams.NOTIFY])
+    [items] = calls
+    chat1 = [text for chat_id, text in items if chat_id == 1]
+    assert chat1[0] == "❌ SL HIT"
+    assert chat1[1].startswith("🧾 2 eventos") and "1.20" in chat1[1] and "1.10" not in chat1[1]
+    assert (2, "TP1") in items
+    assert sorted(r.acked) == sorted(msg_id for msg_id, _ in r.streams[Streams.NOTIFY])
+    assert all(SENT_KEY.format(e["id"]) in r.keys for e in _events(r))
+
+
+@pytest.mark.asyncio
+async def test_worker_skips_events_already_delivered():
+    r = FakeRedis()
+    outbox = NotifyOutbox(r)
+    outbox.enqueue(1, "TP1", event_id="abc")
+    await outbox.flush()
+    batch = r.streams[Streams.NOTIFY]
+    sender, calls = _sender()
+    worker = _worker(r, sender)
+    await worker.process(batch)
+    await worker.process(batch)  # re-entrega (p.ej. reinicio antes del XACK)
+    assert len(calls) == 1 and worker.duplicates == 1
+    assert r.acked == ["1-0", "1-0"]
+
+
+@pytest.mark.asyncio
+async def test_failed_chat_is_retried_in_order_then_dead_lettered():
+    r = FakeRedis()
+    outbox = NotifyOutbox(r)
+    outbox.enqueue(1, "primero")
+    await outbox.flush()
+    sender, calls = _sender("timeout", "timeout", "timeout")
+    worker = _worker(r, sender, max_attempts=3)
+    await worker.process(r.streams[Streams.NOTIFY])
+    assert r.acked == [] and worker.retried == 1
+
+    # llega otro evento del mismo chat mientras está en backoff: espera detrás
+    outbox.enqueue(1, "segundo")
+    await outbox.flush()
+    await worker.process(r.streams[Streams.NOTIFY][1:])
+    assert len(calls) == 1
+
+    await worker.retry_due()
+    assert calls[1] == [(1, "🧾 2 eventos\n\nprimero\n\nsegundo")]
+    await worker.retry_due()
+    dead = [decode_message(Streams.NOTIFY_DEAD, f) for _, f in r.streams[Streams.NOTIFY_DEAD]]
+    assert [d["text"] for d in dead] == ["primero"] and dead[0]["error"] == "timeout"
+    assert r.acked == ["1-0"] and worker._due
+
+    await worker.retry_due()  # el cuarto envío sale bien
+    assert r.acked == ["1-0", "2-0"] and not worker._held
+
+
+@pytest.mark.asyncio
+async def test_invalid_event_goes_to_dead_letter():
+    r = FakeRedis()
+    r.xadd_sync(Streams.NOTIFY, encode_message(Streams.NOTIFY, {"text": "sin chat"}))
+    sender, calls = _sender()
+    await _worker(r, sender).process(r.streams[Streams.NOTIFY])
+    assert calls == [] and r.acked == ["1-0"]
+    assert len(r.streams[Streams.NOTIFY_DEAD]) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_reread_from_pending_without_restart(monkeypatch):
+    from services.common import notify_outbox
+    r = FakeRedis()
+    outbox = NotifyOutbox(r)
+    outbox.enqueue(1, "TP1")
+    await outbox.flush()
+    entries = r.streams[Streams.NOTIFY]
+    reads = []
+
+    async def fake_batches(_r, stream, group, consumer, recover_pending=True, **kw):
+        # cada (re)arranque relee los pendientes: la entrada sigue sin ACK
+        reads.append(recover_pending)
+        if r.acked:
+            await asyncio.sleep(3600)
+        yield list(entries)
+    monkeypatch.setattr(notify_outbox, "xreadgroup_batches", fake_batches)
+
+    sender, calls = _sender()
+    worker = _worker(r, sender, base_backoff=0.001)
+    r.down = True  # falla el pipeline de notify:sent
+    task = asyncio.create_task(worker.run())
+    await asyncio.sleep(0.01)
+    assert r.acked == [] and calls == []
+    r.down = False
+    for _ in range(50):
+        await asyncio.sleep(0.005)
+        if r.acked:
+            break
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    assert r.acked == ["1-0"] and calls == [[(1, "TP1")]]
+    assert all(reads)
+
+
+@pytest.mark.asyncio
+async def test_reread_pending_skips_events_waiting_for_retry():
+    r = FakeRedis()
+    outbox = NotifyOutbox(r)
+    outbox.enqueue(1, "primero")
+    await outbox.flush()
+    sender, calls = _sender("timeout")
+    worker = _worker(r, sender, base_backoff=60.0)
+    await worker.process(r.streams[Streams.NOTIFY])
+    await worker.process(r.streams[Streams.NOTIFY])  # relectura de pendientes
+    assert len(calls) == 1
+    assert [m for m, _ in worker._held[1]] == ["1-0"]
+
+
+@pytest.mark.asyncio
+async def test_split_digest_retries_only_the_failed_part():
+    r = FakeRedis()
+    outbox = NotifyOutbox(r)
+    for i in range(4):
+        outbox.enqueue(1, f"evento {i} " + "x" * 40)
+    await outbox.flush()
+    calls = []
+
+    async def post_batch(items):
+        calls.append(list(items))
+        # primera ronda: falla sólo el segundo trozo del digest
+        return [("timeout" if len(calls) == 1 and i == 1 else None) for i in range(len(items))]
+    sender = AsyncMock()
+    sender.post_batch.side_effect = post_batch
+    worker = _worker(r, sender, max_len=120)
+    await worker.process(r.streams[Streams.NOTIFY])
+    [first] = calls
+    assert [text.count("evento ") for _, text in first] == [2, 1, 1]
+    assert r.acked == ["1-0", "2-0", "4-0"]
+
+    worker._due[1] = 0
+    await worker.retry_due()
+    [(_, resent)] = calls[1]
+    assert resent.startswith("evento 2")
+    assert sorted(r.acked) == sorted(m for m, _ in r.streams[Streams.NOTIFY])
@@ -0,0 +1,67 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.router_parser.parse_cache import ParseCache
+from services.router_parser.parsers_base import ParseResult
+from services.router_parser.parsers_goldbro_long import GoldBroLongParser
+from services.router_parser.templates import load_templates
+
+
+def test_hit_returns_same_result_and_caches_negatives():
+    cache = ParseCache(max_entries=10, ttl_sec=60)
+    pr = ParseResult(format_tag="GB_LONG", provider_tag="GB_LONG", symbol="XAUUSD", direction="BUY")
+    k1 = ParseCache.key("100", "ORO BUY 2500-2505")
+    k2 = ParseCache.key("100", "hola")
+    assert cache.lookup(k1) == (False, None)
+    cache.store(k1, pr)
+    cache.store(k2, None)
+    assert cache.lookup(k1) == (True, pr)
+    assert cache.lookup(k2) == (True, None)
+    assert cache.hits == 2 and cache.misses == 1
+
+
+def test_key_depends_on_chat_and_text():
+    assert ParseCache.key("1", "a") == ParseCache.key(1, "a")
+    assert ParseCache.key("1", "a") != ParseCache.key("2", "a")
+    assert ParseCache.key("1", "a") != ParseCache.key("1", "b")
+
+
+def test_ttl_expiry():
+    cache = ParseCache(max_entries=10, ttl_sec=5)
+    k = ParseCache.key("1", "x")
+    cache.store(k, None, now=100.0)
+    assert cache.lookup(k, now=104.9) == (True, None)
+    assert cache.lookup(k, now=105.0) == (False, None)
+    assert len(cache) == 0
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = ParseCache(max_entries=2, ttl_sec=60)
+    ka, kb, kc = (ParseCache.key("1", t) for t in "abc")
+    cache.store(ka, "A")
+    cache.store(kb, "B")
+    cache.lookup(ka)            # a pasa a ser el más reciente
+    cache.store(kc, "C")        # expulsa b
+    assert cache.lookup(kb) == (False, None)
+    assert cache.lookup(ka) == (True, "A")
+    assert cache.lookup(kc) == (True, "C")
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ParseCache(max_entries=0)
+    k = ParseCache.key("1", "x")
+    cache.store(k, "X")
+    assert cache.lookup(k) == (False, None)
+
+
+def test_parsers_emit_float_prices():
+    """parse_signal ya no reconstruye el resultado: los parsers entregan floats."""
+    for parser, text in [
+        (GoldBroLongParser(), "ORO BUY Entry: 2500-2505, SL: 2490, TP1: 2515, TP2: 2530"),
+        (load_templates()["hannah"], "GOLD BUY NOW\n@4460-4457\nSL 4454\nTP1 4463\nTP2 4466"),
+    ]:
+        pr = parser.parse(text)
+        assert all(isinstance(x, float) for x in pr.entry_range)
+        assert isinstance(pr.sl, float)
+        assert all(isinstance(x, float) for x in pr.tps)
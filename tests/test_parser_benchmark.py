@@ -0,0 +1,58 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.router_parser.benchmarks import bench_parsers as bench
+
+
+def test_corpus_covers_every_provider():
+    corpus = bench.load_corpus()
+    expected = {'hannah', 'tradepulse', 'torofx', 'goldbro_fast', 'goldbro_long',
+                'goldbro_scalp', 'daily_signal', 'limitless'}
+    assert set(corpus['providers']) == expected
+    assert all(p['messages'] for p in corpus['providers'].values())
+
+
+def test_corpus_parses_as_declared_and_noise_is_ignored():
+    corpus = bench.load_corpus()
+    router = bench.build_router(corpus)
+    noise = bench.noise_set(corpus['noise'], size=300)
+    assert bench.verify_corpus(router, corpus, noise) == []
+
+
+def test_noise_set_is_deterministic_and_sized():
+    seeds = ["hola", "good morning"]
+    a = bench.noise_set(seeds, size=50)
+    assert a == bench.noise_set(seeds, size=50)
+    assert len(a) == 50 and len(set(a)) == 50
+
+
+def test_run_benchmark_reports_all_targets():
+    corpus = bench.load_corpus()
+    report = bench.run_benchmark(corpus, noise_size=20, rounds=1)
+    assert report['errors'] == []
+    assert {'router', 'router_cached', 'hannah', 'tradepulse'} <= set(report['results'])
+    for r in report['results'].values():
+        assert r['msgs_per_sec'] > 0 and r['score'] > 0
+        assert r['p99_us'] >= r['p50_us']
+
+
+def _report(**scores):
+    return {'corpus_version': 1, 'results': {k: {'score': v} for k, v in scores.items()}}
+
+
+def test_compare_flags_only_regressions_past_threshold():
+    baseline = {'corpus_version': 1, 'scores': {'router': 1.0, 'hannah': 2.0, 'gone': 1.0}}
+    assert bench.compare(_report(router=0.8, hannah=2.5), baseline, max_regression=0.25) == []
+    regressions = bench.compare(_report(router=0.7, hannah=2.0), baseline, max_regression=0.25)
+    assert len(regressions) == 1 and regressions[0].startswith('router:')
+
+
+def test_compare_requires_matching_corpus_version():
+    baseline = {'corpus_version': 0, 'scores': {'router': 1.0}}
+    assert bench.compare(_report(router=1.0), baseline)
+
+
+def test_baseline_from_report():
+    base = bench.baseline_from({'corpus_version': 1, 'noise_size': 10, 'results': {'router': {'score': 0.1234567}}})
+    assert base == {'corpus_version': 1, 'noise_size': 10, 'scores': {'router': 0.123457}}
@@ -0,0 +1,147 @@
+import sys
+import os
+import json
+from dataclasses import asdict
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from services.router_parser.templates import TemplateParser, TemplateError, load_templates
+from services.router_parser.prefilter import MessageView
+from services.router_parser.parsers_base import ParseResult
+
+BUILTIN = load_templates()
+
+SAMPLES = [
+    "GOLD BUY NOW\n\n@4460-4457\n\nSL 4454\n\nTP1 4463\nTP2 4466",
+    "GOLD SELL NOW\n@4475-4478\nSL 4481\nTP1 4472\nTP2 4469\nTP3 4465",
+    "GOLD SELL NOW\nZone: 4473 - 4475\nTP 1: 4470\nTP 2: 4468\nRisk Price: 4478",
+    "GOLD BUY NOW\nZone: 4410 - 4406\nTP 1: 4414\nTP 1: 4414\nRisk Price: 4402",
+    "XAUUSD BUY NOW",
+    "  \n  GOLD SELL NOW  \n",
+    "XAUUSD BUY NOW\nSL 4400",
+    "‼️SIGNAL ALERT‼️\n\nPAIR: XAUUSD\nORDER TYPE: BUY\nENTRY PRICE: 4999 -4992\n\n❌STOP LOSS: 4982\n\n✅TAKE PROFIT 1:5020\n✅TAKE PROFIT 2:5040",
+    "SIGNAL ALERT\nPAIR: GOLD\nORDER TYPE: SELL",
+    "SIGNAL ALERT\nORDER TYPE: SELL\nENTRY PRICE: 3100 - 3110",
+    "ORO BUY Entry: 2500-2505, SL: 2490, TP1: 2515",
+    "Buenos días equipo",
+    "",
+]
+
+
+def _hannah(direction, entry, sl, tps):
+    return ParseResult(format_tag="HANNAH", provider_tag="hannah", symbol="XAUUSD", direction=direction,
+                       entry_range=entry, sl=sl, tps=tps)
+
+
+def _limitless(direction, entry, sl, tps):
+    return ParseResult(format_tag="LIMITLESS", provider_tag="LIMITLESS", symbol="XAUUSD", direction=direction,
+                       entry_range=entry, sl=sl, tps=tps)
+
+
+def _tradepulse(direction, is_fast=True, entry=None, sl=None, tps=None):
+    return ParseResult(format_tag="TRADEPULSE", provider_tag="TRADE_PULSE", symbol="XAUUSD", direction=direction,
+                       is_fast=is_fast, entry_range=entry, sl=sl, tps=tps)
+
+
+# Resultado esperado de cada plantilla integrada por índice de SAMPLES (el resto: None)
+EXPECTED = {
+    "hannah": {
+        0: _hannah("BUY", (4457.0, 4460.0), 4454.0, [4463.0, 4466.0]),
+        1: _hannah("SELL", (4475.0, 4478.0), 4481.0, [4472.0, 4469.0, 4465.0]),
+    },
+    "limitless": {
+        2: _limitless("SELL", (4473.0, 4475.0), 4478.0, [4470.0, 4468.0]),
+        3: _limitless("BUY", (4410.0, 4406.0), 4402.0, [4414.0]),
+    },
+    "tradepulse": {
+        0: _tradepulse("BUY"),
+        1: _tradepulse("SELL"),
+        2: _tradepulse("SELL"),
+        3: _tradepulse("BUY"),
+        4: _tradepulse("BUY"),
+        5: _tradepulse("SELL"),
+        6: _tradepulse("BUY"),
+        7: _tradepulse("BUY", is_fast=False, entry=(4992.0, 4999.0), sl=4982.0, tps=[5020.0, 5040.0]),
+        8: _tradepulse("SELL", is_fast=False),
+    },
+}
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED))
+@pytest.mark.parametrize("index", range(len(SAMPLES)))
+def test_builtin_templates_parse_samples(name, index):
+    template = BUILTIN[name]
+    text = SAMPLES[index]
+    expected = EXPECTED[name].get(index)
+    result = template.parse(text)
+    # templates.py importa parsers_base como módulo suelto: se comparan los campos
+    assert (result and asdict(result)) == (expected and asdict(expected))
+    if result:
+        assert template.anchor(MessageView(text))
+
+
+def _channel(**overrides):
+    tpl = {
+        "name": "nuevo_canal",
+        "format_tag": "NUEVO",
+        "fields": {
+            "signal": r"\b(?P<symbol>xauusd|oro)\s+(?P<direction>compra|venta)\b",
+            "entry": r"entrada\s*:?\s*(?P<entry_a>\d+(?:\.\d+)?)(?:\s*/\s*(?P<entry_b>\d+(?:\.\d+)?))?",
+            "sl": r"\bsl\s*:?\s*(?P<sl>\d+(?:\.\d+)?)",
+            "tp": r"\btp\d?\s*:?\s*(?P<tp>\d+(?:\.\d+)?)",
+        },
+        "multi": ["tp"],
+        "required": ["signal", "entry"],
+        "symbol": {"aliases": {"ORO": "XAUUSD"}},
+        "direction": {"aliases": {"COMPRA": "BUY", "VENTA": "SELL"}},
+        "prefilter": [[["oro", "xauusd"], ["compra", "venta"]]],
+    }
+    tpl.update(overrides)
+    return tpl
+
+
+def test_new_channel_from_template_without_python():
+    parser = TemplateParser(_channel())
+    pr = parser.parse("ORO VENTA entrada 2510/2505 SL 2520 TP1 2500 TP2 2490")
+    assert pr.format_tag == "NUEVO" and pr.provider_tag == "NUEVO"
+    assert (pr.symbol, pr.direction) == ("XAUUSD", "SELL")
+    assert pr.entry_range == (2505.0, 2510.0)
+    assert pr.sl == 2520.0 and pr.tps == [2500.0, 2490.0]
+    assert parser.parse("ORO VENTA sin entrada") is None
+    assert parser.anchor(MessageView("oro compra ya")) is True
+    assert parser.anchor(MessageView("buenos días")) is False
+
+
+def test_fast_variant_and_group_suffix():
+    parser = TemplateParser(_channel(fast=[{
+        "pattern": r"^(?P<symbol__fast>oro)\s+(?P<direction__fast>compra|venta)\s+ya(?:\s+@(?P<hint>\d+))?$",
+        "unless": ["sl"],
+    }]))
+    pr = parser.parse("oro compra ya @2500")
+    assert pr.is_fast and pr.direction == "BUY" and pr.hint_price == 2500.0
+    assert parser.parse("oro compra ya @2500 sl 2490") is None
+
+
+def test_load_templates_extra_dir_overrides_and_skips_invalid(tmp_path, monkeypatch):
+    (tmp_path / "nuevo.json").write_text(json.dumps(_channel()), encoding="utf-8")
+    (tmp_path / "hannah.json").write_text(json.dumps(_channel(name="hannah", format_tag="HANNAH2")), encoding="utf-8")
+    (tmp_path / "roto.json").write_text(json.dumps(_channel(name="roto", fields={"x": "(?P<precio>\\d+)"})), encoding="utf-8")
+    monkeypatch.setenv("PARSER_TEMPLATES_DIR", str(tmp_path))
+    parsers = load_templates()
+    assert parsers["nuevo_canal"].format_tag == "NUEVO"
+    assert parsers["hannah"].format_tag == "HANNAH2"
+    assert "roto" not in parsers
+    assert {"limitless", "tradepulse"} <= set(parsers)
+
+
+@pytest.mark.parametrize("bad", [
+    {"name": "", "fields": {"a": "x"}},
+    {"name": "x", "fields": {}},
+    {"name": "x", "fields": {"a": "("}},
+    {"name": "x", "fields": {"a": "(?P<sl>1)", "b": "(?P<sl>2)"}},
+    {"name": "x", "fields": {"a": "x"}, "required": ["b"]},
+])
+def test_invalid_templates_raise(bad):
+    with pytest.raises(TemplateError):
+        TemplateParser(bad)
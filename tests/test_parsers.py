@@ -9,8 +9,14 @@ from services.router_parser.parsers_goldbro_long import GoldBroLongParser
 from services.router_parser.parsers_goldbro_scalp import GoldBroScalpParser
 from services.router_parser.parsers_torofx import ToroFxParser
 from services.router_parser.parsers_daily_signal import DailySignalParser
-from services.router_parser.parsers_limitless import LimitlessParser
-from services.router_parser.parsers_hannah import HannahParser
+from services.router_parser.templates import load_templates
+
+TEMPLATES = load_templates()
+
+
+def _template(name):
+    return lambda: TEMPLATES[name]
+
 
 @pytest.mark.parametrize("parser_cls,text,expected", [
     (GoldBroFastParser, "Compra ORO ahora @2500", "GB_FAST"),
@@ -18,8 +24,8 @@ from services.router_parser.parsers_hannah import HannahParser
     (GoldBroScalpParser, "ORO SCALP BUY Entry: 2500, SL: 2495, TP1: 2505 (70%), TP2: 2510 (100%)", "GB_SCALP"),
     (ToroFxParser, "EURUSD BUY Entry: 1.2500-1.2510, SL: 1.2490, TP: 1.2550, 1.2600", "TOROFX"),
     (DailySignalParser, "GOLD MARKET BUY Entry: 2500-2505, SL: 2490, TP1: 2515, TP2: 2530, TP3: 2550", "DAILY_SIGNAL"),
-    (LimitlessParser, "GOLD SELL NOW\nZone: 4473 - 4475\nTP 1: 4470\nTP 2: 4468\nRisk Price: 4478", "LIMITLESS"),
-    (HannahParser, "GOLD BUY NOW\n@4460-4457\nSL 4454\nTP1 4463\nTP2 4466", "HANNAH"),
+    (_template("limitless"), "GOLD SELL NOW\nZone: 4473 - 4475\nTP 1: 4470\nTP 2: 4468\nRisk Price: 4478", "LIMITLESS"),
+    (_template("hannah"), "GOLD BUY NOW\n@4460-4457\nSL 4454\nTP1 4463\nTP2 4466", "HANNAH"),
 ])
 def test_parsers(parser_cls, text, expected):
     parser = parser_cls()
@@ -1,8 +1,8 @@
 """
-Tests for TradePulseParser — full signal and fast signal formats.
+Tests for the TradePulse template — full signal and fast signal formats.
 """
 import pytest
-from services.router_parser.parsers_tradepulse import TradePulseParser
+from services.router_parser.templates import load_templates
 
 FULL_SIGNAL_BUY = """‼️SIGNAL ALERT‼️
 
@@ -35,7 +35,7 @@ ENTRY PRICE: 3100 - 3110
 FAST_BUY = "XAUUSD BUY NOW"
 FAST_SELL = "XAUUSD SELL NOW"
 
-parser = TradePulseParser()
+parser = load_templates()["tradepulse"]
 
 
 # ── Full signal ──────────────────────────────────────────────────────────────
@@ -0,0 +1,96 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from services.router_parser.prefilter import MessageView, PARSER_ANCHORS, candidate_parsers
+from services.router_parser.gb_filters import looks_like_followup
+from services.router_parser.torofx_filters import looks_like_torofx_management
+from services.router_parser.parsers_goldbro_fast import GoldBroFastParser
+from services.router_parser.parsers_goldbro_long import GoldBroLongParser
+from services.router_parser.parsers_goldbro_scalp import GoldBroScalpParser
+from services.router_parser.parsers_torofx import ToroFxParser
+from services.router_parser.parsers_daily_signal import DailySignalParser
+from services.router_parser.templates import load_templates
+
+TEMPLATES = load_templates()
+PARSERS = {
+    'hannah': TEMPLATES['hannah'],
+    'goldbro_long': GoldBroLongParser(),
+    'goldbro_fast': GoldBroFastParser(),
+    'goldbro_scalp': GoldBroScalpParser(),
+    'torofx': ToroFxParser(),
+    'daily_signal': DailySignalParser(),
+    'limitless': TEMPLATES['limitless'],
+    'tradepulse': TEMPLATES['tradepulse'],
+}
+
+CORPUS = [
+    # Señales
+    "Compra ORO ahora @2500",
+    "ORO BUY Entry: 2500-2505, SL: 2490, TP1: 2515, TP2: 2530",
+    "ORO SCALP BUY Entry: 2500, SL: 2495, TP1: 2505 (70%), TP2: 2510 (100%)",
+    "EURUSD BUY Entry: 1.2500-1.2510, SL: 1.2490, TP: 1.2550, 1.2600",
+    "GOLD MARKET BUY Entry: 2500-2505, SL: 2490, TP1: 2515, TP2: 2530, TP3: 2550",
+    "GOLD SELL NOW\nZone: 4473 - 4475\nTP 1: 4470\nTP 2: 4468\nRisk Price: 4478",
+    "GOLD BUY NOW\n@4460-4457\nSL 4454\nTP1 4463\nTP2 4466",
+    "XAUUSD SELL NOW",
+    "SIGNAL ALERT\nPAIR: XAUUSD\nORDER TYPE: BUY\nENTRY PRICE: 4400 - 4395\nSTOP LOSS: 4390\nTAKE PROFIT 1: 4410",
+    "Vendan oro de nuevo 4420",
+    "BUY MARKET GBPUSD 1.2700-1.2690 SL 1.2650",
+    "EUR/USD SELL 1.0850-1.0860 Stop Loss: 1.0900 Target: open",
+    # Gestión
+    "Asegurando ganancias, muevan SL a BE",
+    "Tomar parcial en EURUSD",
+    "Cerrando el riesgo de la entrada",
+    "Break even en todas las posiciones",
+    "Corriendo +40 pips desde la entrada",
+    "Cierren @ 2500 con SL 2490 asegurando",
+    # Ruido
+    "Buenos días equipo, hoy hay noticias de la FED",
+    "https://t.me/joinchat/abc",
+    "",
+    "🔥🔥🔥",
+]
+
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_anchor_is_necessary_condition(text):
+    """Si un parser reconoce el mensaje, su ancla tiene que cumplirse (nunca se pierde una señal)."""
+    view = MessageView(text)
+    for name, parser in PARSERS.items():
+        if parser.parse(text):
+            assert PARSER_ANCHORS[name](view), f"{name} parsea {text!r} pero el prefiltro lo descarta"
+
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_management_filters_match_legacy(text):
+    view = MessageView(text)
+    legacy_torofx = looks_like_torofx_management(text) or (
+        "stop loss" in text.lower() and "target: open" in text.lower()
+    )
+    assert view.is_torofx_management() == legacy_torofx
+    assert view.is_followup() == looks_like_followup(text)
+
+
+def test_noise_touches_no_parser():
+    view = MessageView("Buenos días equipo, hoy hay noticias de la FED")
+    assert candidate_parsers(view, list(PARSERS)) == []
+
+
+def test_candidates_keep_order_and_narrow():
+    view = MessageView("SIGNAL ALERT\nPAIR: XAUUSD\nORDER TYPE: BUY\nENTRY PRICE: 4400 - 4395")
+    names = candidate_parsers(view, list(PARSERS))
+    assert 'tradepulse' in names
+    assert 'hannah' not in names and 'limitless' not in names and 'daily_signal' not in names
+    assert names == [n for n in PARSERS if n in names]
+
+
+def test_unknown_parser_is_always_candidate():
+    assert candidate_parsers(MessageView("nada"), ['custom']) == ['custom']
+
+
+def test_overlapping_phrases_are_all_detected():
+    view = MessageView("CERRANDO EL RIESGO y stop loss")
+    assert {"cerrando el riesgo", "cerrando", "stop loss", "stop"} <= view.phrases
@@ -0,0 +1,97 @@
+"""
+Tests de QuoteCache (quote_cache.py) y del publicador de ticks de redis_streams.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from services.common.redis_streams import Streams, publish_tick
+from services.trade_orchestrator.quote_cache import QuoteCache
+
+
+SRC = "mt5_acct1:8001"
+
+
+class Bridge:
+    def __init__(self, price=1999.0, host="mt5_acct1", port=8001):
+        self.price = price
+        self.host = host
+        self.port = port
+        self.calls = 0
+
+    def tick_price(self, symbol, direction):
+        self.calls += 1
+        return self.price
+
+
+def _id(ts):
+    return f"{int(ts * 1000)}-0"
+
+
+def test_fresh_quote_avoids_bridge():
+    qc = QuoteCache(max_age_sec=1.0)
+    qc.apply_tick(_id(time.time()), {"symbol": "XAUUSD", "bid": "2500.1", "ask": "2500.4", "time": "0", "source": SRC})
+    bridge = Bridge()
+    assert qc.tick_price(bridge, "xauusd", "BUY") == 2500.4
+    assert qc.tick_price(bridge, "XAUUSD", "SELL") == 2500.1
+    assert bridge.calls == 0
+
+
+def test_stale_or_missing_quote_falls_back_to_bridge():
+    qc = QuoteCache(max_age_sec=1.0)
+    qc.apply_tick(_id(time.time() - 5), {"symbol": "XAUUSD", "bid": "2500.1", "ask": "2500.4", "source": SRC})
+    bridge = Bridge()
+    assert qc.tick_price(bridge, "XAUUSD", "BUY") == 1999.0
+    assert qc.tick_price(bridge, "EURUSD", "BUY") == 1999.0
+    # Cota por llamada más laxa: el mismo tick sirve
+    assert qc.tick_price(bridge, "XAUUSD", "BUY", max_age=10) == 2500.4
+    assert bridge.calls == 2
+
+
+def test_older_tick_does_not_overwrite_newer():
+    qc = QuoteCache()
+    now = time.time()
+    qc.update(SRC, "XAUUSD", 2501, 2502, now)
+    qc.update(SRC, "XAUUSD", 2400, 2401, now - 1)
+    qc.update(SRC, "XAUUSD", 0, 0, now + 1)   # tick inválido se ignora
+    assert qc.get(SRC, "XAUUSD").bid == 2501.0
+
+
+def test_quotes_only_serve_clients_of_the_publishing_bridge():
+    qc = QuoteCache(max_age_sec=1.0)
+    qc.apply_tick(_id(time.time()), {"symbol": "XAUUSD", "bid": "2500.1", "ask": "2500.4", "source": SRC})
+    qc.apply_tick(_id(time.time()), {"symbol": "EURUSD", "bid": "1.1", "ask": "1.2"})  # sin source: se ignora
+    acct1, acct2 = Bridge(), Bridge(host="mt5_acct2")
+    assert qc.tick_price(acct1, "XAUUSD", "BUY") == 2500.4
+    assert qc.tick_price(acct2, "XAUUSD", "BUY") == 1999.0   # otro broker: a su bridge
+    assert qc.tick_price(acct1, "EURUSD", "BUY") == 1999.0
+    assert (acct1.calls, acct2.calls) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_warm_start_from_latest_hash():
+    r = AsyncMock()
+    r.hgetall.return_value = {"XAUUSD": json.dumps({"bid": "2500", "ask": "2501", "ts": time.time(), "source": SRC}), "BAD": "{"}
+    qc = QuoteCache()
+    assert await qc.warm_start(r) == 1
+    r.hgetall.assert_awaited_once_with(Streams.QUOTES)
+    assert qc.get(SRC, "XAUUSD").ask == 2501.0
+
+
+@pytest.mark.asyncio
+async def test_publish_tick_stream_and_hash_in_one_pipeline():
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    r = MagicMock()
+    r.pipeline.return_value = pipe
+    tick = {"symbol": "XAUUSD", "bid": "2500", "ask": "2501", "time": "1", "source": SRC}
+    await publish_tick(r, tick)
+    pipe.xadd.assert_called_once_with(Streams.TICKS, tick, maxlen=10000, approximate=True)
+    symbol, latest = pipe.hset.call_args.args[1:]
+    assert symbol == "XAUUSD" and json.loads(latest)["bid"] == "2500" and json.loads(latest)["source"] == SRC
+    pipe.execute.assert_awaited_once()
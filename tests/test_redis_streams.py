@@ -0,0 +1,136 @@
+"""
+Tests de los helpers de consumer groups en redis_streams.py.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from services.common.redis_streams import (
+    xreadgroup_batches, xack_batch, create_consumer_group, publish_batch_and_ack,
+    reclaim_idle, Streams,
+)
+
+
+async def _take(agen, n):
+    out = []
+    async for item in agen:
+        out.append(item)
+        if len(out) == n:
+            break
+    return out
+
+
+@pytest.mark.asyncio
+async def test_batches_recover_pending_before_new_messages():
+    """Primero se re-entregan los pendientes del consumer (ID 0...), luego los nuevos ('>')."""
+    r = AsyncMock()
+    r.xreadgroup.side_effect = [
+        [["s", [("1-0", {"a": "1"}), ("2-0", None)]]],   # pendientes (2-0 recortado por MAXLEN)
+        [["s", []]],                                      # fin de pendientes
+        [["s", [("3-0", {"a": "3"})]]],                   # nuevos
+    ]
+    batches = await _take(xreadgroup_batches(r, "s", "g", "c"), 2)
+    assert batches[0] == [("1-0", {"a": "1"}), ("2-0", {})]
+    assert batches[1] == [("3-0", {"a": "3"})]
+    ids_requested = [call.args[2]["s"] for call in r.xreadgroup.call_args_list]
+    assert ids_requested == ["0", "2-0", ">"]
+
+
+@pytest.mark.asyncio
+async def test_batches_without_recovery_start_with_new_messages():
+    r = AsyncMock()
+    r.xreadgroup.side_effect = [None, [["s", [("5-0", {"x": "y"})]]]]
+    batches = await _take(xreadgroup_batches(r, "s", "g", "c", recover_pending=False), 1)
+    assert batches == [[("5-0", {"x": "y"})]]
+    assert all(call.args[2]["s"] == ">" for call in r.xreadgroup.call_args_list)
+
+
+@pytest.mark.asyncio
+async def test_xack_batch_single_command():
+    r = AsyncMock()
+    await xack_batch(r, "s", "g", ["1-0", "2-0", "3-0"])
+    r.xack.assert_awaited_once_with("s", "g", "1-0", "2-0", "3-0")
+    r.xack.reset_mock()
+    await xack_batch(r, "s", "g", [])
+    r.xack.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_create_consumer_group_start_id_and_busygroup():
+    r = AsyncMock()
+    await create_consumer_group(r, "s", "g", start_id="$")
+    r.xgroup_create.assert_awaited_once_with("s", "g", id="$", mkstream=True)
+    r.xgroup_create.side_effect = Exception("BUSYGROUP Consumer Group name already exists")
+    await create_consumer_group(r, "s", "g")   # no lanza
+
+
+class _FakePipeline:
+    def __init__(self):
+        self.ops = []
+
+    def xadd(self, stream, data, **kw):
+        self.ops.append(("xadd", stream, data))
+
+    def xack(self, stream, group, *ids):
+        self.ops.append(("xack", stream, group, ids))
+
+    async def execute(self):
+        return [True] * len(self.ops)
+
+
+@pytest.mark.asyncio
+async def test_publish_batch_and_ack_single_pipeline_in_order():
+    """Salidas en orden de entrada y un único XACK al final, todo en el mismo pipeline."""
+    pipe = _FakePipeline()
+    r = MagicMock()
+    r.pipeline.return_value = pipe
+    outputs = [("signals", {"n": "1"}), ("mgmt", {"n": "2"}), ("signals", {"n": "3"})]
+    await publish_batch_and_ack(r, outputs, "raw", "g", ["1-0", "2-0", "3-0", "4-0"])
+    r.pipeline.assert_called_once_with(transaction=False)
+    assert pipe.ops == [
+        ("xadd", "signals", {"n": "1"}),
+        ("xadd", "mgmt", {"n": "2"}),
+        ("xadd", "signals", {"n": "3"}),
+        ("xack", "raw", "g", ("1-0", "2-0", "3-0", "4-0")),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_publish_batch_and_ack_empty_batch_is_noop():
+    r = MagicMock()
+    assert await publish_batch_and_ack(r, [], "raw", "g", []) == []
+    r.pipeline.assert_not_called()
+
+
+def test_raw_partition_is_stable_per_chat():
+    assert Streams.raw_partition("-100123", 1) == Streams.RAW
+    p = Streams.raw_partition("-100123", 4)
+    assert p == Streams.raw_partition("-100123", 4)
+    assert p in Streams.raw_partitions(4)
+    chats = [str(-1000 - i) for i in range(200)]
+    assert {Streams.raw_partition(c, 4) for c in chats} == set(Streams.raw_partitions(4))
+
+
+@pytest.mark.asyncio
+async def test_reclaim_idle_follows_cursor_and_keeps_deleted_ids():
+    r = AsyncMock()
+    r.xautoclaim.side_effect = [
+        ["5-0", [("1-0", {"a": "1"})], []],
+        ["0-0", [("5-0", {"a": "5"})], ["3-0"]],
+    ]
+    claimed = await reclaim_idle(r, "s", "g", "router-0", min_idle_ms=1000)
+    assert claimed == [("1-0", {"a": "1"}), ("5-0", {"a": "5"}), ("3-0", {})]
+    starts = [call.kwargs["start_id"] for call in r.xautoclaim.call_args_list]
+    assert starts == ["0-0", "5-0"]
+
+
+@pytest.mark.asyncio
+async def test_batches_yield_claimed_entries_before_new_messages():
+    r = AsyncMock()
+    r.xautoclaim.return_value = ["0-0", [("1-0", {"a": "1"})], []]
+    r.xreadgroup.side_effect = [[["s", [("9-0", {"a": "9"})]]]]
+    batches = await _take(xreadgroup_batches(r, "s", "g", "c", recover_pending=False, claim_idle_ms=1000), 2)
+    assert batches == [[("1-0", {"a": "1"})], [("9-0", {"a": "9"})]]
@@ -0,0 +1,58 @@
+"""
+Workers particionados de router_parser: pendientes de particiones sin dueño activo.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'services', 'router_parser')))
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from services.common.redis_streams import Streams
+from services.router_parser import app
+
+
+@pytest.mark.asyncio
+async def test_live_worker_claims_and_acks_idle_entries_of_other_partitions(monkeypatch):
+    streams = Streams.raw_partitions(3)
+    r = AsyncMock()
+    claims = {
+        streams[1]: ["0-0", [("7-0", {"chat_id": "1", "text": "a"}), ("8-0", {"chat_id": "1", "text": "b"})], []],
+        streams[2]: ["0-0", [], []],
+    }
+    r.xautoclaim.side_effect = lambda stream, group, consumer, **kw: claims[stream]
+    router = AsyncMock()
+    router.route_raw.side_effect = [(Streams.SIGNALS, {"symbol": "XAUUSD"}), None]
+    encoded = []
+    monkeypatch.setattr(app, "encode_message", lambda stream, msg: encoded.append(msg) or {"v": "x"})
+    published = AsyncMock()
+    monkeypatch.setattr(app, "publish_batch_and_ack", published)
+
+    handled = await app.claim_foreign_partitions(r, router, streams[1:], "router_group", "router-0", 60000)
+
+    assert handled == 2
+    assert [call.args[0] for call in r.xautoclaim.call_args_list] == streams[1:]
+    assert all(call.args[2] == "router-0" for call in r.xautoclaim.call_args_list)
+    # se procesan en orden y se confirman en la partición de origen, no en la propia
+    published.assert_awaited_once_with(r, [(Streams.SIGNALS, {"v": "x"})], streams[1], "router_group", ["7-0", "8-0"])
+
+
+@pytest.mark.asyncio
+async def test_failed_claim_on_one_partition_does_not_stop_the_others(monkeypatch):
+    streams = Streams.raw_partitions(3)
+    r = AsyncMock()
+
+    def xautoclaim(stream, group, consumer, **kw):
+        if stream == streams[1]:
+            raise ConnectionError("NOGROUP")
+        return ["0-0", [("3-0", {"chat_id": "2"})], []]
+    r.xautoclaim.side_effect = xautoclaim
+    router = AsyncMock()
+    router.route_raw.return_value = None
+    published = AsyncMock()
+    monkeypatch.setattr(app, "publish_batch_and_ack", published)
+
+    assert await app.claim_foreign_partitions(r, router, streams[1:], "router_group", "router-0", 60000) == 1
+    published.assert_awaited_once_with(r, [], streams[2], "router_group", ["3-0"])
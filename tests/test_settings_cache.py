@@ -0,0 +1,113 @@
+"""
+Snapshot tipado de settings (settings_cache) y su recarga en ConfigProvider.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from unittest.mock import MagicMock
+
+from services.common.settings_cache import SettingsSnapshot, SETTINGS_SCHEMA
+from services.common.config_db import ConfigProvider
+
+
+def test_snapshot_converts_schema_keys():
+    snap = SettingsSnapshot({
+        "TOLERANCE_PIPS": "25",
+        "ENABLE_TRAILING": "off",
+        "trailing": '{"demo": {"XAUUSD": {"stop_pips": 10}}}',
+        "OTRA": "x",
+    })
+    assert snap.setting("TOLERANCE_PIPS") == 25.0
+    assert snap.setting("ENABLE_TRAILING") is False
+    assert snap.setting("trailing")["demo"]["XAUUSD"]["stop_pips"] == 10
+    assert snap.get("OTRA") == "x" and "OTRA" not in snap.typed
+
+
+def test_snapshot_defaults_and_invalid_values():
+    snap = SettingsSnapshot({"SL_MAX_PIPS": "mucho"})
+    assert snap.setting("SL_MAX_PIPS") == SETTINGS_SCHEMA["SL_MAX_PIPS"][1]
+    # Sin configurar: default del llamador, si no el del esquema
+    assert snap.setting("SCALING_TRAMO_PIPS", 55.0) == 55.0
+    assert snap.setting("SCALING_TRAMO_PIPS") == 40.0
+
+
+def _provider_with_rows(rows, tmp_path):
+    cur = MagicMock()
+    # Sólo la consulta de settings devuelve filas; cuentas/proveedores vacíos
+    cur.execute.side_effect = lambda sql, params=None: setattr(
+        cur, "rows", rows if sql == "SELECT key, value FROM settings" else [])
+    cur.fetchall.side_effect = lambda: cur.rows
+    conn = MagicMock(autocommit=False)
+    conn.cursor.return_value.__enter__.return_value = cur
+    provider = ConfigProvider(db_url="", listen=False, snapshot_path=str(tmp_path / "config.json"))
+    provider.pool = MagicMock()
+    provider.pool.connection.return_value.__enter__.return_value = conn
+    return provider, cur
+
+
+def test_reload_replaces_snapshot(tmp_path):
+    provider, cur = _provider_with_rows([("TOLERANCE_PIPS", "12"), ("LOG_LEVEL", "DEBUG")], tmp_path)
+    assert provider.reload()
+    queries = cur.execute.call_count
+    assert provider.snapshot.version == 1
+    assert provider.setting("TOLERANCE_PIPS") == 12.0
+    assert provider.get("LOG_LEVEL") == "DEBUG"
+
+    # Lecturas siguientes: sin ir a la base
+    provider.get("TOLERANCE_PIPS")
+    provider.setting("TOLERANCE_PIPS")
+    assert cur.execute.call_count == queries
+
+
+def test_reload_failure_keeps_previous_snapshot(tmp_path):
+    provider, cur = _provider_with_rows([("TOLERANCE_PIPS", "12")], tmp_path)
+    provider.reload()
+    seen = []
+    provider.on_change(seen.append)
+    cur.execute.side_effect = RuntimeError("db caída")
+    assert provider.reload() is False
+    assert provider.setting("TOLERANCE_PIPS") == 12.0 and provider.snapshot.version == 1
+    assert seen == []
+
+
+def test_set_notifies_and_reloads(tmp_path):
+    provider, cur = _provider_with_rows([("SL_MAX_PIPS", "90")], tmp_path)
+    provider.set("SL_MAX_PIPS", "90")
+    sqls = [c.args[0] for c in cur.execute.call_args_list]
+    assert "SELECT pg_notify(%s, %s)" in sqls
+    assert provider.setting("SL_MAX_PIPS") == 90.0
+
+
+def test_without_db_reads_environment(monkeypatch):
+    monkeypatch.setenv("TOLERANCE_PIPS", "18")
+    provider = ConfigProvider(db_url="", listen=False)
+    assert provider.setting("TOLERANCE_PIPS") == 18.0
+    provider.set("TOLERANCE_PIPS", "20")
+    assert provider.setting("TOLERANCE_PIPS") == 20.0 and provider.get("TOLERANCE_PIPS") == "20"
+
+
+def test_scaling_out_reads_typed_snapshot(monkeypatch):
+    """TradeManager._maybe_scaling_out_no_tp lee SCALING_* del snapshot, sin get() por tick."""
+    import asyncio
+    from types import SimpleNamespace
+    from unittest.mock import AsyncMock
+    from services.trade_orchestrator.trade_manager import TradeManager, ManagedTrade
+
+    snap = SettingsSnapshot({"SCALING_TRAMO_PIPS": "10", "SCALING_PERCENT_PER_TRAMO": "20"})
+    provider = MagicMock()
+    provider.setting.side_effect = snap.setting
+    provider.get.side_effect = AssertionError("get() en el camino caliente")
+    acct = {"name": "demo"}
+    tm = TradeManager(SimpleNamespace(accounts=[acct], _client_for=lambda a: None), config_provider=provider)
+    monkeypatch.setattr(tm, "_do_partial_close", AsyncMock())
+    monkeypatch.setattr(tm, "_do_be", AsyncMock())
+    monkeypatch.setattr(tm, "notify_trade_event", AsyncMock())
+    trade = ManagedTrade(account_name="demo", ticket=1, symbol="XAUUSD", direction="BUY",
+                         provider_tag="TOROFX", group_id=1, tps=[], entry_price=2000.0)
+    trade.actions_done = {"HIT_TP_SCALING_TRAMO_1"}
+    pos = SimpleNamespace(ticket=1, price_open=2000.0)
+    # +25 pips con tramos de 10 -> tramo 2: cierra 2 x 20%
+    asyncio.run(tm._maybe_scaling_out_no_tp(acct, pos, 0.01, True, 2002.5, trade))
+    tm._do_partial_close.assert_awaited_once_with(acct, 1, percent=40, reason="ScalingOut-2")
+    assert {c.args[0] for c in provider.setting.call_args_list} == {"SCALING_TRAMO_PIPS", "SCALING_PERCENT_PER_TRAMO"}
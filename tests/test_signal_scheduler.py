@@ -0,0 +1,161 @@
+"""
+Tests del scheduler de señales por carril (signal_scheduler.py).
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import pytest
+
+from services.common.redis_streams import Signal
+from services.trade_orchestrator.signal_scheduler import SignalScheduler, lane_key
+
+
+def _job(log, name, delay=0.0):
+    async def _run():
+        log.append(("start", name))
+        await asyncio.sleep(delay)
+        log.append(("end", name))
+    return _run
+
+
+@pytest.mark.asyncio
+async def test_same_lane_is_sequential_other_lanes_run_concurrently():
+    sched = SignalScheduler(max_concurrency=4)
+    log = []
+    gold = ("XAUUSD", "BUY", "-100")
+    await sched.submit(gold, _job(log, "g1", 0.05))
+    await sched.submit(gold, _job(log, "g2"))
+    await sched.submit(("EURUSD", "SELL", "-200"), _job(log, "e1"))
+    await sched.drain()
+    # e1 no espera a que termine la entrada lenta de g1; g2 sí
+    assert log.index(("end", "e1")) < log.index(("end", "g1"))
+    assert log.index(("end", "g1")) < log.index(("start", "g2"))
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit():
+    sched = SignalScheduler(max_concurrency=2)
+    running = []
+    peak = []
+
+    async def job():
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.02)
+        running.pop()
+
+    for i in range(6):
+        await sched.submit(("S", "BUY", str(i)), job)
+    await sched.drain()
+    assert max(peak) == 2
+
+
+@pytest.mark.asyncio
+async def test_on_done_reports_result_and_failures_do_not_block_lane():
+    sched = SignalScheduler()
+    results = []
+
+    async def boom():
+        raise RuntimeError("fallo")
+
+    async def ok():
+        pass
+
+    async def done(flag):
+        results.append(flag)
+
+    key = ("XAUUSD", "SELL", "1")
+    await sched.submit(key, boom, on_done=done)
+    await sched.submit(key, ok, on_done=done)
+    await sched.drain()
+    assert results == [False, True]
+    assert sched.depth(key) == 0
+
+
+@pytest.mark.asyncio
+async def test_management_priority_holds_new_signals():
+    sched = SignalScheduler()
+    log = []
+    async with sched.priority():
+        await sched.submit(("XAUUSD", "BUY", "1"), _job(log, "sig"))
+        await asyncio.sleep(0.02)
+        assert log == []   # no arranca mientras corre la gestión
+        log.append(("mgmt", "done"))
+    await sched.drain()
+    assert log == [("mgmt", "done"), ("start", "sig"), ("end", "sig")]
+
+
+@pytest.mark.asyncio
+async def test_submit_blocks_when_queue_full():
+    sched = SignalScheduler(max_concurrency=1, max_queued=1)
+    release = asyncio.Event()
+
+    async def wait():
+        await release.wait()
+
+    await sched.submit(("A", "BUY", "1"), wait)
+    second = asyncio.create_task(sched.submit(("B", "BUY", "1"), wait))
+    await asyncio.sleep(0.02)
+    assert not second.done()
+    release.set()
+    await second
+    await sched.drain()
+
+
+def test_fast_and_complete_signal_share_lane():
+    fast = Signal(symbol="XAUUSD", direction="BUY", provider_tag="GB_FAST", chat_id="-1001")
+    full = Signal(symbol="xauusd", direction="BUY", provider_tag="GB_LONG", chat_id="-1001")
+    assert lane_key(fast) == lane_key(full)
+
+
+@pytest.mark.asyncio
+async def test_consume_group_restart_does_not_reschedule_signal_in_flight(monkeypatch):
+    from services.common.redis_streams import Streams, encode_message
+    from services.trade_orchestrator import app
+
+    fields = encode_message(Streams.SIGNALS, Signal(symbol="XAUUSD", direction="BUY", provider_tag="HANNAH"))
+    reads = []
+    acked = []
+
+    async def fake_batches(_r, stream, group, consumer, **kw):
+        # cada (re)arranque relee los pendientes: la señal sigue sin XACK
+        reads.append(consumer)
+        yield [("1-0", fields)]
+        if len(reads) == 1:
+            raise ConnectionError("redis caído")
+        await asyncio.sleep(3600)
+
+    async def fake_xack(_r, stream, group, ids):
+        acked.extend(ids)
+
+    async def noop(*a, **kw):
+        return None
+
+    monkeypatch.setattr(app, "xreadgroup_batches", fake_batches)
+    monkeypatch.setattr(app, "xack_batch", fake_xack)
+    monkeypatch.setattr(app, "create_consumer_group", noop)
+
+    release = asyncio.Event()
+    runs = []
+
+    async def handler(sig, msg_id):
+        runs.append(msg_id)
+        await release.wait()
+
+    sched = SignalScheduler(max_concurrency=4)
+    task = asyncio.create_task(app.consume_group(
+        None, Streams.SIGNALS, "orchestrator_group", "orchestrator-1", handler,
+        start_id="$", scheduler=sched, scheduled=True, retry_sec=0.0,
+    ))
+    for _ in range(20):
+        await asyncio.sleep(0.005)
+    assert len(reads) == 2 and runs == ["1-0"] and acked == []
+
+    release.set()
+    for _ in range(20):
+        await asyncio.sleep(0.005)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    assert runs == ["1-0"] and acked == ["1-0"]
@@ -0,0 +1,128 @@
+"""
+Tests de MT5Executor.modify_sltp_batch: actualización de SL en lote (FAST -> COMPLETE).
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import threading
+import time
+import pytest
+from types import SimpleNamespace
+
+from services.trade_orchestrator.mt5_executor import MT5Executor
+
+
+class FakeBridge:
+    """Cliente MT5 simulado: posiciones en memoria y order_send con latencia fija."""
+
+    def __init__(self, positions, fail_tickets=(), delay=0.0):
+        self.positions = {p.ticket: p for p in positions}
+        self.fail_tickets = set(fail_tickets)
+        self.delay = delay
+        self.positions_get_calls = 0
+        self.symbol_info_calls = []
+        self.order_send_calls = []
+        self._lock = threading.Lock()
+
+    def positions_get(self, *args, **kwargs):
+        with self._lock:
+            self.positions_get_calls += 1
+            return list(self.positions.values())
+
+    def symbol_info(self, symbol):
+        self.symbol_info_calls.append((symbol, threading.current_thread()))
+        return SimpleNamespace(point=0.01, stops_level=0)
+
+    def order_send(self, req):
+        time.sleep(self.delay)
+        with self._lock:
+            self.order_send_calls.append(req)
+            if req["position"] in self.fail_tickets:
+                return SimpleNamespace(retcode=10006, comment="rejected")
+            self.positions[req["position"]].sl = req["sl"]
+            return SimpleNamespace(retcode=10009, comment="done")
+
+
+def _pos(ticket, price=2500.0, sl=2490.0, tp=0.0, symbol="XAUUSD"):
+    return SimpleNamespace(ticket=ticket, symbol=symbol, type=0, price_current=price, sl=sl, tp=tp)
+
+
+def _executor():
+    return MT5Executor([], magic=1)
+
+
+@pytest.mark.asyncio
+async def test_batch_updates_all_accounts_with_single_snapshot():
+    """Un positions_get de snapshot + uno de verificación por cuenta, sin importar el número de tickets."""
+    b1 = FakeBridge([_pos(1), _pos(2)])
+    b2 = FakeBridge([_pos(3)])
+    a1 = {"name": "A1", "client": b1}
+    a2 = {"name": "A2", "client": b2}
+    res = await _executor().modify_sltp_batch([
+        {"account": a1, "ticket": 1, "sl": 2495.0, "tp": None},
+        {"account": a1, "ticket": 2, "sl": 2495.0, "tp": None},
+        {"account": a2, "ticket": 3, "sl": 2495.0, "tp": None},
+    ], reason="full-signal")
+    assert res.updated_by_account == {"A1": {1: 2495.0, 2: 2495.0}, "A2": {3: 2495.0}}
+    assert res.error_count == 0
+    assert b1.positions_get_calls == 2
+    assert b2.positions_get_calls == 2
+    assert len(b1.order_send_calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_missing_and_failed_tickets():
+    bridge = FakeBridge([_pos(1), _pos(2)], fail_tickets={2})
+    acct = {"name": "A1", "client": bridge}
+    res = await _executor().modify_sltp_batch([
+        {"account": acct, "ticket": 1, "sl": 2495.0},
+        {"account": acct, "ticket": 2, "sl": 2495.0},
+        {"account": acct, "ticket": 99, "sl": 2495.0},
+    ], reintentos=2)
+    assert res.updated_by_account["A1"] == {1: 2495.0}
+    assert set(res.errors_by_account["A1"]) == {2, 99}
+    assert "10006" in res.errors_by_account["A1"][2]
+    # ticket 2: dos intentos; ticket 99 nunca se envía
+    assert [r["position"] for r in bridge.order_send_calls] == [1, 2, 2]
+
+
+@pytest.mark.asyncio
+async def test_batch_keeps_tp_unless_given():
+    bridge = FakeBridge([_pos(1, tp=2600.0), _pos(2, tp=2600.0)])
+    acct = {"name": "A1", "client": bridge}
+    await _executor().modify_sltp_batch([
+        {"account": acct, "ticket": 1, "sl": 2495.0, "tp": None},
+        {"account": acct, "ticket": 2, "sl": 2495.0, "tp": 2550.0},
+    ])
+    tps = {r["position"]: r["tp"] for r in bridge.order_send_calls}
+    assert tps == {1: 2600.0, 2: 2550.0}
+
+
+@pytest.mark.asyncio
+async def test_batch_runs_accounts_concurrently():
+    """Con N cuentas lentas el lote tarda ~1 envío, no N envíos en serie."""
+    delay = 0.2
+    accounts = [{"name": f"A{i}", "client": FakeBridge([_pos(i)], delay=delay)} for i in range(4)]
+    items = [{"account": a, "ticket": i, "sl": 2495.0} for i, a in enumerate(accounts)]
+    start = time.monotonic()
+    res = await _executor().modify_sltp_batch(items)
+    elapsed = time.monotonic() - start
+    assert res.updated_count == 4
+    assert elapsed < delay * 3
+
+
+@pytest.mark.asyncio
+async def test_batch_fetches_symbol_info_once_per_symbol_off_the_loop():
+    bridge = FakeBridge([_pos(1), _pos(2), _pos(3), _pos(4, price=1.1, sl=1.09, symbol="EURUSD")])
+    acct = {"name": "A1", "client": bridge}
+    res = await _executor().modify_sltp_batch([
+        {"account": acct, "ticket": 1, "sl": 2495.0},
+        {"account": acct, "ticket": 2, "sl": 2495.0},
+        {"account": acct, "ticket": 3, "sl": 2495.0},
+        {"account": acct, "ticket": 4, "sl": 1.095},
+    ])
+    assert res.updated_count == 4
+    assert sorted(symbol for symbol, _ in bridge.symbol_info_calls) == ["EURUSD", "XAUUSD"]
+    assert all(thread is not threading.main_thread() for _, thread in bridge.symbol_info_calls)
@@ -0,0 +1,269 @@
+"""
+Tests del coalescedor latest-wins de SL por ticket (sl_coalescer.py).
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import time
+import pytest
+
+from services.trade_orchestrator.sl_coalescer import SLCoalescer, APPLIED, FAILED, SUPERSEDED
+
+ACCT = {"name": "demo", "host": "mt5_acct1", "port": 8001}
+
+
+class SlowBridge:
+    """Registra los SL enviados; cada envío tarda `delay` segundos."""
+
+    def __init__(self, delay=0.05, ok=True):
+        self.delay = delay
+        self.ok = ok
+        self.sent = []
+
+    async def send(self, sl):
+        self.sent.append(sl)
+        await asyncio.sleep(self.delay)
+        return self.ok
+
+
+@pytest.mark.asyncio
+async def test_latest_intent_wins_while_one_in_flight():
+    """Con un envío en vuelo, sólo la intención más nueva se envía después; las intermedias se descartan."""
+    co = SLCoalescer(min_interval_sec=0.0)
+    bridge = SlowBridge()
+    first = asyncio.create_task(co.submit(ACCT, 1, 2000.0, bridge.send, reason="BE"))
+    await asyncio.sleep(0.01)  # 2000.0 ya está en vuelo
+    mid = asyncio.create_task(co.submit(ACCT, 1, 2001.0, bridge.send, reason="TRAIL"))
+    await asyncio.sleep(0)
+    last = asyncio.create_task(co.submit(ACCT, 1, 2002.0, bridge.send, reason="TRAIL"))
+    results = await asyncio.gather(first, mid, last)
+    assert results == [APPLIED, SUPERSEDED, APPLIED]
+    assert bridge.sent == [2000.0, 2002.0]
+
+
+@pytest.mark.asyncio
+async def test_same_sl_as_in_flight_shares_result():
+    co = SLCoalescer(min_interval_sec=0.0)
+    bridge = SlowBridge()
+    a = asyncio.create_task(co.submit(ACCT, 1, 2000.0, bridge.send))
+    await asyncio.sleep(0.01)
+    b = asyncio.create_task(co.submit(ACCT, 1, 2000.0, bridge.send))
+    assert await asyncio.gather(a, b) == [APPLIED, APPLIED]
+    assert bridge.sent == [2000.0]
+
+
+@pytest.mark.asyncio
+async def test_already_applied_sl_is_noop():
+    co = SLCoalescer(min_interval_sec=0.0)
+    bridge = SlowBridge(delay=0)
+    assert await co.submit(ACCT, 1, 2000.0, bridge.send) == APPLIED
+    assert await co.submit(ACCT, 1, 2000.0, bridge.send) == APPLIED
+    assert bridge.sent == [2000.0]
+
+
+@pytest.mark.asyncio
+async def test_failed_send_is_reported_and_retried_on_next_intent():
+    co = SLCoalescer(min_interval_sec=0.0)
+    bridge = SlowBridge(delay=0, ok=False)
+    assert await co.submit(ACCT, 1, 2000.0, bridge.send) == FAILED
+    bridge.ok = True
+    assert await co.submit(ACCT, 1, 2000.0, bridge.send) == APPLIED
+    assert bridge.sent == [2000.0, 2000.0]
+
+
+@pytest.mark.asyncio
+async def test_send_exception_counts_as_failure():
+    co = SLCoalescer(min_interval_sec=0.0)
+
+    async def boom(sl):
+        raise RuntimeError("bridge caído")
+
+    assert await co.submit(ACCT, 1, 2000.0, boom) == FAILED
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_per_bridge():
+    """Dos tickets del mismo bridge respetan el intervalo mínimo; otro bridge no espera."""
+    interval = 0.15
+    co = SLCoalescer(min_interval_sec=interval)
+    stamps = {}
+
+    def sender(tag):
+        async def _send(sl):
+            stamps[tag] = time.monotonic()
+            return True
+        return _send
+
+    other = {"name": "other", "host": "mt5_acct2", "port": 8001}
+    start = time.monotonic()
+    await asyncio.gather(
+        co.submit(ACCT, 1, 2000.0, sender("t1")),
+        co.submit(ACCT, 2, 2000.0, sender("t2")),
+        co.submit(other, 3, 2000.0, sender("t3")),
+    )
+    assert abs(stamps["t2"] - stamps["t1"]) >= interval * 0.9
+    assert stamps["t3"] - start < interval
+
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_reserves_consecutive_slots_per_bridge():
+    """Tres tickets del mismo bridge salen en turnos consecutivos, no todos tras el primero."""
+    interval = 0.1
+    co = SLCoalescer(min_interval_sec=interval)
+    stamps = []
+
+    async def send(sl):
+        stamps.append(time.monotonic())
+        return True
+
+    await asyncio.gather(*(co.submit(ACCT, t, 2000.0, send) for t in (1, 2, 3)))
+    gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+    assert all(g >= interval * 0.9 for g in gaps) and all(g < interval * 1.9 for g in gaps)
+
+
+@pytest.mark.asyncio
+async def test_forget_releases_ticket_state():
+    co = SLCoalescer(min_interval_sec=0.0)
+    bridge = SlowBridge(delay=0)
+    await co.submit(ACCT, 1, 2000.0, bridge.send)
+    co.forget(ACCT, 1)
+    assert co._tickets == {}
+
+
+@pytest.mark.asyncio
+async def test_forget_while_in_flight_releases_after_send():
+    co = SLCoalescer(min_interval_sec=0.0)
+    bridge = SlowBridge()
+    task = asyncio.create_task(co.submit(ACCT, 1, 2000.0, bridge.send))
+    await asyncio.sleep(0.01)
+    co.forget(ACCT, 1)
+    assert len(co._tickets) == 1  # el envío en curso sigue teniendo su estado
+    assert await task == APPLIED
+    await asyncio.sleep(0)
+    assert co._tickets == {}
+
+# --- TradeManager._do_be pasa por el coalescedor ---
+
+import ast
+from types import SimpleNamespace
+
+from services.trade_orchestrator.trade_manager import TradeManager, ManagedTrade
+from services.trade_orchestrator.mt5_executor import MT5Executor
+
+
+class BEClient:
+    """Cliente MT5 mínimo para _do_be: una posición BUY y order_send que aplica el SL."""
+
+    def __init__(self):
+        self.pos = SimpleNamespace(ticket=7, symbol="XAUUSD", volume=0.1, time_update=1,
+                                   price_open=2000.0, price_current=2010.0, sl=1990.0, tp=0.0)
+        self.requests = []
+
+    def positions_get(self, ticket=None):
+        return [self.pos]
+
+    def symbol_info(self, symbol):
+        return SimpleNamespace(spread=0, point=0.01, stops_level=0, volume_step=0.01, volume_min=0.01)
+
+    def order_send(self, req):
+        self.requests.append(req)
+        self.pos.sl = req["sl"]
+        return SimpleNamespace(retcode=10009)
+
+
+@pytest.fixture
+def be_manager(monkeypatch):
+    real_sleep = asyncio.sleep
+
+    async def no_wait(_delay, *a, **kw):
+        await real_sleep(0)
+    monkeypatch.setattr(asyncio, "sleep", no_wait)
+    client = BEClient()
+    mt5 = SimpleNamespace(accounts=[ACCT], _client_for=lambda account: client)
+    tm = TradeManager(mt5, notifier=None)
+    tm.sl_coalescer = SLCoalescer(min_interval_sec=0.0)
+    return tm, client
+
+
+def test_trade_manager_defines_each_method_once():
+    """Una definición repetida en la clase deja muerta a la primera (la que se editó)."""
+    path = os.path.join(os.path.dirname(__file__), "..", "services", "trade_orchestrator", "trade_manager.py")
+    tree = ast.parse(open(path, encoding="utf-8").read())
+    cls = next(n for n in tree.body if isinstance(n, ast.ClassDef) and n.name == "TradeManager")
+    names = [n.name for n in cls.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    assert sorted({n for n in names if names.count(n) > 1}) == []
+
+
+@pytest.mark.asyncio
+async def test_do_be_submits_through_coalescer(be_manager):
+    tm, client = be_manager
+    reasons = []
+    submit = tm.sl_coalescer.submit
+
+    async def spy(account, ticket, sl, send, reason=""):
+        reasons.append((ticket, sl, reason))
+        return await submit(account, ticket, sl, send, reason=reason)
+    tm.sl_coalescer.submit = spy
+
+    await tm._do_be(ACCT, 7, 0.01, True)
+    assert reasons == [(7, 2000.0, "BE")]
+    assert [r["sl"] for r in client.requests] == [2000.0]
+
+    # Mismo SL ya aplicado: el coalescedor no vuelve a tocar el bridge
+    await tm._do_be(ACCT, 7, 0.01, True)
+    assert len(client.requests) == 1
+
+
+
+@pytest.mark.asyncio
+async def test_closed_trade_is_forgotten_by_coalescer(be_manager):
+    tm, client = be_manager
+    await tm._do_be(ACCT, 7, 0.01, True)
+    assert tm.sl_coalescer._tickets
+    tm.trades[7] = ManagedTrade(account_name="demo", ticket=7, symbol="XAUUSD", direction="BUY",
+                                provider_tag="T", group_id=1)
+    client.positions_get = lambda ticket=None: []  # la posición se cerró
+    await tm._tick_once_account(ACCT)
+    assert tm.trades == {} and tm.sl_coalescer._tickets == {}
+
+
+@pytest.mark.asyncio
+async def test_trailing_does_not_wait_for_bridge_turn():
+    """El tick de gestión vuelve enseguida; el SL de trailing se aplica cuando le toca el turno."""
+    client = BEClient()
+    mt5 = SimpleNamespace(accounts=[ACCT], _client_for=lambda account: client)
+    tm = TradeManager(mt5, notifier=None)
+    tm.sl_coalescer = SLCoalescer(min_interval_sec=0.2)
+    tm.sl_coalescer._bridge_next_slot[("mt5_acct1", 8001)] = time.monotonic() + 0.2
+    tm.trailing_activation_pips = 0
+    trade = ManagedTrade(account_name="demo", ticket=7, symbol="XAUUSD", direction="BUY",
+                         provider_tag="T", group_id=1)
+    start = time.monotonic()
+    await tm._maybe_trailing(ACCT, client.pos, 0.01, True, 2010.0, trade)
+    assert time.monotonic() - start < 0.1
+    assert client.requests == [] and trade.last_trailing_sl is None
+    await asyncio.gather(*tm._sl_tasks)
+    assert len(client.requests) == 1 and trade.last_trailing_sl == client.requests[0]["sl"]
+
+
+@pytest.mark.asyncio
+async def test_early_partial_close_does_not_claim_be_when_superseded(monkeypatch):
+    client = BEClient()
+    ex = MT5Executor([], magic=1)
+    ex.sl_coalescer = SLCoalescer(min_interval_sec=0.0)
+    monkeypatch.setattr(ex, "_client_for", lambda account: client)
+
+    async def filled(*a, **kw):
+        return SimpleNamespace(retcode=10009)
+    monkeypatch.setattr(ex, "_best_filling_order_send", filled)
+    sent = []
+    monkeypatch.setattr(ex, "_notify_bg", lambda account_name, message: sent.append(message))
+
+    async def superseded(*a, **kw):
+        return SUPERSEDED
+    monkeypatch.setattr(ex.sl_coalescer, "submit", superseded)
+    assert await ex.early_partial_close(ACCT, 7, percent=0.5) is True
+    assert len(sent) == 1 and "movido a BE" not in sent[0] and "no BE" in sent[0]
@@ -0,0 +1,76 @@
+"""
+Tests del codec versionado msgpack de redis_streams.py (Signal / MgmtCommand / eventos).
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+msgpack = pytest.importorskip("msgpack")
+
+from services.common.redis_streams import (
+    Streams, Signal, MgmtCommand, encode_message, decode_message, StreamSchemaError, SIGNAL_VERSION,
+)
+from services.router_parser.parsers_base import ParseResult
+
+
+def _as_binary(fields):
+    """Lo que devuelve una conexión sin decode_responses."""
+    return {k.encode(): (v if isinstance(v, bytes) else str(v).encode()) for k, v in fields.items()}
+
+
+def test_signal_roundtrip_typed():
+    sig = Signal(symbol="XAUUSD", direction="BUY", entry_range=[2500.0, 2505.0], sl=2490.0,
+                 tps=[2515.0, 2530.0], provider_tag="GB_LONG", chat_id="-100", tctx='{"id":"x","h":[]}')
+    fields = encode_message(Streams.SIGNALS, sig)
+    assert set(fields) == {"v", "m"} and fields["v"] == SIGNAL_VERSION
+    assert decode_message(Streams.SIGNALS, _as_binary(fields)) == sig
+
+
+def test_signal_from_parse_result_normalizes_numbers():
+    pr = ParseResult(format_tag="TOROFX", provider_tag="TOROFX", symbol="EURUSD", direction="SELL",
+                     entry_range=("1.25", "1.26"), sl=1.27, tps=[1.24], hint_price=0.0)
+    sig = Signal.from_parse_result(pr, chat_id="7")
+    assert sig.entry_range == [1.25, 1.26]
+    assert sig.fast is False and sig.hint_price is None and sig.chat_id == "7"
+
+
+def test_legacy_flat_signal_still_decodes():
+    legacy = {"symbol": "XAUUSD", "direction": "SELL", "entry_range": "[2500, 2501]", "sl": "2510",
+              "tps": "[2490]", "provider_tag": "HANNAH", "fast": "false", "hint_price": "", "chat_id": "5"}
+    sig = decode_message(Streams.SIGNALS, _as_binary(legacy))
+    assert isinstance(sig, Signal)
+    assert sig.entry_range == [2500.0, 2501.0] and sig.sl == 2510.0 and sig.tps == [2490.0]
+    assert sig.hint_price is None and sig.chat_id == "5"
+
+
+def test_mgmt_and_event_roundtrip():
+    cmd = MgmtCommand(chat_id="9", text="move SL to BE", provider_hint="TOROFX")
+    assert decode_message(Streams.MGMT, encode_message(Streams.MGMT, cmd)) == cmd
+    ev = {"type": "open_errors", "errors": {"acct1": "no money"}}
+    assert decode_message(Streams.EVENTS, _as_binary(encode_message(Streams.EVENTS, ev))) == ev
+
+
+def test_unknown_version_is_rejected():
+    fields = encode_message(Streams.SIGNALS, Signal(symbol="XAUUSD", direction="BUY"))
+    fields["v"] = SIGNAL_VERSION + 1
+    with pytest.raises(StreamSchemaError):
+        decode_message(Streams.SIGNALS, fields)
+
+
+def test_encoded_signal_is_smaller_than_flat_map():
+    sig = Signal(symbol="XAUUSD", direction="BUY", entry_range=[2500.0, 2505.0], sl=2490.0,
+                 tps=[2515.0, 2530.0, 2550.0], provider_tag="GB_LONG", format_tag="GB_LONG", chat_id="-1001234567890")
+    flat = sig.to_fields()
+    packed = encode_message(Streams.SIGNALS, sig)
+    size = lambda f: sum(len(str(k)) + len(v if isinstance(v, bytes) else str(v).encode()) for k, v in f.items())
+    assert size(packed) < size(flat)
+
+
+def test_signal_v1_payload_decodes_without_update_of():
+    sig = Signal(symbol="XAUUSD", direction="BUY", sl=2490.0, update_of="trace-1")
+    assert decode_message(Streams.SIGNALS, encode_message(Streams.SIGNALS, sig)).update_of == "trace-1"
+    v1 = ["XAUUSD", "BUY", None, 2490.0, [], "GB", "", False, None, "5", "", "", ""]
+    old = decode_message(Streams.SIGNALS, {"v": 1, "m": msgpack.packb(v1, use_bin_type=True)})
+    assert old.update_of == "" and old.chat_id == "5"
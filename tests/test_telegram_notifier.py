@@ -0,0 +1,131 @@
+"""
+RemoteTelegramNotifier: cliente HTTP persistente y envío agrupado a /notify/batch.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import importlib
+import json
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+
+from services.common.telegram_notifier import RemoteTelegramNotifier
+
+
+def _notifier(handler, **kw):
+    calls = []
+
+    def record(request):
+        calls.append((request.url.path, json.loads(request.content)))
+        return handler(request)
+    kw.setdefault("digest_window_ms", 0)
+    notifier = RemoteTelegramNotifier("http://ingestor:8000", api_key="k", transport=httpx.MockTransport(record), **kw)
+    return notifier, calls
+
+
+def _ok_batch(request):
+    if request.url.path == "/notify/batch":
+        n = len(json.loads(request.content)["messages"])
+        return httpx.Response(200, json={"status": "ok", "results": [{"status": "ok"}] * n})
+    return httpx.Response(200, json={"status": "ok"})
+
+
+@pytest.mark.asyncio
+async def test_concurrent_notifies_share_one_batch_request():
+    notifier, calls = _notifier(_ok_batch, batch_window_ms=5)
+    await asyncio.gather(*(notifier.notify(100 + i % 3, f"TP1 cuenta {i}") for i in range(8)))
+    assert [path for path, _ in calls] == ["/notify/batch"]
+    assert [m["message"] for m in calls[0][1]["messages"]] == [f"TP1 cuenta {i}" for i in range(8)]
+    client = notifier._client
+    await notifier.notify(100, "otro")
+    assert notifier._client is client and len(calls) == 2
+    await notifier.aclose()
+
+
+@pytest.mark.asyncio
+async def test_batches_are_capped():
+    notifier, calls = _notifier(_ok_batch, batch_window_ms=5, batch_max=3)
+    await notifier.notify_many([(1, f"m{i}") for i in range(7)])
+    assert [len(body.get("messages", [body])) for _, body in calls] == [3, 3, 1]
+    await notifier.aclose()
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_single_notify_without_batch_endpoint():
+    def handler(request):
+        if request.url.path == "/notify/batch":
+            return httpx.Response(404)
+        return httpx.Response(200, json={"status": "ok"})
+    notifier, calls = _notifier(handler, batch_window_ms=5)
+    await notifier.notify_many([(1, "a"), (2, "b")])
+    await notifier.notify_many([(1, "c"), (2, "d")])
+    assert [path for path, _ in calls] == ["/notify/batch", "/notify", "/notify", "/notify", "/notify"]
+    await notifier.aclose()
+
+
+@pytest.mark.asyncio
+async def test_errors_are_logged_not_raised():
+    notifier, _ = _notifier(lambda request: httpx.Response(502), batch_window_ms=0)
+    await notifier.notify(1, "x")
+    await notifier.notify("no-numerico", "x")
+    await notifier.aclose()
+
+
+@pytest.fixture
+def notify_api(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # TelegramClient crea su .session en el cwd
+    monkeypatch.setenv("NOTIFY_API_KEY", "")
+    monkeypatch.setenv("TG_API_ID", "1")
+    monkeypatch.setenv("TG_API_HASH", "hash")
+    module = importlib.import_module("services.telegram_ingestor.notify_api")
+    module._rate_limit_store.clear()
+    return module
+
+
+def test_notify_batch_endpoint(notify_api, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    sent = []
+
+    async def send_message(chat_id, message):
+        if message == "falla":
+            raise RuntimeError("FloodWait")
+        sent.append((chat_id, message))
+    monkeypatch.setattr(notify_api.client, "send_message", AsyncMock(side_effect=send_message))
+
+    api = TestClient(notify_api.app)
+    resp = api.post("/notify/batch", json={"messages": [
+        {"chat_id": "1", "message": "a"},
+        {"chat_id": "2", "message": "falla"},
+        {"chat_id": "1", "message": "b"},
+    ]})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["status"] == "partial"
+    assert [r["status"] for r in body["results"]] == ["ok", "error", "ok"]
+    assert [m for c, m in sent if c == 1] == ["a", "b"]
+
+    assert api.post("/notify/batch", json={"messages": []}).status_code == 422
+
+
+def test_notify_batch_charges_rate_limit_per_message(notify_api, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(notify_api, "RATE_LIMIT_REQUESTS", 3)
+    send_message = AsyncMock()
+    monkeypatch.setattr(notify_api.client, "send_message", send_message)
+
+    api = TestClient(notify_api.app)
+    messages = [{"chat_id": "1", "message": m} for m in ("a", "b")]
+    assert api.post("/notify/batch", json={"messages": messages}).json()["status"] == "ok"
+    body = api.post("/notify/batch", json={"messages": messages}).json()
+    # queda cupo para un solo mensaje: el último del request vuelve con error para reintentar
+    assert body["status"] == "partial"
+    assert [r["status"] for r in body["results"]] == ["ok", "error"]
+    assert [c.args for c in send_message.await_args_list] == [(1, "a"), (1, "b"), (1, "a")]
+    assert api.post("/notify/batch", json={"messages": messages}).status_code == 429
+    assert api.post("/notify", json={"chat_id": "1", "message": "c"}).status_code == 429
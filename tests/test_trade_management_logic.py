@@ -346,6 +346,8 @@ class TestTrailingStop:
 
         await tm._maybe_trailing(CUENTA, pos, POINT, True, current, trade)
 
+        await asyncio.gather(*tm._sl_tasks)
+
         sl_reqs = [r for r in client.order_send_calls if 'sl' in r and r.get('action') == 3]
         assert len(sl_reqs) >= 1
         new_sl = sl_reqs[0]['sl']
@@ -363,6 +365,8 @@ class TestTrailingStop:
 
         await tm._maybe_trailing(CUENTA, pos, POINT, True, current, trade)
 
+        await asyncio.gather(*tm._sl_tasks)
+
         sl_reqs = [r for r in client.order_send_calls if 'sl' in r]
         assert len(sl_reqs) == 0
 
@@ -379,6 +383,8 @@ class TestTrailingStop:
 
         await tm._maybe_trailing(CUENTA, pos, POINT, True, current, trade)
 
+        await asyncio.gather(*tm._sl_tasks)
+
         sl_reqs = [r for r in client.order_send_calls if 'sl' in r and r.get('action') == 3]
         assert len(sl_reqs) >= 1
 
@@ -394,6 +400,8 @@ class TestTrailingStop:
 
         await tm._maybe_trailing(CUENTA, pos, POINT, True, current, trade)
 
+        await asyncio.gather(*tm._sl_tasks)
+
         sl_reqs = [r for r in client.order_send_calls if 'sl' in r and r.get('action') == 3]
         assert len(sl_reqs) >= 1
         assert sl_reqs[0]['sl'] > old_sl
@@ -412,6 +420,8 @@ class TestTrailingStop:
 
         await tm._maybe_trailing(CUENTA, pos, POINT, False, current, trade)
 
+        await asyncio.gather(*tm._sl_tasks)
+
         sl_reqs = [r for r in client.order_send_calls if 'sl' in r and r.get('action') == 3]
         assert len(sl_reqs) >= 1
         assert sl_reqs[0]['sl'] < old_sl
@@ -432,6 +442,8 @@ class TestTrailingStop:
 
         await tm._maybe_trailing(CUENTA, pos, POINT, True, current, trade)
 
+        await asyncio.gather(*tm._sl_tasks)
+
         sl_reqs = [r for r in client.order_send_calls if 'sl' in r and r.get('action') == 3]
         assert len(sl_reqs) == 0
 
@@ -446,6 +458,8 @@ class TestTrailingStop:
 
         await tm._maybe_trailing(CUENTA, pos, POINT, True, current, trade)
 
+        await asyncio.gather(*tm._sl_tasks)
+
         assert trade.last_trailing_sl is not None
         expected_sl = current - 20 * POINT
         assert abs(trade.last_trailing_sl - expected_sl) < POINT